@@ -0,0 +1,309 @@
+"""
+Admission control for the services, so one Member running heavy reports can't starve everyone else.
+
+Every request is put in one of three classes:
+    - `posting`: Requests that write, e.g. creating an invoice or an Allocation
+    - `heavy`: The reports and exports that aggregate or stream large parts of the ledger, see `HEAVY`
+    - `light`: Every other read
+
+Each class has its own limits in `FINANCIAL_ADMISSION`, so reports can never hold the slots used for posting:
+    - `slots`: The number of requests of the class that can run at once in a process
+    - `tenant_slots`: The number of those that one tenant can hold. Heavy requests are counted per Member, the others
+      per Address
+    - `queue`: The number of requests of the class that can wait for a slot
+    - `timeout`: The seconds a request waits for a slot before it is rejected
+
+Waiting requests are given slots in turn by tenant rather than in the order they arrived, so a tenant with a long queue
+only delays its own requests. Requests that can't be queued, or time out waiting, are rejected with `429 Too Many
+Requests` and a `Retry-After` header estimated from how long requests of the class have been taking.
+
+The limits apply to each process, and waiting requests are queued on the threads of the process, so the services must
+be served by a threaded worker. The Docker image runs gunicorn with the `gthread` worker class and
+`GUNICORN_THREADS` threads per process. A sync worker handles one request at a time, so no request would ever wait
+for a slot or be rejected, and `AdmissionMiddleware` raises ImproperlyConfigured for the requests gunicorn serves
+without threads. The limits of a deployment are those of one process times the number of gunicorn workers.
+
+A waiting request holds a thread just like a running one, so the slots and queues of every class together must fit in
+the `FINANCIAL_ADMISSION_THREADS` threads of a process, see `check_limits`. Otherwise a storm of heavy reports could
+hold every thread, running or waiting, and posting would be starved of threads rather than slots. Only running requests
+query the database, so the slots of the classes together are also the most database connections a process opens.
+
+The limits are checked by `AdmissionThrottle` once the User has been authenticated. Add
+`financial.admission.AdmissionMiddleware` to `MIDDLEWARE`, which releases the slot once the response has been sent, and
+`financial.admission.AdmissionThrottle` to `DEFAULT_THROTTLE_CLASSES` in `REST_FRAMEWORK`. The throttle admits every
+request if the middleware is not installed.
+"""
+# stdlib
+import math
+import threading
+import time
+from collections import Counter, deque, OrderedDict
+from typing import Any, Callable, Deque, Dict, Hashable, NamedTuple, Optional
+# libs
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpRequest, HttpResponse
+from rest_framework.request import Request
+from rest_framework.throttling import BaseThrottle
+# local
+from financial.report_jobs import REPORTS
+
+
+__all__ = [
+    'AdmissionMiddleware',
+    'AdmissionThrottle',
+    'check_limits',
+    'classify',
+    'Gate',
+    'HEAVY',
+    'Limits',
+]
+
+# The URL names of the heavy reports and exports
+HEAVY = frozenset({url_name for url_name, _ in REPORTS.values()} | {
+    'audit_file_collection',
+    'nominal_ledger_export_collection',
+    'purchases_by_territory_collection',
+    'sales_by_territory_collection',
+})
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class Limits(NamedTuple):
+    """
+    The limits of a class of requests, see the module docstring
+    """
+    slots: int
+    tenant_slots: int
+    queue: int
+    timeout: float
+
+
+class _Waiter:
+    __slots__ = ('tenant', 'event', 'granted')
+
+    def __init__(self, tenant: Hashable):
+        self.tenant = tenant
+        self.event = threading.Event()
+        self.granted = False
+
+
+class Gate:
+    """
+    The slots and queue of one class of requests
+    """
+
+    def __init__(self, limits: Limits):
+        self.limits = limits
+        self._lock = threading.Lock()
+        self._running = 0
+        self._tenants: Counter = Counter()
+        # The waiting requests of each tenant. Tenants are moved to the back each time one of their requests is admitted
+        self._waiting: Dict[Hashable, Deque[_Waiter]] = OrderedDict()
+        self._queued = 0
+        # A moving average of how long admitted requests take, in seconds
+        self._duration = 1.0
+
+    def _free(self, tenant: Hashable) -> bool:
+        return self._running < self.limits.slots and self._tenants[tenant] < self.limits.tenant_slots
+
+    def _start(self, tenant: Hashable):
+        self._running += 1
+        self._tenants[tenant] += 1
+
+    def _dispatch(self):
+        """
+        Admit waiting requests while there are free slots, one per tenant in turn
+        """
+        admitted = True
+        while admitted and self._running < self.limits.slots:
+            admitted = False
+            for tenant in list(self._waiting):
+                if not self._free(tenant):
+                    continue
+                waiters = self._waiting.pop(tenant)
+                waiter = waiters.popleft()
+                if len(waiters) > 0:
+                    self._waiting[tenant] = waiters
+                self._queued -= 1
+                self._start(tenant)
+                waiter.granted = True
+                waiter.event.set()
+                admitted = True
+
+    def acquire(self, tenant: Hashable) -> bool:
+        """
+        Wait for a slot for a tenant
+        :return: Whether a slot was acquired. If it was, `release` must be called once the request has finished
+        """
+        with self._lock:
+            if tenant not in self._waiting and self._free(tenant):
+                self._start(tenant)
+                return True
+            if self._queued >= self.limits.queue or self.limits.timeout <= 0:
+                return False
+            waiter = _Waiter(tenant)
+            self._waiting.setdefault(tenant, deque()).append(waiter)
+            self._queued += 1
+
+        if waiter.event.wait(self.limits.timeout):
+            return True
+        with self._lock:
+            # The slot may have been granted after the wait timed out
+            if waiter.granted:
+                return True
+            waiters = self._waiting[tenant]
+            waiters.remove(waiter)
+            if len(waiters) == 0:
+                del self._waiting[tenant]
+            self._queued -= 1
+        return False
+
+    def release(self, tenant: Hashable, duration: float):
+        """
+        Give up a tenant's slot, admitting the next waiting request
+        :param tenant: The tenant that held the slot
+        :param duration: The seconds the request held the slot for
+        """
+        with self._lock:
+            self._running -= 1
+            self._tenants[tenant] -= 1
+            if self._tenants[tenant] <= 0:
+                del self._tenants[tenant]
+            self._duration = 0.8 * self._duration + 0.2 * duration
+            self._dispatch()
+
+    def retry_after(self) -> int:
+        """
+        An estimate of the seconds until a request of this class could be admitted
+        """
+        with self._lock:
+            return max(1, math.ceil(self._duration * (self._queued + 1) / max(self.limits.slots, 1)))
+
+
+_gates: Dict[str, Gate] = {}
+_gates_lock = threading.Lock()
+
+
+def check_limits(limits: Dict[str, Dict[str, Any]], threads: int):
+    """
+    Check that the running and waiting requests of every class together fit in the threads of a process
+    :param limits: The limits of each class, as in FINANCIAL_ADMISSION
+    :param threads: The number of threads that serve requests in each process
+    :raises ImproperlyConfigured: If they don't fit
+    """
+    held = sum(class_limits['slots'] + class_limits['queue'] for class_limits in limits.values())
+    if held > threads:
+        raise ImproperlyConfigured(
+            f'The slots and queues in FINANCIAL_ADMISSION add up to {held} requests, more than the {threads} threads '
+            'of a process. Lower them or raise FINANCIAL_ADMISSION_THREADS and the threads of the server together',
+        )
+
+
+def _gate(name: str) -> Gate:
+    gate = _gates.get(name)
+    if gate is None:
+        with _gates_lock:
+            gate = _gates.setdefault(name, Gate(Limits(**settings.FINANCIAL_ADMISSION[name])))
+    return gate
+
+
+def classify(request: HttpRequest) -> str:
+    """
+    Find the class of a request, one of `posting`, `heavy` or `light`
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is not None and match.url_name in HEAVY:
+        return 'heavy'
+    if request.method in SAFE_METHODS:
+        return 'light'
+    return 'posting'
+
+
+class _Admission:
+    """
+    The slot held by a request, released by AdmissionMiddleware
+    """
+    __slots__ = ('gate', 'tenant', 'admitted', 'released')
+
+    def __init__(self):
+        self.gate: Optional[Gate] = None
+        self.tenant: Hashable = None
+        self.admitted = 0.0
+        self.released = False
+
+    def release(self):
+        if self.gate is not None and not self.released:
+            self.released = True
+            self.gate.release(self.tenant, time.perf_counter() - self.admitted)
+
+
+class AdmissionThrottle(BaseThrottle):
+    """
+    Admit a request once a slot for its class and tenant is free, or reject it with a 429
+    """
+
+    def __init__(self):
+        self.gate: Optional[Gate] = None
+
+    def allow_request(self, request: Request, view: Any) -> bool:
+        admission = getattr(request._request, 'admission', None)
+        if admission is None or admission.gate is not None:
+            # The middleware is not installed, or the request has already been admitted
+            return True
+
+        name = classify(request._request)
+        user = request.user
+        if name == 'heavy':
+            tenant = ('member', getattr(user, 'member', {}).get('id'))
+        else:
+            tenant = ('address', getattr(user, 'address', {}).get('id'))
+
+        self.gate = _gate(name)
+        start = time.perf_counter()
+        admitted = self.gate.acquire(tenant)
+        span = getattr(request._request, 'span', None)
+        if span is not None:
+            span.set_tag('admission_class', name)
+            span.set_tag('admission_wait_ms', round((time.perf_counter() - start) * 1000, 3))
+        if not admitted:
+            return False
+
+        admission.gate = self.gate
+        admission.tenant = tenant
+        admission.admitted = time.perf_counter()
+        return True
+
+    def wait(self) -> Optional[float]:
+        return self.gate.retry_after() if self.gate is not None else None
+
+
+class AdmissionMiddleware:
+    """
+    Release the slot of each request admitted by AdmissionThrottle once its response has been sent
+    """
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        self.get_response = get_response
+        check_limits(settings.FINANCIAL_ADMISSION, settings.FINANCIAL_ADMISSION_THREADS)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        # Requests that don't come from a server, e.g. the replays of Report Jobs, are not checked
+        server = request.META.get('SERVER_SOFTWARE', '')
+        if server.startswith('gunicorn') and not request.META.get('wsgi.multithread', False):
+            raise ImproperlyConfigured(
+                'Admission control needs a threaded worker. Run gunicorn with --worker-class gthread and --threads',
+            )
+        admission = _Admission()
+        request.admission = admission
+        response = None
+        try:
+            response = self.get_response(request)
+        finally:
+            if response is not None and response.streaming:
+                # Streamed exports keep reading the ledger until the server closes the response
+                response._resource_closers.append(admission.release)
+            else:
+                admission.release()
+        return response
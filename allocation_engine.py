@@ -0,0 +1,216 @@
+"""
+Automatic allocation of the open items of a Debtor or Creditor ledger.
+
+The open items of an Address, i.e. the Nominal Ledger entries on its Sales or Purchases ledger with an unallocated
+balance, are loaded in one query and matched in memory for each contra Address. Each strategy only considers the
+balances left open by the strategies before it:
+    - `exact`: An item is matched against the oldest item of the opposite sign with exactly the opposite balance.
+    - `reference`: Items with the same `external_reference` are matched against each other, oldest first.
+    - `fifo`: The remaining items are matched against each other, oldest first.
+
+Every match becomes one Allocation. The Allocations of a run are inserted in one statement, and all of their Allocation
+Details in another, so the balance triggers update each allocated entry once. In a dry run the matches are returned
+without being saved.
+"""
+# stdlib
+from collections import defaultdict, deque
+from decimal import Decimal
+from typing import Deque, Dict, Iterable, List, NamedTuple, Optional, Sequence
+# libs
+from django.db import router, transaction
+# local
+from financial import reserved_accounts as reserved
+from financial.models import Allocation, AllocationDetail, NominalLedger
+
+
+__all__ = [
+    'ALLOCATION_TYPES',
+    'allocate',
+    'AllocationLine',
+    'Match',
+    'STRATEGIES',
+]
+
+STRATEGIES = ('exact', 'reference', 'fifo')
+
+# The Nominal Account and the Transaction Types allocated for each type of allocation, the same Transaction Types as
+# the Allocation service accepts
+ALLOCATION_TYPES = {
+    'customer': (reserved.DEBTOR_CONTROL_ACCOUNT, (11002, 11003, 11004, 11005)),
+    'supplier': (reserved.CREDITOR_CONTROL_ACCOUNT, (10002, 10003, 10004, 10005)),
+}
+
+
+class AllocationLine(NamedTuple):
+    """
+    The amount of a Nominal Ledger entry allocated by a Match, signed the same way as the `amount` of a line sent to
+    the Allocation service, i.e. the opposite of the entry's unallocated balance
+    """
+    amount: Decimal
+    nominal_ledger: NominalLedger
+
+
+class Match(NamedTuple):
+    """
+    A set of open items whose allocated amounts balance to zero
+    - `allocation_id`: The id of the Allocation created for the match, None in a dry run
+    - `contra_address_id`: The contra Address of every entry in the match
+    - `lines`: The amounts allocated
+    - `strategy`: The strategy that made the match
+    """
+    allocation_id: Optional[int]
+    contra_address_id: int
+    lines: List[AllocationLine]
+    strategy: str
+
+
+class _OpenItems:
+    """
+    The open items of one contra Address, and the balances they have left as they are matched
+    """
+
+    def __init__(self, contra_address_id: int, items: List[NominalLedger]):
+        self.contra_address_id = contra_address_id
+        self.items = items
+        self.remaining: Dict[int, Decimal] = {item.pk: Decimal(str(item.unallocated_balance)) for item in items}
+        self.matches: List[Match] = []
+
+    def open(self, items: Iterable[NominalLedger], positive: bool) -> List[NominalLedger]:
+        """
+        The items, in the order given, that are still open on one side
+        """
+        if positive:
+            return [item for item in items if self.remaining[item.pk] > 0]
+        return [item for item in items if self.remaining[item.pk] < 0]
+
+    def match(self, strategy: str, allocated: Dict[NominalLedger, Decimal]):
+        """
+        Record a match of the given amounts, each being the absolute amount allocated from an item
+        """
+        lines = []
+        for item, amount in allocated.items():
+            if self.remaining[item.pk] > 0:
+                amount = amount * -1
+            self.remaining[item.pk] += amount
+            lines.append(AllocationLine(amount=amount, nominal_ledger=item))
+        self.matches.append(Match(
+            allocation_id=None,
+            contra_address_id=self.contra_address_id,
+            lines=lines,
+            strategy=strategy,
+        ))
+
+    def exact(self):
+        """
+        Match each negative item against the oldest positive item of exactly the same balance
+        """
+        positives: Dict[Decimal, Deque[NominalLedger]] = defaultdict(deque)
+        for item in self.open(self.items, positive=True):
+            positives[self.remaining[item.pk]].append(item)
+        for item in self.open(self.items, positive=False):
+            amount = self.remaining[item.pk] * -1
+            candidates = positives.get(amount)
+            if candidates:
+                self.match('exact', {item: amount, candidates.popleft(): amount})
+
+    def reference(self):
+        """
+        Match the items that share an external reference against each other, oldest first
+        """
+        references: Dict[str, List[NominalLedger]] = defaultdict(list)
+        for item in self.items:
+            if item.external_reference:
+                references[item.external_reference].append(item)
+        for items in references.values():
+            self.fifo(items, 'reference')
+
+    def fifo(self, items: Optional[List[NominalLedger]] = None, strategy: str = 'fifo'):
+        """
+        Match the negative items against the positive items, oldest first. Each negative item makes one match with the
+        positive items it is allocated against
+        """
+        if items is None:
+            items = self.items
+        positives = deque(self.open(items, positive=True))
+        for item in self.open(items, positive=False):
+            if len(positives) == 0:
+                break
+            outstanding = self.remaining[item.pk] * -1
+            allocated: Dict[NominalLedger, Decimal] = {}
+            while outstanding > 0 and len(positives) > 0:
+                positive = positives[0]
+                amount = min(outstanding, self.remaining[positive.pk])
+                allocated[positive] = amount
+                outstanding -= amount
+                if amount == self.remaining[positive.pk]:
+                    positives.popleft()
+                else:
+                    # The negative item is fully allocated, and the rest of the positive item is left for the next
+                    break
+            allocated[item] = sum(allocated.values())
+            self.match(strategy, allocated)
+
+
+def allocate(
+        address_id: int,
+        allocation_type: str,
+        contra_address_ids: Optional[Iterable[int]] = None,
+        strategies: Sequence[str] = STRATEGIES,
+        dry_run: bool = False,
+) -> List[Match]:
+    """
+    Match and allocate the open items of an Address' Debtor or Creditor ledger
+    :param address_id: The id of the Address whose ledger is allocated
+    :param allocation_type: `customer` to allocate the Sales ledger or `supplier` to allocate the Purchases ledger
+    :param contra_address_ids: Only allocate the items of these contra Addresses. Defaults to all of them
+    :param strategies: The strategies to match with, in order, see STRATEGIES
+    :param dry_run: Return the matches without creating the Allocations
+    :return: The matches, in the order they were made
+    """
+    nominal_account_number, transaction_types = ALLOCATION_TYPES[allocation_type]
+
+    with transaction.atomic(using=router.db_for_write(Allocation)):
+        items = NominalLedger.objects.lean().filter(
+            address_id=address_id,
+            deleted__isnull=True,
+            transaction_type_id__in=transaction_types,
+        ).exclude(
+            unallocated_balance=0,
+        )
+        if contra_address_ids is not None:
+            items = items.filter(contra_address_id__in=contra_address_ids)
+        if not dry_run:
+            # Lock the items in id order, like the Allocation service, so the balances don't change until the
+            # Allocations are saved
+            items = items.order_by('id').select_for_update()
+
+        groups: Dict[int, List[NominalLedger]] = defaultdict(list)
+        for item in sorted(items, key=lambda nl: (nl.transaction_date, nl.pk)):
+            groups[item.contra_address_id].append(item)
+
+        matches: List[Match] = []
+        for contra_address_id in sorted(groups, key=lambda c: (c is None, c)):
+            open_items = _OpenItems(contra_address_id, groups[contra_address_id])
+            for strategy in strategies:
+                getattr(open_items, strategy)()
+            matches.extend(open_items.matches)
+
+        if dry_run or len(matches) == 0:
+            return matches
+
+        # Postgres returns the ids of the rows inserted in bulk, so the details can reference their Allocations
+        allocations = Allocation.objects.bulk_create(
+            Allocation(address_id=address_id, nominal_account_number=nominal_account_number) for _ in matches
+        )
+        details = []
+        for allocation, match in zip(allocations, matches):
+            for line in match.lines:
+                details.append(AllocationDetail(
+                    allocation=allocation,
+                    credit_amount=line.amount if line.amount < 0 else 0,
+                    debit_amount=line.amount if line.amount > 0 else 0,
+                    nominal_ledger=line.nominal_ledger,
+                ))
+        AllocationDetail.objects.bulk_create(details)
+
+    return [match._replace(allocation_id=allocation.pk) for allocation, match in zip(allocations, matches)]
@@ -0,0 +1,216 @@
+"""
+Archival of the ledger lines of closed years.
+
+Once a Year End has been posted, the entries on or before its date can no longer change, and are only read for audits
+and reports on the whole history of an Address. The archiver moves the debits and credits of those entries from the
+hot line tables into `nominal_ledger_debits_archive` and `nominal_ledger_credits_archive`, so the tables and indexes
+that every posting and report touches only hold the open years.
+
+The archive tables inherit from the line tables, so every read of the line tables, including the resource views,
+exports and the `nominal_account_history` view, still returns the archived lines without any change. The Nominal
+Ledger entries themselves are not moved.
+
+Each run stores the totals of the lines it moved per Nominal Account and transaction type as Ledger Archive Balances.
+The reports that aggregate every line up to a date use these totals in place of the archived lines, see
+`archived_totals`.
+
+The archive tables are created by the first run, not by a migration. Archiving and `partition_ledger` are alternative
+ways of keeping the hot tables small, and a database uses one or the other: a partitioned table can't have inheritance
+children, so a ledger that has been partitioned, or is being partitioned, is never archived. To partition a ledger
+that has been archived, move the lines back with `restore_archives` (`archive_ledger --restore`) first.
+"""
+# stdlib
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+# libs
+from cloudcix_rest.utils import db_lock
+from django.db import connections, router, transaction
+from django.db.models import Max, Q, QuerySet
+# local
+from financial.models import LedgerArchive, LedgerArchiveBalance, NominalLedger
+
+
+__all__ = [
+    'ArchivedTotals',
+    'archive_address',
+    'archived_totals',
+    'restore_archives',
+]
+
+LINE_TABLES = (
+    ('debits', 'nominal_ledger_debits'),
+    ('credits', 'nominal_ledger_credits'),
+)
+
+# The archive tables inherit from the line tables, so every query against `nominal_ledger_debits` and
+# `nominal_ledger_credits` (the ORM, the `nominal_account_history` view and the integrity checks) still reads the
+# archived lines, while inserts, and the indexes of the hot tables, only see the lines that have not been archived.
+# Indexes and foreign keys are not inherited, so they are created for each archive table.
+ARCHIVE_TABLE_SQL = """
+CREATE TABLE {table}_archive () INHERITS ({table});
+ALTER TABLE {table}_archive ADD CONSTRAINT {table}_archive_pkey PRIMARY KEY (id);
+ALTER TABLE {table}_archive ADD CONSTRAINT {table}_archive_nominal_ledger_id_fk
+    FOREIGN KEY (nominal_ledger_id) REFERENCES nominal_ledger (id) DEFERRABLE INITIALLY DEFERRED;
+CREATE INDEX {table}_archive_nominal_ledger_id ON {table}_archive (nominal_ledger_id);
+CREATE INDEX {table}_archive_ledger_account ON {table}_archive (nominal_ledger_id, nominal_account_number)
+    WHERE deleted IS NULL;
+CREATE INDEX {table}_archive_updated ON {table}_archive (updated);
+"""
+
+# Move every archived line back into the hot table and drop the archive table
+RESTORE_SQL = """
+WITH moved AS (
+    DELETE FROM {table}_archive RETURNING *
+)
+INSERT INTO {table} SELECT * FROM moved;
+DROP TABLE {table}_archive;
+"""
+
+# Move the lines of an Address' entries up to a date from the hot table into its archive table, and total the lines
+# that were moved per Nominal Account and transaction type. Deleted lines are archived but not totalled.
+MOVE_SQL = """
+WITH moved AS (
+    DELETE FROM ONLY {table} AS L
+    USING nominal_ledger AS NL
+    WHERE L.nominal_ledger_id = NL.id
+    AND NL.address_id = %(address_id)s
+    AND NL.transaction_date <= %(archived_to)s
+    RETURNING L.*
+), archived AS (
+    INSERT INTO {table}_archive SELECT * FROM moved
+    RETURNING nominal_ledger_id, nominal_account_number, amount, deleted
+)
+SELECT
+    NL.transaction_type_id,
+    A.nominal_account_number,
+    COALESCE(SUM(A.amount) FILTER (WHERE A.deleted IS NULL), 0),
+    COUNT(*)
+FROM archived AS A
+INNER JOIN nominal_ledger AS NL ON NL.id = A.nominal_ledger_id
+GROUP BY NL.transaction_type_id, A.nominal_account_number
+"""
+
+
+class ArchivedTotals(NamedTuple):
+    """
+    How to combine the archived totals of some Addresses with their lines, as of a date
+    - `recent`: A filter on debits or credits that leaves out the lines covered by the archived totals
+    - `balances`: The Ledger Archive Balances to add in place of those lines
+    """
+    recent: Q
+    balances: QuerySet
+
+
+def archived_totals(address_ids: Iterable[int], on: date) -> ArchivedTotals:
+    """
+    Get the archived totals for some Addresses that can be used by a report of every line up to a date
+    :param address_ids: The ids of the Addresses in the report
+    :param on: The date of the report. Archives made up to a later date are not used
+    :return: The filter for the lines, and the balances to add to them
+    """
+    cutoffs = LedgerArchive.objects.cutoffs(address_ids, on)
+    recent = Q()
+    for address_id, archived_to in cutoffs.items():
+        recent &= ~Q(nominal_ledger__address_id=address_id, nominal_ledger__transaction_date__lte=archived_to)
+    balances = LedgerArchiveBalance.objects.filter(
+        address_id__in=cutoffs.keys(),
+        ledger_archive__archived_to__lte=on,
+    )
+    return ArchivedTotals(recent=recent, balances=balances)
+
+
+def _create_archive_tables(cursor):
+    """
+    Create the archive tables if they don't exist yet
+    :raises ValueError: If the line tables are partitioned, or are being partitioned by `partition_ledger`
+    """
+    for _, table in LINE_TABLES:
+        cursor.execute(
+            'SELECT to_regclass(%s) IS NOT NULL, to_regclass(%s) IS NOT NULL, relkind FROM pg_class '
+            'WHERE oid = %s::regclass',
+            (f'{table}_archive', f'{table}_partitioned', table),
+        )
+        exists, partitioning, relkind = cursor.fetchone()
+        if relkind == 'p' or partitioning:
+            raise ValueError(
+                f'{table} is partitioned or is being partitioned, and a partitioned ledger can not be archived',
+            )
+        if not exists:
+            cursor.execute(ARCHIVE_TABLE_SQL.format(table=table))
+
+
+def archive_address(address_id: int) -> Optional[LedgerArchive]:
+    """
+    Move the lines of every entry of an Address on or before its latest Year End into the archive tables
+    :param address_id: The id of the Address to archive
+    :return: The Ledger Archive that records the run, or None if there is no Year End that has not been archived yet
+    :raises ValueError: If the ledger is partitioned
+    """
+    year_end = NominalLedger.year_ends.lean().filter(
+        address_id=address_id,
+    ).aggregate(
+        date=Max('transaction_date'),
+    )['date']
+    if year_end is None:
+        return None
+
+    archived_to = LedgerArchive.objects.filter(
+        address_id=address_id,
+    ).aggregate(
+        date=Max('archived_to'),
+    )['date']
+    if archived_to is not None and archived_to >= year_end:
+        return None
+
+    using = router.db_for_write(LedgerArchive)
+    # The lock stops two runs creating the archive tables at once
+    with transaction.atomic(using=using), db_lock(LedgerArchive):
+        archive = LedgerArchive.objects.create(address_id=address_id, archived_to=year_end)
+        totals: Dict[Tuple[int, int], Dict[str, Decimal]] = defaultdict(
+            lambda: {'credits': Decimal('0'), 'debits': Decimal('0')},
+        )
+        with connections[using].cursor() as cursor:
+            _create_archive_tables(cursor)
+            for side, table in LINE_TABLES:
+                cursor.execute(MOVE_SQL.format(table=table), {'address_id': address_id, 'archived_to': year_end})
+                count = 0
+                for transaction_type_id, nominal_account_number, amount, lines in cursor.fetchall():
+                    totals[(transaction_type_id, nominal_account_number)][side] += amount
+                    count += lines
+                setattr(archive, f'{side}_archived', count)
+
+        LedgerArchiveBalance.objects.bulk_create(
+            LedgerArchiveBalance(
+                address_id=address_id,
+                ledger_archive=archive,
+                nominal_account_number=nominal_account_number,
+                transaction_type_id=transaction_type_id,
+                **amounts,
+            )
+            for (transaction_type_id, nominal_account_number), amounts in totals.items()
+        )
+        archive.save(update_fields=['credits_archived', 'debits_archived'])
+
+    return archive
+
+
+def restore_archives() -> Dict[str, int]:
+    """
+    Move every archived line in the current shard back into the hot line tables, drop the archive tables, and delete
+    the Ledger Archives and their balances. Run this before partitioning the ledger
+    :return: The number of lines moved back into each line table
+    """
+    restored: Dict[str, int] = {}
+    using = router.db_for_write(LedgerArchive)
+    with transaction.atomic(using=using), db_lock(LedgerArchive), connections[using].cursor() as cursor:
+        for _, table in LINE_TABLES:
+            cursor.execute('SELECT to_regclass(%s) IS NOT NULL', (f'{table}_archive',))
+            if not cursor.fetchone()[0]:
+                continue
+            cursor.execute(f'SELECT COUNT(*) FROM {table}_archive')
+            restored[table] = cursor.fetchone()[0]
+            cursor.execute(RESTORE_SQL.format(table=table))
+        LedgerArchive.objects.all().delete()
+    return restored
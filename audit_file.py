@@ -0,0 +1,340 @@
+"""
+Generation of a standard audit file (modelled on the OECD SAF-T layout) for an Address over a date range.
+
+The file is written with a SAX style generator and yielded in blocks as it is produced, so no document tree is built in
+memory. The master files are small and are read in full, while the Nominal Ledger entries are streamed in chunks using
+`financial.exports.iter_transactions`. The control totals of each section are accumulated while its records are
+written, and are therefore emitted in a `ControlTotals` element at the end of each section rather than at the start.
+"""
+# stdlib
+import io
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, Optional
+from xml.sax.saxutils import XMLGenerator
+# libs
+from django.db.models import Sum
+# local
+from financial.exports import CHUNK_SIZE, export_filters, iter_transactions
+from financial.models import AddressNominalAccount, NominalLedger, NominalLedgerCredit, NominalLedgerDebit, TaxRate
+
+
+__all__ = [
+    'AUDIT_FILE_VERSION',
+    'generate_audit_file',
+]
+
+AUDIT_FILE_VERSION = '1.0'
+
+# Flush the output buffer to the client once it holds this many characters
+BUFFER_SIZE = 64 * 1024
+
+CUSTOMER_TRANSACTION_TYPES = (11000, 11007)
+SUPPLIER_TRANSACTION_TYPES = (10000, 10007)
+
+ZERO = Decimal('0.0000')
+
+
+class _Writer:
+    """
+    A thin wrapper around XMLGenerator that writes to a buffer which can be drained as the document is generated
+    """
+
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._xml = XMLGenerator(self._buffer, encoding='utf-8', short_empty_elements=True)
+
+    def start_document(self):
+        self._xml.startDocument()
+
+    def start(self, tag: str):
+        self._xml.startElement(tag, {})
+
+    def end(self, tag: str):
+        self._xml.endElement(tag)
+
+    def element(self, tag: str, value: Any):
+        """
+        Write an element containing only text. Elements with no value are omitted
+        """
+        if value is None or value == '':
+            return
+        if isinstance(value, (date, datetime)):
+            value = value.isoformat()
+        self._xml.startElement(tag, {})
+        self._xml.characters(str(value))
+        self._xml.endElement(tag)
+
+    def elements(self, values: Dict[str, Any]):
+        for tag, value in values.items():
+            self.element(tag, value)
+
+    def drain(self, force: bool = False) -> Optional[str]:
+        """
+        Take the contents of the buffer if it is full enough to be worth sending, or if `force` is set
+        """
+        if not force and self._buffer.tell() < BUFFER_SIZE:
+            return None
+        value = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return value
+
+
+def _account_balances(model, address_id: int, **filters) -> Dict[int, Decimal]:
+    """
+    Sum the amounts of the lines of one side of the Nominal Ledger for an Address, grouped by Nominal Account
+    """
+    totals = model.objects.filter(
+        nominal_ledger__address_id=address_id,
+        **filters,
+    ).values(
+        'nominal_account_number',
+    ).annotate(
+        total=Sum('amount'),
+    ).order_by(
+        'nominal_account_number',
+    )
+    return {t['nominal_account_number']: t['total'] or ZERO for t in totals}
+
+
+def _balances(address_id: int, **filters) -> Dict[int, Decimal]:
+    """
+    The debit balance of each Nominal Account, with credit balances being negative
+    """
+    balances: Dict[int, Decimal] = defaultdict(lambda: ZERO)
+    for account, total in _account_balances(NominalLedgerDebit, address_id, **filters).items():
+        balances[account] += total
+    for account, total in _account_balances(NominalLedgerCredit, address_id, **filters).items():
+        balances[account] -= total
+    return balances
+
+
+def _contras(address_id: int, transaction_types: Iterable[int], end_date: date) -> Iterator[Dict[str, Any]]:
+    """
+    The Contra Addresses an Address has traded with, using the billing details of the most recent transaction with each
+    """
+    return NominalLedger.objects.lean().filter(
+        address_id=address_id,
+        contra_address_id__isnull=False,
+        transaction_type_id__range=transaction_types,
+        transaction_date__lte=end_date,
+    ).values(
+        'contra_address_id',
+        'name_bill_to',
+        'contra_contact',
+        'address1_bill_to',
+        'address2_bill_to',
+        'address3_bill_to',
+        'city_bill_to',
+        'postcode_bill_to',
+        'country_id_bill_to',
+    ).order_by(
+        'contra_address_id',
+        '-transaction_date',
+        '-id',
+    ).distinct(
+        'contra_address_id',
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+
+def _write_contras(writer: _Writer, section: str, record: str, id_tag: str, contras: Iterable[Dict]) -> Iterator[str]:
+    writer.start(section)
+    count = 0
+    for contra in contras:
+        count += 1
+        writer.start(record)
+        writer.elements({
+            id_tag: contra['contra_address_id'],
+            'Name': contra['name_bill_to'],
+            'Contact': contra['contra_contact'],
+        })
+        writer.start('BillingAddress')
+        writer.elements({
+            'StreetName': contra['address1_bill_to'],
+            'AdditionalAddressDetail': contra['address2_bill_to'],
+            'Region': contra['address3_bill_to'],
+            'City': contra['city_bill_to'],
+            'PostalCode': contra['postcode_bill_to'],
+            'CountryID': contra['country_id_bill_to'],
+        })
+        writer.end('BillingAddress')
+        writer.end(record)
+        chunk = writer.drain()
+        if chunk:
+            yield chunk
+    writer.start('ControlTotals')
+    writer.element('NumberOfRecords', count)
+    writer.end('ControlTotals')
+    writer.end(section)
+
+
+def generate_audit_file(address_id: int, start_date: date, end_date: date, software_version: str) -> Iterator[str]:
+    """
+    Generate the audit file for an Address, yielding blocks of XML as they are produced
+    :param address_id: The id of the Address the audit file is for
+    :param start_date: The first transaction date included in the file
+    :param end_date: The last transaction date included in the file
+    :param software_version: The version of this application, recorded in the header
+    :return: A generator of strings that together form the XML document
+    """
+    writer = _Writer()
+    writer.start_document()
+    writer.start('AuditFile')
+
+    # Header
+    writer.start('Header')
+    writer.elements({
+        'AuditFileVersion': AUDIT_FILE_VERSION,
+        'AddressID': address_id,
+        'SelectionStartDate': start_date,
+        'SelectionEndDate': end_date,
+        'DateCreated': datetime.utcnow().replace(microsecond=0),
+        'SoftwareID': 'CloudCIX Financial',
+        'SoftwareVersion': software_version,
+    })
+    writer.end('Header')
+
+    writer.start('MasterFiles')
+
+    # Chart of accounts, with the balance of each account at the start and end of the period
+    opening = _balances(address_id, nominal_ledger__transaction_date__lt=start_date)
+    movement = _balances(address_id, nominal_ledger__transaction_date__range=(start_date, end_date))
+    accounts = {
+        a['global_nominal_account__nominal_account_number']: a
+        for a in AddressNominalAccount.objects.filter(
+            address_id=address_id,
+        ).values(
+            'description',
+            'global_nominal_account__nominal_account_number',
+            'global_nominal_account__nominal_account_type__description',
+        )
+    }
+    total_opening = total_closing = ZERO
+    writer.start('GeneralLedgerAccounts')
+    # Include accounts that have transactions even if the Address Nominal Account has since been deleted
+    numbers = sorted(set(accounts) | set(opening) | set(movement))
+    for number in numbers:
+        account = accounts.get(number, {})
+        opening_balance = opening.get(number, ZERO)
+        closing_balance = opening_balance + movement.get(number, ZERO)
+        total_opening += opening_balance
+        total_closing += closing_balance
+        writer.start('Account')
+        writer.elements({
+            'AccountID': number,
+            'AccountDescription': account.get('description'),
+            'AccountType': account.get('global_nominal_account__nominal_account_type__description'),
+            'OpeningBalance': opening_balance,
+            'ClosingBalance': closing_balance,
+        })
+        writer.end('Account')
+    writer.start('ControlTotals')
+    writer.elements({
+        'NumberOfRecords': len(numbers),
+        'TotalOpeningBalance': total_opening,
+        'TotalClosingBalance': total_closing,
+    })
+    writer.end('ControlTotals')
+    writer.end('GeneralLedgerAccounts')
+
+    # Customers and Suppliers
+    yield from _write_contras(
+        writer,
+        'Customers',
+        'Customer',
+        'CustomerID',
+        _contras(address_id, CUSTOMER_TRANSACTION_TYPES, end_date),
+    )
+    yield from _write_contras(
+        writer,
+        'Suppliers',
+        'Supplier',
+        'SupplierID',
+        _contras(address_id, SUPPLIER_TRANSACTION_TYPES, end_date),
+    )
+
+    # Tax table
+    count = 0
+    writer.start('TaxTable')
+    for tax_rate in TaxRate.objects.filter(address_id=address_id).values('id', 'description', 'percent').order_by('id'):
+        count += 1
+        writer.start('TaxCodeDetails')
+        writer.elements({
+            'TaxCode': tax_rate['id'],
+            'Description': tax_rate['description'],
+            'TaxPercentage': tax_rate['percent'],
+        })
+        writer.end('TaxCodeDetails')
+    writer.start('ControlTotals')
+    writer.element('NumberOfRecords', count)
+    writer.end('ControlTotals')
+    writer.end('TaxTable')
+
+    writer.end('MasterFiles')
+
+    # Nominal Ledger entries
+    number_of_entries = number_of_lines = 0
+    total_debit = total_credit = ZERO
+    writer.start('GeneralLedgerEntries')
+    for entry, lines in iter_transactions(export_filters(address_id, start_date, end_date)):
+        number_of_entries += 1
+        writer.start('Transaction')
+        writer.elements({
+            'TransactionID': entry['id'],
+            'TransactionType': entry['transaction_type_id'],
+            'TransactionSequenceNumber': entry['tsn'],
+            'TransactionDate': entry['transaction_date'],
+            'SourceDocumentID': entry['external_reference'],
+            'Description': entry['narrative'],
+            'ContraAddressID': entry['contra_address_id'],
+            'SystemEntryDate': entry['created'],
+        })
+        writer.start('Lines')
+        for line in lines:
+            number_of_lines += 1
+            debit = line['side'] == 'debit'
+            if debit:
+                total_debit += line['amount']
+            else:
+                total_credit += line['amount']
+            tag = 'DebitLine' if debit else 'CreditLine'
+            writer.start(tag)
+            writer.elements({
+                'RecordID': line['id'],
+                'AccountID': line['nominal_account_number'],
+                'Description': line['description'],
+                'DebitAmount' if debit else 'CreditAmount': line['amount'],
+                'ExchangeRate': line['exchange_rate'],
+                'Quantity': line['quantity'],
+                'UnitPrice': line['unit_price'],
+                'ProductCode': line['part_number'],
+            })
+            if line['tax_rate_id'] is not None:
+                writer.start('TaxInformation')
+                writer.elements({
+                    'TaxCode': line['tax_rate_id'],
+                    'TaxPercentage': line['tax_percent'],
+                })
+                writer.end('TaxInformation')
+            writer.end(tag)
+        writer.end('Lines')
+        writer.end('Transaction')
+
+        chunk = writer.drain()
+        if chunk:
+            yield chunk
+
+    writer.start('ControlTotals')
+    writer.elements({
+        'NumberOfEntries': number_of_entries,
+        'NumberOfLines': number_of_lines,
+        'TotalDebit': total_debit,
+        'TotalCredit': total_credit,
+    })
+    writer.end('ControlTotals')
+    writer.end('GeneralLedgerEntries')
+
+    writer.end('AuditFile')
+    yield writer.drain(force=True)
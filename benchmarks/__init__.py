@@ -0,0 +1,75 @@
+"""
+Benchmarks of the report and allocation services against a synthetic ledger.
+
+Build a dataset with the `build_benchmark_dataset` management command and run the scenarios against it with
+`run_benchmarks`. The results can be saved as a baseline and later runs compared against it, so a change to a service
+or its queries can be checked for regressions in latency, query count and memory before it is released.
+`run_benchmarks --serialization` instead times the per row cost of serializing the ledger with each sparse fieldset, and
+`run_benchmarks --partitioning` compares the hot queries on the partitioned ledger with the tables it replaced.
+
+The services that write to the ledger are load tested against the same dataset with `run_load_test`, see
+`financial.benchmarks.load`.
+"""
+from .dataset import (
+    build,
+    Scale,
+    SCALES,
+)
+from .partitioning import (
+    PartitioningResult,
+    run_partitioning,
+    table_rows,
+)
+from .runner import (
+    BenchmarkUser,
+    call,
+    compare,
+    load_baseline,
+    Result,
+    run,
+    save_baseline,
+)
+from .scenarios import (
+    Scenario,
+    scenarios,
+)
+from .serialization import (
+    FIELDSETS,
+    run_serialization,
+    SerializationResult,
+)
+from .stub_api import StubAPI
+
+
+__all__ = [
+    # Dataset
+    'build',
+    'Scale',
+    'SCALES',
+
+    # Partitioning
+    'PartitioningResult',
+    'run_partitioning',
+    'table_rows',
+
+    # Runner
+    'BenchmarkUser',
+    'call',
+    'compare',
+    'load_baseline',
+    'Result',
+    'run',
+    'save_baseline',
+
+    # Scenarios
+    'Scenario',
+    'scenarios',
+
+    # Serialization
+    'FIELDSETS',
+    'run_serialization',
+    'SerializationResult',
+
+    # Stub API
+    'StubAPI',
+]
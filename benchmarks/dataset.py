@@ -0,0 +1,513 @@
+"""
+A synthetic ledger for the benchmarks.
+
+The dataset is valid in the sense that the services and the integrity checks expect: every entry balances, the TSNs of
+each Address and Transaction Type are sequential, unallocated balances match the control account lines and the
+Allocations made against them, Period Ends carry the balance the integrity check computes, and Year Ends close the
+trading accounts into the Profit and Loss account.
+
+The chart of accounts, Tax Rates and Statement Settings are created through the ORM. The ledger itself is generated
+with a handful of set based statements inside one transaction, so millions of entries can be built in minutes. Build it
+in a local database only, it is not meant to be removed again.
+"""
+# stdlib
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, NamedTuple
+# libs
+from django.db import connections, router, transaction
+# local
+from financial.models import (
+    AddressNominalAccount,
+    Allocation,
+    AllocationDetail,
+    GlobalNominalAccount,
+    NominalAccountType,
+    NominalLedger,
+    NominalLedgerCredit,
+    NominalLedgerDebit,
+    StatementSettings,
+    TaxRate,
+)
+
+
+__all__ = [
+    'build',
+    'Scale',
+    'SCALES',
+]
+
+
+class Scale(NamedTuple):
+    """
+    The size of a dataset
+    - `addresses`: The number of Addresses, with ids starting from `first_address_id`
+    - `entries`: The number of Nominal Ledger entries of each Address, before Period Ends and Year Ends
+    - `contras`: The number of contra Addresses each Address trades with
+    - `years`: The number of years the entries are spread over, starting from `start`
+    - `bulk_lines`: The number of open items of the contra Address used by the bulk allocation scenario
+    """
+    addresses: int
+    entries: int
+    contras: int = 50
+    years: int = 3
+    bulk_lines: int = 1000
+    first_address_id: int = 1
+    member_id: int = 1
+    start: date = date(2022, 1, 1)
+
+    @property
+    def end(self) -> date:
+        return date(self.start.year + self.years, 1, 1) - timedelta(days=1)
+
+    @property
+    def first_contra_address_id(self) -> int:
+        return self.first_address_id + self.addresses
+
+    @property
+    def bulk_contra_address_id(self) -> int:
+        """
+        The contra Address of the first Address whose items are left open for the bulk allocation scenario
+        """
+        return self.first_contra_address_id + self.contras
+
+
+SCALES = {
+    'small': Scale(addresses=2, entries=10_000),
+    'medium': Scale(addresses=10, entries=100_000),
+    'large': Scale(addresses=20, entries=250_000),
+    # 10 million entries, for the partitioning benchmark
+    'xlarge': Scale(addresses=40, entries=250_000),
+}
+
+ACCOUNT_TYPES = (
+    ('Fixed Assets', 1, 999),
+    ('Current Assets', 1000, 1999),
+    ('Current Liabilities', 2000, 2999),
+    ('Capital and Reserves', 3000, 3999),
+    ('Sales', 4000, 4999),
+    ('Purchases', 5000, 5999),
+    ('Direct Expenses', 6000, 6999),
+    ('Overheads', 7000, 7999),
+)
+
+# The default accounts created by `financial_setup`, as (number, description, sales, purchases)
+ACCOUNTS = (
+    (1000, 'Petty Cash', False, False),
+    (1010, 'Current Account', False, False),
+    (1300, 'Debtors Control Account', False, False),
+    (2200, 'Creditors Control Account', False, False),
+    (2210, 'VAT Control Account', False, False),
+    (3500, 'Profit and Loss b/f', False, False),
+    (4000, 'Sales Account', True, False),
+    (5000, 'Purchases Account', False, True),
+    (6000, 'Direct Expenses', False, False),
+    (6900, 'Sundry Expenses', False, False),
+    (7999, 'Suspense Account', False, False),
+)
+
+TAX_RATES = (
+    ('Exempt', '0'),
+    ('Zero Rate Export', '0'),
+    ('Zero Rate Home', '0'),
+    ('Livestock Rate', '4.8'),
+    ('Flat-Rate Addition', '5.4'),
+    ('Second Reduced Rate', '9'),
+    ('Reduced Rate', '13.5'),
+    ('Standard Rate', '23'),
+)
+
+# The statements that generate the ledger, run in order. `%` is doubled as the statements take parameters, and they are
+# run one at a time because psycopg 3 can't send several statements with parameters at once.
+LEDGER_SQL = (
+    "SET LOCAL financial.bulk_tsn = 'on'",
+    # The entries are staged with their ids so their lines can be generated from the same amounts. Each Address gets a
+    # mix of Account Sale Invoices, Cash Sale Invoices, Account Sale Payments, Account Purchase Invoices and Account
+    # Purchase Payments, spread evenly over the years
+    """
+    CREATE TEMPORARY TABLE benchmark_entry ON COMMIT DROP AS
+    SELECT
+        nextval(pg_get_serial_sequence('nominal_ledger', 'id')) AS id,
+        E.address_id,
+        E.n,
+        (ARRAY[11002, 11002, 11002, 11000, 11004, 11004, 10002, 10002, 10004, 10004])[1 + E.n %% 10]
+            AS transaction_type_id,
+        %(start)s::date + (E.n::bigint * %(days)s / (%(entries)s + 1))::integer AS transaction_date,
+        %(first_contra)s + E.n %% %(contras)s AS contra_address_id,
+        E.net,
+        ROUND(E.net * 0.23, 2) AS vat,
+        E.net + ROUND(E.net * 0.23, 2) AS gross,
+        E.payment
+    FROM (
+        SELECT
+            %(first)s + (i - 1) %% %(addresses)s AS address_id,
+            (i - 1) / %(addresses)s + 1 AS n,
+            (10 + (i * 37) %% 1000)::numeric(23, 4) AS net,
+            (10 + (i * 53) %% 1000)::numeric(23, 4) AS payment
+        FROM generate_series(1, %(addresses)s * %(entries)s) AS i
+    ) AS E
+    """,
+    # One payment and a run of small invoices that add up to it, left open for the bulk allocation scenario
+    """
+    INSERT INTO benchmark_entry (
+        id, address_id, n, transaction_type_id, transaction_date, contra_address_id, net, vat, gross, payment
+    )
+    SELECT
+        nextval(pg_get_serial_sequence('nominal_ledger', 'id')),
+        %(first)s,
+        %(entries)s + 1 + i,
+        CASE WHEN i = 0 THEN 11004 ELSE 11002 END,
+        %(end)s::date,
+        %(bulk_contra)s,
+        10,
+        0,
+        10,
+        (%(bulk_lines)s - 1) * 10
+    FROM generate_series(0, %(bulk_lines)s - 1) AS i
+    """,
+    # Invoices are owed by the contra, so Sale Invoices and Purchase Payments have a positive unallocated balance and
+    # Sale Payments and Purchase Invoices a negative one, see get_unallocated_balance
+    """
+    INSERT INTO nominal_ledger (
+        id, created, updated, extra, address_id, contact, contra_address_id, country_id_bill_to, name_bill_to,
+        narrative, transaction_date, transaction_type_id, tsn, unallocated_balance
+    )
+    SELECT
+        id, now(), now(), '{}', address_id, 'Benchmark', contra_address_id,
+        (ARRAY[372, 276, 250, 826, 840])[1 + contra_address_id %% 5], 'Contra ' || contra_address_id,
+        'Benchmark', transaction_date, transaction_type_id,
+        ROW_NUMBER() OVER (PARTITION BY address_id, transaction_type_id ORDER BY n),
+        CASE transaction_type_id
+            WHEN 11002 THEN gross
+            WHEN 11004 THEN payment * -1
+            WHEN 10002 THEN gross * -1
+            WHEN 10004 THEN payment
+            ELSE 0
+        END
+    FROM benchmark_entry
+    """,
+    """
+    INSERT INTO nominal_ledger_debits (
+        created, updated, extra, amount, exchange_rate, nominal_account_number, nominal_ledger_id, quantity,
+        tax_percent, tax_rate_id, unit_price
+    )
+    SELECT
+        now(), now(), '{}', L.amount, 1, L.nominal_account_number, E.id, L.quantity, L.tax_percent, L.tax_rate_id,
+        L.unit_price
+    FROM benchmark_entry AS E
+    INNER JOIN tax_rate AS T
+    ON T.address_id = E.address_id
+    AND T.description = 'Standard Rate'
+    CROSS JOIN LATERAL (
+        VALUES
+            (11002, 1300, E.gross, NULL::numeric, NULL::numeric, NULL::bigint, NULL::numeric),
+            (11000, 1000, E.gross, NULL, NULL, NULL, NULL),
+            (11004, 1010, E.payment, NULL, NULL, NULL, NULL),
+            (10002, 5000, E.net, 1, 23, T.id, E.net),
+            (10002, 2210, E.vat, NULL, NULL, NULL, NULL),
+            (10004, 2200, E.payment, NULL, NULL, NULL, NULL)
+    ) AS L (transaction_type_id, nominal_account_number, amount, quantity, tax_percent, tax_rate_id, unit_price)
+    WHERE L.transaction_type_id = E.transaction_type_id
+    AND L.amount != 0
+    """,
+    """
+    INSERT INTO nominal_ledger_credits (
+        created, updated, extra, amount, exchange_rate, nominal_account_number, nominal_ledger_id, quantity,
+        tax_percent, tax_rate_id, unit_price
+    )
+    SELECT
+        now(), now(), '{}', L.amount, 1, L.nominal_account_number, E.id, L.quantity, L.tax_percent, L.tax_rate_id,
+        L.unit_price
+    FROM benchmark_entry AS E
+    INNER JOIN tax_rate AS T
+    ON T.address_id = E.address_id
+    AND T.description = 'Standard Rate'
+    CROSS JOIN LATERAL (
+        VALUES
+            (11002, 4000, E.net, 1::numeric, 23::numeric, T.id::bigint, E.net),
+            (11002, 2210, E.vat, NULL, NULL, NULL, NULL),
+            (11000, 4000, E.net, 1, 23, T.id, E.net),
+            (11000, 2210, E.vat, NULL, NULL, NULL, NULL),
+            (11004, 1300, E.payment, NULL, NULL, NULL, NULL),
+            (10002, 2200, E.gross, NULL, NULL, NULL, NULL),
+            (10004, 1010, E.payment, NULL, NULL, NULL, NULL)
+    ) AS L (transaction_type_id, nominal_account_number, amount, quantity, tax_percent, tax_rate_id, unit_price)
+    WHERE L.transaction_type_id = E.transaction_type_id
+    AND L.amount != 0
+    """,
+    # The k-th payment to or from each contra is allocated against the k-th invoice, except every fourth one, so that
+    # there are open items left on both sides
+    """
+    CREATE TEMPORARY TABLE benchmark_allocation ON COMMIT DROP AS
+    SELECT
+        nextval(pg_get_serial_sequence('allocation', 'id')) AS id,
+        P.address_id,
+        P.nominal_account_number,
+        P.id AS payment_id,
+        I.id AS invoice_id,
+        LEAST(P.payment, I.gross) AS amount
+    FROM (
+        SELECT
+            id, address_id, contra_address_id, payment,
+            CASE transaction_type_id WHEN 11004 THEN 1300 ELSE 2200 END AS nominal_account_number,
+            ROW_NUMBER() OVER (PARTITION BY address_id, contra_address_id, transaction_type_id ORDER BY n) AS k
+        FROM benchmark_entry
+        WHERE transaction_type_id IN (11004, 10004)
+        AND contra_address_id != %(bulk_contra)s
+    ) AS P
+    INNER JOIN (
+        SELECT
+            id, address_id, contra_address_id, gross,
+            CASE transaction_type_id WHEN 11002 THEN 1300 ELSE 2200 END AS nominal_account_number,
+            ROW_NUMBER() OVER (PARTITION BY address_id, contra_address_id, transaction_type_id ORDER BY n) AS k
+        FROM benchmark_entry
+        WHERE transaction_type_id IN (11002, 10002)
+        AND contra_address_id != %(bulk_contra)s
+    ) AS I
+    ON I.address_id = P.address_id
+    AND I.contra_address_id = P.contra_address_id
+    AND I.nominal_account_number = P.nominal_account_number
+    AND I.k = P.k
+    WHERE P.k %% 4 != 0
+    """,
+    """
+    INSERT INTO allocation (id, created, updated, extra, address_id, nominal_account_number)
+    SELECT id, now(), now(), '{}', address_id, nominal_account_number
+    FROM benchmark_allocation
+    """,
+    # Each line reduces the balance of its entry towards zero. The balance triggers apply them in this one statement
+    """
+    INSERT INTO allocation_detail (
+        created, updated, extra, allocation_id, credit_amount, debit_amount, nominal_ledger_id
+    )
+    SELECT now(), now(), '{}', A.id, D.credit_amount, D.debit_amount, D.nominal_ledger_id
+    FROM benchmark_allocation AS A
+    CROSS JOIN LATERAL (
+        VALUES
+            (
+                A.invoice_id,
+                CASE WHEN A.nominal_account_number = 1300 THEN A.amount * -1 ELSE 0 END,
+                CASE WHEN A.nominal_account_number = 2200 THEN A.amount ELSE 0 END
+            ),
+            (
+                A.payment_id,
+                CASE WHEN A.nominal_account_number = 2200 THEN A.amount * -1 ELSE 0 END,
+                CASE WHEN A.nominal_account_number = 1300 THEN A.amount ELSE 0 END
+            )
+    ) AS D (nominal_ledger_id, credit_amount, debit_amount)
+    """,
+    # A Period End at the end of every month
+    """
+    CREATE TEMPORARY TABLE benchmark_period_end ON COMMIT DROP AS
+    SELECT
+        nextval(pg_get_serial_sequence('nominal_ledger', 'id')) AS id,
+        A.address_id,
+        M.transaction_date,
+        ROW_NUMBER() OVER (PARTITION BY A.address_id ORDER BY M.transaction_date) AS tsn,
+        COALESCE(
+            LAG(M.transaction_date) OVER (PARTITION BY A.address_id ORDER BY M.transaction_date),
+            DATE '1753-01-01'
+        ) AS previous_date
+    FROM generate_series(%(first)s, %(first)s + %(addresses)s - 1) AS A (address_id)
+    CROSS JOIN (
+        SELECT (date_trunc('month', d) + interval '1 month - 1 day')::date AS transaction_date
+        FROM generate_series(%(start)s::date, %(end)s::date, interval '1 month') AS d
+    ) AS M
+    """,
+    """
+    INSERT INTO nominal_ledger (
+        id, created, updated, extra, address_id, contact, contra_address_id, narrative, transaction_date,
+        transaction_type_id, tsn, unallocated_balance
+    )
+    SELECT id, now(), now(), '{}', address_id, 'Benchmark', address_id, 'Benchmark', transaction_date, 12001, tsn, 0
+    FROM benchmark_period_end
+    """,
+    # The balance of each Period End as the integrity check computes it
+    """
+    UPDATE nominal_ledger AS NL
+    SET period_end_balance = COALESCE((
+        SELECT SUM(L.amount)
+        FROM nominal_ledger AS E
+        INNER JOIN nominal_ledger_debits AS L
+        ON L.nominal_ledger_id = E.id
+        WHERE E.address_id = PE.address_id
+        AND E.deleted IS NULL
+        AND L.deleted IS NULL
+        AND E.transaction_date BETWEEN PE.previous_date AND PE.transaction_date
+        AND (E.transaction_type_id BETWEEN 10000 AND 10005 OR E.transaction_type_id BETWEEN 11000 AND 11005)
+    ), 0)
+    FROM benchmark_period_end AS PE
+    WHERE NL.id = PE.id
+    """,
+    # A Year End on the last Period End of every year, which closes the trading accounts into Profit and Loss the same
+    # way the Year End service does
+    """
+    CREATE TEMPORARY TABLE benchmark_year_end ON COMMIT DROP AS
+    SELECT
+        nextval(pg_get_serial_sequence('nominal_ledger', 'id')) AS id,
+        address_id,
+        transaction_date,
+        ROW_NUMBER() OVER (PARTITION BY address_id ORDER BY transaction_date) AS tsn,
+        COALESCE(
+            LAG(transaction_date) OVER (PARTITION BY address_id ORDER BY transaction_date),
+            DATE '1753-01-01'
+        ) AS previous_date
+    FROM benchmark_period_end
+    WHERE extract(month FROM transaction_date) = 12
+    """,
+    """
+    INSERT INTO nominal_ledger (
+        id, created, updated, extra, address_id, contact, contra_address_id, narrative, transaction_date,
+        transaction_type_id, tsn, unallocated_balance
+    )
+    SELECT id, now(), now(), '{}', address_id, 'Benchmark', address_id, 'Benchmark', transaction_date, 12002, tsn, 0
+    FROM benchmark_year_end
+    """,
+    """
+    CREATE TEMPORARY TABLE benchmark_year_end_balance ON COMMIT DROP AS
+    SELECT YE.id AS nominal_ledger_id, L.nominal_account_number, SUM(L.amount) AS balance
+    FROM benchmark_year_end AS YE
+    INNER JOIN nominal_ledger AS NL
+    ON NL.address_id = YE.address_id
+    AND NL.transaction_date > YE.previous_date
+    AND NL.transaction_date <= YE.transaction_date
+    AND NL.deleted IS NULL
+    INNER JOIN (
+        SELECT nominal_ledger_id, nominal_account_number, amount
+        FROM nominal_ledger_debits
+        WHERE deleted IS NULL
+        AND nominal_account_number >= 4000
+        UNION ALL
+        SELECT nominal_ledger_id, nominal_account_number, amount * -1
+        FROM nominal_ledger_credits
+        WHERE deleted IS NULL
+        AND nominal_account_number >= 4000
+    ) AS L
+    ON L.nominal_ledger_id = NL.id
+    GROUP BY YE.id, L.nominal_account_number
+    HAVING SUM(L.amount) != 0
+    """,
+    # Accounts with a debit balance are credited and the others debited, and the difference goes to Profit and Loss
+    """
+    INSERT INTO nominal_ledger_credits (
+        created, updated, extra, amount, exchange_rate, nominal_account_number, nominal_ledger_id
+    )
+    SELECT now(), now(), '{}', balance, 1, nominal_account_number, nominal_ledger_id
+    FROM benchmark_year_end_balance
+    WHERE balance > 0
+    UNION ALL
+    SELECT now(), now(), '{}', SUM(balance) * -1, 1, 3500, nominal_ledger_id
+    FROM benchmark_year_end_balance
+    GROUP BY nominal_ledger_id
+    HAVING SUM(balance) < 0
+    """,
+    """
+    INSERT INTO nominal_ledger_debits (
+        created, updated, extra, amount, exchange_rate, nominal_account_number, nominal_ledger_id
+    )
+    SELECT now(), now(), '{}', balance * -1, 1, nominal_account_number, nominal_ledger_id
+    FROM benchmark_year_end_balance
+    WHERE balance < 0
+    UNION ALL
+    SELECT now(), now(), '{}', SUM(balance), 1, 3500, nominal_ledger_id
+    FROM benchmark_year_end_balance
+    GROUP BY nominal_ledger_id
+    HAVING SUM(balance) > 0
+    """,
+    'ANALYZE nominal_ledger',
+    'ANALYZE nominal_ledger_debits',
+    'ANALYZE nominal_ledger_credits',
+    'ANALYZE allocation',
+    'ANALYZE allocation_detail',
+)
+
+
+def _build_accounts(scale: Scale):
+    """
+    Create the Nominal Account Types if the database has none, and the chart of accounts, Tax Rates and Statement
+    Settings of every Address
+    """
+    types = {}
+    for description, min_account_number, max_account_number in ACCOUNT_TYPES:
+        types[description], _ = NominalAccountType.objects.get_or_create(
+            description=description,
+            defaults={'max_account_number': max_account_number, 'min_account_number': min_account_number},
+        )
+
+    accounts = list(GlobalNominalAccount.objects.filter(member_id=scale.member_id))
+    if len(accounts) == 0:
+        accounts = GlobalNominalAccount.objects.bulk_create(
+            GlobalNominalAccount(
+                currency_id=1,
+                description=description,
+                member_id=scale.member_id,
+                nominal_account_number=number,
+                nominal_account_type=next(
+                    account_type for account_type in types.values()
+                    if account_type.min_account_number <= number <= account_type.max_account_number
+                ),
+                valid_purchases_account=purchases,
+                valid_sales_account=sales,
+            )
+            for number, description, sales, purchases in ACCOUNTS
+        )
+
+    address_ids = range(scale.first_address_id, scale.first_address_id + scale.addresses)
+    AddressNominalAccount.objects.bulk_create(
+        AddressNominalAccount(
+            address_id=address_id,
+            currency_id=account.currency_id,
+            description=account.description,
+            global_nominal_account=account,
+        )
+        for address_id in address_ids
+        for account in accounts
+    )
+    TaxRate.objects.bulk_create(
+        TaxRate(address_id=address_id, description=description, percent=Decimal(percent))
+        for address_id in address_ids
+        for description, percent in TAX_RATES
+    )
+    StatementSettings.objects.bulk_create(
+        [StatementSettings(address_id=address_id) for address_id in address_ids],
+        ignore_conflicts=True,
+    )
+
+
+def build(scale: Scale) -> Dict[str, int]:
+    """
+    Build a dataset
+    :param scale: The size of the dataset
+    :return: The number of rows in each of the ledger tables afterwards
+    :raises ValueError: If any of the Addresses of the dataset already has a ledger
+    """
+    last_address_id = scale.first_address_id + scale.addresses - 1
+    if NominalLedger.objects.lean().filter(address_id__range=(scale.first_address_id, last_address_id)).exists():
+        raise ValueError(
+            f'Addresses {scale.first_address_id} to {last_address_id} already have ledgers. Build the dataset in an '
+            'empty database or choose another first Address id.',
+        )
+
+    params = {
+        'addresses': scale.addresses,
+        'bulk_contra': scale.bulk_contra_address_id,
+        'bulk_lines': scale.bulk_lines,
+        'contras': scale.contras,
+        'days': (scale.end - scale.start).days,
+        'end': scale.end,
+        'entries': scale.entries,
+        'first': scale.first_address_id,
+        'first_contra': scale.first_contra_address_id,
+        'start': scale.start,
+    }
+    using = router.db_for_write(NominalLedger)
+    with transaction.atomic(using=using):
+        _build_accounts(scale)
+        with connections[using].cursor() as cursor:
+            for sql in LEDGER_SQL:
+                cursor.execute(sql, params if '%' in sql else None)
+
+    return {
+        model._meta.db_table: model.objects.count()
+        for model in (NominalLedger, NominalLedgerDebit, NominalLedgerCredit, Allocation, AllocationDetail)
+    }
@@ -0,0 +1,496 @@
+"""
+Load tests of the services that write to the ledger.
+
+Each worker thread acts as a User of one of the Addresses of the benchmark dataset, and posts a weighted mix of every
+type of transaction to the other Address it is paired with: invoices, credit and debit notes, payments, adjustments,
+receipts and refunds, journals, contra transactions, Allocations and Period Ends. The workers run for a fixed time at
+each level of concurrency, while the cloudcix API clients are served by `StubAPI` with the given latency and error rate.
+
+For each level the results report the transactions per second, the p50 and p99 latency of the requests, the time the
+database spent waiting on locks, and the deadlocks. The lock wait is sampled from `pg_stat_activity`, i.e. the number of
+backends of the database waiting on a lock multiplied by the sampling interval, which includes the waits on the
+`db_lock` of the Nominal Ledger and on the row locks taken by Allocations. Deadlocks are read from `pg_stat_database`.
+
+The transactions are committed. Run the load tests against the benchmark dataset only.
+"""
+# stdlib
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+# libs
+from django.db import connections, router, transaction
+from django.db.models import Max
+from django.test.utils import override_settings
+# local
+from financial import reserved_accounts as reserved
+from financial.benchmarks.dataset import Scale
+from financial.benchmarks.runner import BenchmarkUser, call
+from financial.benchmarks.stub_api import StubAPI
+from financial.models import GlobalNominalAccount, NominalContra, NominalLedger, PaymentMethod, TaxRate
+from financial.sharding import shard_for, use_shard
+
+
+__all__ = [
+    'CONCURRENCY',
+    'LevelResult',
+    'OPERATIONS',
+    'run',
+]
+
+CONCURRENCY = (1, 2, 4, 8, 16, 32, 64)
+
+# The documents that are posted with lines, as the Transaction Type, the Nominal Account of the lines, and whether they
+# are made out to a contra Address and paid with a Payment Method
+DOCUMENTS: Dict[str, Tuple[int, int, bool, bool]] = {
+    'account_sale_invoice': (11002, 4000, True, False),
+    'account_sale_credit_note': (11003, 4000, True, False),
+    'account_purchase_invoice': (10002, 5000, True, False),
+    'account_purchase_debit_note': (10003, 5000, True, False),
+    'cash_sale_invoice': (11000, 4000, True, True),
+    'cash_sale_credit_note': (11001, 4000, True, True),
+    'cash_purchase_invoice': (10000, 5000, True, True),
+    'cash_purchase_debit_note': (10001, 5000, True, True),
+    'cash_sale_receipt': (11006, 4000, False, True),
+    'cash_sale_refund': (11007, 4000, False, True),
+    'cash_purchase_receipt': (10006, 5000, False, True),
+    'cash_purchase_refund': (10007, 5000, False, True),
+}
+
+# The Transaction Types that take a Payment Method, which the load test points at the Current Account
+PAYMENT_TRANSACTION_TYPES = (10000, 10001, 10004, 10006, 10007, 11000, 11001, 11004, 11006, 11007)
+
+# The operations of the workers and how often each is picked relative to the others
+OPERATIONS: Dict[str, int] = {
+    **{document: 2 for document in DOCUMENTS},
+    'account_sale_invoice': 6,
+    'account_sale_payment': 4,
+    'account_purchase_payment': 4,
+    'account_sale_adjustment': 1,
+    'account_purchase_adjustment': 1,
+    'journal_entry': 2,
+    'contra': 3,
+    'allocation': 3,
+    'period_end': 1,
+}
+
+NET = Decimal('100.00')
+
+
+class LevelResult(NamedTuple):
+    """
+    The results of one level of concurrency
+    - `transactions`: The number of requests that succeeded
+    - `errors`: The number of requests that failed, by operation and status code or exception
+    - `tps`: Successful requests per second
+    - `p50` and `p99`: The latency of all requests, in milliseconds
+    - `lock_wait`: The total seconds backends of the database spent waiting on locks
+    - `deadlocks`: The number of deadlocks the database detected
+    - `api_requests`: The number of requests made to the stand-in APIs
+    """
+    concurrency: int
+    duration: float
+    transactions: int
+    errors: Dict[str, int]
+    tps: float
+    p50: float
+    p99: float
+    lock_wait: float
+    deadlocks: int
+    api_requests: int
+
+
+class _Setup(NamedTuple):
+    """
+    The records of the dataset the workers use
+    """
+    payment_method_id: int
+    tax_rate_ids: Dict[int, int]
+
+
+class _Calendar:
+    """
+    The open date of each Address. Transactions are posted on the open date, and a Period End closes it and moves it on
+    a day. Transactions still being posted on the day that was closed are rejected, the same as they would be in use
+    """
+
+    def __init__(self, address_ids: Sequence[int], start: date):
+        self._lock = threading.Lock()
+        self._open: Dict[int, date] = {}
+        for address_id in address_ids:
+            with use_shard(shard_for(address_id)):
+                last = NominalLedger.period_end.lean().filter(
+                    address_id=address_id,
+                ).aggregate(last=Max('transaction_date'))['last']
+            self._open[address_id] = max(last or start, start) + timedelta(days=1)
+
+    def open(self, address_id: int) -> str:
+        return self._open[address_id].isoformat()
+
+    def close(self, address_id: int) -> Optional[str]:
+        """
+        The date to post a Period End on, or None once the open date has caught up with today
+        """
+        with self._lock:
+            day = self._open[address_id]
+            if day >= date.today():
+                return None
+            self._open[address_id] = day + timedelta(days=1)
+            return day.isoformat()
+
+
+class _Stats:
+    """
+    The latencies and outcomes of the requests of one level, shared by its workers
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies: List[float] = []
+        self.errors: Counter = Counter()
+        self.transactions = 0
+
+    def record(self, operation: str, latency: float, outcome: Optional[str]):
+        with self.lock:
+            self.latencies.append(latency)
+            if outcome is None:
+                self.transactions += 1
+            else:
+                self.errors[f'{operation}: {outcome}'] += 1
+
+
+class _Worker:
+    """
+    Posts a random mix of operations as the User of one Address, with another Address as the contra
+    """
+
+    def __init__(
+            self,
+            number: int,
+            address_ids: Sequence[int],
+            member_id: int,
+            setup: _Setup,
+            calendar: _Calendar,
+            stats: _Stats,
+    ):
+        self.address_id = address_ids[number % len(address_ids)]
+        self.contra_address_id = address_ids[(number + 1) % len(address_ids)]
+        self.user = BenchmarkUser(self.address_id, member_id)
+        self.contra_user = BenchmarkUser(self.contra_address_id, member_id)
+        self.setup = setup
+        self.calendar = calendar
+        self.stats = stats
+        self.random = random.Random(number)
+
+    def post(
+            self,
+            operation: str,
+            url_name: str,
+            data: Dict[str, Any],
+            user: Optional[BenchmarkUser] = None,
+            kwargs: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Post a request in its own transaction, so the table lock taken while saving is held until it commits, and
+        record its latency and outcome
+        :return: The content of the response if the request succeeded
+        """
+        user = user or self.user
+        address_id = user.address['id']
+        start = time.perf_counter()
+        outcome = None
+        content = None
+        try:
+            with use_shard(shard_for(address_id)), transaction.atomic(using=router.db_for_write(NominalLedger)):
+                response = call(user, url_name, 'post', kwargs=kwargs, data=data)
+            if response.status_code >= 400:
+                outcome = str(response.status_code)
+            else:
+                content = response.data.get('content')
+        except Exception as e:
+            outcome = 'deadlock' if 'deadlock detected' in str(e) else type(e).__name__
+        self.stats.record(operation, (time.perf_counter() - start) * 1000, outcome)
+        return content
+
+    def lines(self, address_id: int, nominal_account_number: int) -> List[Dict[str, Any]]:
+        return [{
+            'description': 'Benchmark',
+            'exchange_rate': 1,
+            'number': nominal_account_number,
+            'quantity': 1,
+            'tax_rate_id': self.setup.tax_rate_ids[address_id],
+            'unit_price': str(NET),
+        }]
+
+    def document(self, name: str) -> Optional[Dict[str, Any]]:
+        transaction_type_id, nominal_account_number, contra, payment = DOCUMENTS[name]
+        data = {
+            'address1_bill_to': 'Benchmark Street',
+            'address1_deliver_to': 'Benchmark Street',
+            'city_bill_to': 'Cork',
+            'city_deliver_to': 'Cork',
+            'contra_contact': 'Benchmark',
+            'country_id_deliver_to': 372,
+            'lines': self.lines(self.address_id, nominal_account_number),
+            'name_bill_to': 'Benchmark',
+            'name_deliver_to': 'Benchmark',
+            'narrative': 'Load test',
+            # The stand-in Reporting API returns Report Templates for the Transaction Type with their id
+            'report_template_id': transaction_type_id,
+            'transaction_date': self.calendar.open(self.address_id),
+        }
+        if contra:
+            data['contra_address_id'] = self.contra_address_id
+        if payment:
+            data['payment_method_id'] = self.setup.payment_method_id
+        return self.post(name, f'{name}_collection', data)
+
+    def payment(self, name: str, transaction_type_id: int, amount: Decimal) -> Optional[Dict[str, Any]]:
+        return self.post(name, f'{name}_collection', {
+            'amount': str(amount),
+            'contra_address_id': self.contra_address_id,
+            'exchange_rate': 1,
+            'narrative': 'Load test',
+            'payment_method_id': self.setup.payment_method_id,
+            'report_template_id': transaction_type_id,
+            'transaction_date': self.calendar.open(self.address_id),
+        })
+
+    def adjustment(self, name: str, debit: int, credit: int):
+        self.post(name, f'{name}_collection', {
+            'contra_address_id': self.contra_address_id,
+            'credit': {'amount': str(NET), 'number': credit},
+            'debit': {'amount': str(NET), 'number': debit},
+            'narrative': 'Load test',
+            'transaction_date': self.calendar.open(self.address_id),
+        })
+
+    def account_sale_payment(self):
+        self.payment('account_sale_payment', 11004, NET)
+
+    def account_purchase_payment(self):
+        self.payment('account_purchase_payment', 10004, NET)
+
+    def account_sale_adjustment(self):
+        self.adjustment('account_sale_adjustment', reserved.DEBTOR_CONTROL_ACCOUNT, reserved.SUSPENSE_ACCOUNT)
+
+    def account_purchase_adjustment(self):
+        self.adjustment('account_purchase_adjustment', reserved.SUSPENSE_ACCOUNT, reserved.CREDITOR_CONTROL_ACCOUNT)
+
+    def journal_entry(self):
+        self.post('journal_entry', 'journal_entry_collection', {
+            'credits': [{'amount': str(NET), 'number': 1010}],
+            'debits': [{'amount': str(NET), 'number': 6000}],
+            'narrative': 'Load test',
+            'report_template_id': 12000,
+            'transaction_date': self.calendar.open(self.address_id),
+        })
+
+    def contra(self):
+        """
+        Post an Account Sale Invoice, and the Account Purchase Invoice the contra Address makes from it
+        """
+        invoice = self.document('account_sale_invoice')
+        if invoice is None:
+            return
+        self.post(
+            'contra',
+            'account_purchase_invoice_contra_collection',
+            {
+                'lines': self.lines(self.contra_address_id, 5000),
+                'narrative': 'Load test',
+                'transaction_date': self.calendar.open(self.contra_address_id),
+                'tsn': invoice['tsn'],
+            },
+            user=self.contra_user,
+            kwargs={'source_id': self.address_id},
+        )
+
+    def allocation(self):
+        """
+        Post an Account Sale Invoice and a payment of it, and allocate them against each other
+        """
+        invoice = self.document('account_sale_invoice')
+        if invoice is None:
+            return
+        gross = Decimal(str(invoice['unallocated_balance']))
+        payment = self.payment('account_sale_payment', 11004, gross)
+        if payment is None:
+            return
+        self.post('allocation', 'allocation_collection', {
+            'allocations': [
+                {'amount': str(gross * -1), 'transaction_type_id': 11002, 'tsn': invoice['tsn']},
+                {'amount': str(gross), 'transaction_type_id': 11004, 'tsn': payment['tsn']},
+            ],
+        })
+
+    def period_end(self):
+        day = self.calendar.close(self.address_id)
+        if day is not None:
+            self.post('period_end', 'period_end_collection', {'narrative': 'Load test', 'transaction_date': day})
+
+    def run(self, operations: Sequence[str], weights: Sequence[int], barrier: threading.Barrier, until: List[float]):
+        try:
+            barrier.wait()
+            while time.perf_counter() < until[0]:
+                operation = self.random.choices(operations, weights)[0]
+                if operation in DOCUMENTS:
+                    self.document(operation)
+                else:
+                    getattr(self, operation)()
+        finally:
+            # Each thread opens its own connections
+            connections.close_all()
+
+
+class _LockMonitor(threading.Thread):
+    """
+    Sample the number of backends of the database that are waiting on a lock
+    """
+
+    def __init__(self, using: str, interval: float):
+        super().__init__(name='lock_monitor', daemon=True)
+        self.using = using
+        self.interval = interval
+        self.lock_wait = 0.0
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            with connections[self.using].cursor() as cursor:
+                while not self.stopped.wait(self.interval):
+                    cursor.execute(
+                        "SELECT COUNT(*) FROM pg_stat_activity "
+                        "WHERE datname = current_database() AND wait_event_type = 'Lock'",
+                    )
+                    self.lock_wait += cursor.fetchone()[0] * self.interval
+        finally:
+            connections.close_all()
+
+
+def _deadlocks(using: str) -> int:
+    with connections[using].cursor() as cursor:
+        # Read the counters afresh rather than from the snapshot taken earlier in the transaction
+        cursor.execute('SELECT pg_stat_clear_snapshot()')
+        cursor.execute('SELECT deadlocks FROM pg_stat_database WHERE datname = current_database()')
+        return cursor.fetchone()[0]
+
+
+def _prepare(scale: Scale, address_ids: Sequence[int]) -> _Setup:
+    """
+    Create the Payment Method the workers pay with, pointed at the Current Account for every Transaction Type that
+    takes one, and find the Tax Rate of each Address
+    """
+    payment_method, _ = PaymentMethod.objects.get_or_create(member_id=scale.member_id, description='Benchmark')
+    current_account = GlobalNominalAccount.objects.get(member_id=scale.member_id, nominal_account_number=1010)
+    for transaction_type_id in PAYMENT_TRANSACTION_TYPES:
+        NominalContra.objects.get_or_create(
+            payment_method=payment_method,
+            transaction_type_id=transaction_type_id,
+            defaults={'global_nominal_account': current_account},
+        )
+
+    tax_rate_ids = {}
+    for address_id in address_ids:
+        with use_shard(shard_for(address_id)):
+            tax_rate_ids[address_id] = TaxRate.objects.filter(
+                address_id=address_id,
+                description='Standard Rate',
+            ).values_list('id', flat=True).get()
+    return _Setup(payment_method_id=payment_method.pk, tax_rate_ids=tax_rate_ids)
+
+
+def run(
+        scale: Scale,
+        concurrency: Sequence[int] = CONCURRENCY,
+        duration: float = 30,
+        latency: float = 0.05,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        operations: Optional[Sequence[str]] = None,
+        sample_interval: float = 0.05,
+) -> List[LevelResult]:
+    """
+    Load test the write services at increasing levels of concurrency
+    :param scale: The size of the dataset the load test runs against. It needs at least two Addresses
+    :param concurrency: The number of workers at each level
+    :param duration: The seconds each level runs for
+    :param latency: The seconds the stand-in APIs take to respond
+    :param jitter: Up to this many seconds are added to the latency of each API response at random
+    :param error_rate: The fraction of API requests that fail
+    :param operations: Only run these operations, see OPERATIONS. Defaults to all of them
+    :param sample_interval: The seconds between samples of the lock waits
+    :return: The results of each level
+    """
+    address_ids = list(range(scale.first_address_id, scale.first_address_id + scale.addresses))
+    if len(address_ids) < 2:
+        raise ValueError('The load test needs a dataset with at least two Addresses')
+    names = list(operations or OPERATIONS)
+    weights = [OPERATIONS[name] for name in names]
+
+    setup = _prepare(scale, address_ids)
+    calendar = _Calendar(address_ids, scale.end)
+    using = router.db_for_write(NominalLedger)
+    stub = StubAPI(
+        latency=latency,
+        jitter=jitter,
+        error_rate=error_rate,
+        member_id=scale.member_id,
+        address_ids=tuple(address_ids),
+    )
+
+    results = []
+    email = override_settings(EMAIL_BACKEND='django.core.mail.backends.dummy.EmailBackend')
+    with stub, email:
+        for workers in concurrency:
+            stats = _Stats()
+            barrier = threading.Barrier(workers + 1)
+            # The deadline is set once every worker is ready, so starting the threads doesn't count towards it
+            until = [float('inf')]
+            threads = [
+                threading.Thread(
+                    target=_Worker(number, address_ids, scale.member_id, setup, calendar, stats).run,
+                    args=(names, weights, barrier, until),
+                    name=f'load_worker_{number}',
+                )
+                for number in range(workers)
+            ]
+            for thread in threads:
+                thread.start()
+
+            deadlocks = _deadlocks(using)
+            api_requests = stub.requests
+            monitor = _LockMonitor(using, sample_interval)
+            monitor.start()
+            start = time.perf_counter()
+            until[0] = start + duration
+            barrier.wait()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+            monitor.stopped.set()
+            monitor.join()
+
+            latencies = sorted(stats.latencies)
+            if len(latencies) > 1:
+                cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+                p50, p99 = cuts[49], cuts[98]
+            else:
+                p50 = p99 = latencies[0] if latencies else 0.0
+            results.append(LevelResult(
+                concurrency=workers,
+                duration=round(elapsed, 2),
+                transactions=stats.transactions,
+                errors=dict(stats.errors),
+                tps=round(stats.transactions / elapsed, 2),
+                p50=round(p50, 2),
+                p99=round(p99, 2),
+                lock_wait=round(monitor.lock_wait, 2),
+                deadlocks=_deadlocks(using) - deadlocks,
+                api_requests=stub.requests - api_requests,
+            ))
+    return results
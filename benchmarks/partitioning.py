@@ -0,0 +1,134 @@
+"""
+Benchmark of the hot ledger queries against the hash partitioned tables and the tables they replaced.
+
+`partition_ledger swap` keeps the old tables as `<table>_unpartitioned` until they are dropped by hand, so both layouts
+of the same ledger are in the database at once. The queries of `explain_hot_queries`, and the per account totals of an
+Address the reports are built from, are run against both with the table names swapped in the SQL, alternating between
+the layouts so caching favours neither. Build the `xlarge` dataset, 10 million entries and their lines, and run every
+`partition_ledger` step through `swap` before running it; the old tables no longer receive writes after the swap, so
+don't post to the dataset in between.
+"""
+# stdlib
+import re
+import statistics
+import time
+from typing import Dict, List, NamedTuple, Tuple
+# libs
+from django.db import connections, router
+from django.db.models import Sum
+# local
+from financial.benchmarks.dataset import Scale
+from financial.management.commands.explain_hot_queries import hot_queries, LEDGER_TABLES
+from financial.management.commands.partition_ledger import unpartitioned
+from financial.models import NominalLedger, NominalLedgerDebit
+from financial.sharding import shard_for, use_shard
+
+
+__all__ = [
+    'PartitioningResult',
+    'run_partitioning',
+    'table_rows',
+]
+
+# Every quoted reference to a ledger table in the SQL of a query
+TABLE_NAME = re.compile('|'.join(f'"{table}"' for table in sorted(LEDGER_TABLES)))
+
+
+class PartitioningResult(NamedTuple):
+    """
+    The results of a query against both layouts
+    - `rows`: The number of rows the query returns from the partitioned tables
+    - `unpartitioned_p50`, `unpartitioned_p95`, `partitioned_p50` and `partitioned_p95`: The median and 95th
+      percentile latency against each layout, in milliseconds
+    - `speedup`: The median latency against the unpartitioned tables divided by the median against the partitioned ones
+    """
+    name: str
+    rows: int
+    unpartitioned_p50: float
+    unpartitioned_p95: float
+    partitioned_p50: float
+    partitioned_p95: float
+    speedup: float
+
+
+def _percentiles(latencies: List[float]) -> Tuple[float, float]:
+    if len(latencies) > 1:
+        cuts = statistics.quantiles(latencies, n=20, method='inclusive')
+        return round(cuts[9], 2), round(cuts[18], 2)
+    return round(latencies[0], 2), round(latencies[0], 2)
+
+
+def table_rows(using: str) -> Dict[str, int]:
+    """
+    The estimated number of rows in each ledger table, partitioned and unpartitioned, from the planner statistics.
+    Tables that don't exist are left out
+    """
+    tables = sorted(LEDGER_TABLES) + [unpartitioned(table) for table in sorted(LEDGER_TABLES)]
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT C.relname, SUM(GREATEST(P.reltuples, 0))::bigint
+            FROM pg_class AS C
+            LEFT JOIN pg_inherits AS I ON I.inhparent = C.oid AND C.relkind = 'p'
+            JOIN pg_class AS P ON P.oid = COALESCE(I.inhrelid, C.oid)
+            WHERE C.relname = ANY(%s) AND C.relkind IN ('p', 'r')
+            GROUP BY C.relname
+            """,
+            [tables],
+        )
+        return dict(cursor.fetchall())
+
+
+def run_partitioning(scale: Scale, iterations: int = 10) -> List[PartitioningResult]:
+    """
+    Time the hot queries of the first Address of a dataset against the partitioned and unpartitioned tables
+    :param scale: The size of the dataset
+    :param iterations: The number of timed runs of each query against each layout
+    :return: The results of each query
+    """
+    address_id = scale.first_address_id
+    with use_shard(shard_for(address_id)):
+        using = router.db_for_read(NominalLedger)
+        queries = hot_queries(address_id) + [(
+            'address_totals',
+            NominalLedgerDebit.objects.lean().filter(
+                nominal_ledger__address_id=address_id,
+            ).values('nominal_account_number').annotate(total=Sum('amount')),
+        )]
+
+        results = []
+        with connections[using].cursor() as cursor:
+            for name, query in queries:
+                sql, params = query.query.sql_with_params()
+                layouts = {
+                    'partitioned': sql,
+                    'unpartitioned': TABLE_NAME.sub(lambda match: f'"{unpartitioned(match[0][1:-1])}"', sql),
+                }
+                latencies: Dict[str, List[float]] = {layout: [] for layout in layouts}
+                rows = 0
+                # The first run of each layout warms the cache and is not timed
+                for iteration in range(iterations + 1):
+                    for layout, layout_sql in layouts.items():
+                        start = time.perf_counter()
+                        cursor.execute(layout_sql, params)
+                        fetched = len(cursor.fetchall())
+                        if iteration > 0:
+                            latencies[layout].append((time.perf_counter() - start) * 1000)
+                        elif layout == 'partitioned':
+                            rows = fetched
+
+                unpartitioned_p50, unpartitioned_p95 = _percentiles(latencies['unpartitioned'])
+                partitioned_p50, partitioned_p95 = _percentiles(latencies['partitioned'])
+                results.append(PartitioningResult(
+                    name=name,
+                    rows=rows,
+                    unpartitioned_p50=unpartitioned_p50,
+                    unpartitioned_p95=unpartitioned_p95,
+                    partitioned_p50=partitioned_p50,
+                    partitioned_p95=partitioned_p95,
+                    speedup=round(
+                        statistics.median(latencies['unpartitioned']) / statistics.median(latencies['partitioned']),
+                        2,
+                    ),
+                ))
+    return results
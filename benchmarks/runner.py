@@ -0,0 +1,214 @@
+"""
+Run the benchmark scenarios and compare their results against a baseline.
+
+Requests are made with DRF's APIRequestFactory and passed straight to the view, with a User forced onto the request,
+so the benchmarks measure the service without the authentication round trip to Membership. Each scenario is run once to
+warm up, counting its queries and the peak memory it allocates, and then timed over a number of runs. The report cache
+is cleared before every run unless the cached path is being measured.
+"""
+# stdlib
+import json
+import statistics
+import time
+import tracemalloc
+from contextlib import ExitStack
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+# libs
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from rest_framework.test import APIRequestFactory, force_authenticate
+# local
+from financial.benchmarks.dataset import Scale
+from financial.benchmarks.scenarios import Scenario
+from financial.models import NominalLedger
+from financial.report_cache import report_cache
+from financial.sharding import shard_for, use_shard
+
+
+__all__ = [
+    'BenchmarkUser',
+    'call',
+    'compare',
+    'load_baseline',
+    'Result',
+    'run',
+    'save_baseline',
+]
+
+
+class BenchmarkUser:
+    """
+    Stands in for the User that cloudcix authentication puts on a request, as a self managed User of an Address
+    """
+    administrator = True
+    first_name = 'Benchmark'
+    global_active = False
+    is_authenticated = True
+    surname = 'User'
+    token = 'benchmark'
+
+    def __init__(self, address_id: int, member_id: int, country_id: int = 372, currency_id: int = 1):
+        # User 1 is the robot User, which is allowed to act for other Addresses
+        self.id = address_id + 1
+        self.address = {'country_id': country_id, 'currency_id': currency_id, 'id': address_id}
+        self.member = {'currency_id': currency_id, 'id': member_id, 'self_managed': True}
+
+
+class Result(NamedTuple):
+    """
+    The results of a scenario
+    - `status_code`: The status code of the warm up request
+    - `queries`: The number of queries of the warm up request
+    - `peak_memory`: The peak memory allocated by the warm up request, in KiB
+    - `p50` and `p95`: The median and 95th percentile latency of the timed runs, in milliseconds
+    """
+    name: str
+    status_code: int
+    queries: int
+    peak_memory: float
+    p50: float
+    p95: float
+
+
+def call(
+        user: BenchmarkUser,
+        url_name: str,
+        method: str = 'get',
+        kwargs: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        data: Any = None,
+):
+    """
+    Make a request to a service as a User, calling its view directly
+    :param user: The User to make the request as
+    :param url_name: The name of the service's URL
+    :param method: The HTTP method of the request
+    :param kwargs: The arguments of the URL
+    :param params: The query parameters of a GET request
+    :param data: The body of any other request, sent as JSON
+    :return: The response of the view
+    """
+    path = reverse(url_name, kwargs=kwargs)
+    factory = APIRequestFactory()
+    if method == 'get':
+        request = factory.get(path, params or {})
+    else:
+        request = getattr(factory, method)(path, data, format='json')
+    force_authenticate(request, user=user, token=user.token)
+
+    match = resolve(path)
+    with settings.TRACER.start_span(f'benchmark_{url_name}') as span:
+        request.span = span
+        response = match.func(request, *match.args, **match.kwargs)
+    return response
+
+
+def _request(scenario: Scenario, user: BenchmarkUser, data: Any):
+    """
+    Make the request of a scenario
+    """
+    return call(user, scenario.url_name, scenario.method, scenario.kwargs, scenario.params, data)
+
+
+def _run_once(scenario: Scenario, user: BenchmarkUser, data: Any, cached: bool):
+    """
+    Make the request of a scenario once, in a transaction that is rolled back if the scenario writes to the ledger
+    """
+    if not cached and report_cache.backend:
+        report_cache.backend.clear()
+
+    if not scenario.rollback:
+        return _request(scenario, user, data)
+
+    with transaction.atomic(using=router.db_for_write(NominalLedger)):
+        response = _request(scenario, user, data)
+        transaction.set_rollback(True, using=router.db_for_write(NominalLedger))
+    return response
+
+
+def run(scenarios: List[Scenario], scale: Scale, iterations: int = 10, cached: bool = False) -> List[Result]:
+    """
+    Run the scenarios against a dataset
+    :param scenarios: The scenarios to run
+    :param scale: The size of the dataset
+    :param iterations: The number of timed runs of each scenario
+    :param cached: Leave the report cache in place between runs, to measure the cached path of the reports
+    :return: The results of each scenario
+    """
+    user = BenchmarkUser(scale.first_address_id, scale.member_id)
+    results = []
+    with use_shard(shard_for(scale.first_address_id)):
+        for scenario in scenarios:
+            data = scenario.data(scale) if scenario.data is not None else None
+
+            with ExitStack() as stack:
+                contexts = [stack.enter_context(CaptureQueriesContext(connection)) for connection in connections.all()]
+                tracemalloc.start()
+                try:
+                    response = _run_once(scenario, user, data, cached)
+                    _, peak = tracemalloc.get_traced_memory()
+                finally:
+                    tracemalloc.stop()
+            queries = sum(len(context.captured_queries) for context in contexts)
+
+            latencies = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                _run_once(scenario, user, data, cached)
+                latencies.append((time.perf_counter() - start) * 1000)
+
+            if len(latencies) > 1:
+                cuts = statistics.quantiles(latencies, n=20, method='inclusive')
+                p50, p95 = cuts[9], cuts[18]
+            else:
+                p50 = p95 = latencies[0] if latencies else 0.0
+
+            results.append(Result(
+                name=scenario.name,
+                status_code=response.status_code,
+                queries=queries,
+                peak_memory=round(peak / 1024, 1),
+                p50=round(p50, 2),
+                p95=round(p95, 2),
+            ))
+    return results
+
+
+def save_baseline(path: str, results: List[Result]):
+    """
+    Save results as the baseline to compare later runs against
+    """
+    with open(path, 'w') as f:
+        json.dump({result.name: result._asdict() for result in results}, f, indent=2, sort_keys=True)
+
+
+def load_baseline(path: str) -> Dict[str, Result]:
+    """
+    Load a baseline saved with `save_baseline`
+    """
+    with open(path) as f:
+        return {name: Result(**result) for name, result in json.load(f).items()}
+
+
+def compare(results: List[Result], baseline: Dict[str, Result], tolerance: float) -> List[Tuple[str, str]]:
+    """
+    Compare results against a baseline
+    :param results: The results of the current run
+    :param baseline: The baseline results, by scenario name
+    :param tolerance: The fraction the p95 latency may grow by before it is a regression, e.g. 0.2 for 20%
+    :return: The name of each regressed scenario and a description of the regression
+    """
+    regressions = []
+    for result in results:
+        before = baseline.get(result.name)
+        if before is None:
+            continue
+        if result.status_code != before.status_code:
+            regressions.append((result.name, f'status code {before.status_code} -> {result.status_code}'))
+        if result.queries > before.queries:
+            regressions.append((result.name, f'queries {before.queries} -> {result.queries}'))
+        if result.p95 > before.p95 * (1 + tolerance):
+            regressions.append((result.name, f'p95 {before.p95}ms -> {result.p95}ms'))
+    return regressions
@@ -0,0 +1,128 @@
+"""
+The requests made by the benchmarks.
+
+Each scenario is one request to a service, made for the first Address of the dataset. The reports are requested over
+the last year of the dataset, and as of its last day, so they read the archived and the live parts of the ledger alike.
+"""
+# stdlib
+from datetime import date
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+# libs
+from django.db.models import F
+# local
+from financial.benchmarks.dataset import Scale
+from financial.models import NominalLedger
+
+
+__all__ = [
+    'Scenario',
+    'scenarios',
+]
+
+
+class Scenario(NamedTuple):
+    """
+    A request to benchmark
+    - `name`: The name the results are reported and compared under
+    - `url_name`: The name of the service's URL
+    - `method`: The HTTP method of the request
+    - `kwargs`: The arguments of the URL
+    - `params`: The query parameters of the request
+    - `data`: A function of the Scale that returns the body of the request. It is called once, before the request is
+      timed
+    - `rollback`: Whether the request writes to the ledger and must be rolled back after each run
+    """
+    name: str
+    url_name: str
+    method: str = 'get'
+    kwargs: Optional[Dict[str, Any]] = None
+    params: Optional[Dict[str, Any]] = None
+    data: Optional[Callable[[Scale], Dict[str, Any]]] = None
+    rollback: bool = False
+
+
+def _bulk_allocation(scale: Scale) -> Dict[str, Any]:
+    """
+    Allocate all of the open items the dataset left for the bulk contra Address in one request
+    """
+    items = NominalLedger.objects.lean().filter(
+        address_id=scale.first_address_id,
+        contra_address_id=scale.bulk_contra_address_id,
+    ).order_by(
+        'id',
+    ).values(
+        'transaction_type_id',
+        'tsn',
+        amount=F('unallocated_balance') * -1,
+    )
+    return {
+        'allocations': [
+            {'amount': str(item['amount']), 'transaction_type_id': item['transaction_type_id'], 'tsn': item['tsn']}
+            for item in items
+        ],
+    }
+
+
+def scenarios(scale: Scale) -> List[Scenario]:
+    """
+    The scenarios to run against a dataset
+    :param scale: The size of the dataset the scenarios are run against
+    :return: The scenarios, in the order they are run
+    """
+    end = scale.end
+    start = date(end.year, 1, 1)
+    period = {'start_date': start.isoformat(), 'end_date': end.isoformat()}
+    address = {'address_id': scale.first_address_id}
+
+    return [
+        Scenario('trial_balance', 'trial_balance_collection', params={**address, 'date': end.isoformat()}),
+        Scenario('balance_sheet', 'balance_sheet_collection', params={**address, 'date': end.isoformat()}),
+        Scenario('profit_and_loss', 'profit_and_loss_collection', params={**address, **period}),
+        Scenario('debtor_ledger_aged', 'debtor_ledger_aged_collection'),
+        Scenario('creditor_ledger_aged', 'creditor_ledger_aged_collection'),
+        Scenario(
+            'nominal_account_history',
+            'nominal_account_history',
+            kwargs={'id': 4000},
+            params={'search[transaction_date__gte]': start.isoformat()},
+        ),
+        Scenario('vat3', 'vat3_collection', params=period),
+        Scenario('rtd', 'rtd_collection', params=period),
+        Scenario(
+            'vies_sales',
+            'vies_sales_collection',
+            params={
+                'search[nominal_ledger__transaction_date__gte]': start.isoformat(),
+                'search[nominal_ledger__transaction_date__lte]': end.isoformat(),
+            },
+        ),
+        Scenario(
+            'vies_purchases',
+            'vies_purchases_collection',
+            params={
+                'search[nominal_ledger__transaction_date__gte]': start.isoformat(),
+                'search[nominal_ledger__transaction_date__lte]': end.isoformat(),
+            },
+        ),
+        Scenario(
+            'sales_analysis',
+            'sales_analysis_collection',
+            params={
+                'search[transaction_date__gte]': start.isoformat(),
+                'search[transaction_date__lte]': end.isoformat(),
+            },
+        ),
+        Scenario(
+            'debtor_account_statement',
+            'debtor_account_statement',
+            kwargs={'id': scale.first_contra_address_id},
+            params={'search[transaction_date__gte]': start.isoformat()},
+        ),
+        Scenario(
+            'bulk_allocation',
+            'allocation_collection',
+            method='post',
+            data=_bulk_allocation,
+            rollback=True,
+        ),
+    ]
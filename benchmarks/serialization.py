@@ -0,0 +1,127 @@
+"""
+Benchmark of the per row cost of serializing Nominal Ledger entries with each fieldset.
+
+The entries of the first Address of the dataset are read once, with their lines, and the account names the lines are
+serialized with are looked up once, so the timed runs measure only the serializers. The `baseline` row is the serializer
+as it was before sparse fieldsets and the caching of the Resource URLs: every field, with `reverse` called for the URL
+of each entry. The `full` fieldset is every field with the URLs cached, as `sparse_serializer` returns the serializer
+itself when every field is requested, and the other fieldsets are what the ledger services return for `compact=true`
+and `fields=...`.
+"""
+# stdlib
+import statistics
+import time
+from contextlib import contextmanager, ExitStack
+from typing import Iterator, List, NamedTuple, Tuple
+# libs
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+# local
+from financial.benchmarks.dataset import Scale
+from financial.models import NominalLedger, nominal_ledger
+from financial.serializers.fieldsets import Fieldset, sparse_serializer
+from financial.serializers.nominal_ledger import NominalLedgerSerializer
+from financial.serializers.nominal_ledger_line import get_account_names
+from financial.sharding import shard_for, use_shard
+
+
+__all__ = [
+    'FIELDSETS',
+    'run_serialization',
+    'SerializationResult',
+]
+
+# The fieldsets that are benchmarked, by the name they are reported under
+FIELDSETS: Tuple[Tuple[str, Fieldset], ...] = (
+    ('full', Fieldset()),
+    ('compact', Fieldset(compact=True)),
+    ('no_lines', Fieldset(compact=True, exclude=frozenset(('credits', 'debits')))),
+    ('summary', Fieldset(fields=frozenset(('id', 'transaction_date', 'tsn', 'unallocated_balance', 'uri')))),
+)
+
+# The name of the row that serializes every field without caching the Resource URLs
+BASELINE = 'baseline'
+
+
+class SerializationResult(NamedTuple):
+    """
+    The results of serializing the entries with one fieldset
+    - `rows`: The number of entries serialized in each run
+    - `queries`: The number of queries made while serializing, which should always be 0
+    - `p50` and `p95`: The median and 95th percentile time to serialize one entry, in microseconds
+    - `speedup`: The median time of the baseline divided by the median time of this one
+    """
+    name: str
+    rows: int
+    queries: int
+    p50: float
+    p95: float
+    speedup: float
+
+
+@contextmanager
+def _uncached_urls() -> Iterator[None]:
+    """
+    Reverse the Resource URL of every entry, as `get_absolute_url` did before the URLs were cached
+    """
+    cached = nominal_ledger._resource_url
+    nominal_ledger._resource_url = cached.__wrapped__
+    try:
+        yield
+    finally:
+        nominal_ledger._resource_url = cached
+
+
+def run_serialization(scale: Scale, rows: int = 1000, iterations: int = 20) -> List[SerializationResult]:
+    """
+    Time the serialization of the entries of the first Address of a dataset with each of FIELDSETS
+    :param scale: The size of the dataset
+    :param rows: The number of entries to serialize in each run
+    :param iterations: The number of timed runs of each fieldset
+    :return: The results of the baseline, then of each fieldset in the order of FIELDSETS
+    """
+    with use_shard(shard_for(scale.first_address_id)):
+        objs = list(NominalLedger.objects.filter(address_id=scale.first_address_id).order_by('id')[:rows])
+        context = {'account_names': get_account_names(objs)}
+
+    if len(objs) == 0:
+        return []
+
+    timings = []
+    for name, fieldset in ((BASELINE, Fieldset()),) + FIELDSETS:
+        serializer = sparse_serializer(NominalLedgerSerializer, fieldset)
+        with ExitStack() as stack:
+            if name == BASELINE:
+                stack.enter_context(_uncached_urls())
+            # Warm up, counting any queries the serializer makes
+            with ExitStack() as captures:
+                contexts = [
+                    captures.enter_context(CaptureQueriesContext(connection)) for connection in connections.all()
+                ]
+                serializer(instance=objs, many=True, context=dict(context)).data
+            queries = sum(len(capture.captured_queries) for capture in contexts)
+
+            per_row = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                serializer(instance=objs, many=True, context=dict(context)).data
+                per_row.append((time.perf_counter() - start) * 1e6 / len(objs))
+        timings.append((name, queries, per_row))
+
+    results = []
+    baseline = statistics.median(timings[0][2])
+    for name, queries, per_row in timings:
+        if len(per_row) > 1:
+            cuts = statistics.quantiles(per_row, n=20, method='inclusive')
+            p50, p95 = cuts[9], cuts[18]
+        else:
+            p50 = p95 = per_row[0]
+        results.append(SerializationResult(
+            name=name,
+            rows=len(objs),
+            queries=queries,
+            p50=round(p50, 2),
+            p95=round(p95, 2),
+            speedup=round(baseline / statistics.median(per_row), 2),
+        ))
+    return results
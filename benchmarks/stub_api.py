@@ -0,0 +1,216 @@
+"""
+A local stand-in for the Membership and Reporting APIs, for load tests.
+
+`StubAPI` runs an HTTP server in a background thread and points the cloudcix API clients at it for as long as it is
+running. Every request is answered after a configurable latency, and a configurable fraction of them fail with a 503,
+so the effect of a slow or failing API on the services that call it can be measured without a cloudcix deployment.
+
+The clients build their URLs from the application name, as a subdomain or as part of the path depending on the
+application and the version of cloudcix, so the server is used as an HTTP proxy rather than as the API host. The
+requests it receives carry the full URL, and the resource is read from the end of the path.
+"""
+# stdlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+# libs
+import cloudcix.conf
+
+
+__all__ = [
+    'StubAPI',
+]
+
+# The host the clients are pointed at. It is never resolved, the requests are sent to the proxy
+STUB_URL = 'http://cloudcix.stub/'
+
+
+def _address(pk: int, member_id: int) -> Dict[str, Any]:
+    return {
+        'address1': f'{pk} Benchmark Street',
+        'address2': '',
+        'address3': '',
+        'city': 'Cork',
+        'country': {'id': 372, 'name': 'Ireland'},
+        'currency_id': 1,
+        'id': pk,
+        'link': {'credit_limit': None},
+        'member': {'id': member_id, 'self_managed': True},
+        'name': f'Address {pk}',
+        'postcode': '',
+        'subdivision': None,
+        'vat_number': f'IE{pk:07d}X',
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: '_Server'
+
+    def log_message(self, format: str, *args: Any):
+        # Keep the load test output readable
+        pass
+
+    def _resource(self) -> Tuple[str, Optional[int]]:
+        """
+        The resource requested and the primary key of the record, if it is a read
+        """
+        parts = [part for part in urlsplit(self.path).path.split('/') if part != '']
+        pk = None
+        if len(parts) > 0 and parts[-1].isdigit():
+            pk = int(parts.pop())
+        resource = parts[-1] if len(parts) > 0 else ''
+        return resource.lower().replace('_', '').replace('-', ''), pk
+
+    def _content(self, resource: str, pk: Optional[int]) -> Any:
+        member_id = self.server.member_id
+        if resource == 'address':
+            if pk is None:
+                return [_address(address_id, member_id) for address_id in self.server.address_ids]
+            return _address(pk, member_id)
+        if resource == 'link':
+            return {'credit_limit': None}
+        if resource == 'user':
+            return {
+                'address': {'id': pk},
+                'email': 'benchmark@example.com',
+                'first_name': 'Benchmark',
+                'id': pk,
+                'surname': 'User',
+                'username': 'benchmark@example.com',
+            }
+        if resource == 'reporttemplate':
+            # The load test asks for the Report Template with the id of the Transaction Type it is for
+            return {'id': pk, 'idTransactionType': pk}
+        if resource == 'report':
+            return {'downloadLink': '', 'global_id': pk or 1, 'status': 'Complete'}
+        if pk is not None:
+            return {'id': pk, 'name': f'{resource} {pk}'}
+        return []
+
+    def _respond(self):
+        server = self.server
+        delay = server.latency + random.uniform(0, server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        if random.random() < server.error_rate:
+            status = 503
+            body: Dict[str, Any] = {'detail': 'Service unavailable'}
+        else:
+            resource, pk = self._resource()
+            content = self._content(resource, pk)
+            status = 201 if self.command == 'POST' else 200
+            body = {'content': content}
+            if isinstance(content, list):
+                body['_metadata'] = {'limit': len(content), 'page': 0, 'total_records': len(content)}
+
+        with server.lock:
+            server.requests += 1
+            if status >= 500:
+                server.errors += 1
+
+        # Drain the body of writes so the connection can be reused
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > 0:
+            self.rfile.read(length)
+
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_DELETE = do_GET = do_PATCH = do_POST = do_PUT = _respond
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    latency: float
+    jitter: float
+    error_rate: float
+    member_id: int
+    address_ids: Tuple[int, ...]
+    lock: threading.Lock
+    requests: int
+    errors: int
+
+
+class StubAPI:
+    """
+    Serve stand-in responses to the cloudcix API clients while in use as a context manager
+    - `latency`: The seconds every response is delayed by
+    - `jitter`: Up to this many seconds are added to the latency at random
+    - `error_rate`: The fraction of requests, between 0 and 1, that fail with a 503
+    - `member_id`: The Member of every Address returned
+    - `address_ids`: The Addresses returned when listing Addresses
+    """
+
+    def __init__(
+            self,
+            latency: float = 0.0,
+            jitter: float = 0.0,
+            error_rate: float = 0.0,
+            member_id: int = 1,
+            address_ids: Tuple[int, ...] = (),
+    ):
+        self._server = _Server(('127.0.0.1', 0), _Handler)
+        self._server.latency = latency
+        self._server.jitter = jitter
+        self._server.error_rate = error_rate
+        self._server.member_id = member_id
+        self._server.address_ids = tuple(address_ids)
+        self._server.lock = threading.Lock()
+        self._server.requests = 0
+        self._server.errors = 0
+        self._thread = threading.Thread(target=self._server.serve_forever, name='stub_api', daemon=True)
+        self._saved: Dict[str, Any] = {}
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def requests(self) -> int:
+        """
+        The number of requests answered so far
+        """
+        return self._server.requests
+
+    @property
+    def errors(self) -> int:
+        """
+        The number of requests failed on purpose so far
+        """
+        return self._server.errors
+
+    def __enter__(self) -> 'StubAPI':
+        self._thread.start()
+        settings = cloudcix.conf.settings
+        for name in ('CLOUDCIX_API_URL', 'CLOUDCIX_API_V2_URL'):
+            self._saved[name] = getattr(settings, name, None)
+            setattr(settings, name, STUB_URL)
+        # The clients' sessions take their proxies from the environment on every request
+        for name in ('HTTP_PROXY', 'http_proxy', 'NO_PROXY', 'no_proxy'):
+            self._saved[name] = os.environ.pop(name, None)
+        os.environ['HTTP_PROXY'] = os.environ['http_proxy'] = self.url
+        return self
+
+    def __exit__(self, *args: Any):
+        settings = cloudcix.conf.settings
+        for name in ('CLOUDCIX_API_URL', 'CLOUDCIX_API_V2_URL'):
+            if self._saved[name] is not None:
+                setattr(settings, name, self._saved[name])
+        for name in ('HTTP_PROXY', 'http_proxy', 'NO_PROXY', 'no_proxy'):
+            os.environ.pop(name, None)
+            if self._saved[name] is not None:
+                os.environ[name] = self._saved[name]
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
@@ -0,0 +1,99 @@
+"""
+Conditional GET support for the reports that aggregate data from the Nominal Ledger.
+
+Every write to the Nominal Ledger, its debits and credits, or the Allocation Details against it increments the Ledger
+Version of the Address that owns the entry. The reports also show the descriptions of the Nominal Accounts, so every
+write to the Address Nominal Accounts of an Address increments its Account Version, and every write to the Global
+Nominal Accounts of a Member increments the Nominal Account Version of the Member. The ETag of a report is derived from
+these versions and the parameters it was requested with, so a request carrying that ETag in an `If-None-Match` header
+can be answered with `304 Not Modified` before any of the report's aggregation queries are run.
+"""
+# stdlib
+import hashlib
+import json
+from typing import Any, Dict, Iterable
+# libs
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+# local
+from financial.db_router import fan_out
+from financial.models import LedgerVersion, NominalAccountVersion
+
+
+__all__ = [
+    'etag_headers',
+    'etag_matches',
+    'get_report_etag',
+    'not_modified',
+]
+
+# Clients must revalidate every time, the ETag makes that revalidation cheap
+CACHE_CONTROL = 'private, no-cache'
+
+
+def _json_default(obj: Any) -> Any:
+    """
+    Serialize the values json cannot handle natively in a deterministic way
+    """
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj, key=str)
+    return str(obj)
+
+
+def get_report_etag(request: Request, report: str, address_ids: Iterable[int], params: Dict[str, Any]) -> str:
+    """
+    Generate the ETag for a report from the current Ledger and Account Versions of the Addresses it reads, the Nominal
+    Account Version of the Member and its parameters
+    :param request: The request the report is being generated for
+    :param report: The name of the report
+    :param address_ids: The ids of the Addresses whose Nominal Ledger entries are used in the report
+    :param params: The parameters the report was requested with, usually the controller's cleaned_data
+    :return: A quoted strong ETag
+    """
+    # The versions of Addresses in different shards are read from each shard
+    versions = dict(fan_out(address_ids, lambda ids: LedgerVersion.objects.get_versions(ids).items()))
+    member_id = request.user.member['id']
+    key = {
+        'report': report,
+        'member_id': member_id,
+        # The Global Nominal Accounts are read from the shard of the request's Address, like the reports read them
+        'nominal_account_version': NominalAccountVersion.objects.get_version(member_id),
+        'versions': sorted(versions.items()),
+        'params': params,
+    }
+    digest = hashlib.sha1(json.dumps(key, sort_keys=True, default=_json_default).encode()).hexdigest()
+    return quote_etag(f'{report}-{digest}')
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Check if the If-None-Match header of the request contains the given ETag, using the weak comparison function
+    :param request: The request to check
+    :param etag: The current ETag of the requested report
+    :return: A flag stating whether the client's copy of the report is still current
+    """
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    if '*' in etags:
+        return True
+    return any(tag.removeprefix('W/') == etag for tag in etags)
+
+
+def etag_headers(etag: str) -> Dict[str, str]:
+    """
+    The headers to send with a report so that clients can revalidate it with If-None-Match
+    :param etag: The ETag of the report
+    """
+    return {'ETag': etag, 'Cache-Control': CACHE_CONTROL}
+
+
+def not_modified(etag: str) -> Response:
+    """
+    Generate a 304 response for a report that has not changed since the client last requested it
+    :param etag: The ETag of the report
+    """
+    return Response(status=status.HTTP_304_NOT_MODIFIED, headers=etag_headers(etag))
@@ -38,6 +38,10 @@ from .allocation import (
     AllocationCreateController,
     AllocationListController,
 )
+from .audit_file import (
+    AuditFileListController,
+)
+from .auto_allocation import AutoAllocationCreateController
 from .balance_sheet import BalanceSheetListController
 from .cash_purchase_debit_note import (
     CashPurchaseDebitNoteContraCreateController,
@@ -99,6 +103,7 @@ from .journal_entry import (
     JournalEntryListController,
     JournalEntryUpdateController,
 )
+from .journal_import import JournalImportCreateController
 from .nominal_account_history import NominalAccountHistoryListController
 from .nominal_account_type import NominalAccountTypeListController
 from .nominal_contra import (
@@ -106,6 +111,9 @@ from .nominal_contra import (
     NominalContraListController,
     NominalContraUpdateController,
 )
+from .nominal_ledger_export import (
+    NominalLedgerExportListController,
+)
 from .payment_method import (
     PaymentMethodCreateController,
     PaymentMethodListController,
@@ -115,6 +123,7 @@ from .period_end import PeriodEndCreateController, PeriodEndListController
 from .profit_and_loss import ProfitAndLossListController
 from .purchases_analysis import PurchasesAnalysisListController
 from .purchases_by_country import PurchasesByCountryListController
+from .report_job import ReportJobCreateController
 from .rtd import RTDListController
 from .sales_analysis import SalesAnalysisListController
 from .sales_by_country import SalesByCountryListController
@@ -182,6 +191,9 @@ __all__ = [
     'AllocationCreateController',
     'AllocationListController',
 
+    # Audit File
+    'AuditFileListController',
+
     # Balance Sheet
     'BalanceSheetListController',
 
@@ -249,6 +261,9 @@ __all__ = [
     'JournalEntryListController',
     'JournalEntryUpdateController',
 
+    # Journal Import
+    'JournalImportCreateController',
+
     # Nominal Account History
     'NominalAccountHistoryListController',
 
@@ -260,6 +275,9 @@ __all__ = [
     'NominalContraListController',
     'NominalContraUpdateController',
 
+    # Nominal Ledger Export
+    'NominalLedgerExportListController',
+
     # Payment Method
     'PaymentMethodCreateController',
     'PaymentMethodListController',
@@ -278,6 +296,9 @@ __all__ = [
     # Purchases by Country
     'PurchasesByCountryListController',
 
+    # Report Job
+    'ReportJobCreateController',
+
     # RTD (Return of Trading Details)
     'RTDListController',
 
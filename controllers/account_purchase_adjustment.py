@@ -10,6 +10,7 @@ from cloudcix_rest.controllers import ControllerBase
 from financial.models.address_nominal_account import AddressNominalAccount
 from financial.models.nominal_ledger import NominalLedger
 from financial import reserved_accounts as reserved
+from financial.sharding import shard_for
 
 
 __all__ = [
@@ -56,6 +57,8 @@ class AccountPurchaseAdjustmentCreateController(ControllerBase):
         )
         if response.status_code != 200:
             return 'financial_account_purchase_adjustment_create_102'
+        if shard_for(contra_address_id) != shard_for(self.request.user.address['id']):
+            return 'financial_account_purchase_adjustment_create_124'
         self.cleaned_data['contra_address'] = response.json()['content']
         self.cleaned_data['contra_address_id'] = contra_address_id
         return None
@@ -104,7 +107,7 @@ class AccountPurchaseAdjustmentCreateController(ControllerBase):
             transaction_date = datetime.strptime(str(transaction).split('T')[0], '%Y-%m-%d').date()
         except (TypeError, ValueError):
             return 'financial_account_purchase_adjustment_create_107'
-        obj = NominalLedger.period_end.filter(
+        obj = NominalLedger.period_end.lean().filter(
             address_id=self.request.user.address['id'],
             transaction_date__gte=transaction_date,
         )
@@ -284,7 +287,7 @@ class AccountPurchaseAdjustmentContraCreateController(ControllerBase):
         except (TypeError, ValueError):
             return 'financial_account_purchase_adjustment_contra_create_105'
         # Make sure the date has not been processed by a period end
-        obj = NominalLedger.period_end.filter(
+        obj = NominalLedger.period_end.lean().filter(
             address_id=self.request.user.address['id'],
             transaction_date__gte=transaction_date,
         )
@@ -307,14 +310,14 @@ class AccountPurchaseAdjustmentContraCreateController(ControllerBase):
 
         try:
             # Fetch the Account Sale Adjustment that the Account Purchase Adjustment is being created in response to
-            account_sale_adjustment = NominalLedger.account_sale_adjustments.get(
+            account_sale_adjustment = NominalLedger.account_sale_adjustments.lean().get(
                 tsn=tsn,
                 address_id=self.address_id,
                 contra_address_id=self.request.user.address['id'],
             )
         except NominalLedger.DoesNotExist:
             return 'financial_account_purchase_adjustment_contra_create_108'
-        if account_sale_adjustment.contra_nominal_ledger is not None:
+        if account_sale_adjustment.contra_nominal_ledger_id is not None:
             return 'financial_account_purchase_adjustment_contra_create_109'
 
         if 'transaction_date' not in self.cleaned_data:
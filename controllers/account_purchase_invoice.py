@@ -11,6 +11,7 @@ from cloudcix_rest.controllers import ControllerBase
 from financial import reserved_accounts as reserved
 from financial.models import AddressNominalAccount, NominalLedger, TaxRate
 from financial.models.nominal_ledger_debit import NominalLedgerDebit
+from financial.sharding import shard_for
 
 
 __all__ = [
@@ -182,6 +183,8 @@ class AccountPurchaseInvoiceCreateController(ControllerBase):
         )
         if response.status_code != 200:
             return 'financial_account_purchase_invoice_create_113'
+        if shard_for(contra_address_id) != shard_for(self.request.user.address['id']):
+            return 'financial_account_purchase_invoice_create_141'
         self.cleaned_data['contra_address_id'] = contra_address_id
         self.cleaned_data['contra_address'] = response.json()['content']
         return None
@@ -473,7 +476,7 @@ class AccountPurchaseInvoiceCreateController(ControllerBase):
             transaction_date = datetime.strptime(str(date).split('T')[0], '%Y-%m-%d').date()
         except (TypeError, ValueError):
             return 'financial_account_purchase_invoice_create_138'
-        obj = NominalLedger.period_end.filter(
+        obj = NominalLedger.period_end.lean().filter(
             address_id=self.request.user.address['id'],
             transaction_date__gte=transaction_date,
         )
@@ -576,7 +579,7 @@ class AccountPurchaseInvoiceContraCreateController(ControllerBase):
             transaction_date = datetime.strptime(str(transaction).split('T')[0], '%Y-%m-%d').date()
         except (TypeError, ValueError):
             return 'financial_account_purchase_invoice_contra_create_105'
-        obj = NominalLedger.period_end.filter(
+        obj = NominalLedger.period_end.lean().filter(
             address_id=self.request.user.address['id'],
             transaction_date__gte=transaction_date,
         )
@@ -599,14 +602,14 @@ class AccountPurchaseInvoiceContraCreateController(ControllerBase):
 
         try:
             # Fetch the Account Sale Invoice that the Account Purchase Invoice is being created in response to
-            account_sale_invoice = NominalLedger.account_sale_invoices.get(
+            account_sale_invoice = NominalLedger.account_sale_invoices.lean().get(
                 tsn=tsn,
                 address_id=self.address_id,
                 contra_address_id=self.request.user.address['id'],
             )
         except NominalLedger.DoesNotExist:
             return 'financial_account_purchase_invoice_contra_create_108'
-        if account_sale_invoice.contra_nominal_ledger is not None:
+        if account_sale_invoice.contra_nominal_ledger_id is not None:
             return 'financial_account_purchase_invoice_contra_create_109'
 
         self.cleaned_data['contra_nominal_ledger'] = account_sale_invoice
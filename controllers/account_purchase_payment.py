@@ -8,6 +8,7 @@ from cloudcix.api.reporting import Reporting
 from cloudcix_rest.controllers import ControllerBase
 # local
 from financial.models import AddressNominalAccount, NominalContra, NominalLedger, PaymentMethod
+from financial.sharding import shard_for
 
 
 __all__ = [
@@ -70,6 +71,8 @@ class AccountPurchasePaymentCreateController(ControllerBase):
         )
         if response.status_code != 200:
             return 'financial_account_purchase_payment_create_104'
+        if shard_for(contra_address_id) != shard_for(self.request.user.address['id']):
+            return 'financial_account_purchase_payment_create_117'
         self.cleaned_data['contra_address_id'] = contra_address_id
         self.cleaned_data['contra_address'] = response.json()['content']
         return None
@@ -158,7 +161,7 @@ class AccountPurchasePaymentCreateController(ControllerBase):
             transaction_date = datetime.strptime(str(date).split('T')[0], '%Y-%m-%d').date()
         except (TypeError, ValueError):
             return 'financial_account_purchase_payment_create_114'
-        obj = NominalLedger.period_end.filter(
+        obj = NominalLedger.period_end.lean().filter(
             address_id=self.request.user.address['id'],
             transaction_date__gte=transaction_date,
         )
@@ -259,7 +262,7 @@ class AccountPurchasePaymentContraCreateController(ControllerBase):
             transaction_date = datetime.strptime(str(date).split('T')[0], '%Y-%m-%d').date()
         except (TypeError, ValueError):
             return 'financial_account_purchase_payment_contra_create_105'
-        obj = NominalLedger.period_end.filter(
+        obj = NominalLedger.period_end.lean().filter(
             address_id=self.request.user.address['id'],
             transaction_date__gte=transaction_date,
         )
@@ -274,7 +277,7 @@ class AccountPurchasePaymentContraCreateController(ControllerBase):
         type: int
         """
         try:
-            sale_payment = NominalLedger.account_sale_payments.get(
+            sale_payment = NominalLedger.account_sale_payments.lean().get(
                 tsn=int(cast(int, tsn)),
                 address_id=self.address_id,
                 contra_address_id=self.request.user.address['id'],
@@ -284,7 +287,7 @@ class AccountPurchasePaymentContraCreateController(ControllerBase):
         except NominalLedger.DoesNotExist:
             return 'financial_account_purchase_payment_contra_create_108'
 
-        if sale_payment.contra_nominal_ledger is not None:
+        if sale_payment.contra_nominal_ledger_id is not None:
             return 'financial_account_purchase_payment_contra_create_109'
 
         self.cleaned_data['contra_nominal_ledger'] = sale_payment
@@ -10,6 +10,7 @@ from cloudcix_rest.controllers import ControllerBase
 from financial.models.address_nominal_account import AddressNominalAccount
 from financial.models.nominal_ledger import NominalLedger
 from financial import reserved_accounts as reserved
+from financial.sharding import shard_for
 
 
 __all__ = [
@@ -56,6 +57,8 @@ class AccountSaleAdjustmentCreateController(ControllerBase):
         )
         if response.status_code != 200:
             return 'financial_account_sale_adjustment_create_102'
+        if shard_for(contra_address_id) != shard_for(self.request.user.address['id']):
+            return 'financial_account_sale_adjustment_create_124'
         self.cleaned_data['contra_address'] = response.json()['content']
         self.cleaned_data['contra_address_id'] = contra_address_id
         return None
@@ -105,7 +108,7 @@ class AccountSaleAdjustmentCreateController(ControllerBase):
         except (TypeError, ValueError):
             return 'financial_account_sale_adjustment_create_107'
         # Make sure the date has not been processed by a period end
-        obj = NominalLedger.period_end.filter(
+        obj = NominalLedger.period_end.lean().filter(
             address_id=self.request.user.address['id'],
             transaction_date__gte=transaction_date,
         )
@@ -285,7 +288,7 @@ class AccountSaleAdjustmentContraCreateController(ControllerBase):
         except (TypeError, ValueError):
             return 'financial_account_sale_adjustment_contra_create_105'
         # Make sure the date has not been processed by a period end
-        obj = NominalLedger.period_end.filter(
+        obj = NominalLedger.period_end.lean().filter(
             address_id=self.request.user.address['id'],
             transaction_date__gte=transaction_date,
         )
@@ -308,14 +311,14 @@ class AccountSaleAdjustmentContraCreateController(ControllerBase):
 
         try:
             # Fetch the Account Purchase Adjustment that the Account Sale Adjustment is being created in response to
-            account_purchase_adjustment = NominalLedger.account_purchase_adjustments.get(
+            account_purchase_adjustment = NominalLedger.account_purchase_adjustments.lean().get(
                 tsn=tsn,
                 address_id=self.address_id,
                 contra_address_id=self.request.user.address['id'],
             )
         except NominalLedger.DoesNotExist:
             return 'financial_account_sale_adjustment_contra_create_108'
-        if account_purchase_adjustment.contra_nominal_ledger is not None:
+        if account_purchase_adjustment.contra_nominal_ledger_id is not None:
             return 'financial_account_sale_adjustment_contra_create_109'
 
         if 'transaction_date' not in self.cleaned_data:
@@ -13,6 +13,7 @@ from financial.models.address_nominal_account import AddressNominalAccount
 from financial.models.nominal_ledger import NominalLedger
 from financial.models.nominal_ledger_debit import NominalLedgerDebit
 from financial.models.tax_rate import TaxRate
+from financial.sharding import shard_for
 
 
 __all__ = [
@@ -126,6 +127,8 @@ class AccountSaleCreditNoteCreateController(ControllerBase):
         )
         if response.status_code != 200:
             return 'financial_account_sale_credit_note_create_108'
+        if shard_for(contra_address_id) != shard_for(self.request.user.address['id']):
+            return 'financial_account_sale_credit_note_create_139'
         self.cleaned_data['contra_address_id'] = contra_address_id
         self.cleaned_data['contra_address'] = response.json()['content']
         return None
@@ -463,7 +466,7 @@ class AccountSaleCreditNoteCreateController(ControllerBase):
             transaction_date = datetime.strptime(str(date).split('T')[0], '%Y-%m-%d').date()
         except (TypeError, ValueError):
             return 'financial_account_sale_credit_note_create_136'
-        obj = NominalLedger.period_end.filter(
+        obj = NominalLedger.period_end.lean().filter(
             address_id=self.request.user.address['id'],
             transaction_date__gte=transaction_date,
         )
@@ -565,7 +568,7 @@ class AccountSaleCreditNoteContraCreateController(ControllerBase):
             transaction_date = datetime.strptime(str(date).split('T')[0], '%Y-%m-%d').date()
         except (TypeError, ValueError):
             return 'financial_account_sale_credit_note_contra_create_105'
-        obj = NominalLedger.period_end.filter(
+        obj = NominalLedger.period_end.lean().filter(
             address_id=self.request.user.address['id'],
             transaction_date__gte=transaction_date,
         )
@@ -588,7 +591,7 @@ class AccountSaleCreditNoteContraCreateController(ControllerBase):
 
         try:
             # Fetch the Account Sale Credit Note that the Account Purchase Debit Note is being created in response to
-            debit_note = NominalLedger.account_purchase_debit_notes.get(
+            debit_note = NominalLedger.account_purchase_debit_notes.lean().get(
                 tsn=tsn,
                 address_id=self.address_id,
                 contra_address_id=self.request.user.address['id'],
@@ -596,7 +599,7 @@ class AccountSaleCreditNoteContraCreateController(ControllerBase):
         except NominalLedger.DoesNotExist:
             return 'financial_account_sale_credit_note_contra_create_108'
 
-        if debit_note.contra_nominal_ledger is not None:
+        if debit_note.contra_nominal_ledger_id is not None:
             return 'financial_account_sale_credit_note_contra_create_109'
 
         self.cleaned_data['contra_nominal_ledger'] = debit_note
@@ -13,6 +13,7 @@ from django.db.models.functions import Coalesce
 from financial import reserved_accounts as reserved
 from financial.models import AddressNominalAccount, NominalLedger, TaxRate
 from financial.models.nominal_ledger_debit import NominalLedgerDebit
+from financial.sharding import shard_for
 
 
 __all__ = [
@@ -166,6 +167,8 @@ class AccountSaleInvoiceCreateController(ControllerBase):
         )
         if response.status_code != 200:
             return 'financial_account_sale_invoice_create_111'
+        if shard_for(contra_address_id) != shard_for(self.request.user.address['id']):
+            return 'financial_account_sale_invoice_create_143'
         self.cleaned_data['contra_address_id'] = contra_address_id
         self.cleaned_data['contra_address'] = response.json()['content']
         return None
@@ -374,7 +377,7 @@ class AccountSaleInvoiceCreateController(ControllerBase):
         if credit_limit is not None:
             credit_limit = Decimal(credit_limit)
 
-            current_credit = NominalLedger.objects.filter(
+            current_credit = NominalLedger.objects.lean().filter(
                 address_id=address_id,
                 contra_address_id=self.cleaned_data['contra_address_id'],
                 transaction_type_id__in=[11002, 11003, 11004, 11005],
@@ -521,7 +524,7 @@ class AccountSaleInvoiceCreateController(ControllerBase):
         address_id = self.cleaned_data.get('address_id')
         if address_id is None:
             return None
-        obj = NominalLedger.period_end.filter(
+        obj = NominalLedger.period_end.lean().filter(
             address_id=address_id,
             transaction_date__gte=transaction_date,
         )
@@ -624,7 +627,7 @@ class AccountSaleInvoiceContraCreateController(ControllerBase):
             transaction_date = datetime.strptime(str(transaction).split('T')[0], '%Y-%m-%d').date()
         except (TypeError, ValueError):
             return 'financial_account_sale_invoice_contra_create_105'
-        obj = NominalLedger.period_end.filter(
+        obj = NominalLedger.period_end.lean().filter(
             address_id=self.request.user.address['id'],
             transaction_date__gte=transaction_date,
         )
@@ -647,14 +650,14 @@ class AccountSaleInvoiceContraCreateController(ControllerBase):
 
         try:
             # Fetch the Account Purchase Invoice that the Account Sale Invoice is being created in response to
-            account_purchase_invoice = NominalLedger.account_purchase_invoices.get(
+            account_purchase_invoice = NominalLedger.account_purchase_invoices.lean().get(
                 tsn=tsn,
                 address_id=self.address_id,
                 contra_address_id=self.request.user.address['id'],
             )
         except NominalLedger.DoesNotExist:
             return 'financial_account_sale_invoice_contra_create_108'
-        if account_purchase_invoice.contra_nominal_ledger is not None:
+        if account_purchase_invoice.contra_nominal_ledger_id is not None:
             return 'financial_account_sale_invoice_contra_create_109'
 
         self.cleaned_data['contra_nominal_ledger'] = account_purchase_invoice
@@ -13,6 +13,7 @@ from financial.models import (
     NominalLedger,
     PaymentMethod,
 )
+from financial.sharding import shard_for
 
 __all__ = [
     'AccountSalePaymentCreateController',
@@ -73,6 +74,8 @@ class AccountSalePaymentCreateController(ControllerBase):
         )
         if response.status_code != 200:
             return 'financial_account_sale_payment_create_104'
+        if shard_for(contra_address_id) != shard_for(self.request.user.address['id']):
+            return 'financial_account_sale_payment_create_117'
         self.cleaned_data['contra_address_id'] = contra_address_id
         self.cleaned_data['contra_address'] = response.json()['content']
         return None
@@ -163,7 +166,7 @@ class AccountSalePaymentCreateController(ControllerBase):
         except (TypeError, ValueError):
             return 'financial_account_sale_payment_create_114'
 
-        period_end = NominalLedger.period_end.filter(
+        period_end = NominalLedger.period_end.lean().filter(
             address_id=self.request.user.address['id'],
             transaction_date__gte=transaction_date,
         )
@@ -266,7 +269,7 @@ class AccountSalePaymentContraCreateController(ControllerBase):
         except (TypeError, ValueError):
             return 'financial_account_sale_payment_contra_create_105'
 
-        period_end = NominalLedger.period_end.filter(
+        period_end = NominalLedger.period_end.lean().filter(
             address_id=self.request.user.address['id'],
             transaction_date__gte=transaction_date,
         )
@@ -287,7 +290,7 @@ class AccountSalePaymentContraCreateController(ControllerBase):
             return 'financial_account_sale_payment_contra_create_107'
 
         try:
-            purchase_payment = NominalLedger.account_purchase_payments.get(
+            purchase_payment = NominalLedger.account_purchase_payments.lean().get(
                 tsn=tsn,
                 address_id=self.address_id,
                 contra_address_id=self.request.user.address['id'],
@@ -295,7 +298,7 @@ class AccountSalePaymentContraCreateController(ControllerBase):
         except NominalLedger.DoesNotExist:
             return 'financial_account_sale_payment_contra_create_108'
 
-        if purchase_payment.contra_nominal_ledger is not None:
+        if purchase_payment.contra_nominal_ledger_id is not None:
             return 'financial_account_sale_payment_contra_create_109'
 
         self.cleaned_data['contra_nominal_ledger'] = purchase_payment
@@ -3,6 +3,7 @@ from decimal import Decimal, InvalidOperation
 from typing import cast, Optional
 # libs
 from cloudcix_rest.controllers import ControllerBase
+from django.db.models import Q
 # local
 from financial import reserved_accounts as reserved
 from financial.models import Allocation, NominalLedger
@@ -75,9 +76,8 @@ class AllocationCreateController(ControllerBase):
         if len(allocations) < 2:
             return 'financial_allocation_create_102'
 
-        balance = Decimal('0')
-        contra_address_id = 0
         sale = None
+        keys = []
 
         for line in allocations:
             if not isinstance(line, dict):
@@ -107,15 +107,30 @@ class AllocationCreateController(ControllerBase):
             else:
                 if transaction_type not in PURCHASE_TRANSACTIONS:
                     return 'financial_allocation_create_109'
-            try:
-                nominal_ledger = NominalLedger.objects.get(
-                    tsn=tsn,
-                    transaction_type_id=transaction_type,
-                    address_id=self.request.user.address['id'],
-                )
-                line['nominal_ledger'] = nominal_ledger
-            except NominalLedger.DoesNotExist:
+            keys.append((transaction_type, tsn))
+
+        # Fetch every Nominal Ledger entry being allocated in one query. The entries are locked until the Allocation
+        # is saved so their unallocated balances can't change in between, and they are locked in id order so that
+        # concurrent Allocations of the same entries can't deadlock. Must be run inside a transaction.
+        lookup = Q()
+        for transaction_type, tsn in set(keys):
+            lookup |= Q(transaction_type_id=transaction_type, tsn=tsn)
+        nominal_ledgers = NominalLedger.objects.lean().filter(
+            lookup,
+            address_id=self.request.user.address['id'],
+        ).order_by(
+            'id',
+        ).select_for_update()
+        nominal_ledgers = {(nl.transaction_type_id, nl.tsn): nl for nl in nominal_ledgers}
+
+        balance = Decimal('0')
+        contra_address_id = 0
+
+        for line, key in zip(allocations, keys):
+            nominal_ledger = nominal_ledgers.get(key)
+            if nominal_ledger is None:
                 return 'financial_allocation_create_110'
+            line['nominal_ledger'] = nominal_ledger
             # All Nominal Ledger transaction have the same contra_address_id
             if contra_address_id == 0:
                 contra_address_id = nominal_ledger.contra_address_id
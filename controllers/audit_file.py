@@ -0,0 +1,75 @@
+# stdlib
+from typing import Optional
+# libs
+from cloudcix_rest.controllers import ControllerBase
+# local
+from financial.controllers.transaction_mixin import FinancialException, TransactionMixin
+
+
+__all__ = [
+    'AuditFileListController',
+]
+
+
+class AuditFileListController(ControllerBase, TransactionMixin):
+    """
+    Validate User data used to generate an Audit File for an Address
+    """
+
+    class Meta(ControllerBase.Meta):
+        """
+        Override some of the ControllerBase.Meta fields to make them more specific for this controller
+        """
+        validation_order = (
+            'address_id',
+            'start_date',
+            'end_date',
+        )
+
+    def validate_address_id(self, address_id: Optional[int]) -> Optional[str]:
+        """
+        description: |
+            The id of the Address to generate the Audit File for. A global active User can generate the Audit File of
+            another Address in their Member. Defaults to the requesting User's Address.
+        type: integer
+        required: optional
+        """
+        try:
+            address_id = self._validate_integer(address_id, 'financial_audit_file_list_101')
+        except FinancialException as e:
+            return e.args[0]
+
+        self.cleaned_data['address_id'] = address_id
+        return None
+
+    def validate_start_date(self, start_date: Optional[str]) -> Optional[str]:
+        """
+        description: The first day of the period covered by the Audit File, usually the start of a financial year
+        type: string
+        """
+        try:
+            start_date = self._validate_date(start_date, 'financial_audit_file_list_102')
+        except FinancialException as e:
+            return e.args[0]
+
+        self.cleaned_data['start_date'] = start_date
+        return None
+
+    def validate_end_date(self, end_date: Optional[str]) -> Optional[str]:
+        """
+        description: The last day of the period covered by the Audit File
+        type: string
+        """
+        try:
+            end_date = self._validate_date(end_date, 'financial_audit_file_list_103')
+        except FinancialException as e:
+            return e.args[0]
+        if 'start_date' not in self.cleaned_data:
+            return None
+        try:
+            self._validate_start_end_dates(self.cleaned_data['start_date'], end_date, 'financial_audit_file_list_104')
+        except FinancialException as e:
+            return e.args[0]
+
+        self.cleaned_data['end_date'] = end_date
+        return None
@@ -0,0 +1,103 @@
+# stdlib
+from typing import Any, Optional
+# libs
+from cloudcix_rest.controllers import ControllerBase
+# local
+from financial.allocation_engine import ALLOCATION_TYPES, STRATEGIES
+from financial.models import Allocation
+
+
+__all__ = [
+    'AutoAllocationCreateController',
+]
+
+
+class AutoAllocationCreateController(ControllerBase):
+    """
+    Validate User data used to automatically allocate the open items of a Debtor or Creditor ledger
+    """
+
+    class Meta(ControllerBase.Meta):
+        """
+        Override some of the ControllerBase.Meta fields to make them more specific for this controller
+        """
+        model = Allocation
+        validation_order = (
+            'allocation_type',
+            'contra_address_ids',
+            'strategies',
+            'dry_run',
+        )
+
+    def validate_allocation_type(self, allocation_type: Optional[str]) -> Optional[str]:
+        """
+        description: |
+            The ledger to allocate, either `customer` for the Sales ledger or `supplier` for the Purchases ledger
+        type: string
+        """
+        allocation_type = str(allocation_type or '').lower()
+        if allocation_type not in ALLOCATION_TYPES:
+            return 'financial_auto_allocation_create_101'
+
+        self.cleaned_data['allocation_type'] = allocation_type
+        return None
+
+    def validate_contra_address_ids(self, contra_address_ids: Optional[Any]) -> Optional[str]:
+        """
+        description: Only allocate the open items of these contra Addresses. Defaults to every contra Address.
+        type: array
+        items:
+            type: integer
+        required: false
+        """
+        if contra_address_ids is None:
+            self.cleaned_data['contra_address_ids'] = None
+            return None
+
+        if not isinstance(contra_address_ids, list) or len(contra_address_ids) == 0:
+            return 'financial_auto_allocation_create_102'
+        try:
+            contra_address_ids = [int(contra_address_id) for contra_address_id in contra_address_ids]
+        except (TypeError, ValueError):
+            return 'financial_auto_allocation_create_103'
+
+        self.cleaned_data['contra_address_ids'] = contra_address_ids
+        return None
+
+    def validate_strategies(self, strategies: Optional[Any]) -> Optional[str]:
+        """
+        description: |
+            The strategies used to match the open items, applied in the order sent. `exact` matches items with
+            exactly opposite balances, `reference` matches items with the same `external_reference` oldest first, and
+            `fifo` matches the remaining items oldest first. Defaults to `["exact", "reference", "fifo"]`.
+        type: array
+        items:
+            type: string
+        required: false
+        """
+        if strategies is None:
+            self.cleaned_data['strategies'] = STRATEGIES
+            return None
+
+        if not isinstance(strategies, list) or len(strategies) == 0:
+            return 'financial_auto_allocation_create_104'
+        strategies = [str(strategy).lower() for strategy in strategies]
+        if any(strategy not in STRATEGIES for strategy in strategies) or len(set(strategies)) != len(strategies):
+            return 'financial_auto_allocation_create_105'
+
+        self.cleaned_data['strategies'] = strategies
+        return None
+
+    def validate_dry_run(self, dry_run: Optional[bool]) -> Optional[str]:
+        """
+        description: Return the proposed matches without creating any Allocations. Defaults to false.
+        type: boolean
+        required: false
+        """
+        if dry_run is None:
+            dry_run = False
+        if not isinstance(dry_run, bool):
+            return 'financial_auto_allocation_create_106'
+
+        self.cleaned_data['dry_run'] = dry_run
+        return None
@@ -17,6 +17,7 @@ from financial.models import (
     TaxRate,
 )
 from financial.models.nominal_ledger_debit import NominalLedgerDebit
+from financial.sharding import shard_for
 
 
 __all__ = [
@@ -132,6 +133,8 @@ class CashPurchaseInvoiceCreateController(ControllerBase):
         )
         if response.status_code != 200:
             return 'financial_cash_purchase_invoice_create_108'
+        if shard_for(contra_address_id) != shard_for(self.request.user.address['id']):
+            return 'financial_cash_purchase_invoice_create_146'
         self.cleaned_data['contra_address_id'] = contra_address_id
         self.cleaned_data['contra_address'] = response.json()['content']
         return None
@@ -527,7 +530,7 @@ class CashPurchaseInvoiceCreateController(ControllerBase):
             transaction_date = datetime.strptime(str(date).split('T')[0], '%Y-%m-%d').date()
         except (TypeError, ValueError):
             return 'financial_cash_purchase_invoice_create_143'
-        obj = NominalLedger.period_end.filter(
+        obj = NominalLedger.period_end.lean().filter(
             address_id=self.request.user.address['id'],
             transaction_date__gte=transaction_date,
         )
@@ -659,7 +662,7 @@ class CashPurchaseInvoiceContraCreateController(ControllerBase):
             transaction_date = datetime.strptime(str(date).split('T')[0], '%Y-%m-%d').date()
         except (TypeError, ValueError):
             return 'financial_cash_purchase_invoice_contra_create_109'
-        obj = NominalLedger.period_end.filter(
+        obj = NominalLedger.period_end.lean().filter(
             address_id=self.request.user.address['id'],
             transaction_date__gte=transaction_date,
         )
@@ -679,7 +682,7 @@ class CashPurchaseInvoiceContraCreateController(ControllerBase):
             return 'financial_cash_purchase_invoice_contra_create_111'
 
         try:
-            invoice = NominalLedger.cash_sale_invoices.get(
+            invoice = NominalLedger.cash_sale_invoices.lean().get(
                 tsn=tsn,
                 address_id=self.address_id,
                 contra_address_id=self.request.user.address['id'],
@@ -687,7 +690,7 @@ class CashPurchaseInvoiceContraCreateController(ControllerBase):
         except NominalLedger.DoesNotExist:
             return 'financial_cash_purchase_invoice_contra_create_112'
 
-        if invoice.contra_nominal_ledger is not None:
+        if invoice.contra_nominal_ledger_id is not None:
             return 'financial_cash_purchase_invoice_contra_create_113'
 
         self.cleaned_data['contra_nominal_ledger'] = invoice
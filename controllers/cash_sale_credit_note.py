@@ -17,6 +17,7 @@ from financial.models import (
     TaxRate,
 )
 from financial.models.nominal_ledger_debit import NominalLedgerDebit
+from financial.sharding import shard_for
 
 
 __all__ = [
@@ -132,6 +133,8 @@ class CashSaleCreditNoteCreateController(ControllerBase):
         )
         if response.status_code != 200:
             return 'financial_cash_sale_credit_note_create_108'
+        if shard_for(contra_address_id) != shard_for(self.request.user.address['id']):
+            return 'financial_cash_sale_credit_note_create_144'
         self.cleaned_data['contra_address_id'] = contra_address_id
         self.cleaned_data['contra_address'] = response.json()['content']
         return None
@@ -505,7 +508,7 @@ class CashSaleCreditNoteCreateController(ControllerBase):
             transaction_date = datetime.strptime(str(date).split('T')[0], '%Y-%m-%d').date()
         except (TypeError, ValueError):
             return 'financial_cash_sale_credit_note_create_141'
-        obj = NominalLedger.period_end.filter(
+        obj = NominalLedger.period_end.lean().filter(
             address_id=self.request.user.address['id'],
             transaction_date__gte=transaction_date,
         )
@@ -637,7 +640,7 @@ class CashSaleCreditNoteContraCreateController(ControllerBase):
             transaction_date = datetime.strptime(str(date).split('T')[0], '%Y-%m-%d').date()
         except (TypeError, ValueError):
             return 'financial_cash_sale_credit_note_contra_create_109'
-        obj = NominalLedger.period_end.filter(
+        obj = NominalLedger.period_end.lean().filter(
             address_id=self.request.user.address['id'],
             transaction_date__gte=transaction_date,
         )
@@ -657,7 +660,7 @@ class CashSaleCreditNoteContraCreateController(ControllerBase):
             return 'financial_cash_sale_credit_note_contra_create_111'
 
         try:
-            debit_note = NominalLedger.cash_purchase_debit_notes.get(
+            debit_note = NominalLedger.cash_purchase_debit_notes.lean().get(
                 tsn=tsn,
                 address_id=self.address_id,
                 contra_address_id=self.request.user.address['id'],
@@ -665,7 +668,7 @@ class CashSaleCreditNoteContraCreateController(ControllerBase):
         except NominalLedger.DoesNotExist:
             return 'financial_cash_sale_credit_note_contra_create_112'
 
-        if debit_note.contra_nominal_ledger is not None:
+        if debit_note.contra_nominal_ledger_id is not None:
             return 'financial_cash_sale_credit_note_contra_create_113'
 
         self.cleaned_data['contra_nominal_ledger'] = debit_note
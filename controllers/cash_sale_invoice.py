@@ -17,6 +17,7 @@ from financial.models import (
     TaxRate,
 )
 from financial.models.nominal_ledger_debit import NominalLedgerDebit
+from financial.sharding import shard_for
 
 __all__ = [
     'CashSaleInvoiceCreateController',
@@ -132,6 +133,8 @@ class CashSaleInvoiceCreateController(ControllerBase):
         )
         if response.status_code != 200:
             return 'financial_cash_sale_invoice_create_108'
+        if shard_for(contra_address_id) != shard_for(self.request.user.address['id']):
+            return 'financial_cash_sale_invoice_create_144'
         self.cleaned_data['contra_address_id'] = contra_address_id
         self.cleaned_data['contra_address'] = response.json()['content']
         return None
@@ -505,7 +508,7 @@ class CashSaleInvoiceCreateController(ControllerBase):
             transaction_date = datetime.strptime(str(date).split('T')[0], '%Y-%m-%d').date()
         except (TypeError, ValueError):
             return 'financial_cash_sale_invoice_create_141'
-        obj = NominalLedger.period_end.filter(
+        obj = NominalLedger.period_end.lean().filter(
             address_id=self.request.user.address['id'],
             transaction_date__gte=transaction_date,
         )
@@ -640,7 +643,7 @@ class CashSaleInvoiceContraCreateController(ControllerBase):
         except (TypeError, ValueError):
             return 'financial_cash_sale_invoice_contra_create_109'
 
-        period_end = NominalLedger.period_end.filter(
+        period_end = NominalLedger.period_end.lean().filter(
             address_id=self.request.user.address['id'],
             transaction_date__gte=transaction_date,
         )
@@ -661,7 +664,7 @@ class CashSaleInvoiceContraCreateController(ControllerBase):
             return 'financial_cash_sale_invoice_contra_create_111'
 
         try:
-            invoice = NominalLedger.cash_purchase_invoices.get(
+            invoice = NominalLedger.cash_purchase_invoices.lean().get(
                 tsn=tsn,
                 address_id=self.address_id,
                 contra_address_id=self.request.user.address['id'],
@@ -669,7 +672,7 @@ class CashSaleInvoiceContraCreateController(ControllerBase):
         except NominalLedger.DoesNotExist:
             return 'financial_cash_sale_invoice_contra_create_112'
 
-        if invoice.contra_nominal_ledger is not None:
+        if invoice.contra_nominal_ledger_id is not None:
             return 'financial_cash_sale_invoice_contra_create_113'
 
         self.cleaned_data['contra_nominal_ledger'] = invoice
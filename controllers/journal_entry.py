@@ -216,7 +216,7 @@ class JournalEntryCreateController(ControllerBase):
             return 'financial_journal_entry_create_121'
 
         # Make sure the new transaction date is not processed by a period end
-        period_end = NominalLedger.period_end.filter(
+        period_end = NominalLedger.period_end.lean().filter(
             address_id=self.request.user.address['id'],
             transaction_date__gte=transaction_date,
         )
@@ -290,7 +290,7 @@ class JournalEntryUpdateController(ControllerBase):
             return 'financial_journal_entry_update_105'
 
         # Make sure the new transaction date is not processed by a period end
-        period_end = NominalLedger.period_end.filter(
+        period_end = NominalLedger.period_end.lean().filter(
             address_id=self.request.user.address['id'],
             transaction_date__gte=transaction_date,
         )
@@ -0,0 +1,66 @@
+# stdlib
+import os
+from typing import Any, Optional
+# libs
+from cloudcix_rest.controllers import ControllerBase
+# local
+from financial.journal_import import IMPORT_FORMATS
+from financial.models import JournalImport
+
+
+__all__ = [
+    'JournalImportCreateController',
+]
+
+
+class JournalImportCreateController(ControllerBase):
+    """
+    Validate User data used to import a file of Journal Entries
+    """
+
+    class Meta(ControllerBase.Meta):
+        """
+        Override some of the ControllerBase.Meta fields to make them more specific for this controller
+        """
+        model = JournalImport
+        validation_order = (
+            'file',
+            'file_format',
+        )
+
+    def validate_file(self, file: Optional[Any]) -> Optional[str]:
+        """
+        description: |
+            The file of journals to import, sent as multipart form data. Each row of the file is one line of a journal
+            and has the fields `reference`, `transaction_date`, `narrative`, `nominal_account_number`, `debit`,
+            `credit`, `tax_rate_id` and `description`. Rows with the same `reference` make up one Journal Entry, and
+            each row must have exactly one of `debit` or `credit`.
+        type: string
+        format: binary
+        """
+        if file is None or not hasattr(file, 'read'):
+            return 'financial_journal_import_create_101'
+
+        self.cleaned_data['file'] = file
+        return None
+
+    def validate_file_format(self, file_format: Optional[str]) -> Optional[str]:
+        """
+        description: |
+            The format of the file, either `csv` (with a header row) or `ndjson`. Defaults to the extension of the
+            file name.
+        type: string
+        required: optional
+        """
+        if file_format is None or file_format == '':
+            file = self.cleaned_data.get('file')
+            if file is None:
+                return None
+            file_format = os.path.splitext(getattr(file, 'name', '') or '')[1].lstrip('.')
+
+        file_format = str(file_format).lower()
+        if file_format not in IMPORT_FORMATS:
+            return 'financial_journal_import_create_102'
+
+        self.cleaned_data['file_format'] = file_format
+        return None
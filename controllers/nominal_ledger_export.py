@@ -0,0 +1,139 @@
+# stdlib
+from typing import List, Optional
+# libs
+from cloudcix_rest.controllers import ControllerBase
+# local
+from financial.controllers.transaction_mixin import FinancialException, TransactionMixin
+from financial.exports import EXPORT_FORMATS
+
+
+__all__ = [
+    'NominalLedgerExportListController',
+]
+
+
+class NominalLedgerExportListController(ControllerBase, TransactionMixin):
+    """
+    Validate User data used to select the Nominal Ledger records that will be streamed in an export
+    """
+
+    class Meta(ControllerBase.Meta):
+        """
+        Override some of the ControllerBase.Meta fields to make them more specific for this controller
+        """
+        validation_order = (
+            'address_id',
+            'start_date',
+            'end_date',
+            'transaction_type_ids',
+            'nominal_account_numbers',
+            'format',
+        )
+
+    def _validate_integer_list(self, values: Optional[str], error: str) -> Optional[List[int]]:
+        """
+        Parse a comma separated list of integers, e.g. `11000,11002`
+        """
+        if values is None or values == '':
+            return None
+        try:
+            return sorted({int(value) for value in str(values).split(',')})
+        except (TypeError, ValueError):
+            raise FinancialException(error)
+
+    def validate_address_id(self, address_id: Optional[int]) -> Optional[str]:
+        """
+        description: |
+            The id of the Address to export the Nominal Ledger of. A global active User can export the Nominal Ledger
+            of another Address in their Member. Defaults to the requesting User's Address.
+        type: integer
+        required: optional
+        """
+        try:
+            address_id = self._validate_integer(address_id, 'financial_nominal_ledger_export_list_101')
+        except FinancialException as e:
+            return e.args[0]
+
+        self.cleaned_data['address_id'] = address_id
+        return None
+
+    def validate_start_date(self, start_date: Optional[str]) -> Optional[str]:
+        """
+        description: The earliest transaction date to include in the export
+        type: string
+        """
+        try:
+            start_date = self._validate_date(start_date, 'financial_nominal_ledger_export_list_102')
+        except FinancialException as e:
+            return e.args[0]
+
+        self.cleaned_data['start_date'] = start_date
+        return None
+
+    def validate_end_date(self, end_date: Optional[str]) -> Optional[str]:
+        """
+        description: The latest transaction date to include in the export
+        type: string
+        """
+        try:
+            end_date = self._validate_date(end_date, 'financial_nominal_ledger_export_list_103')
+        except FinancialException as e:
+            return e.args[0]
+        if 'start_date' not in self.cleaned_data:
+            return None
+        if self.cleaned_data['start_date'] > end_date:
+            return 'financial_nominal_ledger_export_list_104'
+
+        self.cleaned_data['end_date'] = end_date
+        return None
+
+    def validate_transaction_type_ids(self, transaction_type_ids: Optional[str]) -> Optional[str]:
+        """
+        description: A comma separated list of transaction type ids to limit the export to
+        type: string
+        required: optional
+        """
+        try:
+            transaction_type_ids = self._validate_integer_list(
+                transaction_type_ids,
+                'financial_nominal_ledger_export_list_105',
+            )
+        except FinancialException as e:
+            return e.args[0]
+
+        self.cleaned_data['transaction_type_ids'] = transaction_type_ids
+        return None
+
+    def validate_nominal_account_numbers(self, nominal_account_numbers: Optional[str]) -> Optional[str]:
+        """
+        description: |
+            A comma separated list of Nominal Account numbers. Only transactions that debit or credit one of these
+            accounts will be exported.
+        type: string
+        required: optional
+        """
+        try:
+            nominal_account_numbers = self._validate_integer_list(
+                nominal_account_numbers,
+                'financial_nominal_ledger_export_list_106',
+            )
+        except FinancialException as e:
+            return e.args[0]
+
+        self.cleaned_data['nominal_account_numbers'] = nominal_account_numbers
+        return None
+
+    def validate_format(self, format: Optional[str]) -> Optional[str]:
+        """
+        description: The format of the export, either `ndjson` (the default) or `csv`
+        type: string
+        required: optional
+        """
+        if format is None or format == '':
+            format = 'ndjson'
+        format = str(format).lower()
+        if format not in EXPORT_FORMATS:
+            return 'financial_nominal_ledger_export_list_107'
+
+        self.cleaned_data['format'] = format
+        return None
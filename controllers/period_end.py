@@ -79,7 +79,7 @@ class PeriodEndCreateController(ControllerBase):
         if transaction_date > datetime.utcnow():
             return 'financial_period_end_create_103'
 
-        period_end = NominalLedger.period_end.filter(
+        period_end = NominalLedger.period_end.lean().filter(
             address_id=self.request.user.address['id'],
             transaction_date__gte=transaction_date,
         )
@@ -88,7 +88,7 @@ class PeriodEndCreateController(ControllerBase):
 
         # Calculate the total debits and credits from the last period end up to `transaction_date`. They should always
         # be equal, otherwise something has gone wrong in the db
-        previous_date = NominalLedger.period_end.filter(
+        previous_date = NominalLedger.period_end.lean().filter(
             address_id=self.request.user.address['id'],
         ).order_by(
             '-transaction_date',
@@ -105,10 +105,10 @@ class PeriodEndCreateController(ControllerBase):
             'nominal_ledger__transaction_type_id__in': transaction_ids,
         }
 
-        debits = NominalLedgerDebit.objects.filter(**filters).aggregate(
+        debits = NominalLedgerDebit.objects.lean().filter(**filters).aggregate(
             total=Coalesce(Sum('amount'), Decimal('0')),
         )
-        credits = NominalLedgerCredit.objects.filter(**filters).aggregate(
+        credits = NominalLedgerCredit.objects.lean().filter(**filters).aggregate(
             total=Coalesce(Sum('amount'), Decimal('0')),
         )
         if debits['total'] != credits['total']:
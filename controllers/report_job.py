@@ -0,0 +1,60 @@
+# stdlib
+from typing import Any, Optional
+# libs
+from cloudcix_rest.controllers import ControllerBase
+# local
+from financial.models import ReportJob
+from financial.report_jobs import REPORTS
+
+
+__all__ = [
+    'ReportJobCreateController',
+]
+
+
+class ReportJobCreateController(ControllerBase):
+    """
+    Validate User data used to submit a Report Job
+    """
+
+    class Meta(ControllerBase.Meta):
+        """
+        Override some of the ControllerBase.Meta fields to make them more specific for this controller
+        """
+        model = ReportJob
+        validation_order = (
+            'report',
+            'params',
+        )
+
+    def validate_report(self, report: Optional[str]) -> Optional[str]:
+        """
+        description: |
+            The report to run. One of `balance_sheet`, `creditor_ledger`, `creditor_ledger_aged`, `debtor_ledger`,
+            `debtor_ledger_aged`, `profit_and_loss`, `purchases_analysis`, `purchases_by_country`, `rtd`,
+            `sales_analysis`, `sales_by_country`, `statement`, `trial_balance`, `vat3`, `vies_purchases` or
+            `vies_sales`
+        type: string
+        """
+        report = str(report or '').lower()
+        if report not in REPORTS:
+            return 'financial_report_job_create_101'
+
+        self.cleaned_data['report'] = report
+        return None
+
+    def validate_params(self, params: Optional[Any]) -> Optional[str]:
+        """
+        description: |
+            The parameters to run the report with, exactly as they would be sent to the report's service. They are
+            validated when the report runs, and any errors are returned as the result of the job.
+        type: object
+        required: false
+        """
+        if params is None:
+            params = {}
+        if not isinstance(params, dict):
+            return 'financial_report_job_create_102'
+
+        self.cleaned_data['params'] = params
+        return None
@@ -306,7 +306,7 @@ class TransactionMixin:
         except (TypeError, ValueError):
             raise FinancialException(iso_error)
 
-        obj = NominalLedger.period_end.filter(
+        obj = NominalLedger.period_end.lean().filter(
             address_id=self.request.user.address['id'],
             transaction_date__gte=transaction_date,
         )
@@ -82,7 +82,7 @@ class YearEndCreateController(ControllerBase):
 
         # Make sure the date has not been processed by a period end
         address_id = self.request.user.address['id']
-        obj = NominalLedger.period_end.filter(
+        obj = NominalLedger.period_end.lean().filter(
             address_id=address_id,
             transaction_date__gte=transaction_date,
         )
@@ -91,13 +91,13 @@ class YearEndCreateController(ControllerBase):
 
         # Make sure the Suspense Account has been closed at this date. This account is for temporarily storing
         # transactions when there's uncertainty about which account they should be stored in
-        debits = NominalLedgerDebit.objects.filter(
+        debits = NominalLedgerDebit.objects.lean().filter(
             nominal_account_number=reserved.SUSPENSE_ACCOUNT,
             nominal_ledger__address_id=address_id,
             nominal_ledger__transaction_date__lte=transaction_date,
         ).aggregate(Sum('amount'))['amount__sum'] or Decimal('0')
 
-        credits = NominalLedgerCredit.objects.filter(
+        credits = NominalLedgerCredit.objects.lean().filter(
             nominal_account_number=reserved.SUSPENSE_ACCOUNT,
             nominal_ledger__address_id=address_id,
             nominal_ledger__transaction_date__lte=transaction_date,
@@ -107,7 +107,7 @@ class YearEndCreateController(ControllerBase):
             return 'financial_year_end_create_105'
 
         # Get the date of the previous Year End
-        previous_year_end = NominalLedger.year_ends.filter(
+        previous_year_end = NominalLedger.year_ends.lean().filter(
             address_id=address_id,
         ).order_by(
             '-transaction_date',
@@ -124,11 +124,11 @@ class YearEndCreateController(ControllerBase):
             'nominal_ledger__transaction_date__lte': transaction_date,
             'nominal_ledger__transaction_type_id__in': transaction_ids,
         }
-        debits = NominalLedgerDebit.objects.filter(**filters).aggregate(
+        debits = NominalLedgerDebit.objects.lean().filter(**filters).aggregate(
             total=Coalesce(Sum('amount'), Decimal('0')),
         )
 
-        credits = NominalLedgerCredit.objects.filter(**filters).aggregate(
+        credits = NominalLedgerCredit.objects.lean().filter(**filters).aggregate(
             total=Coalesce(Sum('amount'), Decimal('0')),
         )
 
@@ -9,18 +9,298 @@ for various operations
 - Relations
 - Migrations
 
-This stuff could be used when it comes to sharding out the DBs too.
+The ledgers of some Addresses can be kept in separate shards, see `financial.sharding`. Queries are routed to the
+shard of the Address being worked on, and `fan_out` runs a query against several shards at once.
+
+Reads of the `financial` shard can be sent to the read replicas in the `FINANCIAL_REPLICAS` setting by running them
+inside `replica_reads`. The report and list services use it so heavy aggregation does not compete with posting on the
+primary. Everything else, and every read outside of it, goes to the primary.
+- A replica is only used while its replication lag is at most `FINANCIAL_REPLICA_MAX_LAG` seconds. The lag of each
+  replica is checked at most once every `FINANCIAL_REPLICA_LAG_CHECK_INTERVAL` seconds per process.
+- Once a request writes to a financial DB, the rest of its reads are pinned to the primary so it reads its own
+  writes.
+- Writes are also read by the requests that follow them, which may be handled by another process. When a request
+  writes to the `financial` shard, the Addresses it wrote for are marked in the Django cache named by
+  `FINANCIAL_REPLICA_PIN_CACHE_ALIAS` for as long as a replica in use could still be missing the write, the maximum lag
+  plus the lag check interval. The reads of a marked Address go to the primary until the mark expires. The cache must
+  be shared by every process, e.g. Redis or Memcached, for this to hold across processes.
 """
 
 # stdlib
-from typing import Any, Dict, Optional, Type
+import contextvars
+import functools
+import itertools
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, ExitStack
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Type, TypeVar
 # libs
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections, DatabaseError, transaction
 from django.db.models import Model
+# local
+from financial.instrumentation import current_stats, instrument_thread
+from financial.sharding import (
+    current_address_id,
+    current_request,
+    current_shard,
+    group_by_shard,
+    PRIMARY,
+    shard_for,
+    use_shard,
+)
+
+
+__all__ = [
+    'fan_out',
+    'FinancialRouter',
+    'pin_to_primary',
+    'pinned_to_primary',
+    'read_alias',
+    'replica_reads',
+    'use_replica',
+]
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# The cache key that marks an Address whose reads are pinned to the primary after a write
+PIN_KEY = 'financial_replica_pin_{}'
+
+# The replication lag of a standby in seconds, or 0 if it has replayed everything it has received. NULL if the
+# database is not a standby
+LAG_SQL = """
+SELECT CASE
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+END
+"""
+
+
+class ReadState:
+    """
+    The routing of reads for the request being handled
+    - `alias`: The replica chosen for the request, or None if no replica could be used
+    - `pinned`: Set once the request has written to the financial DB, after which all reads go to the primary
+    """
+    __slots__ = 'alias', 'pinned'
+
+    def __init__(self, alias: Optional[str]):
+        self.alias = alias
+        self.pinned = False
+
+
+_read_state: contextvars.ContextVar[Optional[ReadState]] = contextvars.ContextVar('financial_read_state', default=None)
+
+# The time each replica was last checked, and whether it was within the maximum lag
+_lag_checks: Dict[str, Tuple[float, bool]] = {}
+_lag_lock = threading.Lock()
+_rotation = itertools.count()
+
+
+def replica_is_current(alias: str) -> bool:
+    """
+    Check whether a replica's replication lag is within `FINANCIAL_REPLICA_MAX_LAG`. The result is cached for
+    `FINANCIAL_REPLICA_LAG_CHECK_INTERVAL` seconds. A replica that can't be reached is treated as lagging.
+    :param alias: The alias of the replica in `DATABASES`
+    :return: A flag stating whether the replica can be read from
+    """
+    now = time.monotonic()
+    with _lag_lock:
+        checked = _lag_checks.get(alias)
+    if checked is not None and now - checked[0] < settings.FINANCIAL_REPLICA_LAG_CHECK_INTERVAL:
+        return checked[1]
+
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            lag = cursor.fetchone()[0]
+        current = lag is not None and lag <= settings.FINANCIAL_REPLICA_MAX_LAG
+    except DatabaseError:
+        current = False
+
+    with _lag_lock:
+        _lag_checks[alias] = (now, current)
+    return current
+
+
+def choose_replica() -> Optional[str]:
+    """
+    Pick the next replica within the maximum lag, rotating between the replicas
+    :return: The alias of the replica, or None if none of them can be used
+    """
+    replicas = settings.FINANCIAL_REPLICAS
+    if len(replicas) == 0:
+        return None
+    start = next(_rotation)
+    for offset in range(len(replicas)):
+        alias = replicas[(start + offset) % len(replicas)]
+        if replica_is_current(alias):
+            return alias
+    return None
+
+
+def pin_to_primary(address_id: int):
+    """
+    Send the reads of an Address to the primary, in every process, for as long as a replica in use could still be
+    missing a write that was just made
+    :param address_id: The id of the Address that was written for
+    """
+    seconds = math.ceil(settings.FINANCIAL_REPLICA_MAX_LAG + settings.FINANCIAL_REPLICA_LAG_CHECK_INTERVAL)
+    try:
+        caches[settings.FINANCIAL_REPLICA_PIN_CACHE_ALIAS].set(PIN_KEY.format(address_id), True, seconds)
+    except Exception:
+        logger.warning('Could not pin the reads of Address %s to the primary', address_id, exc_info=True)
+
+
+def pinned_to_primary(address_id: int) -> bool:
+    """
+    Check whether the reads of an Address are pinned to the primary by a recent write. If the cache can't be read, the
+    Address is treated as pinned
+    """
+    try:
+        return caches[settings.FINANCIAL_REPLICA_PIN_CACHE_ALIAS].get(PIN_KEY.format(address_id)) is not None
+    except Exception:
+        return True
+
+
+def _record_write(address_id: Optional[int]):
+    """
+    Pin the Address written for, and the Address of the requesting User, to the primary once the write has been
+    committed, so the pin lasts for the whole lag window after the commit. Each Address is pinned once per request
+    """
+    request = current_request()
+    if request is None or len(settings.FINANCIAL_REPLICAS) == 0:
+        return
+    pinned = getattr(request, 'financial_pinned', None)
+    if pinned is None:
+        pinned = request.financial_pinned = set()
+    for pin in (address_id, current_address_id()):
+        if pin is not None and pin not in pinned:
+            pinned.add(pin)
+            transaction.on_commit(functools.partial(pin_to_primary, pin), using=PRIMARY)
+
+
+def read_alias() -> str:
+    """
+    The alias that reads of financial models are currently routed to
+    """
+    shard = current_shard()
+    state = _read_state.get()
+    if shard != PRIMARY or state is None or state.alias is None or state.pinned:
+        return shard
+    return state.alias
+
+
+@contextmanager
+def record_queries(span, aliases: Iterable[str]) -> Iterator[None]:
+    """
+    Log the alias of the database that serves each query made inside the block on a span
+    :param span: The span to log the queries on
+    :param aliases: The aliases of the databases that may be queried
+    """
+    def record(alias: str) -> Callable:
+        def wrapper(execute, sql, params, many, context):
+            span.log_kv({'event': 'db_query', 'db_alias': alias})
+            return execute(sql, params, many, context)
+        return wrapper
+
+    with ExitStack() as stack:
+        for alias in set(aliases):
+            stack.enter_context(connections[alias].execute_wrapper(record(alias)))
+        yield
+
+
+@contextmanager
+def use_replica(span) -> Iterator[Optional[str]]:
+    """
+    Route the reads of financial models made inside the block to a replica, and record the alias that serves each
+    query on the span. Replicas are only used for the `financial` shard.
+    :param span: The span to record the routing on
+    :return: The replica chosen, or None if all reads go to the shard's primary
+    """
+    shard = current_shard()
+    alias = None
+    if shard == PRIMARY and len(settings.FINANCIAL_REPLICAS) > 0:
+        address_id = current_address_id()
+        if address_id is not None and pinned_to_primary(address_id):
+            span.set_tag('db_read_pinned', True)
+        else:
+            alias = choose_replica()
+    token = _read_state.set(ReadState(alias))
+    span.set_tag('db_read_alias', alias or shard)
+    try:
+        with record_queries(span, (alias or shard, shard)):
+            yield alias
+    finally:
+        _read_state.reset(token)
+
+
+def replica_reads(method: Callable) -> Callable:
+    """
+    Decorator for the `get` methods of views whose reads can be served by a replica
+    """
+    @functools.wraps(method)
+    def wrapper(view, request, *args, **kwargs):
+        with use_replica(request.span):
+            return method(view, request, *args, **kwargs)
+    return wrapper
+
+
+def fan_out(address_ids: Iterable[int], query: Callable[[List[int]], Iterable[T]], span=None) -> List[T]:
+    """
+    Run a query for a set of Addresses against each of the shards that hold their ledgers, concurrently, and gather
+    the results. The results of each shard are only concatenated, so aggregates have to be merged by the caller.
+    :param address_ids: The ids of the Addresses to run the query for
+    :param query: A function that is given the ids of the Addresses in one shard and returns the results for them.
+                  Querysets are evaluated in the shard's thread.
+    :param span: If given, the number of shards and the alias serving each query are recorded on this span
+    :return: The results of every shard
+    """
+    groups = group_by_shard(address_ids)
+    if span is not None:
+        span.set_tag('shards', len(groups))
+    # Reads of the financial shard keep using the replica chosen for the request, if any
+    state = _read_state.get()
+    replica = state.alias if state is not None and not state.pinned else None
+
+    def run(shard: str, ids: List[int], record: bool = False) -> List[T]:
+        token = _read_state.set(ReadState(replica if shard == PRIMARY else None))
+        try:
+            with use_shard(shard), ExitStack() as stack:
+                if record and span is not None:
+                    stack.enter_context(record_queries(span, (read_alias(), shard)))
+                return list(query(ids))
+        finally:
+            _read_state.reset(token)
+
+    if len(groups) <= 1:
+        return [result for shard, ids in groups.items() for result in run(shard, ids)]
+
+    stats = current_stats()
+
+    def run_in_thread(shard: str, ids: List[int]) -> List[T]:
+        # Threads of the pool start with an empty context, so they open their own connections, which are closed here
+        try:
+            with instrument_thread(stats):
+                return run(shard, ids, record=True)
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=len(groups), thread_name_prefix='financial_fan_out') as executor:
+        futures = [executor.submit(run_in_thread, shard, ids) for shard, ids in groups.items()]
+        return [result for future in futures for result in future.result()]
 
 
 class FinancialRouter:
     """
-    This class controls Django's DB functionality to ensure that all financial models get routed to the financial DB
+    This class controls Django's DB functionality to ensure that all financial models get routed to the financial DB, or
+    to the shard of the Address being worked on
     """
 
     def db_for_read(self, model: Type[Model], **hints: Dict[str, Any]) -> Optional[str]:
@@ -31,7 +311,11 @@ class FinancialRouter:
         :return: The name of the DB to route reads to
         """
         if model._meta.app_label == 'financial':
-            return 'financial'
+            # Related objects are read from the database their instance was read from
+            instance = hints.get('instance')
+            if instance is not None and instance._state.db is not None:
+                return instance._state.db
+            return read_alias()
         # We don't read from any other DB during test so we can safely ignore this line from coverage
         return None  # pragma: no cover
 
@@ -43,7 +327,18 @@ class FinancialRouter:
         :return: The name of the DB to route writes to
         """
         if model._meta.app_label == 'financial':
-            return 'financial'
+            # Reads after a write in the same request must see it, so they are pinned to the primary from now on
+            state = _read_state.get()
+            if state is not None:
+                state.pinned = True
+            # Objects that belong to an Address are written to the shard of that Address
+            address_id = getattr(hints.get('instance'), 'address_id', None)
+            shard = shard_for(address_id) if address_id is not None else current_shard()
+            # Replicas are only used for the financial shard, so only its writes have to be read from the primary by
+            # the requests that follow
+            if shard == PRIMARY:
+                _record_write(address_id)
+            return shard
         return None  # pragma: no cover
 
     def allow_relation(self, model1: Type[Model], model2: Type[Model], **hints: Dict[str, Any]) -> Optional[bool]:
@@ -54,7 +349,13 @@ class FinancialRouter:
         :param hints: Any hints that can be given to help the decision
         :return: A flag that states whether a relation is allowed between the two supplied model classes.
         """
-        return True if model1._meta.app_label == 'financial' and model2._meta.app_label == 'financial' else None
+        if model1._meta.app_label != 'financial' or model2._meta.app_label != 'financial':
+            return None
+        # Objects are passed in rather than classes. Foreign keys can't cross shards
+        address_ids = (getattr(model1, 'address_id', None), getattr(model2, 'address_id', None))
+        if None not in address_ids and shard_for(address_ids[0]) != shard_for(address_ids[1]):
+            return False
+        return True
 
     def allow_migrate(self, db: str, app_label: str, model_name: str = None, **hints: Dict[str, Any]) -> Optional[bool]:
         """
@@ -65,4 +366,4 @@ class FinancialRouter:
         :param hints: Any hints that can be given to help the decision
         :return: A flag that states whether the migration is allowed
         """
-        return True if app_label == 'financial' and db == 'financial' else None
+        return True if app_label == 'financial' and db in settings.FINANCIAL_SHARDS else None
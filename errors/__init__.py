@@ -13,6 +13,8 @@ from .account_sale_credit_note import *
 from .account_sale_credit_note_contra import *
 from .account_sale_invoice import *
 from .allocation import *
+from .audit_file import *
+from .auto_allocation import *
 from .account_sale_invoice_contra import *
 from .account_sale_payment import *
 from .account_sale_payment_contra import *
@@ -35,15 +37,18 @@ from .debtor_account import *
 from .debtor_ledger import *
 from .global_nominal_account import *
 from .journal_entry import *
+from .journal_import import *
 from .nominal_account_history import *
 from .nominal_account_type import *
 from .nominal_contra import *
+from .nominal_ledger_export import *
 from .payment_method import *
 from .period_end import *
 from .profit_and_loss import *
 from .purchases_analysis import *
 from .purchases_by_country import *
 from .purchases_by_territory import *
+from .report_job import *
 from .rtd import *
 from .sales_by_country import *
 from .sales_by_territory import *
@@ -82,6 +82,7 @@ financial_account_purchase_adjustment_create_122 = (
 financial_account_purchase_adjustment_create_123 = (
     'The "credit" and/or "debit" parameters are invalid. The "amount" values from the "debit" and "credit" must equal.'
 )
+financial_account_purchase_adjustment_create_124 = default.contra_address_id__other_shard
 financial_account_purchase_adjustment_create_201 = (
     'You do not have permission to execute this method. Your Member must be self-managed.'
 )
@@ -51,6 +51,7 @@ financial_account_purchase_debit_note_create_137 = default.subdivision_id_delive
 financial_account_purchase_debit_note_create_138 = default.transaction_date__not_isoformat
 financial_account_purchase_debit_note_create_139 = default.transaction_date__period_ended
 financial_account_purchase_debit_note_create_140 = default.lines_description__too_long
+financial_account_purchase_debit_note_create_141 = default.contra_address_id__other_shard
 financial_account_purchase_debit_note_create_201 = default.not_self_managed
 
 # Read
@@ -51,6 +51,7 @@ financial_account_purchase_invoice_create_137 = (
 financial_account_purchase_invoice_create_138 = default.transaction_date__not_isoformat
 financial_account_purchase_invoice_create_139 = default.transaction_date__period_ended
 financial_account_purchase_invoice_create_140 = default.lines_description__too_long
+financial_account_purchase_invoice_create_141 = default.contra_address_id__other_shard
 financial_account_purchase_invoice_create_201 = default.not_self_managed
 
 # Read
@@ -42,6 +42,7 @@ financial_account_purchase_payment_create_116 = (
     'The "exchange_rate" parameter is invalid. The Account specified by the Payment Method uses a different currency '
     'to your Address so an "exchange_rate" is required and must be a decimal string.'
 )
+financial_account_purchase_payment_create_117 = default.contra_address_id__other_shard
 financial_account_purchase_payment_create_201 = default.not_self_managed
 
 # Read
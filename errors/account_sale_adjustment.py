@@ -84,6 +84,7 @@ financial_account_sale_adjustment_create_122 = (
 financial_account_sale_adjustment_create_123 = (
     'The "amount" values from the "debit" and "credit" must be equal.'
 )
+financial_account_sale_adjustment_create_124 = default.contra_address_id__other_shard
 financial_account_sale_adjustment_create_201 = (
     'You do not have permission to execute this method. Your Member must be self-managed.'
 )
@@ -49,6 +49,7 @@ financial_account_sale_credit_note_create_135 = default.subdivision_id_deliver_t
 financial_account_sale_credit_note_create_136 = default.transaction_date__not_isoformat
 financial_account_sale_credit_note_create_137 = default.transaction_date__period_ended
 financial_account_sale_credit_note_create_138 = default.lines_description__too_long
+financial_account_sale_credit_note_create_139 = default.contra_address_id__other_shard
 financial_account_sale_credit_note_create_201 = default.not_self_managed
 
 # Read
@@ -62,6 +62,7 @@ financial_account_sale_invoice_create_139 = default.subdivision_id_deliver_to__i
 financial_account_sale_invoice_create_140 = default.transaction_date__not_isoformat
 financial_account_sale_invoice_create_141 = default.transaction_date__period_ended
 financial_account_sale_invoice_create_142 = default.lines_description__too_long
+financial_account_sale_invoice_create_143 = default.contra_address_id__other_shard
 financial_account_sale_invoice_create_201 = default.not_self_managed
 
 # Read
@@ -0,0 +1,21 @@
+"""
+Error Codes for all of the Methods in the Audit File service
+"""
+
+# List
+financial_audit_file_list_101 = 'The "address_id" parameter is invalid. "address_id" must be an integer.'
+financial_audit_file_list_102 = (
+    'The "start_date" parameter is invalid. "start_date" is required and must be a date string in isoformat.'
+)
+financial_audit_file_list_103 = (
+    'The "end_date" parameter is invalid. "end_date" is required and must be a date string in isoformat.'
+)
+financial_audit_file_list_104 = 'The "end_date" parameter is invalid. "end_date" must be after "start_date".'
+financial_audit_file_list_201 = (
+    'You do not have permission to make this request. You must be global active to generate the Audit File of other '
+    'Addresses in your Member.'
+)
+financial_audit_file_list_202 = (
+    'You do not have permission to make this request. You cannot generate the Audit File of an Address in another '
+    'Member.'
+)
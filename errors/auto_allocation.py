@@ -0,0 +1,26 @@
+"""
+Error Codes for all of the Methods in the Auto Allocation service
+"""
+
+# Create
+financial_auto_allocation_create_101 = (
+    'The "allocation_type" parameter is invalid. "allocation_type" is required and must be either "customer" or '
+    '"supplier".'
+)
+financial_auto_allocation_create_102 = (
+    'The "contra_address_ids" parameter is invalid. "contra_address_ids" must be a list with at least one item.'
+)
+financial_auto_allocation_create_103 = (
+    'The "contra_address_ids" parameter is invalid. Each item in "contra_address_ids" must be an integer.'
+)
+financial_auto_allocation_create_104 = (
+    'The "strategies" parameter is invalid. "strategies" must be a list with at least one item.'
+)
+financial_auto_allocation_create_105 = (
+    'The "strategies" parameter is invalid. Each item in "strategies" must be one of "exact", "reference" or "fifo", '
+    'and can only be sent once.'
+)
+financial_auto_allocation_create_106 = 'The "dry_run" parameter is invalid. "dry_run" must be a boolean.'
+financial_auto_allocation_create_201 = (
+    'You do not have permission to execute this method. Your Member must be self-managed.'
+)
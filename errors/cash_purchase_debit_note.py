@@ -61,6 +61,7 @@ financial_cash_purchase_debit_note_create_142 = default.subdivision_id_deliver_t
 financial_cash_purchase_debit_note_create_143 = default.transaction_date__not_isoformat
 financial_cash_purchase_debit_note_create_144 = default.transaction_date__period_ended
 financial_cash_purchase_debit_note_create_145 = default.lines_description__too_long
+financial_cash_purchase_debit_note_create_146 = default.contra_address_id__other_shard
 financial_cash_purchase_debit_note_create_201 = default.not_self_managed
 
 # Read
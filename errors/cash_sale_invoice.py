@@ -59,6 +59,7 @@ financial_cash_sale_invoice_create_140 = default.subdivision_id_deliver_to__inva
 financial_cash_sale_invoice_create_141 = default.transaction_date__not_isoformat
 financial_cash_sale_invoice_create_142 = default.transaction_date__period_ended
 financial_cash_sale_invoice_create_143 = default.lines_description__too_long
+financial_cash_sale_invoice_create_144 = default.contra_address_id__other_shard
 financial_cash_sale_invoice_create_201 = default.not_self_managed
 
 # Read
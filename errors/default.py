@@ -40,6 +40,11 @@ contra_address_id__invalid_id = (
     'The "contra_address_id" parameter is invalid. "contra_address_id" must belong to a valid Address that your '
     'Address is linked to.'
 )
+contra_address_id__other_shard = (
+    'The "contra_address_id" parameter is invalid. The ledger of the Address is kept in a different database to the '
+    'ledger of your Address, so it can\'t create the contra transaction. Contact support to have the ledgers moved '
+    'together.'
+)
 contra_contact__too_long = (
     'The "contra_contact" parameter is invalid. "contra_contact" cannot be longer than 100 characters.'
 )
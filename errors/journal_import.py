@@ -0,0 +1,25 @@
+"""
+Error Codes for all of the Methods in the Journal Import service
+"""
+
+# Create
+financial_journal_import_create_101 = 'The "file" parameter is invalid. "file" is required and must be a file upload.'
+financial_journal_import_create_102 = (
+    'The "file_format" parameter is invalid. "file_format" must be one of "csv" or "ndjson". If it is not sent, the '
+    'file name must end in ".csv" or ".ndjson".'
+)
+financial_journal_import_create_103 = 'The "file" parameter is invalid. "file" must be encoded as UTF-8.'
+financial_journal_import_create_104 = (
+    'The "file" parameter is invalid. "file" could not be parsed in the sent "file_format". The reason is recorded '
+    'on the failed Journal Import.'
+)
+financial_journal_import_create_105 = (
+    'The "file" parameter is invalid. A CSV "file" must have a header row with at least the "reference", '
+    '"transaction_date", "nominal_account_number", "debit" and "credit" columns.'
+)
+financial_journal_import_create_201 = (
+    'You do not have permission to make this request. Your Member must be self-managed to import Journal Entries.'
+)
+
+# Read
+financial_journal_import_read_001 = 'The "pk" path parameter is invalid. "pk" must belong to a valid Journal Import.'
@@ -0,0 +1,32 @@
+"""
+Error Codes for all of the Methods in the Nominal Ledger Export service
+"""
+
+# List
+financial_nominal_ledger_export_list_101 = 'The "address_id" parameter is invalid. "address_id" must be an integer.'
+financial_nominal_ledger_export_list_102 = (
+    'The "start_date" parameter is invalid. "start_date" is required and must be a date string in isoformat.'
+)
+financial_nominal_ledger_export_list_103 = (
+    'The "end_date" parameter is invalid. "end_date" is required and must be a date string in isoformat.'
+)
+financial_nominal_ledger_export_list_104 = 'The "end_date" parameter is invalid. "end_date" must be after "start_date".'
+financial_nominal_ledger_export_list_105 = (
+    'The "transaction_type_ids" parameter is invalid. "transaction_type_ids" must be a comma separated list of '
+    'integers.'
+)
+financial_nominal_ledger_export_list_106 = (
+    'The "nominal_account_numbers" parameter is invalid. "nominal_account_numbers" must be a comma separated list of '
+    'integers.'
+)
+financial_nominal_ledger_export_list_107 = (
+    'The "format" parameter is invalid. "format" must be one of "ndjson" or "csv".'
+)
+financial_nominal_ledger_export_list_201 = (
+    'You do not have permission to make this request. You must be global active to export the Nominal Ledger of '
+    'other Addresses in your Member.'
+)
+financial_nominal_ledger_export_list_202 = (
+    'You do not have permission to make this request. You cannot export the Nominal Ledger of an Address in another '
+    'Member.'
+)
@@ -0,0 +1,20 @@
+"""
+Error Codes for all of the Methods in the Report Job service
+"""
+
+# Create
+financial_report_job_create_101 = (
+    'The "report" parameter is invalid. "report" is required and must be the name of a report that can be run as a '
+    'job.'
+)
+financial_report_job_create_102 = 'The "params" parameter is invalid. "params" must be an object.'
+
+# Read
+financial_report_job_read_001 = 'The "pk" path parameter is invalid. "pk" must belong to a valid Report Job.'
+
+# Result
+financial_report_job_result_001 = (
+    'The "pk" path parameter is invalid. "pk" must belong to a valid Report Job whose result has not expired.'
+)
+financial_report_job_result_002 = 'The Report Job has not finished yet. Poll the Report Job until its status changes.'
+financial_report_job_result_003 = 'The Report Job failed. Submit the report again.'
@@ -42,3 +42,7 @@ financial_year_end_delete_001 = (
 financial_year_end_delete_201 = (
     'You do not have permission to make this request. Year End has already been processed by a Period End.'
 )
+financial_year_end_delete_202 = (
+    'You do not have permission to make this request. The transactions of the year closed by this Year End have been '
+    'archived.'
+)
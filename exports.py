@@ -0,0 +1,184 @@
+"""
+Streaming exports of the Nominal Ledger.
+
+The Nominal Ledger entries are read with a server-side cursor in fixed size chunks, and the debits and credits of each
+chunk are fetched with one query per side. Only a single chunk is ever held in memory, so an export of any size can be
+streamed to the client with constant memory use.
+"""
+# stdlib
+import csv
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+# libs
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Exists, OuterRef, Q
+# local
+from financial.models import NominalLedger, NominalLedgerCredit, NominalLedgerDebit
+
+
+__all__ = [
+    'EXPORT_FORMATS',
+    'export_filters',
+    'HEADER_FIELDS',
+    'iter_transactions',
+    'LINE_FIELDS',
+    'stream_csv',
+    'stream_ndjson',
+]
+
+# The number of Nominal Ledger entries fetched from the cursor at a time
+CHUNK_SIZE = 2000
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+HEADER_FIELDS = (
+    'id',
+    'address_id',
+    'contra_address_id',
+    'transaction_type_id',
+    'tsn',
+    'transaction_date',
+    'external_reference',
+    'narrative',
+    'name_bill_to',
+    'contra_nominal_ledger_id',
+    'unallocated_balance',
+    'period_end_balance',
+    'created',
+    'updated',
+)
+
+LINE_FIELDS = (
+    'id',
+    'nominal_account_number',
+    'amount',
+    'description',
+    'exchange_rate',
+    'part_number',
+    'quantity',
+    'unit_price',
+    'tax_rate_id',
+    'tax_percent',
+)
+
+
+def _chunks(iterable: Iterable, size: int) -> Iterator[List]:
+    chunk: List = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def export_filters(
+        address_id: int,
+        start_date,
+        end_date,
+        transaction_type_ids: Optional[List[int]] = None,
+        nominal_account_numbers: Optional[List[int]] = None,
+) -> Q:
+    """
+    Build the filter for the Nominal Ledger entries to export
+    :param address_id: The id of the Address to export
+    :param start_date: The earliest transaction date to include
+    :param end_date: The latest transaction date to include
+    :param transaction_type_ids: If given, only export entries of these transaction types
+    :param nominal_account_numbers: If given, only export entries that debit or credit one of these accounts
+    """
+    q = Q(address_id=address_id, transaction_date__range=(start_date, end_date))
+    if transaction_type_ids:
+        q &= Q(transaction_type_id__in=transaction_type_ids)
+    if nominal_account_numbers:
+        # Exists subqueries avoid duplicating entries that have several matching lines
+        debits = NominalLedgerDebit.objects.filter(
+            nominal_ledger_id=OuterRef('pk'),
+            nominal_account_number__in=nominal_account_numbers,
+        )
+        credits = NominalLedgerCredit.objects.filter(
+            nominal_ledger_id=OuterRef('pk'),
+            nominal_account_number__in=nominal_account_numbers,
+        )
+        q &= Exists(debits) | Exists(credits)
+    return q
+
+
+def iter_transactions(filters: Q, chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[Dict[str, Any], List[Dict]]]:
+    """
+    Iterate through the Nominal Ledger entries matching the filters along with their lines, in transaction date order
+    :param filters: The filters for the Nominal Ledger entries, see `export_filters`
+    :param chunk_size: The number of entries to fetch from the cursor at a time
+    :return: A generator of (entry, lines) tuples. Each line has a `side` of either `debit` or `credit`
+    """
+    entries = NominalLedger.objects.lean().filter(
+        filters,
+    ).values(
+        *HEADER_FIELDS,
+    ).order_by(
+        'transaction_date',
+        'id',
+    ).iterator(chunk_size=chunk_size)
+
+    for chunk in _chunks(entries, chunk_size):
+        ids = [entry['id'] for entry in chunk]
+        lines: Dict[int, List[Dict]] = defaultdict(list)
+        for side, model in (('debit', NominalLedgerDebit), ('credit', NominalLedgerCredit)):
+            for line in model.objects.filter(
+                nominal_ledger_id__in=ids,
+            ).values(
+                'nominal_ledger_id',
+                *LINE_FIELDS,
+            ).order_by(
+                'id',
+            ):
+                line['side'] = side
+                lines[line.pop('nominal_ledger_id')].append(line)
+
+        for entry in chunk:
+            yield entry, lines.get(entry['id'], [])
+
+
+def stream_ndjson(transactions: Iterable[Tuple[Dict[str, Any], List[Dict]]]) -> Iterator[str]:
+    """
+    Render each Nominal Ledger entry as one JSON document per line, with its debits and credits in `lines`
+    """
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for entry, lines in transactions:
+        entry['lines'] = lines
+        yield encoder.encode(entry) + '\n'
+
+
+class _Echo:
+    """
+    A file-like object for csv.writer that returns what is written instead of buffering it
+    """
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def stream_csv(transactions: Iterable[Tuple[Dict[str, Any], List[Dict]]]) -> Iterator[str]:
+    """
+    Render one CSV row per debit or credit line, repeating the fields of the Nominal Ledger entry on each row.
+    Entries without any lines are written as a single row with empty line fields.
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(
+        [f'nominal_ledger_{field}' if field == 'id' else field for field in HEADER_FIELDS] +
+        ['side'] + [f'line_{field}' if field == 'id' else field for field in LINE_FIELDS],
+    )
+    empty = [''] * (len(LINE_FIELDS) + 1)
+    for entry, lines in transactions:
+        header = ['' if entry[field] is None else entry[field] for field in HEADER_FIELDS]
+        if not lines:
+            yield writer.writerow(header + empty)
+            continue
+        for line in lines:
+            yield writer.writerow(
+                header + [line['side']] + ['' if line[field] is None else line[field] for field in LINE_FIELDS],
+            )
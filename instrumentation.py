@@ -0,0 +1,285 @@
+"""
+Database instrumentation of the tracer spans.
+
+Every view wraps its stages in spans from `settings.TRACER`, e.g. `validating_controller` and `get_objects`. With
+`QueryInstrumentationMiddleware` installed, each of those spans is tagged with the database work done while it was
+open, including the work of the spans inside it:
+    - `db.queries`: The number of statements run
+    - `db.time_ms`: The time spent running them
+    - `db.rows`: The number of rows they returned or changed
+    - `db.slowest_ms` and `db.slowest_statement`: The time and fingerprint of the slowest one
+
+The same totals for the whole request are tagged on the request's span with the `db.request.` prefix.
+
+Statements that take longer than `FINANCIAL_SLOW_QUERY_MS` are logged with their plan from `EXPLAIN` to the
+`financial.instrumentation` logger, unless the setting is 0. The plan is fetched after the statement has run, without
+`ANALYZE`, so the statement is never run twice. It is fetched in a savepoint, so a failed `EXPLAIN` doesn't abort the
+request's transaction.
+
+The connections of a thread are only instrumented while it runs a request, or code wrapped in `instrument_thread`.
+`financial.db_router.fan_out` wraps the threads it queries the shards from, so their statements are counted on the
+request's spans. Statements run while a streamed response is being sent, after the view has returned, are not counted.
+
+Add `financial.instrumentation.QueryInstrumentationMiddleware` to `MIDDLEWARE` after the middleware that sets
+`request.span`. The middleware wraps `settings.TRACER` in an `InstrumentedTracer` the first time it is created.
+"""
+# stdlib
+import contextvars
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager, ExitStack
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+# libs
+from django.conf import settings
+from django.db import connections, transaction
+from django.http import HttpRequest, HttpResponse
+
+
+__all__ = [
+    'current_stats',
+    'fingerprint',
+    'instrument_thread',
+    'instrument_tracer',
+    'InstrumentedSpan',
+    'InstrumentedTracer',
+    'open_spans',
+    'QueryInstrumentationMiddleware',
+    'QueryStats',
+]
+
+logger = logging.getLogger(__name__)
+
+# The statements the plans of slow queries can be fetched for
+EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LIST = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+_SPACE = re.compile(r'\s+')
+
+# The stats of a request can be added to by the threads it fans out to
+_stats_lock = threading.Lock()
+
+
+def fingerprint(sql: str) -> str:
+    """
+    Reduce a statement to its shape, so statements that differ only in their values are the same
+    :param sql: The statement, with or without its parameters interpolated
+    :return: The statement with its literals replaced by `?`, lists of values collapsed to `(...)` and its whitespace
+             normalised
+    """
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _LIST.sub('(...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+class QueryStats:
+    """
+    The totals of the statements run while a span or request is open, with the name of the span if it is for one
+    """
+    __slots__ = ('name', 'queries', 'time', 'rows', 'slowest_time', 'slowest_sql')
+
+    def __init__(self, name: str = ''):
+        self.name = name
+        self.queries = 0
+        self.time = 0.0
+        self.rows = 0
+        self.slowest_time = 0.0
+        self.slowest_sql = ''
+
+    def add(self, duration: float, rows: int, sql: str):
+        with _stats_lock:
+            self.queries += 1
+            self.time += duration
+            if rows > 0:
+                self.rows += rows
+            if duration > self.slowest_time:
+                self.slowest_time = duration
+                self.slowest_sql = sql
+
+    def tag(self, span, prefix: str = 'db.'):
+        """
+        Record the totals on a span
+        """
+        span.set_tag(f'{prefix}queries', self.queries)
+        span.set_tag(f'{prefix}time_ms', round(self.time * 1000, 3))
+        span.set_tag(f'{prefix}rows', self.rows)
+        if self.queries > 0:
+            span.set_tag(f'{prefix}slowest_ms', round(self.slowest_time * 1000, 3))
+            # The fingerprint is only worked out for the slowest statement, when the span finishes
+            span.set_tag(f'{prefix}slowest_statement', fingerprint(self.slowest_sql)[:500])
+
+
+# The stats of the request and of each instrumented span that is open, outermost first
+_open: contextvars.ContextVar[Tuple[QueryStats, ...]] = contextvars.ContextVar('financial_query_stats', default=())
+# Set while the plan of a slow query is fetched, so the EXPLAIN itself is not instrumented
+_explaining: contextvars.ContextVar[bool] = contextvars.ContextVar('financial_explaining', default=False)
+
+
+class InstrumentedSpan:
+    """
+    A span that records the statements run while it is open, as a context manager, and tags them on it when it closes.
+    Everything else is passed to the wrapped span
+    """
+
+    def __init__(self, span, name: str):
+        self._span = span
+        self._stats = QueryStats(name)
+        self._token: Optional[contextvars.Token] = None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._span, name)
+
+    def __enter__(self) -> 'InstrumentedSpan':
+        self._span.__enter__()
+        self._token = _open.set(_open.get() + (self._stats,))
+        return self
+
+    def __exit__(self, *args: Any):
+        if self._token is not None:
+            _open.reset(self._token)
+            self._token = None
+            self._stats.tag(self._span)
+        return self._span.__exit__(*args)
+
+
+class InstrumentedTracer:
+    """
+    Wraps a tracer so the spans it starts are InstrumentedSpans. Everything else is passed to the wrapped tracer
+    """
+
+    def __init__(self, tracer):
+        self._tracer = tracer
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._tracer, name)
+
+    def start_span(self, operation_name: str = '', child_of: Any = None, **kwargs: Any) -> InstrumentedSpan:
+        if isinstance(child_of, InstrumentedSpan):
+            child_of = child_of._span
+        span = self._tracer.start_span(operation_name, child_of=child_of, **kwargs)
+        return InstrumentedSpan(span, operation_name)
+
+
+def instrument_tracer():
+    """
+    Wrap `settings.TRACER` in an InstrumentedTracer, if it is not already
+    """
+    if not isinstance(settings.TRACER, InstrumentedTracer):
+        settings.TRACER = InstrumentedTracer(settings.TRACER)
+
+
+def open_spans() -> Tuple[str, ...]:
+    """
+    The names of the instrumented spans that are open, outermost first
+    """
+    return tuple(stats.name for stats in _open.get() if stats.name != '')
+
+
+def current_stats() -> Tuple[QueryStats, ...]:
+    """
+    The stats of the request and spans that are open, to be passed to `instrument_thread`
+    """
+    return _open.get()
+
+
+def _explain(connection, sql: str, params: Any, duration: float):
+    """
+    Log the plan of a slow statement. The EXPLAIN is run in a savepoint, which is rolled back if it fails, so the
+    transaction the statement ran in can carry on
+    """
+    token = _explaining.set(True)
+    try:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN {sql}', params)
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+    except Exception as e:
+        plan = f'The plan could not be fetched: {e}'
+    finally:
+        _explaining.reset(token)
+    logger.warning(
+        'Slow query on %s took %.1fms: %s\n%s',
+        connection.alias,
+        duration * 1000,
+        fingerprint(sql),
+        plan,
+    )
+
+
+def _record(execute: Callable, sql: str, params: Any, many: bool, context: Dict[str, Any]) -> Any:
+    """
+    The execute wrapper installed on every connection during a request
+    """
+    if _explaining.get():
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = time.perf_counter() - start
+
+    rows = getattr(context['cursor'], 'rowcount', -1)
+    for stats in _open.get():
+        stats.add(duration, rows, sql)
+
+    threshold = settings.FINANCIAL_SLOW_QUERY_MS
+    if threshold > 0 and duration * 1000 >= threshold and not many and \
+            sql.lstrip().upper().startswith(EXPLAINABLE):
+        _explain(context['connection'], sql, params, duration)
+    return result
+
+
+@contextmanager
+def _wrap_connections() -> Iterator[None]:
+    """
+    Install the execute wrapper on every connection of the calling thread
+    """
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(_record))
+        yield
+
+
+@contextmanager
+def instrument_thread(stats: Tuple[QueryStats, ...]) -> Iterator[None]:
+    """
+    Record the statements run by a worker thread on the request and spans that were open in the thread that started
+    it. Threads start with an empty context and their own connections, so neither is instrumented otherwise
+    :param stats: The `current_stats()` of the thread that started the worker. Nothing is recorded if it is empty
+    """
+    if len(stats) == 0:
+        yield
+        return
+    token = _open.set(stats)
+    try:
+        with _wrap_connections():
+            yield
+    finally:
+        _open.reset(token)
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Record the statements run by each request on its spans
+    """
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        self.get_response = get_response
+        instrument_tracer()
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        stats = QueryStats()
+        token = _open.set((stats,))
+        try:
+            with _wrap_connections():
+                response = self.get_response(request)
+        finally:
+            _open.reset(token)
+
+        span = getattr(request, 'span', None)
+        if span is not None:
+            stats.tag(span, prefix='db.request.')
+        return response
@@ -0,0 +1,494 @@
+"""
+Incremental integrity checks of the ledger.
+
+The checks are those of the `database_integrity_test_financial` procedure, written as one set based query each, and
+run for one Address at a time:
+    - `nominal_ledger_balance_check`: The debits and credits of an entry balance.
+    - `nominal_ledger_rounding_check`: The amount of each line is its quantity by its unit price, rounded to 2 places.
+    - `transaction_sequence_number_unique`: No other entry of the Address has the same Transaction Type and TSN.
+    - `purchase_calculation`: The lines of an entry, leaving out the VAT account, balance within 2 cent when the amounts
+      on one side are calculated from their quantity, unit price and tax percent.
+    - `balance_calculation`: As above, exactly, for the Account Sale Invoices since 2013.
+    - `sanity_check`: The Debtor and Creditor entries between each Period End and the one before it balance, and their
+      total matches the Period End balance.
+
+Each Address has an Integrity Checkpoint that records its Ledger Version and the time of its last check. Addresses
+whose Ledger Version has not changed since are skipped, and for the others only the entries that were written since,
+or whose lines were, are checked. The Period Ends on or after the earliest of those entries are checked again. A full
+rescan ignores the checkpoints.
+
+The Addresses to check are spread over a pool of workers. Each run is recorded as an Integrity Test, with the totals and
+timings of each check and the details of every defect found. The checkpoints of the Addresses are only moved on once
+the Integrity Test has been saved, in the same transaction for the `financial` database and straight after it for the
+other shards, so the defects found are never lost while their Addresses are skipped by the next run. An Address whose
+checks fail to run is recorded as a `check_error` defect, with no entry, and is checked again by the next run.
+"""
+# stdlib
+import logging
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+# libs
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+# local
+from financial.models import (
+    IntegrityCheckpoint,
+    IntegrityDefect,
+    IntegrityTest,
+    IntegrityTestCheck,
+    LedgerVersion,
+    NominalLedger,
+)
+from financial.sharding import PRIMARY, use_shard
+
+
+__all__ = [
+    'CHECK_ERROR',
+    'check_address',
+    'CheckResult',
+    'CHECKS',
+    'run',
+]
+
+logger = logging.getLogger(__name__)
+
+# The check name of the defect recorded for an Address whose checks could not be run
+CHECK_ERROR = 'check_error'
+
+# Writes that were in flight when a check started can commit with an earlier `updated`, so each check looks back this
+# far before the previous one started
+OVERLAP = timedelta(minutes=10)
+
+# Results are kept for this long
+RETENTION = timedelta(days=730)
+
+# Credits that are known to fail the rounding check
+SKIP_CREDITS = (32409,)
+
+# The entries written since the last check, including deleted ones, and the lines written since then. A full rescan
+# uses every entry of the Address instead.
+TOUCHED_SQL = """
+    SELECT NL.id, NL.transaction_date, NL.deleted
+    FROM nominal_ledger AS NL
+    WHERE NL.address_id = %(address_id)s
+    AND NL.updated >= %(since)s
+    UNION
+    SELECT NL.id, NL.transaction_date, NL.deleted
+    FROM nominal_ledger_debits AS L
+    INNER JOIN nominal_ledger AS NL
+    ON NL.id = L.nominal_ledger_id
+    WHERE NL.address_id = %(address_id)s
+    AND L.updated >= %(since)s
+    UNION
+    SELECT NL.id, NL.transaction_date, NL.deleted
+    FROM nominal_ledger_credits AS L
+    INNER JOIN nominal_ledger AS NL
+    ON NL.id = L.nominal_ledger_id
+    WHERE NL.address_id = %(address_id)s
+    AND L.updated >= %(since)s
+"""
+FULL_SQL = """
+    SELECT NL.id, NL.transaction_date, NL.deleted
+    FROM nominal_ledger AS NL
+    WHERE NL.address_id = %(address_id)s
+"""
+
+# The scope of each check. `changed` is the entries to check, and `period_ends` the Period Ends to check, with the date
+# of the Period End before each
+SCOPE_SQL = """
+WITH touched AS ({touched}),
+changed AS (
+    SELECT NL.*
+    FROM touched AS T
+    INNER JOIN nominal_ledger AS NL
+    ON NL.id = T.id
+    WHERE T.deleted IS NULL
+),
+period_ends AS (
+    SELECT
+        PE.id,
+        PE.transaction_date,
+        PE.period_end_balance,
+        COALESCE((
+            SELECT MAX(P.transaction_date)
+            FROM nominal_ledger AS P
+            WHERE P.address_id = PE.address_id
+            AND P.transaction_type_id = 12001
+            AND P.deleted IS NULL
+            AND P.period_end_balance IS NOT NULL
+            AND P.transaction_date < PE.transaction_date
+        ), '1753-01-01') AS previous_date
+    FROM nominal_ledger AS PE
+    WHERE PE.address_id = %(address_id)s
+    AND PE.transaction_type_id = 12001
+    AND PE.deleted IS NULL
+    AND PE.period_end_balance IS NOT NULL
+    AND PE.transaction_date >= (SELECT MIN(transaction_date) FROM touched)
+)
+"""
+
+# The totals of the lines of each changed entry, leaving out the VAT account, used by the calculation checks.
+# `calculated` is the gross amount worked out from the quantity, unit price and tax percent of the lines, and `taxed` is
+# the total of the lines that have a tax percent.
+CALCULATION_SQL = """
+SELECT NL.id, NL.transaction_type_id, NL.transaction_date, NL.tsn, NL.unallocated_balance, D.*, C.*
+FROM changed AS NL
+LEFT JOIN LATERAL (
+    SELECT
+        SUM(amount) AS debits,
+        SUM(amount) FILTER (WHERE tax_percent IS NOT NULL) AS debits_taxed,
+        SUM(quantity * unit_price * (1 + tax_percent / 100)) FILTER (
+            WHERE quantity IS NOT NULL AND unit_price IS NOT NULL AND tax_percent IS NOT NULL
+        ) AS debits_calculated
+    FROM nominal_ledger_debits
+    WHERE nominal_ledger_id = NL.id
+    AND deleted IS NULL
+    AND nominal_account_number != 2210
+) AS D ON true
+LEFT JOIN LATERAL (
+    SELECT
+        SUM(amount) AS credits,
+        SUM(amount) FILTER (WHERE tax_percent IS NOT NULL) AS credits_taxed,
+        SUM(quantity * unit_price * (1 + tax_percent / 100)) FILTER (
+            WHERE quantity IS NOT NULL AND unit_price IS NOT NULL AND tax_percent IS NOT NULL
+        ) AS credits_calculated
+    FROM nominal_ledger_credits
+    WHERE nominal_ledger_id = NL.id
+    AND deleted IS NULL
+    AND nominal_account_number != 2210
+) AS C ON true
+"""
+
+
+class Check(NamedTuple):
+    """
+    One integrity check
+    - `name`: The name of the check, as in `database_integrity_test_financial`
+    - `scope`: The CTE of SCOPE_SQL holding the records the check inspects
+    - `sql`: A query on the scope that returns the id of the failing entry and the details, for every defect
+    """
+    name: str
+    scope: str
+    sql: str
+
+
+CHECKS = (
+    Check(
+        name='nominal_ledger_balance_check',
+        scope='changed',
+        sql="""
+        SELECT NL.id, 'Debits of ' || D.amount || ' do not equal credits of ' || C.amount
+        FROM changed AS NL
+        CROSS JOIN LATERAL (
+            SELECT SUM(amount) AS amount
+            FROM nominal_ledger_debits
+            WHERE nominal_ledger_id = NL.id
+            AND deleted IS NULL
+        ) AS D
+        CROSS JOIN LATERAL (
+            SELECT SUM(amount) AS amount
+            FROM nominal_ledger_credits
+            WHERE nominal_ledger_id = NL.id
+            AND deleted IS NULL
+        ) AS C
+        WHERE D.amount != C.amount
+        """,
+    ),
+    Check(
+        name='nominal_ledger_rounding_check',
+        scope='changed',
+        sql=f"""
+        SELECT L.nominal_ledger_id, 'Debit ' || L.id || ' has an amount of ' || L.amount || ' for ' || L.quantity
+            || ' at ' || L.unit_price
+        FROM nominal_ledger_debits AS L
+        INNER JOIN changed AS NL
+        ON NL.id = L.nominal_ledger_id
+        WHERE L.deleted IS NULL
+        AND L.quantity != 0
+        AND L.unit_price != 0
+        AND ROUND(L.unit_price * L.quantity, 2) != L.amount
+        UNION ALL
+        SELECT L.nominal_ledger_id, 'Credit ' || L.id || ' has an amount of ' || L.amount || ' for ' || L.quantity
+            || ' at ' || L.unit_price
+        FROM nominal_ledger_credits AS L
+        INNER JOIN changed AS NL
+        ON NL.id = L.nominal_ledger_id
+        WHERE L.deleted IS NULL
+        AND L.id NOT IN ({', '.join(str(credit) for credit in SKIP_CREDITS)})
+        AND L.quantity != 0
+        AND L.unit_price != 0
+        AND ROUND(L.unit_price * L.quantity, 2) != L.amount
+        """,
+    ),
+    Check(
+        name='transaction_sequence_number_unique',
+        scope='changed',
+        sql="""
+        SELECT NL.id, 'TSN ' || NL.tsn || ' of Transaction Type ' || NL.transaction_type_id || ' is also used by '
+            || string_agg(O.id::text, ', ' ORDER BY O.id)
+        FROM changed AS NL
+        INNER JOIN nominal_ledger AS O
+        ON O.address_id = NL.address_id
+        AND O.transaction_type_id = NL.transaction_type_id
+        AND O.tsn = NL.tsn
+        AND O.deleted IS NULL
+        AND O.id != NL.id
+        GROUP BY NL.id, NL.tsn, NL.transaction_type_id
+        """,
+    ),
+    Check(
+        name='purchase_calculation',
+        scope='changed',
+        sql=f"""
+        SELECT id, 'Debits of ' || debits || ' do not equal credits of ' || credits || ' within 0.02'
+        FROM ({CALCULATION_SQL}) AS T
+        WHERE COALESCE(debits != credits, true)
+        AND ABS(ROUND(debits_calculated, 2) - credits_taxed) > 0.02
+        AND ABS(debits_taxed - ROUND(credits_calculated, 2)) > 0.02
+        """,
+    ),
+    Check(
+        name='balance_calculation',
+        scope='changed',
+        sql=f"""
+        SELECT id, 'Debits of ' || debits || ' do not equal credits of ' || credits || ', unallocated balance '
+            || unallocated_balance || ', tsn ' || tsn || ', transaction date ' || transaction_date
+        FROM ({CALCULATION_SQL}) AS T
+        WHERE transaction_type_id = 11002
+        AND transaction_date > '2013-01-01'
+        AND COALESCE(debits != credits, true)
+        AND COALESCE(ROUND(debits_calculated, 4) != credits_taxed, true)
+        AND COALESCE(debits_taxed != ROUND(credits_calculated, 4), true)
+        AND COALESCE(ROUND(debits_taxed, 2) != ROUND(credits_calculated, 2), true)
+        """,
+    ),
+    Check(
+        name='sanity_check',
+        scope='period_ends',
+        sql="""
+        SELECT PE.id, 'Debits of ' || T.debits || ' and credits of ' || T.credits || ' since ' || PE.previous_date
+            || ' do not match the balance of ' || PE.period_end_balance
+        FROM period_ends AS PE
+        CROSS JOIN LATERAL (
+            SELECT
+                COALESCE((
+                    SELECT SUM(L.amount)
+                    FROM nominal_ledger AS NL
+                    INNER JOIN nominal_ledger_debits AS L
+                    ON L.nominal_ledger_id = NL.id
+                    WHERE NL.address_id = %(address_id)s
+                    AND NL.deleted IS NULL
+                    AND L.deleted IS NULL
+                    AND NL.transaction_date BETWEEN PE.previous_date AND PE.transaction_date
+                    AND (
+                        NL.transaction_type_id BETWEEN 10000 AND 10005
+                        OR NL.transaction_type_id BETWEEN 11000 AND 11005
+                    )
+                ), 0) AS debits,
+                COALESCE((
+                    SELECT SUM(L.amount)
+                    FROM nominal_ledger AS NL
+                    INNER JOIN nominal_ledger_credits AS L
+                    ON L.nominal_ledger_id = NL.id
+                    WHERE NL.address_id = %(address_id)s
+                    AND NL.deleted IS NULL
+                    AND L.deleted IS NULL
+                    AND NL.transaction_date BETWEEN PE.previous_date AND PE.transaction_date
+                    AND (
+                        NL.transaction_type_id BETWEEN 10000 AND 10005
+                        OR NL.transaction_type_id BETWEEN 11000 AND 11005
+                    )
+                ), 0) AS credits
+        ) AS T
+        WHERE T.credits != T.debits
+        OR T.debits != PE.period_end_balance
+        """,
+    ),
+)
+
+
+class CheckResult(NamedTuple):
+    """
+    The result of one check for one Address
+    - `defects`: The id of each failing entry and the details of the failure
+    - `duration`: The time taken by the check, in seconds
+    - `name`: The name of the check
+    - `records_tested`: The number of entries, or Period Ends, inspected
+    """
+    defects: List[Tuple[int, str]]
+    duration: float
+    name: str
+    records_tested: int
+
+
+def check_address(address_id: int, since: Optional[datetime]) -> List[CheckResult]:
+    """
+    Run every check for an Address, in the current shard
+    :param address_id: The id of the Address to check
+    :param since: Only check the entries written since this time. If None, every entry of the Address is checked
+    :return: The result of each check
+    """
+    scope = SCOPE_SQL.format(touched=FULL_SQL if since is None else TOUCHED_SQL)
+    params = {'address_id': address_id, 'since': since}
+    results = []
+    with connections[router.db_for_read(NominalLedger)].cursor() as cursor:
+        for check in CHECKS:
+            started = time.monotonic()
+            cursor.execute(f'{scope} SELECT COUNT(*) FROM {check.scope}', params)
+            records_tested = cursor.fetchone()[0]
+            defects = []
+            if records_tested > 0:
+                cursor.execute(f'{scope} {check.sql}', params)
+                defects = cursor.fetchall()
+            results.append(CheckResult(
+                defects=defects,
+                duration=time.monotonic() - started,
+                name=check.name,
+                records_tested=records_tested,
+            ))
+    return results
+
+
+def _check_shard_address(
+        shard: str,
+        address_id: int,
+        version: int,
+        full: bool,
+) -> Tuple[List[CheckResult], IntegrityCheckpoint]:
+    """
+    Check an Address in a worker thread
+    :return: The results, and the checkpoint to save once they have been recorded
+    """
+    try:
+        with use_shard(shard):
+            checkpoint = IntegrityCheckpoint.objects.filter(address_id=address_id).first()
+            since = None
+            if not full and checkpoint is not None:
+                since = checkpoint.checked - OVERLAP
+            checked = timezone.now()
+            results = check_address(address_id, since)
+        return results, IntegrityCheckpoint(address_id=address_id, checked=checked, version=version)
+    finally:
+        # Threads of the pool open their own connections
+        connections.close_all()
+
+
+def _addresses_to_check(full: bool, address_ids: Optional[Iterable[int]]) -> Dict[str, Dict[int, int]]:
+    """
+    Find the Addresses in each shard whose ledgers have changed since their last check, with their current versions
+    """
+    shards: Dict[str, Dict[int, int]] = {}
+    for shard in settings.FINANCIAL_SHARDS:
+        with use_shard(shard):
+            versions = dict(LedgerVersion.objects.values_list('address_id', 'version'))
+            if full:
+                # Addresses that have not been written to since versions were introduced have no Ledger Version
+                candidates = set(NominalLedger.objects.lean().values_list('address_id', flat=True).distinct())
+                candidates.update(versions)
+            else:
+                checked = dict(IntegrityCheckpoint.objects.values_list('address_id', 'version'))
+                candidates = {a for a, version in versions.items() if checked.get(a) != version}
+        if address_ids is not None:
+            candidates &= set(address_ids)
+        shards[shard] = {address_id: versions.get(address_id, 0) for address_id in sorted(candidates)}
+    return shards
+
+
+def _save_checkpoints(checkpoints: List[IntegrityCheckpoint]):
+    """
+    Create or move on the checkpoints of the Addresses checked, in the current shard
+    """
+    IntegrityCheckpoint.objects.bulk_create(
+        checkpoints,
+        batch_size=1000,
+        unique_fields=['address_id'],
+        update_conflicts=True,
+        update_fields=['checked', 'version'],
+    )
+
+
+def run(full: bool = False, workers: int = 4, address_ids: Optional[Iterable[int]] = None) -> IntegrityTest:
+    """
+    Run the integrity checks and record the results
+    :param full: Check every entry of every Address, instead of only those written since their last check
+    :param workers: The number of Addresses checked at the same time
+    :param address_ids: Only check these Addresses
+    :return: The Integrity Test recording the run
+    """
+    start_time = timezone.now()
+    shards = _addresses_to_check(full, address_ids)
+
+    totals: Dict[str, List[float]] = defaultdict(lambda: [0, 0, 0.0])
+    defects: List[IntegrityDefect] = []
+    checkpoints: Dict[str, List[IntegrityCheckpoint]] = defaultdict(list)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='financial_integrity') as executor:
+        futures = {
+            executor.submit(_check_shard_address, shard, address_id, version, full): (shard, address_id)
+            for shard, addresses in shards.items()
+            for address_id, version in addresses.items()
+        }
+        for future, (shard, address_id) in futures.items():
+            try:
+                results, checkpoint = future.result()
+            except Exception as e:
+                # The other Addresses are still checked, and this one is checked again by the next run
+                logger.exception('The integrity checks of Address %s failed', address_id)
+                defects.append(IntegrityDefect(
+                    address_id=address_id,
+                    check_name=CHECK_ERROR,
+                    detail=f'The checks could not be run: {e}',
+                    nominal_ledger_id=0,
+                ))
+                continue
+
+            checkpoints[shard].append(checkpoint)
+            for result in results:
+                total = totals[result.name]
+                total[0] += result.records_tested
+                total[1] += len(result.defects)
+                total[2] += result.duration
+                defects.extend(
+                    IntegrityDefect(
+                        address_id=address_id,
+                        check_name=result.name,
+                        detail=detail or '',
+                        nominal_ledger_id=nominal_ledger_id,
+                    )
+                    for nominal_ledger_id, detail in result.defects
+                )
+
+    # The results of every shard are kept in the financial database, with the checkpoints of its own Addresses
+    with use_shard(PRIMARY), transaction.atomic(using=router.db_for_write(IntegrityTest)):
+        integrity_test = IntegrityTest.objects.create(
+            errors_found=len(defects),
+            finish_time=timezone.now(),
+            full=full,
+            records_tested=sum(total[0] for total in totals.values()),
+            start_time=start_time,
+        )
+        IntegrityTestCheck.objects.bulk_create(
+            IntegrityTestCheck(
+                duration=totals[check.name][2],
+                errors_found=totals[check.name][1],
+                integrity_test=integrity_test,
+                name=check.name,
+                records_tested=totals[check.name][0],
+            )
+            for check in CHECKS
+        )
+        for defect in defects:
+            defect.integrity_test = integrity_test
+        IntegrityDefect.objects.bulk_create(defects, batch_size=1000)
+        IntegrityTest.objects.filter(start_time__lt=start_time - RETENTION).delete()
+        _save_checkpoints(checkpoints.pop(PRIMARY, []))
+
+    # The other shards are moved on once the results are safe. If this fails, their Addresses are only checked again
+    for shard, shard_checkpoints in checkpoints.items():
+        with use_shard(shard), transaction.atomic(using=router.db_for_write(IntegrityCheckpoint)):
+            _save_checkpoints(shard_checkpoints)
+
+    return integrity_test
@@ -0,0 +1,515 @@
+"""
+Bulk import of Journal Entries.
+
+An import runs in three stages, each of which is a handful of statements regardless of the size of the file:
+    1. The file is streamed into the `journal_import_row` staging table with COPY. Values are staged as text so that
+       COPY never fails on a bad value.
+    2. The staged rows are validated with set based UPDATE statements, each of which marks every row failing one
+       check with an error message. A journal is rejected as a whole if any of its rows is rejected.
+    3. The valid journals are inserted into the Nominal Ledger with a single INSERT ... SELECT, with their TSNs assigned
+       in the same statement, and their lines are inserted into the debit and credit tables with one statement each.
+
+The rows that were rejected are kept in the staging table as the rejected rows report, the rest are removed.
+"""
+# stdlib
+import csv
+import io
+import json
+from typing import Any, Dict, Iterator
+# libs
+from cloudcix_rest.utils import db_lock
+from django.db import connections, router, transaction
+# local
+from financial import reserved_accounts as reserved
+from financial.models import JournalImport, JournalImportRow, NominalLedger
+
+
+__all__ = [
+    'IMPORT_COLUMNS',
+    'IMPORT_FORMATS',
+    'ImportFileError',
+    'post',
+    'run_import',
+    'stage',
+    'validate',
+]
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+# The columns read from each row of the file. Rows with the same reference make up one Journal Entry
+IMPORT_COLUMNS = (
+    'reference',
+    'transaction_date',
+    'narrative',
+    'nominal_account_number',
+    'debit',
+    'credit',
+    'tax_rate_id',
+    'description',
+)
+
+# The columns the header of a CSV file must contain. The others can be left out
+REQUIRED_COLUMNS = ('reference', 'transaction_date', 'nominal_account_number', 'debit', 'credit')
+
+COPY_SQL = (
+    'COPY journal_import_row (journal_import_id, row_number, error, {}) FROM STDIN WITH (FORMAT csv)'.format(
+        ', '.join(IMPORT_COLUMNS),
+    )
+)
+
+INTEGER = r'^\d{1,9}$'
+AMOUNT = r'^\d{1,19}(\.\d{1,4})?$'
+
+# Row level checks, applied in order. Each one only considers rows that have passed all of the checks before it
+ROW_CHECKS = (
+    (
+        'The "reference" is required and must be at most 50 characters long.',
+        'reference IS NULL OR length(reference) > 50',
+    ),
+    (
+        'The "transaction_date" is invalid. It must be a date string in the format YYYY-MM-DD.',
+        'journal_import_date(transaction_date) IS NULL',
+    ),
+    (
+        'The "nominal_account_number" is invalid. It is required and must be an integer.',
+        f"nominal_account_number IS NULL OR nominal_account_number !~ '{INTEGER}'",
+    ),
+    (
+        'Exactly one of "debit" or "credit" must be sent for each row.',
+        '(debit IS NULL) = (credit IS NULL)',
+    ),
+    (
+        'The "debit" or "credit" amount is invalid. It must be a positive decimal with at most 4 decimal places.',
+        f"COALESCE(debit, credit) !~ '{AMOUNT}'",
+    ),
+    (
+        'The "debit" or "credit" amount cannot be zero.',
+        f"CASE WHEN COALESCE(debit, credit) ~ '{AMOUNT}' THEN COALESCE(debit, credit)::numeric = 0 ELSE false END",
+    ),
+    (
+        'The "narrative" and "description" must be at most 250 characters long.',
+        'length(narrative) > 250 OR length(description) > 250',
+    ),
+    (
+        'The "nominal_account_number" is the Debtor or Creditor control account, which cannot be used in a journal.',
+        f"CASE WHEN nominal_account_number ~ '{INTEGER}' THEN nominal_account_number::integer IN "
+        f'({reserved.DEBTOR_CONTROL_ACCOUNT}, {reserved.CREDITOR_CONTROL_ACCOUNT}) ELSE false END',
+    ),
+    (
+        'The "nominal_account_number" does not exist for your Address.',
+        f"""
+        NOT EXISTS (
+            SELECT 1
+            FROM address_nominal_account AS A
+            INNER JOIN global_nominal_account AS G
+            ON G.id = A.global_nominal_account_id
+            WHERE A.address_id = %(address_id)s
+            AND A.deleted IS NULL
+            AND G.nominal_account_number = CASE
+                WHEN nominal_account_number ~ '{INTEGER}' THEN nominal_account_number::integer
+            END
+        )
+        """,
+    ),
+    (
+        'The "tax_rate_id" does not exist for your Address.',
+        f"""
+        tax_rate_id IS NOT NULL AND NOT EXISTS (
+            SELECT 1
+            FROM tax_rate AS T
+            WHERE T.address_id = %(address_id)s
+            AND T.deleted IS NULL
+            AND T.id = CASE WHEN tax_rate_id ~ '{INTEGER}' THEN tax_rate_id::bigint END
+        )
+        """,
+    ),
+    (
+        'The "transaction_date" has already been processed by a period end.',
+        """
+        journal_import_date(transaction_date) <= (
+            SELECT MAX(transaction_date)
+            FROM nominal_ledger
+            WHERE address_id = %(address_id)s
+            AND transaction_type_id = 12001
+            AND deleted IS NULL
+        )
+        """,
+    ),
+)
+
+# Journal level checks. Each condition selects the references of the journals that fail it
+JOURNAL_CHECKS = (
+    (
+        'All of the rows of a journal must have the same "transaction_date".',
+        'HAVING COUNT(DISTINCT transaction_date) > 1',
+    ),
+    (
+        'A "nominal_account_number" can only be used once in a journal.',
+        'HAVING COUNT(DISTINCT nominal_account_number) <> COUNT(*)',
+    ),
+    (
+        'The journal must have at least one debit and one credit, and the total debits must equal the total credits.',
+        f"""
+        HAVING COUNT(debit) = 0
+        OR COUNT(credit) = 0
+        OR SUM(CASE WHEN debit ~ '{AMOUNT}' THEN debit::numeric END)
+            <> SUM(CASE WHEN credit ~ '{AMOUNT}' THEN credit::numeric END)
+        """,
+    ),
+)
+
+REJECTED_JOURNAL = 'Another row in this journal was rejected, so the journal was not imported.'
+
+
+class ImportFileError(Exception):
+    """
+    Raised when a file cannot be read at all, rather than having rows that are invalid
+    """
+
+    def __init__(self, error_code: str, reason: str):
+        super().__init__(reason)
+        self.error_code = error_code
+
+
+class _GeneratorFile:
+    """
+    A minimal read only file that pulls its contents from a generator of strings, for psycopg2's copy_expert
+    """
+
+    def __init__(self, generator: Iterator[str]):
+        self._generator = generator
+        self._buffer = ''
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buffer) < size:
+            try:
+                self._buffer += next(self._generator)
+            except StopIteration:
+                break
+        if size < 0:
+            size = len(self._buffer)
+        value, self._buffer = self._buffer[:size], self._buffer[size:]
+        return value
+
+
+def _read_header(reader: csv.DictReader):
+    """
+    Read and check the header of a CSV file, before any of it is sent to COPY
+    """
+    try:
+        fieldnames = reader.fieldnames
+    except UnicodeDecodeError:
+        raise ImportFileError('financial_journal_import_create_103', 'The file is not encoded as UTF-8.')
+    except csv.Error as e:
+        raise ImportFileError('financial_journal_import_create_104', f'The header row is not valid CSV: {e}')
+    if fieldnames is None:
+        raise ImportFileError('financial_journal_import_create_105', 'The file is empty.')
+
+    reader.fieldnames = [name.strip().lower() for name in fieldnames]
+    missing = [column for column in REQUIRED_COLUMNS if column not in reader.fieldnames]
+    if len(missing) > 0:
+        raise ImportFileError(
+            'financial_journal_import_create_105',
+            'The header row is missing the columns {}.'.format(', '.join(f'"{column}"' for column in missing)),
+        )
+
+
+def _read_ndjson(text: io.TextIOWrapper) -> Iterator[Dict[str, Any]]:
+    for line in text:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line, parse_float=str, parse_int=str)
+        except ValueError:
+            yield {'_error': 'The row is not a valid JSON document.'}
+            continue
+        if not isinstance(row, dict):
+            yield {'_error': 'The row must be a JSON object.'}
+            continue
+        yield row
+
+
+def _read_rows(file, file_format: str) -> Iterator[Dict[str, Any]]:
+    """
+    Read the rows of an uploaded file as dictionaries. A row that cannot be parsed is returned with an `_error` key.
+    The header of a CSV file is checked straight away, and an ImportFileError is raised if the file cannot be decoded
+    or parsed as it is read
+    """
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    if file_format == 'csv':
+        reader = csv.DictReader(text)
+        _read_header(reader)
+        rows = reader
+    else:
+        reader = None
+        rows = _read_ndjson(text)
+
+    def read() -> Iterator[Dict[str, Any]]:
+        try:
+            yield from rows
+        except UnicodeDecodeError:
+            raise ImportFileError('financial_journal_import_create_103', 'The file is not encoded as UTF-8.')
+        except csv.Error as e:
+            raise ImportFileError(
+                'financial_journal_import_create_104',
+                f'Line {reader.line_num} of the file is not valid CSV: {e}',
+            )
+
+    return read()
+
+
+def _copy_lines(journal_import_id: int, rows: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    """
+    Encode the rows as CSV for COPY. Empty values are written unquoted so that COPY loads them as NULL
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row_number, row in enumerate(rows, start=1):
+        values = [row.get(column) for column in IMPORT_COLUMNS]
+        values = ['' if value is None else str(value).strip() for value in values]
+        error = row.get('_error') or ''
+        if any('\x00' in value for value in values):
+            # Postgres cannot store NUL characters in text
+            values = [value.replace('\x00', '') for value in values]
+            error = error or 'The row contains a NUL character.'
+        writer.writerow([journal_import_id, row_number, error] + values)
+        if buffer.tell() > 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stage(journal_import: JournalImport, file, file_format: str) -> int:
+    """
+    Load the rows of a file into the staging table with COPY
+    :param journal_import: The Journal Import the rows belong to
+    :param file: The uploaded file, opened in binary mode
+    :param file_format: One of IMPORT_FORMATS
+    :return: The number of rows staged
+    :raises ImportFileError: If the file cannot be decoded or parsed, or a CSV file's header is missing columns
+    """
+    lines = _copy_lines(journal_import.pk, _read_rows(file, file_format))
+    using = router.db_for_write(JournalImportRow)
+    with connections[using].cursor() as cursor:
+        raw = cursor.cursor
+        if hasattr(raw, 'copy_expert'):
+            # psycopg2
+            raw.copy_expert(COPY_SQL, _GeneratorFile(lines))
+        else:
+            # psycopg 3
+            with raw.copy(COPY_SQL) as copy:
+                for block in lines:
+                    copy.write(block)
+    return JournalImportRow.objects.filter(journal_import=journal_import).count()
+
+
+def validate(journal_import: JournalImport):
+    """
+    Validate the staged rows of a Journal Import with set based statements, recording the reason each rejected row was
+    rejected in its `error`
+    :param journal_import: The Journal Import to validate
+    """
+    params = {'import_id': journal_import.pk, 'address_id': journal_import.address_id}
+    using = router.db_for_write(JournalImportRow)
+    with connections[using].cursor() as cursor:
+        for error, condition in ROW_CHECKS:
+            cursor.execute(
+                f"""
+                UPDATE journal_import_row
+                SET error = %(error)s
+                WHERE journal_import_id = %(import_id)s
+                AND error IS NULL
+                AND ({condition})
+                """,
+                dict(params, error=error),
+            )
+
+        for error, having in JOURNAL_CHECKS:
+            cursor.execute(
+                f"""
+                UPDATE journal_import_row
+                SET error = %(error)s
+                WHERE journal_import_id = %(import_id)s
+                AND error IS NULL
+                AND reference IN (
+                    SELECT reference
+                    FROM journal_import_row
+                    WHERE journal_import_id = %(import_id)s
+                    GROUP BY reference
+                    {having}
+                )
+                """,
+                dict(params, error=error),
+            )
+
+        # A journal is only imported if all of its rows are valid
+        cursor.execute(
+            """
+            UPDATE journal_import_row
+            SET error = %(error)s
+            WHERE journal_import_id = %(import_id)s
+            AND error IS NULL
+            AND reference IN (
+                SELECT reference
+                FROM journal_import_row
+                WHERE journal_import_id = %(import_id)s
+                AND error IS NOT NULL
+            )
+            """,
+            dict(params, error=REJECTED_JOURNAL),
+        )
+
+
+def _insert_lines(cursor, table: str, column: str, params: Dict[str, Any]):
+    cursor.execute(
+        f"""
+        INSERT INTO {table} (
+            created, updated, extra, amount, description, exchange_rate, nominal_account_number, nominal_ledger_id,
+            tax_rate_id, tax_percent
+        )
+        SELECT
+            now(), now(), '{{}}'::jsonb, R.{column}::numeric(23, 4), R.description, 1,
+            R.nominal_account_number::integer, R.nominal_ledger_id, T.id, T.percent
+        FROM journal_import_row AS R
+        LEFT JOIN tax_rate AS T
+        ON T.id = CASE WHEN R.tax_rate_id ~ '{INTEGER}' THEN R.tax_rate_id::bigint END
+        WHERE R.journal_import_id = %(import_id)s
+        AND R.error IS NULL
+        AND R.{column} IS NOT NULL
+        ORDER BY R.row_number
+        """,
+        params,
+    )
+
+
+def post(journal_import: JournalImport, address: Dict[str, Any], contact: str) -> int:
+    """
+    Insert the valid journals of a Journal Import into the Nominal Ledger
+    :param journal_import: The validated Journal Import to post
+    :param address: The Address of the requesting User, used for the billing details as with a single Journal Entry
+    :param contact: The name of the requesting User
+    :return: The number of Journal Entries created
+    """
+    params = {
+        'import_id': journal_import.pk,
+        'address_id': journal_import.address_id,
+        'address1': address['address1'],
+        'address2': address['address2'],
+        'address3': address['address3'],
+        'city': address['city'],
+        'contact': contact,
+        'country_id': address['country_id'],
+        'name': address['name'],
+        'postcode': address['postcode'],
+        'subdivision_id': address.get('subdivision_id'),
+    }
+    using = router.db_for_write(NominalLedger)
+    with transaction.atomic(using=using), db_lock(NominalLedger):
+        with connections[using].cursor() as cursor:
+            # Let the TSN trigger keep the TSNs assigned below
+            cursor.execute("SET LOCAL financial.bulk_tsn = 'on'")
+
+            # Create one Nominal Ledger entry per journal, numbering them on from the Address' current highest TSN in
+            # transaction date order, and record the id of the entry against its rows
+            cursor.execute(
+                """
+                WITH journals AS (
+                    SELECT
+                        reference,
+                        MIN(row_number) AS first_row,
+                        journal_import_date(MIN(transaction_date)) AS transaction_date,
+                        (ARRAY_AGG(narrative ORDER BY row_number) FILTER (WHERE narrative IS NOT NULL))[1] AS narrative
+                    FROM journal_import_row
+                    WHERE journal_import_id = %(import_id)s
+                    AND error IS NULL
+                    GROUP BY reference
+                ), numbered AS (
+                    SELECT
+                        J.*,
+                        ROW_NUMBER() OVER (ORDER BY J.transaction_date, J.first_row) + (
+                            SELECT COALESCE(MAX(tsn), 0)
+                            FROM nominal_ledger
+                            WHERE deleted IS NULL
+                            AND address_id = %(address_id)s
+                            AND transaction_type_id = 12000
+                        ) AS tsn
+                    FROM journals AS J
+                ), inserted AS (
+                    INSERT INTO nominal_ledger (
+                        created, updated, extra, address_id, address1_bill_to, address2_bill_to, address3_bill_to,
+                        city_bill_to, contact, contra_address_id, country_id_bill_to, external_reference,
+                        name_bill_to, narrative, postcode_bill_to, subdivision_id_bill_to, transaction_date,
+                        transaction_type_id, tsn, unallocated_balance
+                    )
+                    SELECT
+                        now(), now(), jsonb_build_object('journal_import_id', %(import_id)s), %(address_id)s,
+                        %(address1)s, %(address2)s, %(address3)s, %(city)s, %(contact)s, %(address_id)s,
+                        %(country_id)s, N.reference, %(name)s, N.narrative, %(postcode)s, %(subdivision_id)s,
+                        N.transaction_date, 12000, N.tsn, 0
+                    FROM numbered AS N
+                    ORDER BY N.tsn
+                    RETURNING id, tsn
+                )
+                UPDATE journal_import_row AS R
+                SET nominal_ledger_id = I.id
+                FROM inserted AS I
+                INNER JOIN numbered AS N
+                ON N.tsn = I.tsn
+                WHERE R.journal_import_id = %(import_id)s
+                AND R.error IS NULL
+                AND R.reference = N.reference
+                """,
+                params,
+            )
+
+            _insert_lines(cursor, 'nominal_ledger_debits', 'debit', params)
+            _insert_lines(cursor, 'nominal_ledger_credits', 'credit', params)
+
+            cursor.execute(
+                """
+                SELECT COUNT(DISTINCT nominal_ledger_id)
+                FROM journal_import_row
+                WHERE journal_import_id = %(import_id)s
+                AND error IS NULL
+                """,
+                params,
+            )
+            imported = cursor.fetchone()[0]
+
+            # Only the rejected rows are kept, as the report of what was not imported
+            cursor.execute(
+                'DELETE FROM journal_import_row WHERE journal_import_id = %(import_id)s AND error IS NULL',
+                params,
+            )
+    return imported
+
+
+def run_import(journal_import: JournalImport, file, address: Dict[str, Any], contact: str) -> JournalImport:
+    """
+    Stage, validate and post a file of journals, updating the Journal Import with the results
+    :param journal_import: A new Journal Import record for the file
+    :param file: The uploaded file, opened in binary mode
+    :param address: The Address of the requesting User
+    :param contact: The name of the requesting User
+    :return: The updated Journal Import
+    :raises ImportFileError: If the file cannot be read. The Journal Import is failed with the reason as its `error`
+    """
+    try:
+        journal_import.rows_total = stage(journal_import, file, journal_import.file_format)
+        validate(journal_import)
+        journal_import.journals_imported = post(journal_import, address, contact)
+    except Exception as e:
+        journal_import.status = JournalImport.STATUS_FAILED
+        if isinstance(e, ImportFileError):
+            journal_import.error = str(e)
+        journal_import.save()
+        raise
+
+    rejected = JournalImportRow.objects.filter(journal_import=journal_import)
+    journal_import.rows_rejected = rejected.count()
+    journal_import.journals_rejected = rejected.values('reference').distinct().count()
+    journal_import.status = JournalImport.STATUS_COMPLETED
+    journal_import.save()
+    return journal_import
@@ -0,0 +1,72 @@
+"""
+Move the ledger lines of closed years into the archive tables, see `financial.archive`.
+
+Run it after Year Ends have been posted, e.g. nightly. Each Address is archived in its own transaction on its own
+shard, so the command can be stopped and re-run at any point.
+
+`--restore` moves every archived line back into the line tables of every shard and drops the archive tables, which has
+to be done before the ledger can be partitioned with `partition_ledger`.
+"""
+# libs
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+# local
+from financial.archive import archive_address, restore_archives
+from financial.models import LedgerArchive, NominalLedger
+from financial.sharding import shard_for, use_shard
+
+
+class Command(BaseCommand):
+    help = 'Move the lines of Nominal Ledger entries on or before the latest Year End of each Address to the archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--address-id',
+            type=int,
+            action='append',
+            dest='address_ids',
+            help='Only archive this Address. Can be given more than once.',
+        )
+        parser.add_argument(
+            '--restore',
+            action='store_true',
+            help='Move every archived line back into the line tables and drop the archive tables.',
+        )
+
+    def handle(self, *args, **options):
+        if options['restore']:
+            for shard in settings.FINANCIAL_SHARDS:
+                with use_shard(shard):
+                    restored = restore_archives()
+                for table, count in restored.items():
+                    self.stdout.write(f'{shard}: moved {count} lines back into {table}')
+            self.stdout.write(self.style.SUCCESS('Restored the archived lines'))
+            return
+
+        address_ids = options['address_ids']
+        if address_ids is None:
+            address_ids = []
+            for shard in settings.FINANCIAL_SHARDS:
+                with use_shard(shard):
+                    address_ids.extend(NominalLedger.year_ends.lean().values_list(
+                        'address_id',
+                        flat=True,
+                    ).distinct().order_by(
+                        'address_id',
+                    ))
+
+        archived = 0
+        for address_id in address_ids:
+            with use_shard(shard_for(address_id)):
+                try:
+                    archive: LedgerArchive = archive_address(address_id)
+                except ValueError as e:
+                    raise CommandError(str(e))
+            if archive is None:
+                continue
+            archived += 1
+            self.stdout.write(
+                f'Address {address_id}: archived {archive.debits_archived} debits and {archive.credits_archived} '
+                f'credits up to {archive.archived_to}',
+            )
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} Addresses'))
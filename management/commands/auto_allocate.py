@@ -0,0 +1,65 @@
+"""
+Automatically allocate the open items of the Debtor or Creditor ledger of an Address, see `financial.allocation_engine`.
+
+Use `--dry-run` to print the matches that would be made without creating any Allocations.
+"""
+# libs
+from django.core.management.base import BaseCommand
+# local
+from financial.allocation_engine import ALLOCATION_TYPES, allocate, STRATEGIES
+from financial.sharding import shard_for, use_shard
+
+
+class Command(BaseCommand):
+    help = 'Match the open items of the Sales or Purchases ledger of an Address and create an Allocation for each match'
+
+    def add_arguments(self, parser):
+        parser.add_argument('address_id', type=int, help='The Address whose ledger is allocated.')
+        parser.add_argument(
+            'allocation_type',
+            choices=sorted(ALLOCATION_TYPES),
+            help='Allocate the Sales ledger (customer) or the Purchases ledger (supplier).',
+        )
+        parser.add_argument(
+            '--contra-address-id',
+            type=int,
+            action='append',
+            dest='contra_address_ids',
+            help='Only allocate the open items of this contra Address. Can be given more than once.',
+        )
+        parser.add_argument(
+            '--strategy',
+            choices=STRATEGIES,
+            action='append',
+            dest='strategies',
+            help=f'A strategy to match with, applied in the order given. Defaults to {", ".join(STRATEGIES)}.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Print the matches without creating any Allocations.',
+        )
+
+    def handle(self, *args, **options):
+        address_id = options['address_id']
+        with use_shard(shard_for(address_id)):
+            matches = allocate(
+                address_id=address_id,
+                allocation_type=options['allocation_type'],
+                contra_address_ids=options['contra_address_ids'],
+                strategies=options['strategies'] or STRATEGIES,
+                dry_run=options['dry_run'],
+            )
+
+        for match in matches:
+            lines = ', '.join(
+                f'{line.nominal_ledger.transaction_type_id}/{line.nominal_ledger.tsn}: {line.amount}'
+                for line in match.lines
+            )
+            allocation = 'proposed' if match.allocation_id is None else f'Allocation {match.allocation_id}'
+            self.stdout.write(f'{allocation} ({match.strategy}) contra Address {match.contra_address_id}: {lines}')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'{len(matches)} matches proposed'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Created {len(matches)} Allocations'))
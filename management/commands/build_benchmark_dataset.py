@@ -0,0 +1,44 @@
+"""
+Build the synthetic ledger the benchmarks run against, see `financial.benchmarks.dataset`.
+
+Run it once in an empty local database. The dataset is not removed afterwards, so never run it against a database with
+real data in it.
+"""
+# libs
+from django.core.management.base import BaseCommand, CommandError
+# local
+from financial.benchmarks import build, SCALES
+from financial.sharding import shard_for, use_shard
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic ledger for the benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            choices=sorted(SCALES),
+            default='small',
+            help='The size of the dataset. Defaults to small.',
+        )
+        parser.add_argument(
+            '--first-address-id',
+            type=int,
+            default=1,
+            help='The id of the first Address of the dataset. Defaults to 1.',
+        )
+
+    def handle(self, *args, **options):
+        scale = SCALES[options['scale']]._replace(first_address_id=options['first_address_id'])
+        try:
+            with use_shard(shard_for(scale.first_address_id)):
+                counts = build(scale)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for table, count in counts.items():
+            self.stdout.write(f'{table}: {count} rows')
+        self.stdout.write(self.style.SUCCESS(
+            f'Built a {options["scale"]} dataset for Addresses {scale.first_address_id} to '
+            f'{scale.first_address_id + scale.addresses - 1}',
+        ))
@@ -0,0 +1,58 @@
+"""
+Check the integrity of the ledger, see `financial.integrity`.
+
+Run it nightly. Only the Addresses whose ledgers have changed since their last check are checked, and only their
+changed entries, so a run takes time in proportion to the writes since the last one. Use `--full` to check every entry
+of every Address, e.g. for the first run or after restoring a backup.
+"""
+# libs
+from django.core.management.base import BaseCommand, CommandError
+# local
+from financial.integrity import run
+
+
+class Command(BaseCommand):
+    help = 'Check the Nominal Ledger entries written since the last check, and record the results as an Integrity Test'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Check every entry of every Address, ignoring the checkpoints of the previous checks.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='The number of Addresses to check at the same time. Defaults to 4.',
+        )
+        parser.add_argument(
+            '--address-id',
+            type=int,
+            action='append',
+            dest='address_ids',
+            help='Only check this Address. Can be given more than once.',
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1')
+
+        integrity_test = run(full=options['full'], workers=options['workers'], address_ids=options['address_ids'])
+
+        for check in integrity_test.checks.order_by('id'):
+            self.stdout.write(
+                f'{check.name}: {check.records_tested} records tested, {check.errors_found} defects found in '
+                f'{check.duration:.2f}s',
+            )
+        for defect in integrity_test.defects.order_by('id'):
+            self.stdout.write(
+                f'{defect.check_name}: Address {defect.address_id}, nominal_ledger_id {defect.nominal_ledger_id}: '
+                f'{defect.detail}',
+            )
+        duration = (integrity_test.finish_time - integrity_test.start_time).total_seconds()
+        message = f'{integrity_test.records_tested} records tested, {integrity_test.errors_found} defects found in ' \
+                  f'{duration:.2f}s'
+        if integrity_test.errors_found > 0:
+            raise CommandError(message)
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,146 @@
+"""
+Check that the hot queries on the ledger tables are planned with an index rather than a sequential scan.
+
+Run against a copy of production data, or with `--synthetic` to load a generated dataset inside a transaction that is
+rolled back afterwards. The command fails if any of the queries scans a ledger table sequentially, so it can be used as
+a check after changing the indexes or the queries.
+"""
+# stdlib
+import json
+from typing import Any, Dict, Iterator, List, Tuple
+# libs
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router, transaction
+from django.db.models import QuerySet
+# local
+from financial.models import NominalLedger, NominalLedgerCredit, NominalLedgerDebit
+
+
+LEDGER_TABLES = frozenset((
+    NominalLedger._meta.db_table,
+    NominalLedgerCredit._meta.db_table,
+    NominalLedgerDebit._meta.db_table,
+))
+
+# Generate Nominal Ledger entries spread over a number of Addresses, each with one debit and one credit. The statements
+# are run one at a time because psycopg 3 can't send several statements with parameters at once.
+SYNTHETIC_SQL = (
+    "SET LOCAL financial.bulk_tsn = 'on'",
+    """
+    INSERT INTO nominal_ledger (
+        created, updated, extra, address_id, contact, contra_address_id, transaction_date, transaction_type_id, tsn,
+        unallocated_balance
+    )
+    SELECT
+        now(), now(), '{}', 1 + i %% %(addresses)s, 'Synthetic', 1 + i %% 97, DATE '2020-01-01' + i %% 1500,
+        11000 + i %% 6, i, CASE WHEN i %% 4 = 0 THEN 0 ELSE i %% 1000 END
+    FROM generate_series(1, %(entries)s) AS i
+    """,
+    """
+    INSERT INTO nominal_ledger_debits (
+        created, updated, extra, amount, exchange_rate, nominal_account_number, nominal_ledger_id
+    )
+    SELECT now(), now(), '{}', 100, 1, 1300, id FROM nominal_ledger WHERE contact = 'Synthetic'
+    """,
+    """
+    INSERT INTO nominal_ledger_credits (
+        created, updated, extra, amount, exchange_rate, nominal_account_number, nominal_ledger_id
+    )
+    SELECT now(), now(), '{}', 100, 1, 4000, id FROM nominal_ledger WHERE contact = 'Synthetic'
+    """,
+    'ANALYZE nominal_ledger',
+    'ANALYZE nominal_ledger_debits',
+    'ANALYZE nominal_ledger_credits',
+)
+
+
+def hot_queries(address_id: int) -> List[Tuple[str, QuerySet]]:
+    """
+    The queries on the ledger tables that run on every request to the busiest services
+    :param address_id: The Address to run the queries for
+    :return: A list of the name and QuerySet of each query
+    """
+    ledger_ids = NominalLedger.objects.lean().filter(address_id=address_id).values('id')[:20]
+    return [
+        (
+            'resource_read',
+            NominalLedger.objects.lean().filter(address_id=address_id, transaction_type_id=11002, tsn=1),
+        ),
+        (
+            'outstanding_balances',
+            NominalLedger.objects.lean().filter(
+                address_id=address_id,
+                contra_address_id=1,
+                transaction_type_id__range=(11002, 11005),
+            ).exclude(
+                unallocated_balance=0,
+            ),
+        ),
+        (
+            'pending_contras',
+            NominalLedger.objects.lean().filter(contra_address_id=address_id, contra_nominal_ledger__isnull=True),
+        ),
+        (
+            'debit_lines',
+            NominalLedgerDebit.objects.lean().filter(nominal_ledger_id__in=ledger_ids, nominal_account_number=1300),
+        ),
+        (
+            'credit_lines',
+            NominalLedgerCredit.objects.lean().filter(nominal_ledger_id__in=ledger_ids, nominal_account_number=1300),
+        ),
+    ]
+
+
+def plan_nodes(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Walk all of the nodes in an EXPLAIN plan
+    """
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+class Command(BaseCommand):
+    help = 'Fail if any of the hot queries on the ledger tables is planned with a sequential scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--address-id', type=int, default=1, help='The Address to run the queries for')
+        parser.add_argument(
+            '--synthetic',
+            type=int,
+            default=0,
+            metavar='ENTRIES',
+            help='Load this many generated Nominal Ledger entries first. They are rolled back afterwards.',
+        )
+        parser.add_argument('--addresses', type=int, default=50, help='The number of Addresses in the synthetic data')
+
+    def handle(self, *args, **options):
+        using = router.db_for_read(NominalLedger)
+        with transaction.atomic(using=using):
+            if options['synthetic'] > 0:
+                params = {'addresses': options['addresses'], 'entries': options['synthetic']}
+                with connections[using].cursor() as cursor:
+                    for sql in SYNTHETIC_SQL:
+                        cursor.execute(sql, params if '%(' in sql else None)
+            failures = self.check_plans(options['address_id'])
+            # Never keep the synthetic data
+            transaction.set_rollback(True, using=using)
+
+        if len(failures) > 0:
+            raise CommandError(f'Sequential scans found in: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('All hot queries use an index'))
+
+    def check_plans(self, address_id: int) -> List[str]:
+        failures = []
+        for name, query in hot_queries(address_id):
+            plan = json.loads(query.explain(format='json'))[0]['Plan']
+            scans = [
+                node['Relation Name'] for node in plan_nodes(plan)
+                if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') in LEDGER_TABLES
+            ]
+            if len(scans) > 0:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f'{name}: Seq Scan on {", ".join(scans)}'))
+            else:
+                self.stdout.write(f'{name}: ok')
+        return failures
@@ -0,0 +1,76 @@
+"""
+Work out the shard map that keeps Addresses that trade with each other in the same shard, see `financial.sharding`.
+
+Map the Addresses to be moved in `FINANCIAL_SHARD_MAP` and run the command. It reads the trading relationships from the
+ledgers in every shard, adds every Address the mapped Addresses trade with to the map, directly or through other
+Addresses, and prints the result as the JSON to set `FINANCIAL_SHARD_MAP` to. It also lists the Addresses whose ledgers
+are not in the shard the new map routes them to, which have to be moved before the new map is deployed.
+
+With `--check` it prints nothing, and fails if the current map leaves trading partners in different shards or any
+ledger is not in the shard it is mapped to.
+"""
+# stdlib
+import json
+from collections import defaultdict
+from typing import Dict, List, Set, Tuple
+# libs
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+# local
+from financial.models import NominalLedger
+from financial.sharding import colocate, PRIMARY, use_shard
+
+
+class Command(BaseCommand):
+    help = 'Print the shard map that keeps the trading partners of every mapped Address in the same shard'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Fail if the current shard map separates trading partners or any ledger is in the wrong shard.',
+        )
+
+    def handle(self, *args, **options):
+        pairs: Set[Tuple[int, int]] = set()
+        located: Dict[int, Set[str]] = defaultdict(set)
+        for shard in settings.FINANCIAL_SHARDS:
+            with use_shard(shard):
+                for address_id, contra_address_id in NominalLedger.objects.lean().values_list(
+                    'address_id',
+                    'contra_address_id',
+                ).distinct():
+                    located[address_id].add(shard)
+                    if contra_address_id is not None:
+                        pairs.add((address_id, contra_address_id))
+
+        try:
+            shard_map = colocate(settings.FINANCIAL_SHARD_MAP, pairs)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        misplaced: List[str] = []
+        for address_id, shards in sorted(located.items()):
+            shard = shard_map.get(address_id, PRIMARY)
+            if shards != {shard}:
+                misplaced.append(f'{address_id}: in {", ".join(sorted(shards))}, mapped to {shard}')
+
+        if options['check']:
+            errors = []
+            added = sorted(set(shard_map) - set(settings.FINANCIAL_SHARD_MAP))
+            if len(added) > 0:
+                errors.append(f'Trading partners of mapped Addresses are not mapped with them: {added}')
+            if len(misplaced) > 0:
+                errors.append('Ledgers not in the shard they are mapped to:\n' + '\n'.join(misplaced))
+            if len(errors) > 0:
+                raise CommandError('\n'.join(errors))
+            self.stdout.write(self.style.SUCCESS('Every ledger is in its shard, with its trading partners'))
+            return
+
+        prefix = f'{PRIMARY}_'
+        self.stdout.write(json.dumps({
+            str(address_id): shard[len(prefix):] if shard.startswith(prefix) else shard
+            for address_id, shard in sorted(shard_map.items())
+        }))
+        if len(misplaced) > 0:
+            self.stderr.write('Move these ledgers before deploying the map:\n' + '\n'.join(misplaced))
@@ -0,0 +1,21 @@
+"""
+Apply the financial migrations to every shard, see `financial.sharding`.
+
+`migrate` only migrates one database at a time, so the shards in `FINANCIAL_SHARDS` are migrated one after the other,
+starting with the `financial` database. The command stops at the first shard that fails, and can be re-run once it has
+been fixed. It is run by the entrypoint of the Docker image.
+"""
+# libs
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Apply the financial migrations to the financial database and every shard in FINANCIAL_SHARDS'
+
+    def handle(self, *args, **options):
+        for shard in settings.FINANCIAL_SHARDS:
+            self.stdout.write(f'Migrating {shard}')
+            call_command('migrate', 'financial', database=shard, verbosity=options['verbosity'], interactive=False)
+        self.stdout.write(self.style.SUCCESS(f'Migrated {len(settings.FINANCIAL_SHARDS)} databases'))
@@ -0,0 +1,420 @@
+"""
+Convert the Nominal Ledger and its debit and credit tables to hash partitioned tables, online.
+
+This is opt-in and is run by hand in five steps, each of which can be re-run:
+
+1. `prepare`: Create the partitioned copies of the tables, `<table>_partitioned`, and triggers on the live tables that
+   mirror every write into the copies.
+2. `backfill`: Copy the existing rows across in batches of ids, each in its own transaction.
+3. `index`: Build the indexes of the live tables on every partition with `CREATE INDEX CONCURRENTLY`, and attach them
+   to an index on the partitioned table. Partition indexes left invalid by an interrupted build are rebuilt, and ones
+   that were built but not attached are attached, so the step picks up where it stopped.
+4. `verify`: Compare the copies with the live tables in batches of ids, repairing the rows that differ. A row that is
+   updated or deleted while it is being backfilled can be left stale or behind in the copy, as the mirrored write
+   doesn't see the uncommitted backfilled row.
+5. `swap`: Run `verify` without locking anything, then in one short transaction lock the tables and rename the copies
+   into place. The triggers, the `nominal_account_history` view and the ownership of the id sequences are moved to the
+   new tables and the old tables are kept as `<table>_unpartitioned` until they are dropped by hand.
+
+Once `verify` has found the copies equal, they stay equal: every later write is mirrored by the triggers in the same
+transaction as the write. So the tables are only locked for as long as the renames take, as long as `backfill` is not
+run at the same time. The lock is taken with a `lock_timeout` so a long running query on the ledger makes the swap
+fail, and be retried, rather than queueing every other query behind it.
+
+`nominal_ledger` is partitioned by `address_id`, so every per-Address query only reads one partition. The debit and
+credit tables don't have an `address_id`, so they are partitioned by `nominal_ledger_id` with the same number of
+partitions, which keeps the lines of an entry together in one partition.
+
+A partitioned table can only have a unique key that includes its partition key, so `id` can't be referenced by a
+foreign key any more. The `swap` step drops the foreign keys to and from these tables, and lists them. The integrity of
+the ledger is still checked by the `check_integrity` command.
+
+PostgreSQL 13 or later is needed for the row triggers on the partitioned tables.
+
+Partitioning and `archive_ledger` are alternative ways of keeping the hot tables small, and a database uses one or the
+other. The archive tables inherit from the line tables, and a partitioned table can't have inheritance children, so:
+    - `prepare` refuses to run once any lines have been archived. Move them back with `archive_ledger --restore` first.
+      Archive tables that have never held a line are dropped.
+    - `archive_ledger` refuses to archive once `prepare` has created the partitioned copies, or after the swap.
+"""
+# stdlib
+import re
+from typing import Any, Dict, List, Optional, Tuple, Union
+# libs
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router, transaction
+# local
+from financial.models import LedgerArchive, NominalLedger
+
+
+# The tables to partition, and their partition keys
+TABLES = (
+    ('nominal_ledger', 'address_id'),
+    ('nominal_ledger_debits', 'nominal_ledger_id'),
+    ('nominal_ledger_credits', 'nominal_ledger_id'),
+)
+
+VIEW = 'nominal_account_history'
+
+# Tables that have foreign keys to the Nominal Ledger, which have to be locked to drop the keys
+REFERENCING_TABLES = ('allocation_detail', 'email_log')
+
+# The number of times a batch of ids is repaired and compared again by `verify` before it gives up
+VERIFY_ATTEMPTS = 3
+
+INDEX_DEF = re.compile(r'^CREATE (?P<unique>UNIQUE )?INDEX (?P<name>\S+) ON (?P<table>\S+) (?P<rest>.*)$')
+
+
+def partitioned(table: str) -> str:
+    return f'{table}_partitioned'
+
+
+def unpartitioned(name: str) -> str:
+    return f'{name}_unpartitioned'
+
+
+class Command(BaseCommand):
+    help = 'Convert the Nominal Ledger and its debit and credit tables to hash partitioned tables, online'
+
+    def add_arguments(self, parser):
+        parser.add_argument('step', choices=('prepare', 'backfill', 'index', 'verify', 'swap'))
+        parser.add_argument('--partitions', type=int, default=16, help='The number of hash partitions per table')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50000,
+            help='The number of ids to copy or verify per transaction',
+        )
+        parser.add_argument(
+            '--lock-timeout',
+            default='5s',
+            help='How long the swap waits for its lock on the tables before it fails. Defaults to 5s.',
+        )
+
+    def handle(self, *args, **options):
+        self.connection = connections[router.db_for_write(NominalLedger)]
+        getattr(self, options['step'])(**options)
+
+    def execute_sql(self, sql: str, params: Union[Tuple, Dict[str, Any]] = ()) -> List[Tuple]:
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params or None)
+            return cursor.fetchall() if cursor.description is not None else []
+
+    def table_exists(self, table: str) -> bool:
+        return self.execute_sql('SELECT to_regclass(%s) IS NOT NULL', (table,))[0][0]
+
+    def indexes(self, table: str) -> Dict[str, str]:
+        """
+        The definitions of the indexes on a table, other than its primary key, by name
+        """
+        return dict(self.execute_sql(
+            """
+            SELECT I.relname, pg_get_indexdef(X.indexrelid)
+            FROM pg_index AS X
+            INNER JOIN pg_class AS I ON I.oid = X.indexrelid
+            WHERE X.indrelid = %s::regclass AND NOT X.indisprimary
+            """,
+            (table,),
+        ))
+
+    def index_state(self, name: str) -> Optional[Tuple[bool, Optional[str]]]:
+        """
+        Whether an index is valid, and the partitioned index it is attached to
+        :return: None if the index does not exist
+        """
+        rows = self.execute_sql(
+            """
+            SELECT X.indisvalid, P.inhparent::regclass::text
+            FROM pg_index AS X
+            LEFT JOIN pg_inherits AS P ON P.inhrelid = X.indexrelid
+            WHERE X.indexrelid = to_regclass(%s)
+            """,
+            (name,),
+        )
+        return rows[0] if len(rows) > 0 else None
+
+    def prepare(self, partitions: int, **options):
+        """
+        Create the partitioned tables and start mirroring writes to them
+        """
+        # A partitioned table can't have inheritance children, so the lines must not have been archived. Archive tables
+        # that have never been used are dropped, `archive_ledger` refuses to archive once the copies exist
+        children = self.execute_sql(
+            'SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = ANY(%s::regclass[])',
+            ([table for table, _ in TABLES],),
+        )
+        archives = {f'{table}_archive' for table, _ in TABLES}
+        others = [child for child, in children if child not in archives]
+        if len(others) > 0:
+            raise CommandError(f'The ledger tables have inheritance children ({", ".join(others)})')
+        archived = LedgerArchive.objects.using(self.connection.alias).exists()
+        for child, in children:
+            archived = archived or self.execute_sql(f'SELECT EXISTS (SELECT 1 FROM {child})')[0][0]
+        if archived:
+            raise CommandError(
+                'Lines of the ledger have been archived. Move them back with `archive_ledger --restore` before '
+                'partitioning.',
+            )
+        for child, in children:
+            self.execute_sql(f'DROP TABLE {child}')
+            self.stdout.write(f'Dropped the empty archive table {child}')
+
+        for table, key in TABLES:
+            new = partitioned(table)
+            if self.table_exists(new):
+                self.stdout.write(f'{new} already exists')
+                continue
+
+            sequence = self.execute_sql('SELECT pg_get_serial_sequence(%s, %s)', (table, 'id'))[0][0]
+            with transaction.atomic(using=self.connection.alias):
+                self.execute_sql(f"""
+                    CREATE TABLE {new} (
+                        LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE
+                    ) PARTITION BY HASH ({key})
+                """)
+                self.execute_sql(f'ALTER TABLE {new} ALTER COLUMN id SET DEFAULT nextval(%s::regclass)', (sequence,))
+                self.execute_sql(f'ALTER TABLE {new} ADD CONSTRAINT {new}_pkey PRIMARY KEY (id, {key})')
+                for remainder in range(partitions):
+                    self.execute_sql(f"""
+                        CREATE TABLE {table}_p{remainder} PARTITION OF {new}
+                        FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})
+                    """)
+
+                # Mirror every write to the live table into the partitioned table. Updates are applied as a delete and
+                # insert so the function doesn't need to list the columns.
+                self.execute_sql(f"""
+                    CREATE OR REPLACE FUNCTION {table}_partition_sync()
+                        RETURNS TRIGGER AS
+                    $BODY$
+                    BEGIN
+                        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                            DELETE FROM {new} WHERE id = OLD.id AND {key} = OLD.{key};
+                        END IF;
+                        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                            INSERT INTO {new} SELECT NEW.* ON CONFLICT DO NOTHING;
+                        END IF;
+                        RETURN NULL;
+                    END;
+                    $BODY$
+                    LANGUAGE plpgsql;
+                """)
+                self.execute_sql(f"""
+                    CREATE TRIGGER {table}_partition_sync
+                        AFTER INSERT OR UPDATE OR DELETE ON {table}
+                        FOR EACH ROW EXECUTE FUNCTION {table}_partition_sync()
+                """)
+            self.stdout.write(f'Created {new} with {partitions} partitions')
+
+    def backfill(self, batch_size: int, **options):
+        """
+        Copy the existing rows into the partitioned tables in batches of ids
+        """
+        for table, _ in TABLES:
+            new = partitioned(table)
+            if not self.table_exists(new):
+                raise CommandError(f'{new} does not exist, run the prepare step first')
+
+            low, high = self.execute_sql(f'SELECT MIN(id), MAX(id) FROM {table}')[0]
+            if low is None:
+                continue
+            copied = 0
+            for start in range(low, high + 1, batch_size):
+                # Rows written since the prepare step are already in the partitioned table via the trigger
+                with transaction.atomic(using=self.connection.alias):
+                    with self.connection.cursor() as cursor:
+                        cursor.execute(
+                            f'INSERT INTO {new} SELECT * FROM {table} WHERE id >= %s AND id < %s '
+                            'ON CONFLICT DO NOTHING',
+                            (start, start + batch_size),
+                        )
+                        copied += cursor.rowcount
+                self.stdout.write(f'{table}: copied up to id {min(start + batch_size - 1, high)} ({copied} rows)')
+
+    def index(self, **options):
+        """
+        Build the indexes of the live tables on the partitioned tables without blocking writes
+        """
+        for table, _ in TABLES:
+            new = partitioned(table)
+            partitions = [row[0] for row in self.execute_sql(
+                'SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = %s::regclass ORDER BY 1',
+                (new,),
+            )]
+            for name, definition in self.indexes(table).items():
+                match = INDEX_DEF.match(definition)
+                if match is None or match['unique']:
+                    raise CommandError(f'Index {name} on {table} can not be moved to a partitioned table')
+                parent = f'p_{name}'
+                state = self.index_state(parent)
+                if state is not None and state[0]:
+                    # The index is only valid once it is attached on every partition
+                    continue
+
+                # Create the index on the parent only, build it on each partition concurrently and attach them
+                self.execute_sql(f'CREATE INDEX IF NOT EXISTS {parent} ON ONLY {new} {match["rest"]}')
+                for number, partition in enumerate(partitions):
+                    child = f'{parent}_{number}'
+                    state = self.index_state(child)
+                    if state is not None and not state[0]:
+                        # A concurrent build that failed or was interrupted leaves an invalid index behind
+                        self.execute_sql(f'DROP INDEX CONCURRENTLY {child}')
+                        state = None
+                    if state is None:
+                        self.execute_sql(f'CREATE INDEX CONCURRENTLY {child} ON {partition} {match["rest"]}')
+                        state = (True, None)
+                    if state[1] != parent:
+                        self.execute_sql(f'ALTER INDEX {parent} ATTACH PARTITION {child}')
+                self.stdout.write(f'Built {parent} on {new}')
+
+    def verify(self, batch_size: int, **options):
+        """
+        Compare the partitioned tables with the live tables in batches of ids, and repair the rows that differ
+        """
+        for table, _ in TABLES:
+            new = partitioned(table)
+            if not self.table_exists(new):
+                raise CommandError(f'{new} does not exist, run the prepare step first')
+
+            low, high = self.execute_sql(f"""
+                SELECT LEAST(T.low, N.low), GREATEST(T.high, N.high)
+                FROM (SELECT MIN(id), MAX(id) FROM {table}) AS T(low, high)
+                CROSS JOIN (SELECT MIN(id), MAX(id) FROM {new}) AS N(low, high)
+            """)[0]
+            if low is None:
+                continue
+            repaired = 0
+            for start in range(low, high + 1, batch_size):
+                params = {'start': start, 'end': start + batch_size}
+                for attempt in range(VERIFY_ATTEMPTS + 1):
+                    # Both tables are read with one snapshot, and a mirrored write is made in the same transaction as
+                    # the write it mirrors, so writes in flight can't make the batch look different
+                    different = self.execute_sql(
+                        f"""
+                        SELECT COUNT(*)
+                        FROM (SELECT * FROM {table} WHERE id >= %(start)s AND id < %(end)s) AS T
+                        FULL JOIN (SELECT * FROM {new} WHERE id >= %(start)s AND id < %(end)s) AS N
+                        ON N.id = T.id
+                        WHERE T::text IS DISTINCT FROM N::text
+                        """,
+                        params,
+                    )[0][0]
+                    if different == 0:
+                        break
+                    if attempt == VERIFY_ATTEMPTS:
+                        raise CommandError(
+                            f'{new} still differs from {table} between ids {start} and {start + batch_size - 1} '
+                            f'after {VERIFY_ATTEMPTS} repairs. Make sure backfill is not running and try again.',
+                        )
+                    repaired += different
+                    with transaction.atomic(using=self.connection.alias):
+                        self.execute_sql(
+                            f"""
+                            DELETE FROM {new} AS N
+                            WHERE N.id >= %(start)s AND N.id < %(end)s
+                            AND NOT EXISTS (SELECT 1 FROM {table} AS T WHERE T.id = N.id AND T::text = N::text)
+                            """,
+                            params,
+                        )
+                        # The rows are locked so a write to one can't be mirrored before this copy of it is committed
+                        self.execute_sql(
+                            f"""
+                            INSERT INTO {new}
+                            SELECT * FROM {table} AS T
+                            WHERE T.id >= %(start)s AND T.id < %(end)s
+                            AND NOT EXISTS (SELECT 1 FROM {new} AS N WHERE N.id = T.id)
+                            FOR SHARE
+                            ON CONFLICT DO NOTHING
+                            """,
+                            params,
+                        )
+            self.stdout.write(f'{new} matches {table}, {repaired} rows were repaired')
+
+    def swap(self, batch_size: int, lock_timeout: str, **options):
+        """
+        Move the partitioned tables into place
+        """
+        for table, _ in TABLES:
+            new = partitioned(table)
+            if not self.table_exists(new):
+                raise CommandError(f'{new} does not exist, run the prepare step first')
+            invalid = []
+            for name in self.indexes(table):
+                state = self.index_state(f'p_{name}')
+                if state is None or not state[0]:
+                    invalid.append(f'p_{name}')
+            if len(invalid) > 0:
+                raise CommandError(
+                    f'{new} is missing indexes or has invalid indexes {", ".join(sorted(invalid))}, run the index step '
+                    'first',
+                )
+
+        # Check the copies before the lock is taken, so the tables are only locked for the renames
+        self.verify(batch_size)
+
+        names = ', '.join([table for table, _ in TABLES] + list(REFERENCING_TABLES))
+        with transaction.atomic(using=self.connection.alias):
+            self.execute_sql('SELECT set_config(%s, %s, true)', ('lock_timeout', lock_timeout))
+            self.execute_sql(f'LOCK TABLE {names} IN ACCESS EXCLUSIVE MODE')
+
+            view = self.execute_sql('SELECT pg_get_viewdef(%s::regclass, true)', (VIEW,))[0][0]
+            self.execute_sql(f'DROP VIEW {VIEW}')
+
+            # A foreign key can't reference a partitioned table unless it includes the partition key
+            foreign_keys = self.execute_sql(
+                """
+                SELECT conrelid::regclass::text, conname
+                FROM pg_constraint
+                WHERE contype = 'f' AND (confrelid = ANY(%s::regclass[]) OR conrelid = ANY(%s::regclass[]))
+                """,
+                ([table for table, _ in TABLES], [table for table, _ in TABLES]),
+            )
+            for owner, name in foreign_keys:
+                self.execute_sql(f'ALTER TABLE {owner} DROP CONSTRAINT {name}')
+                self.stdout.write(f'Dropped foreign key {name} on {owner}')
+
+            for table, _ in TABLES:
+                new = partitioned(table)
+                self.execute_sql(f'DROP TRIGGER {table}_partition_sync ON {table}')
+                self.execute_sql(f'DROP FUNCTION {table}_partition_sync()')
+
+                # Triggers follow the table they are on when it is renamed, so get their definitions to recreate them
+                # on the partitioned table once it has the table's name
+                triggers = [row[0] for row in self.execute_sql(
+                    'SELECT pg_get_triggerdef(oid) FROM pg_trigger WHERE tgrelid = %s::regclass AND NOT tgisinternal',
+                    (table,),
+                )]
+                sequence = self.execute_sql('SELECT pg_get_serial_sequence(%s, %s)', (table, 'id'))[0][0]
+                primary_key = self.execute_sql(
+                    "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'",
+                    (table,),
+                )[0][0]
+
+                # Move the old table and its indexes out of the way
+                self.execute_sql(f'ALTER TABLE {table} RENAME TO {unpartitioned(table)}')
+                self.execute_sql(f'ALTER TABLE {unpartitioned(table)} RENAME CONSTRAINT {primary_key} TO '
+                                 f'{unpartitioned(primary_key)}')
+                for name in self.indexes(unpartitioned(table)):
+                    self.execute_sql(f'ALTER INDEX {name} RENAME TO {unpartitioned(name)}')
+
+                # Give the partitioned table and its indexes the old names
+                self.execute_sql(f'ALTER TABLE {new} RENAME TO {table}')
+                self.execute_sql(f'ALTER TABLE {table} RENAME CONSTRAINT {new}_pkey TO {primary_key}')
+                for name in self.indexes(table):
+                    self.execute_sql(f'ALTER INDEX {name} RENAME TO {name[len("p_"):]}')
+                for definition in triggers:
+                    self.execute_sql(definition)
+
+                # The sequence is dropped with the table that owns it, so the new table has to own it. Sequences of
+                # identity columns can't be moved, so the old table must be kept.
+                identity = self.execute_sql(
+                    "SELECT attidentity <> '' FROM pg_attribute WHERE attrelid = %s::regclass AND attname = 'id'",
+                    (unpartitioned(table),),
+                )[0][0]
+                if identity:
+                    self.stdout.write(f'The id sequence of {table} belongs to {unpartitioned(table)}, do not drop it')
+                else:
+                    self.execute_sql(f'ALTER SEQUENCE {sequence} OWNED BY {table}.id')
+
+                self.stdout.write(f'{table} is now partitioned, the old table is {unpartitioned(table)}')
+
+            self.execute_sql(f'CREATE VIEW {VIEW} AS {view}')
@@ -0,0 +1,175 @@
+"""
+Run the benchmark scenarios against the dataset built with `build_benchmark_dataset`, see `financial.benchmarks`.
+
+Save a baseline with `--save-baseline` before a change and compare against it with `--baseline` afterwards. The command
+fails if any scenario has regressed: its status code changed, it ran more queries, or its p95 latency grew by more than
+the tolerance.
+
+`--serialization` runs the serialization benchmark instead, which compares the per row cost of serializing Nominal
+Ledger entries with each sparse fieldset against the full serializer without the cached Resource URLs, see
+`financial.benchmarks.serialization`.
+
+`--partitioning` runs the partitioning benchmark instead, which compares the hot ledger queries on the tables converted
+by `partition_ledger` with the unpartitioned tables it keeps after the swap, see `financial.benchmarks.partitioning`.
+Run it against the `xlarge` dataset.
+"""
+# libs
+from django.core.management.base import BaseCommand, CommandError
+from django.db import router
+# local
+from financial.benchmarks import (
+    compare,
+    load_baseline,
+    run,
+    run_partitioning,
+    run_serialization,
+    save_baseline,
+    Scale,
+    SCALES,
+    scenarios,
+    table_rows,
+)
+from financial.management.commands.partition_ledger import TABLES, unpartitioned
+from financial.models import NominalLedger
+from financial.sharding import shard_for, use_shard
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the report and allocation services against the synthetic ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            choices=sorted(SCALES),
+            default='small',
+            help='The size of the dataset the benchmarks run against. Defaults to small.',
+        )
+        parser.add_argument(
+            '--first-address-id',
+            type=int,
+            default=1,
+            help='The id of the first Address of the dataset. Defaults to 1.',
+        )
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            dest='scenarios',
+            help='Only run this scenario. Can be given more than once.',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=10,
+            help='The number of timed runs of each scenario. Defaults to 10.',
+        )
+        parser.add_argument(
+            '--cached',
+            action='store_true',
+            help='Keep the report cache between runs, to measure cached reports.',
+        )
+        parser.add_argument(
+            '--serialization',
+            action='store_true',
+            help='Run the per row serialization benchmark of the sparse fieldsets instead of the scenarios.',
+        )
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=1000,
+            help='The number of Nominal Ledger entries serialized by the serialization benchmark. Defaults to 1000.',
+        )
+        parser.add_argument(
+            '--partitioning',
+            action='store_true',
+            help='Compare the hot ledger queries on the partitioned tables with the unpartitioned tables instead.',
+        )
+        parser.add_argument('--baseline', help='Compare the results against the baseline saved in this file.')
+        parser.add_argument('--save-baseline', help='Save the results as a baseline to this file.')
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.2,
+            help='The fraction the p95 latency of a scenario may grow by before it is a regression. Defaults to 0.2.',
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1')
+
+        scale = SCALES[options['scale']]._replace(first_address_id=options['first_address_id'])
+        if options['serialization']:
+            self._serialization(scale, options['rows'], options['iterations'])
+            return
+        if options['partitioning']:
+            self._partitioning(scale, options['iterations'])
+            return
+
+        selected = scenarios(scale)
+        if options['scenarios'] is not None:
+            unknown = set(options['scenarios']) - {scenario.name for scenario in selected}
+            if len(unknown) > 0:
+                raise CommandError(f'Unknown scenarios: {", ".join(sorted(unknown))}')
+            selected = [scenario for scenario in selected if scenario.name in options['scenarios']]
+
+        results = run(selected, scale, iterations=options['iterations'], cached=options['cached'])
+
+        self.stdout.write(f'{"scenario":<28}{"status":>8}{"queries":>9}{"memory KiB":>12}{"p50 ms":>10}{"p95 ms":>10}')
+        for result in results:
+            self.stdout.write(
+                f'{result.name:<28}{result.status_code:>8}{result.queries:>9}{result.peak_memory:>12}'
+                f'{result.p50:>10}{result.p95:>10}',
+            )
+
+        if options['save_baseline']:
+            save_baseline(options['save_baseline'], results)
+            self.stdout.write(f'Saved the baseline to {options["save_baseline"]}')
+
+        if options['baseline']:
+            regressions = compare(results, load_baseline(options['baseline']), options['tolerance'])
+            for name, regression in regressions:
+                self.stdout.write(self.style.ERROR(f'{name}: {regression}'))
+            if len(regressions) > 0:
+                raise CommandError(f'{len(regressions)} regressions against {options["baseline"]}')
+        self.stdout.write(self.style.SUCCESS(f'Ran {len(results)} scenarios'))
+
+    def _serialization(self, scale: Scale, rows: int, iterations: int):
+        if rows < 1:
+            raise CommandError('--rows must be at least 1')
+        results = run_serialization(scale, rows=rows, iterations=iterations)
+        if len(results) == 0:
+            raise CommandError(f'Address {scale.first_address_id} has no Nominal Ledger entries')
+
+        self.stdout.write(
+            f'{"fieldset":<28}{"rows":>8}{"queries":>9}{"p50 us/row":>12}{"p95 us/row":>12}{"speedup":>9}',
+        )
+        for result in results:
+            self.stdout.write(
+                f'{result.name:<28}{result.rows:>8}{result.queries:>9}{result.p50:>12}{result.p95:>12}'
+                f'{result.speedup:>9}',
+            )
+        self.stdout.write(self.style.SUCCESS(f'Serialized {results[0].rows} entries with {len(results)} fieldsets'))
+
+    def _partitioning(self, scale: Scale, iterations: int):
+        with use_shard(shard_for(scale.first_address_id)):
+            rows = table_rows(router.db_for_read(NominalLedger))
+        tables = [name for table, _ in TABLES for name in (table, unpartitioned(table))]
+        missing = [table for table in tables if table not in rows]
+        if len(missing) > 0:
+            raise CommandError(
+                f'{", ".join(missing)} not found. Run partition_ledger through the swap step, and keep the '
+                'unpartitioned tables, to compare the layouts',
+            )
+        for table in tables:
+            self.stdout.write(f'{table}: about {rows[table]:,} rows')
+
+        results = run_partitioning(scale, iterations=iterations)
+        self.stdout.write(
+            f'{"query":<24}{"rows":>8}{"unpart. p50":>13}{"unpart. p95":>13}{"part. p50":>11}{"part. p95":>11}'
+            f'{"speedup":>9}',
+        )
+        for result in results:
+            self.stdout.write(
+                f'{result.name:<24}{result.rows:>8}{result.unpartitioned_p50:>13}{result.unpartitioned_p95:>13}'
+                f'{result.partitioned_p50:>11}{result.partitioned_p95:>11}{result.speedup:>9}',
+            )
+        self.stdout.write(self.style.SUCCESS(f'Compared {len(results)} queries on the two layouts'))
@@ -0,0 +1,102 @@
+"""
+Load test the services that write to the ledger, see `financial.benchmarks.load`.
+
+Run it against the dataset built with `build_benchmark_dataset`, which needs at least two Addresses. The Membership and
+Reporting APIs are replaced by a local stand-in for the duration, with the latency and error rate given. The database
+needs more connections than the highest level of concurrency.
+"""
+# libs
+from django.core.management.base import BaseCommand, CommandError
+# local
+from financial.benchmarks import SCALES
+from financial.benchmarks.load import CONCURRENCY, OPERATIONS, run
+
+
+class Command(BaseCommand):
+    help = 'Measure the throughput, latency, lock waits and deadlocks of ledger writes as concurrency grows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            choices=sorted(SCALES),
+            default='small',
+            help='The size of the dataset the load test runs against. Defaults to small.',
+        )
+        parser.add_argument(
+            '--first-address-id',
+            type=int,
+            default=1,
+            help='The id of the first Address of the dataset. Defaults to 1.',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            action='append',
+            help=f'The number of workers of a level. Can be given more than once. Defaults to {CONCURRENCY}.',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=30,
+            help='The seconds each level runs for. Defaults to 30.',
+        )
+        parser.add_argument(
+            '--operation',
+            action='append',
+            dest='operations',
+            choices=sorted(OPERATIONS),
+            help='Only run this operation. Can be given more than once.',
+        )
+        parser.add_argument(
+            '--api-latency',
+            type=float,
+            default=0.05,
+            help='The seconds the stand-in Membership and Reporting APIs take to respond. Defaults to 0.05.',
+        )
+        parser.add_argument(
+            '--api-jitter',
+            type=float,
+            default=0.0,
+            help='Up to this many seconds are added to the latency of each API response at random.',
+        )
+        parser.add_argument(
+            '--api-error-rate',
+            type=float,
+            default=0.0,
+            help='The fraction of API requests, between 0 and 1, that fail. Defaults to 0.',
+        )
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency'] or CONCURRENCY
+        if min(concurrency) < 1:
+            raise CommandError('--concurrency must be at least 1')
+        if not 0 <= options['api_error_rate'] <= 1:
+            raise CommandError('--api-error-rate must be between 0 and 1')
+
+        scale = SCALES[options['scale']]._replace(first_address_id=options['first_address_id'])
+        try:
+            results = run(
+                scale,
+                concurrency=concurrency,
+                duration=options['duration'],
+                latency=options['api_latency'],
+                jitter=options['api_jitter'],
+                error_rate=options['api_error_rate'],
+                operations=options['operations'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            f'{"workers":>8}{"tps":>10}{"p50 ms":>10}{"p99 ms":>10}{"lock wait s":>13}{"deadlocks":>11}'
+            f'{"errors":>8}{"api calls":>11}',
+        )
+        for result in results:
+            self.stdout.write(
+                f'{result.concurrency:>8}{result.tps:>10}{result.p50:>10}{result.p99:>10}{result.lock_wait:>13}'
+                f'{result.deadlocks:>11}{sum(result.errors.values()):>8}{result.api_requests:>11}',
+            )
+        for result in results:
+            for error, count in sorted(result.errors.items()):
+                self.stdout.write(f'{result.concurrency} workers: {error}: {count}')
+        self.stdout.write(self.style.SUCCESS(f'Ran {len(results)} levels'))
@@ -0,0 +1,35 @@
+"""
+Run the report workers that run Report Jobs in the background, see `financial.report_jobs`.
+
+Each worker process runs one job at a time. Stop the workers with SIGINT or SIGTERM, which lets each worker finish the
+job it is running first.
+"""
+# libs
+from django.core.management.base import BaseCommand, CommandError
+# local
+from financial.report_jobs import run_workers
+
+
+class Command(BaseCommand):
+    help = 'Run a pool of worker processes that run the queued Report Jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=4,
+            help='The number of worker processes. Defaults to 4.',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='The seconds idle workers wait between checks for queued jobs. Defaults to 1.',
+        )
+
+    def handle(self, *args, **options):
+        if options['processes'] < 1:
+            raise CommandError('--processes must be at least 1')
+        self.stdout.write(f'Starting {options["processes"]} report workers')
+        run_workers(options['processes'], options['poll_interval'])
+        self.stdout.write(self.style.SUCCESS('Report workers stopped'))
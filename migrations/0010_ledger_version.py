@@ -0,0 +1,189 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financial', '0009_dgango5_view_and_trigger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('address_id', models.IntegerField(unique=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'ledger_version',
+            },
+        ),
+        # ############################################################################## #
+        #          Increment the ledger_version of the Addresses in a set of rows        #
+        # ############################################################################## #
+        # Email Logs are included as they are serialized with the Nominal Ledger entries in the transaction lists.
+        # Statement level triggers with transition tables are used so that a bulk insert of lines only increments each
+        # Address once. Addresses are upserted in a fixed order so that concurrent statements cannot deadlock.
+        migrations.RunSQL(
+            """
+            CREATE OR REPLACE FUNCTION nominal_ledger_version()
+                RETURNS TRIGGER AS
+            $BODY$
+            BEGIN
+                INSERT INTO ledger_version (address_id, version, updated)
+                SELECT DISTINCT address_id, 1, now()
+                FROM changed_rows
+                ORDER BY address_id
+                ON CONFLICT (address_id) DO UPDATE
+                SET version = ledger_version.version + 1, updated = EXCLUDED.updated;
+                RETURN NULL;
+            END;
+            $BODY$
+                LANGUAGE plpgsql VOLATILE
+                COST 100;
+
+            CREATE OR REPLACE FUNCTION nominal_ledger_line_version()
+                RETURNS TRIGGER AS
+            $BODY$
+            BEGIN
+                INSERT INTO ledger_version (address_id, version, updated)
+                SELECT DISTINCT NL.address_id, 1, now()
+                FROM changed_rows AS CR
+                INNER JOIN nominal_ledger AS NL
+                ON NL.id = CR.nominal_ledger_id
+                ORDER BY NL.address_id
+                ON CONFLICT (address_id) DO UPDATE
+                SET version = ledger_version.version + 1, updated = EXCLUDED.updated;
+                RETURN NULL;
+            END;
+            $BODY$
+                LANGUAGE plpgsql VOLATILE
+                COST 100;
+            """,
+            reverse_sql="""
+            DROP FUNCTION IF EXISTS nominal_ledger_line_version();
+            DROP FUNCTION IF EXISTS nominal_ledger_version();
+            """,
+        ),
+        # ############################################################################## #
+        #                                    Triggers                                    #
+        # ############################################################################## #
+        # Postgres does not allow transition tables on triggers with more than one event, so each event needs its own
+        migrations.RunSQL(
+            """
+            CREATE TRIGGER nominal_ledger_version_insert
+                AFTER INSERT ON nominal_ledger
+                REFERENCING NEW TABLE AS changed_rows
+                FOR EACH STATEMENT EXECUTE PROCEDURE nominal_ledger_version();
+
+            CREATE TRIGGER nominal_ledger_version_update
+                AFTER UPDATE ON nominal_ledger
+                REFERENCING NEW TABLE AS changed_rows
+                FOR EACH STATEMENT EXECUTE PROCEDURE nominal_ledger_version();
+
+            CREATE TRIGGER nominal_ledger_version_delete
+                AFTER DELETE ON nominal_ledger
+                REFERENCING OLD TABLE AS changed_rows
+                FOR EACH STATEMENT EXECUTE PROCEDURE nominal_ledger_version();
+            """,
+            reverse_sql="""
+            DROP TRIGGER IF EXISTS nominal_ledger_version_insert ON nominal_ledger;
+            DROP TRIGGER IF EXISTS nominal_ledger_version_update ON nominal_ledger;
+            DROP TRIGGER IF EXISTS nominal_ledger_version_delete ON nominal_ledger;
+            """,
+        ),
+        migrations.RunSQL(
+            """
+            CREATE TRIGGER nominal_ledger_credits_version_insert
+                AFTER INSERT ON nominal_ledger_credits
+                REFERENCING NEW TABLE AS changed_rows
+                FOR EACH STATEMENT EXECUTE PROCEDURE nominal_ledger_line_version();
+
+            CREATE TRIGGER nominal_ledger_credits_version_update
+                AFTER UPDATE ON nominal_ledger_credits
+                REFERENCING NEW TABLE AS changed_rows
+                FOR EACH STATEMENT EXECUTE PROCEDURE nominal_ledger_line_version();
+
+            CREATE TRIGGER nominal_ledger_credits_version_delete
+                AFTER DELETE ON nominal_ledger_credits
+                REFERENCING OLD TABLE AS changed_rows
+                FOR EACH STATEMENT EXECUTE PROCEDURE nominal_ledger_line_version();
+            """,
+            reverse_sql="""
+            DROP TRIGGER IF EXISTS nominal_ledger_credits_version_insert ON nominal_ledger_credits;
+            DROP TRIGGER IF EXISTS nominal_ledger_credits_version_update ON nominal_ledger_credits;
+            DROP TRIGGER IF EXISTS nominal_ledger_credits_version_delete ON nominal_ledger_credits;
+            """,
+        ),
+        migrations.RunSQL(
+            """
+            CREATE TRIGGER nominal_ledger_debits_version_insert
+                AFTER INSERT ON nominal_ledger_debits
+                REFERENCING NEW TABLE AS changed_rows
+                FOR EACH STATEMENT EXECUTE PROCEDURE nominal_ledger_line_version();
+
+            CREATE TRIGGER nominal_ledger_debits_version_update
+                AFTER UPDATE ON nominal_ledger_debits
+                REFERENCING NEW TABLE AS changed_rows
+                FOR EACH STATEMENT EXECUTE PROCEDURE nominal_ledger_line_version();
+
+            CREATE TRIGGER nominal_ledger_debits_version_delete
+                AFTER DELETE ON nominal_ledger_debits
+                REFERENCING OLD TABLE AS changed_rows
+                FOR EACH STATEMENT EXECUTE PROCEDURE nominal_ledger_line_version();
+            """,
+            reverse_sql="""
+            DROP TRIGGER IF EXISTS nominal_ledger_debits_version_insert ON nominal_ledger_debits;
+            DROP TRIGGER IF EXISTS nominal_ledger_debits_version_update ON nominal_ledger_debits;
+            DROP TRIGGER IF EXISTS nominal_ledger_debits_version_delete ON nominal_ledger_debits;
+            """,
+        ),
+        migrations.RunSQL(
+            """
+            CREATE TRIGGER allocation_detail_version_insert
+                AFTER INSERT ON allocation_detail
+                REFERENCING NEW TABLE AS changed_rows
+                FOR EACH STATEMENT EXECUTE PROCEDURE nominal_ledger_line_version();
+
+            CREATE TRIGGER allocation_detail_version_update
+                AFTER UPDATE ON allocation_detail
+                REFERENCING NEW TABLE AS changed_rows
+                FOR EACH STATEMENT EXECUTE PROCEDURE nominal_ledger_line_version();
+
+            CREATE TRIGGER allocation_detail_version_delete
+                AFTER DELETE ON allocation_detail
+                REFERENCING OLD TABLE AS changed_rows
+                FOR EACH STATEMENT EXECUTE PROCEDURE nominal_ledger_line_version();
+            """,
+            reverse_sql="""
+            DROP TRIGGER IF EXISTS allocation_detail_version_insert ON allocation_detail;
+            DROP TRIGGER IF EXISTS allocation_detail_version_update ON allocation_detail;
+            DROP TRIGGER IF EXISTS allocation_detail_version_delete ON allocation_detail;
+            """,
+        ),
+        migrations.RunSQL(
+            """
+            CREATE TRIGGER email_log_version_insert
+                AFTER INSERT ON email_log
+                REFERENCING NEW TABLE AS changed_rows
+                FOR EACH STATEMENT EXECUTE PROCEDURE nominal_ledger_line_version();
+
+            CREATE TRIGGER email_log_version_update
+                AFTER UPDATE ON email_log
+                REFERENCING NEW TABLE AS changed_rows
+                FOR EACH STATEMENT EXECUTE PROCEDURE nominal_ledger_line_version();
+
+            CREATE TRIGGER email_log_version_delete
+                AFTER DELETE ON email_log
+                REFERENCING OLD TABLE AS changed_rows
+                FOR EACH STATEMENT EXECUTE PROCEDURE nominal_ledger_line_version();
+            """,
+            reverse_sql="""
+            DROP TRIGGER IF EXISTS email_log_version_insert ON email_log;
+            DROP TRIGGER IF EXISTS email_log_version_update ON email_log;
+            DROP TRIGGER IF EXISTS email_log_version_delete ON email_log;
+            """,
+        ),
+    ]
@@ -0,0 +1,158 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financial', '0010_ledger_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JournalImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('deleted', models.DateTimeField(null=True)),
+                ('extra', models.JSONField(default=dict)),
+                ('address_id', models.IntegerField()),
+                ('file_format', models.CharField(max_length=10)),
+                ('journals_imported', models.IntegerField(default=0)),
+                ('journals_rejected', models.IntegerField(default=0)),
+                ('rows_rejected', models.IntegerField(default=0)),
+                ('rows_total', models.IntegerField(default=0)),
+                ('status', models.CharField(default='staged', max_length=10)),
+                ('user_id', models.IntegerField()),
+            ],
+            options={
+                'db_table': 'journal_import',
+                'indexes': [models.Index(fields=['address_id'], name='journal_import_address_id')],
+            },
+        ),
+        migrations.CreateModel(
+            name='JournalImportRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('credit', models.TextField(null=True)),
+                ('debit', models.TextField(null=True)),
+                ('description', models.TextField(null=True)),
+                ('error', models.TextField(null=True)),
+                ('journal_import', models.ForeignKey(
+                    db_constraint=False,
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='rows',
+                    to='financial.journalimport',
+                )),
+                ('narrative', models.TextField(null=True)),
+                ('nominal_account_number', models.TextField(null=True)),
+                ('nominal_ledger_id', models.BigIntegerField(null=True)),
+                ('reference', models.TextField(null=True)),
+                ('row_number', models.IntegerField()),
+                ('tax_rate_id', models.TextField(null=True)),
+                ('transaction_date', models.TextField(null=True)),
+            ],
+            options={
+                'db_table': 'journal_import_row',
+                'ordering': ['row_number'],
+                'indexes': [
+                    models.Index(fields=['journal_import', 'reference'], name='journal_import_row_reference'),
+                ],
+            },
+        ),
+        # ############################################################################## #
+        #          The staging table is not WAL logged to make loading it cheaper        #
+        # ############################################################################## #
+        # Rows are only kept until their import has been posted, so losing them in a crash only means the file has to
+        # be imported again
+        migrations.RunSQL(
+            'ALTER TABLE journal_import_row SET UNLOGGED;',
+            reverse_sql='ALTER TABLE journal_import_row SET LOGGED;',
+        ),
+        # ############################################################################## #
+        #                  Cast staged text to a date without raising                    #
+        # ############################################################################## #
+        migrations.RunSQL(
+            """
+            CREATE OR REPLACE FUNCTION journal_import_date(value text)
+                RETURNS date AS
+            $BODY$
+            BEGIN
+                IF value !~ '^\\d{4}-\\d{2}-\\d{2}$' THEN
+                    RETURN NULL;
+                END IF;
+                RETURN value::date;
+            EXCEPTION WHEN others THEN
+                RETURN NULL;
+            END;
+            $BODY$
+                LANGUAGE plpgsql IMMUTABLE
+                COST 100;
+            """,
+            reverse_sql='DROP FUNCTION IF EXISTS journal_import_date(text);',
+        ),
+        # ############################################################################## #
+        #        Allow bulk inserts to supply their own transaction_sequence_number      #
+        # ############################################################################## #
+        # When the `financial.bulk_tsn` setting is on for the transaction, rows that already have a tsn keep it. Bulk
+        # imports assign the TSNs for all of their entries in one pass while holding the Nominal Ledger lock, instead
+        # of running the MAX(tsn) lookup once per row.
+        migrations.RunSQL(
+            """
+            CREATE OR REPLACE FUNCTION insert_nominal_ledger_tsn()
+                RETURNS TRIGGER AS
+            $BODY$
+            DECLARE
+                new_tsn integer;
+            BEGIN
+                IF NEW.tsn IS NOT NULL AND current_setting('financial.bulk_tsn', true) = 'on' THEN
+                    RETURN NEW;
+                END IF;
+                SELECT COALESCE(
+                    MAX(tsn),
+                    0
+                ) + 1 INTO new_tsn
+                FROM nominal_ledger
+                WHERE deleted IS NULL
+                AND address_id = NEW.address_id
+                AND transaction_type_id = NEW.transaction_type_id;
+                New.tsn := new_tsn;
+                IF NEW.tsn IS NULL THEN
+                    NEW.tsn := 1;
+                END IF;
+                RETURN NEW;
+            END;
+            $BODY$
+
+            LANGUAGE plpgsql VOLATILE
+            COST 100;
+            """,
+            reverse_sql="""
+            CREATE OR REPLACE FUNCTION insert_nominal_ledger_tsn()
+                RETURNS TRIGGER AS
+            $BODY$
+            DECLARE
+                new_tsn integer;
+            BEGIN
+                SELECT COALESCE(
+                    MAX(tsn),
+                    0
+                ) + 1 INTO new_tsn
+                FROM nominal_ledger
+                WHERE deleted IS NULL
+                AND address_id = NEW.address_id
+                AND transaction_type_id = NEW.transaction_type_id;
+                New.tsn := new_tsn;
+                IF NEW.tsn IS NULL THEN
+                    NEW.tsn := 1;
+                END IF;
+                RETURN NEW;
+            END;
+            $BODY$
+
+            LANGUAGE plpgsql VOLATILE
+            COST 100;
+            """,
+        ),
+    ]
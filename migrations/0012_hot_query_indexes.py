@@ -0,0 +1,57 @@
+# Generated by Django 5.0.10 on 2026-10-19 09:00
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Indexes are built concurrently so the ledger tables are not locked against writes while they build, which can't
+    # be done inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('financial', '0011_journal_import'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='nominalledger',
+            index=models.Index(
+                condition=models.Q(deleted__isnull=True),
+                fields=['address_id', 'transaction_type_id', 'tsn'],
+                name='ledger_address_type_tsn',
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name='nominalledger',
+            index=models.Index(
+                condition=models.Q(deleted__isnull=True) & ~models.Q(unallocated_balance=0),
+                fields=['address_id', 'contra_address_id', 'transaction_type_id'],
+                name='ledger_outstanding',
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name='nominalledger',
+            index=models.Index(
+                condition=models.Q(contra_nominal_ledger__isnull=True, deleted__isnull=True),
+                fields=['contra_address_id'],
+                name='ledger_pending_contra',
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name='nominalledgerdebit',
+            index=models.Index(
+                condition=models.Q(deleted__isnull=True),
+                fields=['nominal_ledger', 'nominal_account_number'],
+                name='ledger_debit_ledger_account',
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name='nominalledgercredit',
+            index=models.Index(
+                condition=models.Q(deleted__isnull=True),
+                fields=['nominal_ledger', 'nominal_account_number'],
+                name='ledger_credit_ledger_account',
+            ),
+        ),
+    ]
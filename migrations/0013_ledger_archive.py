@@ -0,0 +1,58 @@
+# Generated by Django 5.0.10 on 2026-10-19 09:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# The archive tables for the lines are created by the first run of `archive_ledger`, see `financial.archive`, so that a
+# ledger that is never archived can still be partitioned by `partition_ledger`
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financial', '0012_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('address_id', models.IntegerField()),
+                ('archived_to', models.DateField()),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('credits_archived', models.IntegerField(default=0)),
+                ('debits_archived', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'ledger_archive',
+                'indexes': [models.Index(fields=['address_id', 'archived_to'], name='ledger_archive_address_date')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LedgerArchiveBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('address_id', models.IntegerField()),
+                ('credits', models.DecimalField(decimal_places=4, default=0, max_digits=23)),
+                ('debits', models.DecimalField(decimal_places=4, default=0, max_digits=23)),
+                ('ledger_archive', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='balances',
+                    to='financial.ledgerarchive',
+                )),
+                ('nominal_account_number', models.IntegerField()),
+                ('transaction_type_id', models.IntegerField()),
+            ],
+            options={
+                'db_table': 'ledger_archive_balance',
+                'indexes': [
+                    models.Index(
+                        fields=['address_id', 'nominal_account_number'],
+                        name='ledger_archive_balance_account',
+                    ),
+                ],
+            },
+        ),
+    ]
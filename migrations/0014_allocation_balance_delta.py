@@ -0,0 +1,99 @@
+from django.db import migrations
+
+
+# The allocated amount of each Allocation Detail in a transition table, i.e. the change it makes to unallocated_balance.
+# Deleted Allocation Details don't count towards the balance, the same as in get_unallocated_balance
+NEW_DELTAS = 'SELECT nominal_ledger_id, debit_amount + credit_amount AS delta FROM new_rows WHERE deleted IS NULL'
+OLD_DELTAS = (
+    'SELECT nominal_ledger_id, (debit_amount + credit_amount) * -1 AS delta FROM old_rows WHERE deleted IS NULL'
+)
+
+# Apply the changes made by a statement to the unallocated_balance of each Nominal Ledger entry it touched, once per
+# entry. The entries are locked in id order first so concurrent statements can't deadlock.
+BALANCE_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION {name}()
+    RETURNS TRIGGER AS
+$BODY$
+BEGIN
+    PERFORM 1
+    FROM nominal_ledger
+    WHERE id IN (SELECT nominal_ledger_id FROM ({deltas}) AS D)
+    ORDER BY id
+    FOR UPDATE;
+
+    UPDATE nominal_ledger AS NL
+    SET unallocated_balance = NL.unallocated_balance + D.delta
+    FROM (
+        SELECT nominal_ledger_id, SUM(delta) AS delta
+        FROM ({deltas}) AS D
+        GROUP BY nominal_ledger_id
+    ) AS D
+    WHERE NL.id = D.nominal_ledger_id
+    AND D.delta <> 0;
+    RETURN NULL;
+END;
+$BODY$
+    LANGUAGE plpgsql VOLATILE
+    COST 100;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financial', '0013_ledger_archive'),
+    ]
+
+    operations = [
+        # ############################################################################## #
+        #     Maintain unallocated_balance from the changes to the Allocation Details    #
+        # ############################################################################## #
+        # The row trigger re-summed every control account line and Allocation Detail of the entry for each Allocation
+        # Detail written. These statement triggers only add the change in the allocated amounts, so the cost of an
+        # allocation depends on its size, not on the history of the entries it allocates. get_unallocated_balance is
+        # kept for the integrity test.
+        migrations.RunSQL(
+            BALANCE_FUNCTION_SQL.format(name='allocation_detail_balance_insert', deltas=NEW_DELTAS)
+            + BALANCE_FUNCTION_SQL.format(
+                name='allocation_detail_balance_update',
+                deltas=f'{NEW_DELTAS} UNION ALL {OLD_DELTAS}',
+            )
+            + BALANCE_FUNCTION_SQL.format(name='allocation_detail_balance_delete', deltas=OLD_DELTAS),
+            reverse_sql="""
+            DROP FUNCTION IF EXISTS allocation_detail_balance_insert();
+            DROP FUNCTION IF EXISTS allocation_detail_balance_update();
+            DROP FUNCTION IF EXISTS allocation_detail_balance_delete();
+            """,
+        ),
+        # ############################################################################## #
+        #                                    Triggers                                    #
+        # ############################################################################## #
+        # Postgres does not allow transition tables on triggers with more than one event, so each event needs its own
+        migrations.RunSQL(
+            """
+            DROP TRIGGER IF EXISTS allocation_create_balance ON allocation_detail;
+
+            CREATE TRIGGER allocation_detail_balance_insert
+                AFTER INSERT ON allocation_detail
+                REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE PROCEDURE allocation_detail_balance_insert();
+            CREATE TRIGGER allocation_detail_balance_update
+                AFTER UPDATE ON allocation_detail
+                REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE PROCEDURE allocation_detail_balance_update();
+            CREATE TRIGGER allocation_detail_balance_delete
+                AFTER DELETE ON allocation_detail
+                REFERENCING OLD TABLE AS old_rows
+                FOR EACH STATEMENT EXECUTE PROCEDURE allocation_detail_balance_delete();
+            """,
+            reverse_sql="""
+            DROP TRIGGER IF EXISTS allocation_detail_balance_insert ON allocation_detail;
+            DROP TRIGGER IF EXISTS allocation_detail_balance_update ON allocation_detail;
+            DROP TRIGGER IF EXISTS allocation_detail_balance_delete ON allocation_detail;
+
+            CREATE TRIGGER allocation_create_balance
+                AFTER INSERT OR UPDATE ON allocation_detail
+                FOR EACH ROW EXECUTE PROCEDURE update_unallocated_balance();
+            """,
+        ),
+    ]
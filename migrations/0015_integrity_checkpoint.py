@@ -0,0 +1,67 @@
+# Generated by Django 5.0.10 on 2026-10-19 09:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financial', '0014_allocation_balance_delta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='integritytest',
+            name='full',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='IntegrityCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('address_id', models.IntegerField(unique=True)),
+                ('checked', models.DateTimeField()),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'integrity_checkpoint',
+            },
+        ),
+        migrations.CreateModel(
+            name='IntegrityTestCheck',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('duration', models.FloatField()),
+                ('errors_found', models.IntegerField()),
+                ('integrity_test', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='checks',
+                    to='financial.integritytest',
+                )),
+                ('name', models.CharField(max_length=50)),
+                ('records_tested', models.IntegerField()),
+            ],
+            options={
+                'db_table': 'integrity_test_check',
+            },
+        ),
+        migrations.CreateModel(
+            name='IntegrityDefect',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('address_id', models.IntegerField()),
+                ('check_name', models.CharField(max_length=50)),
+                ('detail', models.TextField()),
+                ('integrity_test', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='defects',
+                    to='financial.integritytest',
+                )),
+                ('nominal_ledger_id', models.IntegerField()),
+            ],
+            options={
+                'db_table': 'integrity_defect',
+            },
+        ),
+    ]
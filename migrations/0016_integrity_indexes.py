@@ -0,0 +1,86 @@
+# Generated by Django 5.0.10 on 2026-10-19 09:00
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class AddLedgerIndexConcurrently(AddIndexConcurrently):
+    """
+    Postgres can't build an index concurrently on a partitioned table, so once `partition_ledger` has converted the
+    table the index is created on the partitioned table only, built on each partition concurrently and attached, the
+    way `partition_ledger index` moves the existing indexes. Partition indexes left invalid by an interrupted build are
+    rebuilt when the migration is re-run.
+    """
+
+    def partitions(self, schema_editor, table):
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT inhrelid::regclass::text
+                FROM pg_inherits
+                JOIN pg_class ON pg_class.oid = pg_inherits.inhparent
+                WHERE pg_inherits.inhparent = %s::regclass AND pg_class.relkind = 'p'
+                ORDER BY 1
+                """,
+                (table,),
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        table = model._meta.db_table
+        partitions = self.partitions(schema_editor, table)
+        if len(partitions) == 0:
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+            return
+
+        name = self.index.name
+        columns = ', '.join(schema_editor.quote_name(model._meta.get_field(f).column) for f in self.index.fields)
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON ONLY {table} ({columns})')
+        for number, partition in enumerate(partitions):
+            child = f'{name}_{number}'
+            with schema_editor.connection.cursor() as cursor:
+                cursor.execute('SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)', (child,))
+                row = cursor.fetchone()
+            if row is not None and not row[0]:
+                schema_editor.execute(f'DROP INDEX CONCURRENTLY {child}')
+            schema_editor.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {child} ON {partition} ({columns})')
+            # Attaching an index that is already attached to this index does nothing
+            schema_editor.execute(f'ALTER INDEX {name} ATTACH PARTITION {child}')
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if len(self.partitions(schema_editor, model._meta.db_table)) == 0:
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+            return
+        # Dropping the index of a partitioned table drops the indexes of its partitions with it, but not concurrently
+        schema_editor.execute(f'DROP INDEX IF EXISTS {self.index.name}')
+
+
+class Migration(migrations.Migration):
+    # Indexes are built concurrently so the ledger tables are not locked against writes while they build, which can't
+    # be done inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('financial', '0015_integrity_checkpoint'),
+    ]
+
+    operations = [
+        AddLedgerIndexConcurrently(
+            model_name='nominalledger',
+            index=models.Index(fields=['address_id', 'updated'], name='ledger_address_updated'),
+        ),
+        AddLedgerIndexConcurrently(
+            model_name='nominalledgerdebit',
+            index=models.Index(fields=['updated'], name='ledger_debit_updated'),
+        ),
+        AddLedgerIndexConcurrently(
+            model_name='nominalledgercredit',
+            index=models.Index(fields=['updated'], name='ledger_credit_updated'),
+        ),
+    ]
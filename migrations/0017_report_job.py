@@ -0,0 +1,55 @@
+# Generated by Django 5.0.10 on 2026-10-19 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financial', '0016_integrity_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('deleted', models.DateTimeField(null=True)),
+                ('extra', models.JSONField(default=dict)),
+                ('access_key', models.CharField(default='', max_length=40)),
+                ('address_id', models.IntegerField()),
+                ('dedup_key', models.CharField(max_length=40)),
+                ('error', models.TextField(null=True)),
+                ('expires', models.DateTimeField(null=True)),
+                ('finished', models.DateTimeField(null=True)),
+                ('params', models.JSONField(default=dict)),
+                ('progress', models.SmallIntegerField(default=0)),
+                ('report', models.CharField(max_length=50)),
+                ('result', models.JSONField(null=True)),
+                ('stage', models.CharField(default='', max_length=100)),
+                ('stages', models.SmallIntegerField(null=True)),
+                ('started', models.DateTimeField(null=True)),
+                ('status', models.CharField(default='queued', max_length=10)),
+                ('status_code', models.SmallIntegerField(null=True)),
+                ('token', models.TextField(null=True)),
+                ('user_id', models.IntegerField()),
+            ],
+            options={
+                'db_table': 'report_job',
+                'constraints': [
+                    models.UniqueConstraint(
+                        condition=models.Q(('status__in', ('queued', 'running'))),
+                        fields=('dedup_key',),
+                        name='report_job_in_flight',
+                    ),
+                ],
+                'indexes': [
+                    models.Index(fields=['address_id', 'access_key'], name='report_job_address_access'),
+                    models.Index(fields=['status', 'created'], name='report_job_status_created'),
+                    models.Index(fields=['expires'], name='report_job_expires'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.10 on 2026-10-19 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financial', '0017_report_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='journalimport',
+            name='error',
+            field=models.TextField(null=True),
+        ),
+    ]
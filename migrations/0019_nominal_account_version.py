@@ -0,0 +1,124 @@
+# Generated by Django 5.0.10 on 2026-10-19 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financial', '0018_journal_import_error'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ledgerversion',
+            name='account_version',
+            field=models.BigIntegerField(db_default=0),
+        ),
+        migrations.CreateModel(
+            name='NominalAccountVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('member_id', models.IntegerField(unique=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'nominal_account_version',
+            },
+        ),
+        # ############################################################################## #
+        #     Increment the versions of the Addresses and Members in a set of accounts    #
+        # ############################################################################## #
+        # The descriptions of the accounts are shown in the reports, so their ETags have to change with them. As with
+        # the ledger, statement level triggers with transition tables increment each Address or Member once per
+        # statement, in a fixed order so that concurrent statements cannot deadlock.
+        migrations.RunSQL(
+            """
+            CREATE OR REPLACE FUNCTION address_nominal_account_version()
+                RETURNS TRIGGER AS
+            $BODY$
+            BEGIN
+                INSERT INTO ledger_version (address_id, account_version, version, updated)
+                SELECT DISTINCT address_id, 1, 0, now()
+                FROM changed_rows
+                ORDER BY address_id
+                ON CONFLICT (address_id) DO UPDATE
+                SET account_version = ledger_version.account_version + 1, updated = EXCLUDED.updated;
+                RETURN NULL;
+            END;
+            $BODY$
+                LANGUAGE plpgsql VOLATILE
+                COST 100;
+
+            CREATE OR REPLACE FUNCTION global_nominal_account_version()
+                RETURNS TRIGGER AS
+            $BODY$
+            BEGIN
+                INSERT INTO nominal_account_version (member_id, version, updated)
+                SELECT DISTINCT member_id, 1, now()
+                FROM changed_rows
+                ORDER BY member_id
+                ON CONFLICT (member_id) DO UPDATE
+                SET version = nominal_account_version.version + 1, updated = EXCLUDED.updated;
+                RETURN NULL;
+            END;
+            $BODY$
+                LANGUAGE plpgsql VOLATILE
+                COST 100;
+            """,
+            reverse_sql="""
+            DROP FUNCTION IF EXISTS global_nominal_account_version();
+            DROP FUNCTION IF EXISTS address_nominal_account_version();
+            """,
+        ),
+        # ############################################################################## #
+        #                                    Triggers                                    #
+        # ############################################################################## #
+        migrations.RunSQL(
+            """
+            CREATE TRIGGER address_nominal_account_version_insert
+                AFTER INSERT ON address_nominal_account
+                REFERENCING NEW TABLE AS changed_rows
+                FOR EACH STATEMENT EXECUTE PROCEDURE address_nominal_account_version();
+
+            CREATE TRIGGER address_nominal_account_version_update
+                AFTER UPDATE ON address_nominal_account
+                REFERENCING NEW TABLE AS changed_rows
+                FOR EACH STATEMENT EXECUTE PROCEDURE address_nominal_account_version();
+
+            CREATE TRIGGER address_nominal_account_version_delete
+                AFTER DELETE ON address_nominal_account
+                REFERENCING OLD TABLE AS changed_rows
+                FOR EACH STATEMENT EXECUTE PROCEDURE address_nominal_account_version();
+            """,
+            reverse_sql="""
+            DROP TRIGGER IF EXISTS address_nominal_account_version_insert ON address_nominal_account;
+            DROP TRIGGER IF EXISTS address_nominal_account_version_update ON address_nominal_account;
+            DROP TRIGGER IF EXISTS address_nominal_account_version_delete ON address_nominal_account;
+            """,
+        ),
+        migrations.RunSQL(
+            """
+            CREATE TRIGGER global_nominal_account_version_insert
+                AFTER INSERT ON global_nominal_account
+                REFERENCING NEW TABLE AS changed_rows
+                FOR EACH STATEMENT EXECUTE PROCEDURE global_nominal_account_version();
+
+            CREATE TRIGGER global_nominal_account_version_update
+                AFTER UPDATE ON global_nominal_account
+                REFERENCING NEW TABLE AS changed_rows
+                FOR EACH STATEMENT EXECUTE PROCEDURE global_nominal_account_version();
+
+            CREATE TRIGGER global_nominal_account_version_delete
+                AFTER DELETE ON global_nominal_account
+                REFERENCING OLD TABLE AS changed_rows
+                FOR EACH STATEMENT EXECUTE PROCEDURE global_nominal_account_version();
+            """,
+            reverse_sql="""
+            DROP TRIGGER IF EXISTS global_nominal_account_version_insert ON global_nominal_account;
+            DROP TRIGGER IF EXISTS global_nominal_account_version_update ON global_nominal_account;
+            DROP TRIGGER IF EXISTS global_nominal_account_version_delete ON global_nominal_account;
+            """,
+        ),
+    ]
@@ -3,14 +3,20 @@ from .allocation import Allocation
 from .allocation_detail import AllocationDetail
 from .email_log import EmailLog
 from .global_nominal_account import GlobalNominalAccount
-from .integrity_test import IntegrityTest
+from .integrity_checkpoint import IntegrityCheckpoint
+from .integrity_test import IntegrityDefect, IntegrityTest, IntegrityTestCheck
+from .journal_import import JournalImport, JournalImportRow
+from .ledger_archive import LedgerArchive, LedgerArchiveBalance
+from .ledger_version import LedgerVersion
 from .nominal_account_history import NominalAccountHistory
 from .nominal_account_type import NominalAccountType
+from .nominal_account_version import NominalAccountVersion
 from .nominal_contra import NominalContra
 from .nominal_ledger import NominalLedger
 from .nominal_ledger_credit import NominalLedgerCredit
 from .nominal_ledger_debit import NominalLedgerDebit
 from .payment_method import PaymentMethod
+from .report_job import ReportJob
 from .statement_log import StatementLog
 from .statement_settings import StatementSettings
 from .tax_rate import TaxRate
@@ -32,8 +38,24 @@ __all__ = [
     # Global Nominal Account
     'GlobalNominalAccount',
 
+    # Integrity Checkpoint
+    'IntegrityCheckpoint',
+
     # Integrity Test
+    'IntegrityDefect',
     'IntegrityTest',
+    'IntegrityTestCheck',
+
+    # Journal Import
+    'JournalImport',
+    'JournalImportRow',
+
+    # Ledger Archive
+    'LedgerArchive',
+    'LedgerArchiveBalance',
+
+    # Ledger Version
+    'LedgerVersion',
 
     # Nominal Account History
     'NominalAccountHistory',
@@ -41,6 +63,9 @@ __all__ = [
     # Nominal Account Type
     'NominalAccountType',
 
+    # Nominal Account Version
+    'NominalAccountVersion',
+
     # Nominal Contra
     'NominalContra',
 
@@ -56,6 +81,9 @@ __all__ = [
     # Payment Method
     'PaymentMethod',
 
+    # Report Job
+    'ReportJob',
+
     # Statement Log
     'StatementLog',
 
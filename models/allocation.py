@@ -24,8 +24,19 @@ class AllocationManager(BaseManager):
         return super().get_queryset().prefetch_related(
             'details',
             'details__nominal_ledger',
+            'details__nominal_ledger__credits',
+            'details__nominal_ledger__debits',
+            'details__nominal_ledger__email_log',
         )
 
+    def lean(self) -> models.QuerySet:
+        """
+        A QuerySet that does not prefetch the Allocation Details and their Nominal Ledger entries, for requests that
+        don't serialize the Allocation
+        :return: A base queryset which can be further extended
+        """
+        return super().get_queryset()
+
 
 class Allocation(BaseModel):
     """
@@ -60,12 +71,10 @@ class Allocation(BaseModel):
     def set_deleted(self):
         """
         Update the Allocation model to set its deleted field to now, and propagate to all of the children of the
-        Allocation
+        Allocation. Should be called inside a transaction so the Allocation and its details are deleted together
         """
         deltime = datetime.utcnow()
         self.deleted = deltime
         self.save()
-        # Loop through all the Allocation Details belonging to the Allocation and delete them
-        for detail in self.details.iterator():
-            detail.deleted = deltime
-            detail.save()
+        # Delete all of the Allocation Details in one statement, so the trigger updates each Nominal Ledger entry once
+        self.details.all().update(deleted=deltime)
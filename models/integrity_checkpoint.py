@@ -0,0 +1,26 @@
+# libs
+from django.db import models
+
+
+__all__ = [
+    'IntegrityCheckpoint',
+]
+
+
+class IntegrityCheckpoint(models.Model):
+    """
+    The Integrity Checkpoint model records how far the ledger of an Address has been checked by the integrity checker.
+    `version` is the Address' Ledger Version when the last check started, and `checked` is the time it started.
+    The next check only inspects the entries and lines that were written since then, and skips the Address entirely if
+    its Ledger Version has not changed.
+    Rows are created and updated by the integrity checker only, never through the API.
+    """
+    address_id = models.IntegerField(unique=True)
+    checked = models.DateTimeField()
+    version = models.BigIntegerField(default=0)
+
+    class Meta:
+        """
+        Metadata about the model for Django to use in whatever way it sees fit
+        """
+        db_table = 'integrity_checkpoint'
@@ -3,7 +3,9 @@ from django.db import models
 
 
 __all__ = [
+    'IntegrityDefect',
     'IntegrityTest',
+    'IntegrityTestCheck',
 ]
 
 
@@ -14,6 +16,7 @@ class IntegrityTest(models.Model):
     """
     start_time = models.DateTimeField()
     finish_time = models.DateTimeField()
+    full = models.BooleanField(default=False)
     records_tested = models.IntegerField()
     errors_found = models.IntegerField()
 
@@ -22,3 +25,38 @@ class IntegrityTest(models.Model):
         Metadata about the model for Django to use in whatever way it sees fit
         """
         db_table = 'integrity_test'
+
+
+class IntegrityTestCheck(models.Model):
+    """
+    The totals of one check of an Integrity Test, over every Address it inspected. `duration` is the time spent running
+    the check in seconds, summed over the workers.
+    """
+    duration = models.FloatField()
+    errors_found = models.IntegerField()
+    integrity_test = models.ForeignKey(IntegrityTest, models.CASCADE, related_name='checks')
+    name = models.CharField(max_length=50)
+    records_tested = models.IntegerField()
+
+    class Meta:
+        """
+        Metadata about the model for Django to use in whatever way it sees fit
+        """
+        db_table = 'integrity_test_check'
+
+
+class IntegrityDefect(models.Model):
+    """
+    A Nominal Ledger entry that failed one check of an Integrity Test, and the details of the failure
+    """
+    address_id = models.IntegerField()
+    check_name = models.CharField(max_length=50)
+    detail = models.TextField()
+    integrity_test = models.ForeignKey(IntegrityTest, models.CASCADE, related_name='defects')
+    nominal_ledger_id = models.IntegerField()
+
+    class Meta:
+        """
+        Metadata about the model for Django to use in whatever way it sees fit
+        """
+        db_table = 'integrity_defect'
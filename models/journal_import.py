@@ -0,0 +1,80 @@
+# libs
+from cloudcix_rest.models import BaseModel
+from django.db import models
+from django.urls import reverse
+
+
+__all__ = [
+    'JournalImport',
+    'JournalImportRow',
+]
+
+
+class JournalImport(BaseModel):
+    """
+    A Journal Import records a bulk load of Journal Entries from a file, e.g. when migrating a customer's history from
+    another accounting package. The rows of the file are staged in Journal Import Rows, validated as a set and then
+    posted to the Nominal Ledger in bulk.
+    """
+    STATUS_STAGED = 'staged'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+
+    address_id = models.IntegerField()
+    # The reason the file could not be read, if it failed before any rows were staged
+    error = models.TextField(null=True)
+    file_format = models.CharField(max_length=10)
+    journals_imported = models.IntegerField(default=0)
+    journals_rejected = models.IntegerField(default=0)
+    rows_rejected = models.IntegerField(default=0)
+    rows_total = models.IntegerField(default=0)
+    status = models.CharField(max_length=10, default=STATUS_STAGED)
+    user_id = models.IntegerField()
+
+    class Meta:
+        """
+        Metadata about the model for Django to use in whatever way it sees fit
+        """
+        db_table = 'journal_import'
+
+        indexes = [
+            models.Index(fields=['address_id'], name='journal_import_address_id'),
+        ]
+
+    def get_absolute_url(self) -> str:
+        """
+        Generates the absolute URL that corresponds to the JournalImportResource view for this Journal Import record
+        :return: A URL that corresponds to the views for this Journal Import record
+        """
+        return reverse('journal_import_resource', kwargs={'pk': self.pk})
+
+
+class JournalImportRow(models.Model):
+    """
+    A staged line of a Journal Import. Rows are loaded with COPY, so every value from the file is kept as text and
+    only cast once it has been validated. Rows with the same `reference` make up one Journal Entry.
+    """
+    credit = models.TextField(null=True)
+    debit = models.TextField(null=True)
+    description = models.TextField(null=True)
+    error = models.TextField(null=True)
+    # No database constraint so that COPY does not have to check every row against journal_import
+    journal_import = models.ForeignKey(JournalImport, models.CASCADE, related_name='rows', db_constraint=False)
+    narrative = models.TextField(null=True)
+    nominal_account_number = models.TextField(null=True)
+    nominal_ledger_id = models.BigIntegerField(null=True)
+    reference = models.TextField(null=True)
+    row_number = models.IntegerField()
+    tax_rate_id = models.TextField(null=True)
+    transaction_date = models.TextField(null=True)
+
+    class Meta:
+        """
+        Metadata about the model for Django to use in whatever way it sees fit
+        """
+        db_table = 'journal_import_row'
+
+        indexes = [
+            models.Index(fields=['journal_import', 'reference'], name='journal_import_row_reference'),
+        ]
+        ordering = ['row_number']
@@ -0,0 +1,90 @@
+# stdlib
+from datetime import date
+from typing import Dict, Iterable
+# libs
+from django.db import models
+from django.db.models import Max
+
+
+__all__ = [
+    'LedgerArchive',
+    'LedgerArchiveBalance',
+]
+
+
+class LedgerArchiveManager(models.Manager):
+    """
+    Manager for Ledger Archive which provides a helper for reading how far several Addresses have been archived
+    """
+
+    def cutoffs(self, address_ids: Iterable[int], on: date) -> Dict[int, date]:
+        """
+        Read the latest archive date on or before a given date for each of the given Addresses in a single query
+        :param address_ids: The ids of the Addresses to get the archive dates for
+        :param on: Archives after this date are ignored
+        :return: A dictionary mapping each archived Address id to the date its lines have been archived up to.
+                 Addresses that have not been archived are left out
+        """
+        return dict(
+            self.filter(
+                address_id__in=set(address_ids),
+                archived_to__lte=on,
+            ).values(
+                'address_id',
+            ).annotate(
+                cutoff=Max('archived_to'),
+            ).values_list(
+                'address_id',
+                'cutoff',
+            ),
+        )
+
+
+class LedgerArchive(models.Model):
+    """
+    A Ledger Archive records a run of the archiver for an Address. The debits and credits of every Nominal Ledger entry
+    dated on or before `archived_to`, the date of the Address' latest Year End at the time, were moved from the hot line
+    tables into the archive tables.
+    Rows are created by the archiver only, never through the API.
+    """
+    address_id = models.IntegerField()
+    archived_to = models.DateField()
+    created = models.DateTimeField(auto_now_add=True)
+    credits_archived = models.IntegerField(default=0)
+    debits_archived = models.IntegerField(default=0)
+
+    objects = LedgerArchiveManager()
+
+    class Meta:
+        """
+        Metadata about the model for Django to use in whatever way it sees fit
+        """
+        db_table = 'ledger_archive'
+
+        indexes = [
+            models.Index(fields=['address_id', 'archived_to'], name='ledger_archive_address_date'),
+        ]
+
+
+class LedgerArchiveBalance(models.Model):
+    """
+    The total of the lines moved by a Ledger Archive run for one Nominal Account and transaction type. Reports that
+    aggregate the whole history of an Address add these totals instead of summing the archived lines again.
+    Lines that had been deleted when they were archived are not included.
+    """
+    address_id = models.IntegerField()
+    credits = models.DecimalField(decimal_places=4, max_digits=23, default=0)
+    debits = models.DecimalField(decimal_places=4, max_digits=23, default=0)
+    ledger_archive = models.ForeignKey(LedgerArchive, models.CASCADE, related_name='balances')
+    nominal_account_number = models.IntegerField()
+    transaction_type_id = models.IntegerField()
+
+    class Meta:
+        """
+        Metadata about the model for Django to use in whatever way it sees fit
+        """
+        db_table = 'ledger_archive_balance'
+
+        indexes = [
+            models.Index(fields=['address_id', 'nominal_account_number'], name='ledger_archive_balance_account'),
+        ]
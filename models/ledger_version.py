@@ -0,0 +1,57 @@
+# stdlib
+from typing import Dict, Iterable, Tuple
+# libs
+from django.db import models
+
+
+__all__ = [
+    'LedgerVersion',
+]
+
+
+class LedgerVersionManager(models.Manager):
+    """
+    Manager for Ledger Version which provides a helper for reading the versions of several Addresses at once
+    """
+
+    def get_versions(self, address_ids: Iterable[int]) -> Dict[int, Tuple[int, int]]:
+        """
+        Read the current Ledger Version and Account Version of each of the given Addresses in a single query
+        :param address_ids: The ids of the Addresses to get the versions for
+        :return: A dictionary mapping each Address id to its ledger and account versions. Addresses that have never
+                 been written to have versions of 0
+        """
+        address_ids = set(address_ids)
+        versions = dict.fromkeys(address_ids, (0, 0))
+        versions.update(
+            (address_id, (version, account_version))
+            for address_id, version, account_version in self.filter(address_id__in=address_ids).values_list(
+                'address_id',
+                'version',
+                'account_version',
+            )
+        )
+        return versions
+
+
+class LedgerVersion(models.Model):
+    """
+    The Ledger Version model stores a counter for each Address which is incremented by database triggers whenever the
+    Address' Nominal Ledger entries, their debits and credits, or the Allocation Details and Email Logs against them are
+    written. The Account Version is incremented separately whenever the Address Nominal Accounts of the Address are
+    written, as they only change the descriptions shown in the reports, not the ledger the integrity checks read.
+    Rows are created and updated by the triggers only, never through the ORM.
+    """
+    # The triggers on the ledger don't set it, so it is defaulted by the database
+    account_version = models.BigIntegerField(db_default=0)
+    address_id = models.IntegerField(unique=True)
+    updated = models.DateTimeField(auto_now=True)
+    version = models.BigIntegerField(default=0)
+
+    objects = LedgerVersionManager()
+
+    class Meta:
+        """
+        Metadata about the model for Django to use in whatever way it sees fit
+        """
+        db_table = 'ledger_version'
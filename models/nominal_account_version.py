@@ -0,0 +1,45 @@
+# stdlib
+from typing import Optional
+# libs
+from django.db import models
+
+
+__all__ = [
+    'NominalAccountVersion',
+]
+
+
+class NominalAccountVersionManager(models.Manager):
+    """
+    Manager for Nominal Account Version which provides a helper for reading the version of a Member
+    """
+
+    def get_version(self, member_id: int) -> int:
+        """
+        Read the current Nominal Account Version of a Member
+        :param member_id: The id of the Member to get the version for
+        :return: The version of the Member. Members whose Global Nominal Accounts have never been written to have a
+                 version of 0
+        """
+        version: Optional[int] = self.filter(member_id=member_id).values_list('version', flat=True).first()
+        return version or 0
+
+
+class NominalAccountVersion(models.Model):
+    """
+    The Nominal Account Version model stores a counter for each Member which is incremented by database triggers
+    whenever the Member's Global Nominal Accounts are written. The reports show the Global Nominal Accounts of the
+    Member, so their ETags include it.
+    Rows are created and updated by the triggers only, never through the ORM.
+    """
+    member_id = models.IntegerField(unique=True)
+    updated = models.DateTimeField(auto_now=True)
+    version = models.BigIntegerField(default=0)
+
+    objects = NominalAccountVersionManager()
+
+    class Meta:
+        """
+        Metadata about the model for Django to use in whatever way it sees fit
+        """
+        db_table = 'nominal_account_version'
@@ -1,15 +1,55 @@
 # stdlib
 from datetime import datetime
+from functools import lru_cache
+from typing import Optional, Tuple
 # libs
 from cloudcix_rest.models import BaseManager, BaseModel
 from django.db import models
-from django.urls import reverse
+from django.urls import get_script_prefix, get_urlconf, reverse
 
 
 __all__ = [
     'NominalLedger',
 ]
 
+# The names of the Resource views for each Transaction Type
+RESOURCE_URL_NAMES = {
+    10000: 'cash_purchase_invoice_resource',
+    10001: 'cash_purchase_debit_note_resource',
+    10002: 'account_purchase_invoice_resource',
+    10003: 'account_purchase_debit_note_resource',
+    10004: 'account_purchase_payment_resource',
+    10005: 'account_purchase_adjustment_resource',
+    10006: 'cash_purchase_receipt_resource',
+    10007: 'cash_purchase_refund_resource',
+    11000: 'cash_sale_invoice_resource',
+    11001: 'cash_sale_credit_note_resource',
+    11002: 'account_sale_invoice_resource',
+    11003: 'account_sale_credit_note_resource',
+    11004: 'account_sale_payment_resource',
+    11005: 'account_sale_adjustment_resource',
+    11006: 'cash_sale_receipt_resource',
+    11007: 'cash_sale_refund_resource',
+    12000: 'journal_entry_resource',
+    12001: 'period_end_resource',
+    12002: 'year_end_resource',
+}
+
+# A tsn that will not appear anywhere else in a reversed URL
+TSN_PLACEHOLDER = 987654321
+
+
+@lru_cache(maxsize=None)
+def _resource_url(url_name: str, script_prefix: str, urlconf: Optional[str]) -> Tuple[str, str]:
+    """
+    Reverse the URL of a Resource view once with a placeholder tsn and split it around the placeholder, so the URL of
+    any record can be built without resolving the URL patterns again. The script prefix and urlconf are only used as
+    part of the cache key, `reverse` reads them itself.
+    :return: The parts of the URL before and after the tsn
+    """
+    prefix, _, suffix = reverse(url_name, kwargs={'tsn': TSN_PLACEHOLDER}).rpartition(str(TSN_PLACEHOLDER))
+    return prefix, suffix
+
 
 class NominalLedgerManager(BaseManager):
     """
@@ -31,12 +71,32 @@ class NominalLedgerManager(BaseManager):
         Extend the BaseManager QuerySet to filter by the Manager's Transaction Type id and pre-fetch foreign keys
         :return: A base queryset which can be further extended but only returns entries of the given Transaction Type id
         """
-        query = super().get_queryset().prefetch_related(
+        return self.related(self.lean())
+
+    @staticmethod
+    def related(query: models.QuerySet) -> models.QuerySet:
+        """
+        Pre-fetch the foreign keys needed for serialization on a QuerySet, e.g. a page of a `lean` QuerySet once it has
+        been counted
+        :param query: The QuerySet to extend
+        :return: The QuerySet, pre-fetching the credits, debits, Email Logs and contra entries of its entries
+        """
+        return query.prefetch_related(
             'credits',
             'debits',
+            'email_log',
         ).select_related(
             'contra_nominal_ledger',
         )
+
+    def lean(self) -> models.QuerySet:
+        """
+        A QuerySet filtered by the Manager's Transaction Type id that does not pre-fetch any foreign keys.
+        Use this for `exists`, `count`, `aggregate` and `values` queries, and for lookups that only read the columns of
+        the entry itself, so they don't carry the joins and prefetches that are only needed for serialization.
+        :return: A base queryset which can be further extended
+        """
+        query = super().get_queryset()
         if self.transaction_type_id is not None:
             query = query.filter(transaction_type_id=self.transaction_type_id)
         return query
@@ -119,6 +179,28 @@ class NominalLedger(BaseModel):
             models.Index(fields=['transaction_type_id'], name='ledger_transaction_type_id'),
             models.Index(fields=['tsn'], name='ledger_tsn'),
             models.Index(fields=['unallocated_balance'], name='ledger_unallocated_balance'),
+
+            # Composite and partial indexes for the hot queries, which all filter out deleted entries
+            # Resource reads by tsn
+            models.Index(
+                fields=['address_id', 'transaction_type_id', 'tsn'],
+                name='ledger_address_type_tsn',
+                condition=models.Q(deleted__isnull=True),
+            ),
+            # Aged balances, account statements and credit limits only look at entries with a balance outstanding
+            models.Index(
+                fields=['address_id', 'contra_address_id', 'transaction_type_id'],
+                name='ledger_outstanding',
+                condition=models.Q(deleted__isnull=True) & ~models.Q(unallocated_balance=0),
+            ),
+            # Transactions from other Addresses that have not had a contra transaction created yet
+            models.Index(
+                fields=['contra_address_id'],
+                name='ledger_pending_contra',
+                condition=models.Q(deleted__isnull=True, contra_nominal_ledger__isnull=True),
+            ),
+            # Entries changed since the last integrity check, including deleted ones
+            models.Index(fields=['address_id', 'updated'], name='ledger_address_updated'),
         ]
         ordering = ['transaction_date']
 
@@ -127,28 +209,9 @@ class NominalLedger(BaseModel):
         Generates the absolute URL that corresponds to the Resource view for this Nominal Ledger record
         :return: A URL that corresponds to the views for this Nominal Ledger record
         """
-        urls = {
-            10000: 'cash_purchase_invoice_resource',
-            10001: 'cash_purchase_debit_note_resource',
-            10002: 'account_purchase_invoice_resource',
-            10003: 'account_purchase_debit_note_resource',
-            10004: 'account_purchase_payment_resource',
-            10005: 'account_purchase_adjustment_resource',
-            10006: 'cash_purchase_receipt_resource',
-            10007: 'cash_purchase_refund_resource',
-            11000: 'cash_sale_invoice_resource',
-            11001: 'cash_sale_credit_note_resource',
-            11002: 'account_sale_invoice_resource',
-            11003: 'account_sale_credit_note_resource',
-            11004: 'account_sale_payment_resource',
-            11005: 'account_sale_adjustment_resource',
-            11006: 'cash_sale_receipt_resource',
-            11007: 'cash_sale_refund_resource',
-            12000: 'journal_entry_resource',
-            12001: 'period_end_resource',
-            12002: 'year_end_resource',
-        }
-        return reverse(urls[self.transaction_type_id], kwargs={'tsn': self.tsn})
+        url_name = RESOURCE_URL_NAMES[self.transaction_type_id]
+        prefix, suffix = _resource_url(url_name, get_script_prefix(), get_urlconf())
+        return f'{prefix}{self.tsn}{suffix}'
 
     def set_deleted(self):
         """
@@ -25,6 +25,13 @@ class NominalLedgerCreditManager(BaseManager):
             'nominal_ledger',
         )
 
+    def lean(self) -> models.QuerySet:
+        """
+        A QuerySet that does not join the Nominal Ledger entry, for `exists`, `count`, `aggregate` and `values` queries
+        :return: A base queryset which can be further extended
+        """
+        return super().get_queryset()
+
 
 class NominalLedgerCredit(BaseModel):
     """
@@ -54,4 +61,13 @@ class NominalLedgerCredit(BaseModel):
             models.Index(fields=['id'], name='ledger_credit_id'),
             models.Index(fields=['deleted'], name='ledger_credit_deleted'),
             models.Index(fields=['tax_percent'], name='ledger_credit_tax_percent'),
+
+            # The lines of an entry that use a given Nominal Account, e.g. the control account in the ledger reports
+            models.Index(
+                fields=['nominal_ledger', 'nominal_account_number'],
+                name='ledger_credit_ledger_account',
+                condition=models.Q(deleted__isnull=True),
+            ),
+            # Lines changed since the last integrity check
+            models.Index(fields=['updated'], name='ledger_credit_updated'),
         ]
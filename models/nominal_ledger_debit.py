@@ -25,6 +25,13 @@ class NominalLedgerDebitManager(BaseManager):
             'nominal_ledger',
         )
 
+    def lean(self) -> models.QuerySet:
+        """
+        A QuerySet that does not join the Nominal Ledger entry, for `exists`, `count`, `aggregate` and `values` queries
+        :return: A base queryset which can be further extended
+        """
+        return super().get_queryset()
+
 
 class NominalLedgerDebit(BaseModel):
     """
@@ -54,4 +61,13 @@ class NominalLedgerDebit(BaseModel):
             models.Index(fields=['id'], name='ledger_debit_id'),
             models.Index(fields=['deleted'], name='ledger_debit_deleted'),
             models.Index(fields=['tax_percent'], name='ledger_debit_tax_percent'),
+
+            # The lines of an entry that use a given Nominal Account, e.g. the control account in the ledger reports
+            models.Index(
+                fields=['nominal_ledger', 'nominal_account_number'],
+                name='ledger_debit_ledger_account',
+                condition=models.Q(deleted__isnull=True),
+            ),
+            # Lines changed since the last integrity check
+            models.Index(fields=['updated'], name='ledger_debit_updated'),
         ]
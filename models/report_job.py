@@ -0,0 +1,78 @@
+# libs
+from cloudcix_rest.models import BaseModel
+from django.db import models
+from django.db.models import Q
+from django.urls import reverse
+
+
+__all__ = [
+    'ReportJob',
+]
+
+
+class ReportJob(BaseModel):
+    """
+    A Report Job runs one of the report services in the background, for reports that take too long to be returned
+    within the gateway timeout. The job is run by a report worker with the same parameters the report service takes,
+    and the response is stored on the job until it expires.
+    Jobs that are submitted while an identical job is still queued or running are answered with that job instead, using
+    `dedup_key`.
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    IN_FLIGHT = (STATUS_QUEUED, STATUS_RUNNING)
+
+    # The key of the Address and permissions of the User who submitted the job. Only Users with the same key can read it
+    access_key = models.CharField(max_length=40, default='')
+    address_id = models.IntegerField()
+    dedup_key = models.CharField(max_length=40)
+    error = models.TextField(null=True)
+    expires = models.DateTimeField(null=True)
+    finished = models.DateTimeField(null=True)
+    params = models.JSONField(default=dict)
+    progress = models.SmallIntegerField(default=0)
+    report = models.CharField(max_length=50)
+    result = models.JSONField(null=True)
+    stage = models.CharField(max_length=100, default='')
+    stages = models.SmallIntegerField(null=True)
+    started = models.DateTimeField(null=True)
+    status = models.CharField(max_length=10, default=STATUS_QUEUED)
+    status_code = models.SmallIntegerField(null=True)
+    # The encrypted token of the User who submitted the job, which the report is run with. It is cleared once the job
+    # has run
+    token = models.TextField(null=True)
+    user_id = models.IntegerField()
+
+    class Meta:
+        """
+        Metadata about the model for Django to use in whatever way it sees fit
+        """
+        db_table = 'report_job'
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedup_key'],
+                condition=Q(status__in=('queued', 'running')),
+                name='report_job_in_flight',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['address_id', 'access_key'], name='report_job_address_access'),
+            models.Index(fields=['status', 'created'], name='report_job_status_created'),
+            models.Index(fields=['expires'], name='report_job_expires'),
+        ]
+
+    def get_absolute_url(self) -> str:
+        """
+        Generates the absolute URL that corresponds to the ReportJobResource view for this Report Job record
+        :return: A URL that corresponds to the views for this Report Job record
+        """
+        return reverse('report_job_resource', kwargs={'pk': self.pk})
+
+    def get_result_url(self) -> str:
+        """
+        Generates the URL the result of this Report Job can be fetched from
+        """
+        return reverse('report_job_result', kwargs={'pk': self.pk})
@@ -0,0 +1,274 @@
+"""
+Detection of N+1 queries.
+
+The statements run by a request are counted by their fingerprint, together with the view that handled the request and
+the innermost tracer span that was open when they ran. A statement that is run `FINANCIAL_N_PLUS_ONE_THRESHOLD` or
+more times in the same view and span is reported as a Repetition, which is almost always a query made in a loop.
+
+Known Repetitions are listed in the JSON file named by `FINANCIAL_N_PLUS_ONE_ALLOWLIST`, and only new ones are treated
+as failures. Use `save_allowlist` to write the Repetitions found by a run as the allowlist.
+
+Add `financial.n_plus_one.NPlusOneMiddleware` to `MIDDLEWARE` to check requests. `FINANCIAL_N_PLUS_ONE_MODE` is one of
+    - `off`: Requests are not checked
+    - `log`: A sample of `FINANCIAL_N_PLUS_ONE_SAMPLE_RATE` of the requests are checked, and the Repetitions found are
+      logged to the `financial.n_plus_one` logger and counted on the request span as `n_plus_one`. For staging
+    - `raise`: Every request is checked, whatever the sample rate, and an NPlusOneError is raised for new Repetitions,
+      so a test suite using the test client fails
+
+Code that calls views directly, or runs no requests at all, can be checked with `NPlusOneDetector` as a context manager
+or decorator, which raises an NPlusOneError on exit for the new Repetitions found inside it.
+"""
+# stdlib
+import contextvars
+import json
+import logging
+import random
+from collections import Counter
+from contextlib import ContextDecorator, contextmanager, ExitStack
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+# libs
+from django.conf import settings
+from django.db import connections
+from django.http import HttpRequest, HttpResponse
+# local
+from financial.instrumentation import fingerprint, instrument_tracer, open_spans
+
+
+__all__ = [
+    'load_allowlist',
+    'NPlusOneDetector',
+    'NPlusOneError',
+    'NPlusOneMiddleware',
+    'Repetition',
+    'save_allowlist',
+]
+
+logger = logging.getLogger(__name__)
+
+Key = Tuple[str, str, str]
+
+
+class Repetition(NamedTuple):
+    """
+    A statement run repeatedly by one request
+    - `view`: The view and method that handled the request, e.g. `CreditLimitCollection.get`
+    - `span`: The innermost tracer span that was open, e.g. `get_credit_limit_data`
+    - `fingerprint`: The fingerprint of the statement
+    - `count`: The number of times it was run
+    """
+    view: str
+    span: str
+    fingerprint: str
+    count: int
+
+    @property
+    def key(self) -> Key:
+        return self.view, self.span, self.fingerprint
+
+    def __str__(self) -> str:
+        return f'{self.count} x {self.view or "-"} [{self.span or "-"}]: {self.fingerprint}'
+
+
+class NPlusOneError(AssertionError):
+    """
+    Raised for Repetitions that are not in the allowlist
+    """
+
+    def __init__(self, repetitions: List[Repetition]):
+        self.repetitions = repetitions
+        lines = '\n'.join(f'    {repetition}' for repetition in repetitions)
+        super().__init__(f'{len(repetitions)} new N+1 queries found:\n{lines}')
+
+
+def load_allowlist(path: Optional[str]) -> FrozenSet[Key]:
+    """
+    Load the Repetitions that are already known
+    :param path: The JSON file written by `save_allowlist`. If None, nothing is allowed
+    """
+    if not path:
+        return frozenset()
+    return _load_allowlist(path)
+
+
+@lru_cache(maxsize=None)
+def _load_allowlist(path: str) -> FrozenSet[Key]:
+    try:
+        with open(path) as f:
+            entries = json.load(f)
+    except FileNotFoundError:
+        return frozenset()
+    return frozenset((entry['view'], entry['span'], entry['fingerprint']) for entry in entries)
+
+
+def save_allowlist(path: str, repetitions: Iterable[Repetition]):
+    """
+    Add Repetitions to an allowlist, keeping the entries already in it
+    """
+    _load_allowlist.cache_clear()
+    keys = set(load_allowlist(path)) | {repetition.key for repetition in repetitions}
+    entries = [{'view': view, 'span': span, 'fingerprint': statement} for view, span, statement in sorted(keys)]
+    with open(path, 'w') as f:
+        json.dump(entries, f, indent=2)
+    _load_allowlist.cache_clear()
+
+
+class _Collector:
+    """
+    Counts the statements of the current request
+    """
+
+    def __init__(self, threshold: int, view: str = ''):
+        self.threshold = threshold
+        # The view of statements run outside of a request
+        self.default_view = view
+        self.view = view
+        # Statements are only fingerprinted when the request finishes, once per distinct statement
+        self.counts: Counter = Counter()
+        self.found: List[Repetition] = []
+
+    def add(self, sql: str):
+        spans = open_spans()
+        self.counts[self.view, spans[-1] if len(spans) > 0 else '', sql] += 1
+
+    def finish(self) -> List[Repetition]:
+        """
+        Find the Repetitions of the current request and start counting the next one
+        """
+        totals: Dict[Key, int] = Counter()
+        for (view, span, sql), count in self.counts.items():
+            totals[view, span, fingerprint(sql)] += count
+        found = [Repetition(*key, count) for key, count in totals.items() if count >= self.threshold]
+        found.sort(key=lambda repetition: -repetition.count)
+        self.counts.clear()
+        self.view = self.default_view
+        self.found.extend(found)
+        return found
+
+
+_collector: contextvars.ContextVar[Optional[_Collector]] = contextvars.ContextVar('financial_n_plus_one', default=None)
+
+
+def _record(execute: Callable, sql: str, params: Any, many: bool, context: Dict[str, Any]) -> Any:
+    """
+    The execute wrapper installed on every connection while collecting
+    """
+    collector = _collector.get()
+    if collector is not None:
+        collector.add(sql)
+    return execute(sql, params, many, context)
+
+
+@contextmanager
+def _collecting(collector: _Collector) -> Iterator[_Collector]:
+    instrument_tracer()
+    token = _collector.set(collector)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(_record))
+            yield collector
+    finally:
+        _collector.reset(token)
+
+
+def _new(repetitions: List[Repetition], allowlist: FrozenSet[Key]) -> List[Repetition]:
+    return [repetition for repetition in repetitions if repetition.key not in allowlist]
+
+
+class NPlusOneDetector(ContextDecorator):
+    """
+    Check the statements run inside it for N+1 queries, and raise an NPlusOneError on exit for any new ones.
+    Requests made through NPlusOneMiddleware inside it are checked separately, the rest is checked as one request
+    - `threshold`: The number of runs of a statement that are a Repetition. Defaults to FINANCIAL_N_PLUS_ONE_THRESHOLD
+    - `allowlist`: The path of the allowlist, or the keys of the known Repetitions. Defaults to
+      FINANCIAL_N_PLUS_ONE_ALLOWLIST
+    - `view`: The name to report the statements run outside of a request under
+
+    The Repetitions found, new or not, are in `found` afterwards.
+    """
+
+    def __init__(
+            self,
+            threshold: Optional[int] = None,
+            allowlist: Union[None, str, Iterable[Key]] = None,
+            view: str = '',
+    ):
+        self.threshold = threshold or settings.FINANCIAL_N_PLUS_ONE_THRESHOLD
+        if allowlist is None:
+            allowlist = settings.FINANCIAL_N_PLUS_ONE_ALLOWLIST
+        if allowlist is None or isinstance(allowlist, str):
+            self.allowlist = load_allowlist(allowlist)
+        else:
+            self.allowlist = frozenset(allowlist)
+        self.view = view
+        self.found: List[Repetition] = []
+        self._collector: Optional[_Collector] = None
+        self._stack: Optional[ExitStack] = None
+
+    def __enter__(self) -> 'NPlusOneDetector':
+        self._stack = ExitStack()
+        self._collector = self._stack.enter_context(_collecting(_Collector(self.threshold, self.view)))
+        return self
+
+    def __exit__(self, exc_type: Any, *args: Any) -> bool:
+        self._stack.close()
+        self._collector.finish()
+        self.found = self._collector.found
+        new = _new(self.found, self.allowlist)
+        if exc_type is None and len(new) > 0:
+            raise NPlusOneError(new)
+        return False
+
+
+class NPlusOneMiddleware:
+    """
+    Check requests for N+1 queries, as set by FINANCIAL_N_PLUS_ONE_MODE. Only `log` mode checks a sample of them
+    """
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        collector = _collector.get()
+        if collector is not None:
+            # An NPlusOneDetector is already collecting, and checks each request separately
+            collector.finish()
+            response = self.get_response(request)
+            collector.finish()
+            return response
+
+        mode = settings.FINANCIAL_N_PLUS_ONE_MODE
+        if mode == 'off' or (mode == 'log' and random.random() >= settings.FINANCIAL_N_PLUS_ONE_SAMPLE_RATE):
+            return self.get_response(request)
+
+        with _collecting(_Collector(settings.FINANCIAL_N_PLUS_ONE_THRESHOLD)) as collector:
+            response = self.get_response(request)
+        found = collector.finish()
+
+        span = getattr(request, 'span', None)
+        if span is not None:
+            span.set_tag('n_plus_one', len(found))
+        if len(found) == 0:
+            return response
+
+        allowlist = load_allowlist(settings.FINANCIAL_N_PLUS_ONE_ALLOWLIST)
+        for repetition in found:
+            known = repetition.key in allowlist
+            logger.log(
+                logging.INFO if known else logging.WARNING,
+                'N+1 query in %s %s: %s',
+                request.method,
+                request.path,
+                repetition,
+            )
+        new = _new(found, allowlist)
+        if mode == 'raise' and len(new) > 0:
+            raise NPlusOneError(new)
+        return response
+
+    def process_view(self, request: HttpRequest, view_func: Callable, view_args: Any, view_kwargs: Any):
+        collector = _collector.get()
+        if collector is not None:
+            view = getattr(view_func, 'view_class', view_func)
+            collector.view = f'{view.__name__}.{request.method.lower()}'
@@ -51,7 +51,7 @@ class Permissions:
             return Http403(error_code='financial_account_purchase_debit_note_update_201')
 
         # The Account Purchase Debit Note has not been processed by a period end
-        period_end = NominalLedger.period_end.filter(
+        period_end = NominalLedger.period_end.lean().filter(
             address_id=request.user.address['id'],
             transaction_date__gte=obj.transaction_date,
         )
@@ -59,7 +59,7 @@ class Permissions:
             return Http403(error_code='financial_account_sale_invoice_update_201')
 
         # The Account Sale Invoice has not been processed by a period end
-        period_end = NominalLedger.period_end.filter(
+        period_end = NominalLedger.period_end.lean().filter(
             address_id=obj.address_id,
             transaction_date__gte=obj.transaction_date,
         )
@@ -0,0 +1,25 @@
+# stdlib
+from typing import Optional
+# libs
+from cloudcix_rest.exceptions import Http403
+from rest_framework.request import Request
+
+
+__all__ = [
+    'Permissions',
+]
+
+
+class Permissions:
+
+    @staticmethod
+    def create(request: Request) -> Optional[Http403]:
+        """
+        The request to automatically allocate a ledger is valid if:
+        - The requesting User's Member is self-managed
+        """
+        # The requesting User's Member is self-managed
+        if not request.user.member['self_managed']:
+            return Http403(error_code='financial_auto_allocation_create_201')
+
+        return None
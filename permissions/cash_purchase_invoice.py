@@ -51,7 +51,7 @@ class Permissions:
             return Http403(error_code='financial_cash_purchase_invoice_update_201')
 
         # The Cash Purchase Invoice has not been processed by a period end
-        period_end = NominalLedger.period_end.filter(
+        period_end = NominalLedger.period_end.lean().filter(
             address_id=request.user.address['id'],
             transaction_date__gte=obj.transaction_date,
         )
@@ -32,7 +32,7 @@ class Permissions:
         - The Cash Sale Receipt has not been processed by a period end
         """
         # The Cash Sale Invoice has not been processed by a period end
-        period_end = NominalLedger.period_end.filter(
+        period_end = NominalLedger.period_end.lean().filter(
             address_id=obj.address_id,
             transaction_date__gte=obj.transaction_date,
         )
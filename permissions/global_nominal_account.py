@@ -86,7 +86,7 @@ class Permissions:
         address_ids = [account.address_id for account in obj.address_nominal_accounts.all()]
         account_number_filter = Q(debits__nominal_account_number=obj.nominal_account_number)
         account_number_filter |= Q(credits__nominal_account_number=obj.nominal_account_number)
-        transactions = NominalLedger.objects.filter(
+        transactions = NominalLedger.objects.lean().filter(
             account_number_filter,
             address_id__in=address_ids,
         )
@@ -34,7 +34,7 @@ class Permissions:
         - The Period End is not associated with a Year End
         """
         # It is the most recent Period End
-        period_end = NominalLedger.period_end.filter(
+        period_end = NominalLedger.period_end.lean().filter(
             address_id=request.user.address['id'],
             transaction_date__gte=obj.transaction_date,
         ).exclude(
@@ -44,7 +44,7 @@ class Permissions:
             return Http403(error_code='financial_period_end_delete_201')
 
         # The Period End is not associated with a Year End
-        year_end = NominalLedger.year_ends.filter(
+        year_end = NominalLedger.year_ends.lean().filter(
             address_id=request.user.address['id'],
             transaction_date=obj.transaction_date,
         )
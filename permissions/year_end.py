@@ -4,6 +4,7 @@ from typing import Optional
 from cloudcix_rest.exceptions import Http403
 from rest_framework.request import Request
 # local
+from financial.models.ledger_archive import LedgerArchive
 from financial.models.nominal_ledger import NominalLedger
 
 
@@ -26,13 +27,22 @@ class Permissions:
         """
         The request to delete a Year End is valid if:
         - There are no Period Ends after the Year End's transaction date
+        - The lines of the Year End's closed year have not been archived
         """
         # There are no Period Ends after the Year End's transaction date
-        period_end = NominalLedger.objects.filter(
+        period_end = NominalLedger.objects.lean().filter(
             address_id=request.user.address['id'],
             transaction_date__gt=obj.transaction_date,
         )
         if period_end.exists():
             return Http403(error_code='financial_year_end_delete_201')
 
+        # The lines of the Year End's closed year have not been archived
+        archive = LedgerArchive.objects.filter(
+            address_id=request.user.address['id'],
+            archived_to__gte=obj.transaction_date,
+        )
+        if archive.exists():
+            return Http403(error_code='financial_year_end_delete_202')
+
         return None
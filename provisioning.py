@@ -0,0 +1,194 @@
+"""
+Provisioning of the default Financial records for new Members and Addresses.
+
+The defaults are the records of Member 0 and Address 0: the chart of accounts, Payment Methods and Nominal Contras of
+Member 0 are copied to each Member that has no Global Nominal Accounts and no Payment Methods yet, and the Tax Rates of
+Address 0 are copied to each Address that has no Tax Rates yet. Every Address also gets its Statement Settings.
+
+Each kind of record is copied for every Member or Address being provisioned with one INSERT ... SELECT, and the Nominal
+Contras are mapped onto the new accounts and Payment Methods by account number and description in the same way, so
+provisioning runs the same handful of statements for one Address or for thousands. Provisioning is idempotent, records
+are only copied to Members and Addresses that don't have them.
+"""
+# stdlib
+from typing import Dict, Iterable, NamedTuple
+# libs
+from cloudcix_rest.utils import db_lock
+from django.db import connections, router, transaction
+# local
+from financial.models import GlobalNominalAccount
+from financial.sharding import group_by_shard, use_shard
+
+
+__all__ = [
+    'provision',
+    'Target',
+]
+
+
+class Target(NamedTuple):
+    """
+    An Address to provision, with its Member and the currency of the Member
+    """
+    address_id: int
+    member_id: int
+    currency_id: int
+
+
+# The statements that copy the defaults, run in order, with the table each one inserts into
+PROVISION_SQL = (
+    (
+        'statement_settings',
+        """
+        INSERT INTO statement_settings (address_id, day, signature)
+        SELECT DISTINCT T.address_id, '[]'::jsonb, ''
+        FROM unnest(%(address_ids)s::integer[]) AS T(address_id)
+        ON CONFLICT (address_id) DO NOTHING
+        """,
+    ),
+    # The table is left in place if the caller's transaction is still open
+    (None, 'DROP TABLE IF EXISTS provision_member'),
+    (
+        # The Members to copy the chart of accounts, Payment Methods and Nominal Contras to
+        None,
+        """
+        CREATE TEMPORARY TABLE provision_member ON COMMIT DROP AS
+        SELECT DISTINCT ON (T.member_id) T.member_id, T.currency_id
+        FROM unnest(%(member_ids)s::integer[], %(currency_ids)s::integer[]) AS T(member_id, currency_id)
+        WHERE NOT EXISTS (
+            SELECT 1
+            FROM global_nominal_account
+            WHERE deleted IS NULL
+            AND member_id = T.member_id
+        )
+        AND NOT EXISTS (
+            SELECT 1
+            FROM payment_method
+            WHERE deleted IS NULL
+            AND member_id = T.member_id
+        )
+        ORDER BY T.member_id
+        """,
+    ),
+    (
+        'global_nominal_account',
+        """
+        INSERT INTO global_nominal_account (
+            created, updated, extra, currency_id, description, external_reference, member_id, nominal_account_number,
+            nominal_account_type_id, valid_sales_account, valid_purchases_account
+        )
+        SELECT
+            now(), now(), '{}', M.currency_id, D.description, D.external_reference, M.member_id,
+            D.nominal_account_number, D.nominal_account_type_id, D.valid_sales_account, D.valid_purchases_account
+        FROM provision_member AS M
+        CROSS JOIN global_nominal_account AS D
+        WHERE D.deleted IS NULL
+        AND D.member_id = 0
+        """,
+    ),
+    (
+        'payment_method',
+        """
+        INSERT INTO payment_method (created, updated, extra, description, member_id)
+        SELECT now(), now(), '{}', D.description, M.member_id
+        FROM provision_member AS M
+        CROSS JOIN payment_method AS D
+        WHERE D.deleted IS NULL
+        AND D.member_id = 0
+        """,
+    ),
+    (
+        'nominal_contra',
+        """
+        INSERT INTO nominal_contra (created, updated, extra, global_nominal_account_id, payment_method_id,
+                                    transaction_type_id)
+        SELECT now(), now(), '{}', C.global_nominal_account_id, C.payment_method_id, C.transaction_type_id
+        FROM (
+            SELECT DISTINCT
+                A.id AS global_nominal_account_id,
+                P.id AS payment_method_id,
+                D.transaction_type_id
+            FROM nominal_contra AS D
+            INNER JOIN global_nominal_account AS DA
+            ON DA.id = D.global_nominal_account_id
+            INNER JOIN payment_method AS DP
+            ON DP.id = D.payment_method_id
+            INNER JOIN provision_member AS M
+            ON TRUE
+            INNER JOIN global_nominal_account AS A
+            ON A.member_id = M.member_id
+            AND A.nominal_account_number = DA.nominal_account_number
+            AND A.deleted IS NULL
+            INNER JOIN payment_method AS P
+            ON P.member_id = M.member_id
+            AND P.description = DP.description
+            AND P.deleted IS NULL
+            WHERE D.deleted IS NULL
+            AND DA.member_id = 0
+            AND DP.member_id = 0
+        ) AS C
+        WHERE NOT EXISTS (
+            SELECT 1
+            FROM nominal_contra
+            WHERE global_nominal_account_id = C.global_nominal_account_id
+            AND payment_method_id = C.payment_method_id
+            AND transaction_type_id = C.transaction_type_id
+        )
+        """,
+    ),
+    (
+        'tax_rate',
+        """
+        INSERT INTO tax_rate (created, updated, extra, address_id, description, percent)
+        SELECT now(), now(), '{}', T.address_id, D.description, D.percent
+        FROM (SELECT DISTINCT address_id FROM unnest(%(address_ids)s::integer[]) AS T(address_id)) AS T
+        CROSS JOIN tax_rate AS D
+        WHERE D.deleted IS NULL
+        AND D.address_id = 0
+        AND NOT EXISTS (
+            SELECT 1
+            FROM tax_rate
+            WHERE deleted IS NULL
+            AND address_id = T.address_id
+        )
+        """,
+    ),
+)
+
+
+def _provision_shard(targets: Iterable[Target]) -> Dict[str, int]:
+    """
+    Provision Addresses in the current shard
+    """
+    targets = list(targets)
+    params = {
+        'address_ids': [target.address_id for target in targets],
+        'currency_ids': [target.currency_id for target in targets],
+        'member_ids': [target.member_id for target in targets],
+    }
+    created: Dict[str, int] = {}
+    using = router.db_for_write(GlobalNominalAccount)
+    # The lock stops two requests provisioning the same Member at once from both copying the chart of accounts
+    with transaction.atomic(using=using), db_lock(GlobalNominalAccount), connections[using].cursor() as cursor:
+        for table, sql in PROVISION_SQL:
+            cursor.execute(sql, params)
+            if table is not None:
+                created[table] = cursor.rowcount
+    return created
+
+
+def provision(targets: Iterable[Target]) -> Dict[str, int]:
+    """
+    Provision the default Financial records of many Addresses at once, in the shard of each Address
+    :param targets: The Addresses to provision
+    :return: The number of records created in each table
+    """
+    targets = list(targets)
+    by_address = {target.address_id: target for target in targets}
+    created: Dict[str, int] = {}
+    for shard, address_ids in group_by_shard(by_address).items():
+        with use_shard(shard):
+            counts = _provision_shard(by_address[address_id] for address_id in address_ids)
+        for table, count in counts.items():
+            created[table] = created.get(table, 0) + count
+    return created
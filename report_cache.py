@@ -0,0 +1,174 @@
+"""
+A cache for the results of the reports that aggregate data from the Nominal Ledger.
+
+Results are keyed by the report's ETag (see `financial.conditional`), which is derived from the report name, the Member,
+the normalised query parameters, the Ledger and Account Versions of every Address the report reads and the Nominal
+Account Version of the Member. Any write to the ledger or the Nominal Accounts of one of those Addresses, or to the
+Global Nominal Accounts of the Member, changes the key, so cached results never need to be invalidated explicitly;
+stale entries are simply never requested again and fall out of the cache through eviction or expiry. Both backends
+expire results `REPORT_CACHE_TIMEOUT` seconds after they are stored.
+
+The backend is chosen with the `REPORT_CACHE_BACKEND` setting:
+    - `lru`: A size bounded, least recently used cache in the memory of each process
+    - `django`: The Django cache named by `REPORT_CACHE_ALIAS`, shared between processes
+    - `none`: Caching is disabled
+"""
+# stdlib
+import threading
+import time
+from collections import defaultdict, OrderedDict
+from typing import Any, Dict, Optional
+# libs
+from django.conf import settings
+from django.core.cache import caches
+
+
+__all__ = [
+    'DjangoCacheBackend',
+    'LRUBackend',
+    'report_cache',
+    'ReportCache',
+]
+
+
+class LRUBackend:
+    """
+    An in-process cache that holds at most `max_entries` results, evicting the least recently used one when full.
+    Results expire `timeout` seconds after they are stored
+    """
+
+    def __init__(self, max_entries: int, timeout: int):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        # The expiry time and the value of each result, from the least to the most recently used
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class DjangoCacheBackend:
+    """
+    Store results in one of the caches configured in the Django settings. Eviction is left to the cache itself
+    """
+
+    def __init__(self, alias: str, timeout: int):
+        self.alias = alias
+        self.timeout = timeout
+
+    def get(self, key: str) -> Optional[Any]:
+        return caches[self.alias].get(key)
+
+    def set(self, key: str, value: Any):
+        caches[self.alias].set(key, value, self.timeout)
+
+    def clear(self):
+        caches[self.alias].clear()
+
+
+class ReportCache:
+    """
+    Look up and store report results, recording the outcome and latency of each lookup on the tracer span
+    """
+
+    def __init__(self):
+        self._backend = None
+        self._lock = threading.Lock()
+        # Hits and misses since the process started, per report
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {'hits': 0, 'misses': 0})
+
+    @property
+    def backend(self):
+        """
+        Create the backend from the settings the first time it is needed
+        """
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    name = settings.REPORT_CACHE_BACKEND
+                    if name == 'lru':
+                        self._backend = LRUBackend(settings.REPORT_CACHE_MAX_ENTRIES, settings.REPORT_CACHE_TIMEOUT)
+                    elif name == 'django':
+                        self._backend = DjangoCacheBackend(settings.REPORT_CACHE_ALIAS, settings.REPORT_CACHE_TIMEOUT)
+                    else:
+                        self._backend = False
+        return self._backend
+
+    @staticmethod
+    def _key(etag: str) -> str:
+        return 'financial_report_' + etag.strip('"')
+
+    def get(self, report: str, etag: str, span) -> Optional[Dict[str, Any]]:
+        """
+        Retrieve the cached result of a report
+        :param report: The name of the report, used for the metrics
+        :param etag: The ETag of the report, from `financial.conditional.get_report_etag`
+        :param span: The span to record the metrics on
+        :return: The cached response content, or None if there is no cached result
+        """
+        if not self.backend:
+            span.set_tag('cache_enabled', False)
+            return None
+
+        start = time.perf_counter()
+        value = self.backend.get(self._key(etag))
+        latency = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            stats = self._stats[report]
+            stats['hits' if value is not None else 'misses'] += 1
+            hits, misses = stats['hits'], stats['misses']
+
+        span.set_tag('cache_backend', settings.REPORT_CACHE_BACKEND)
+        span.set_tag('cache_hit', value is not None)
+        span.set_tag('cache_get_ms', round(latency, 3))
+        span.set_tag('cache_report_hits', hits)
+        span.set_tag('cache_report_misses', misses)
+        return value
+
+    def set(self, report: str, etag: str, content: Dict[str, Any], span):
+        """
+        Store the result of a report
+        :param report: The name of the report
+        :param etag: The ETag of the report, from `financial.conditional.get_report_etag`
+        :param content: The response content to cache
+        :param span: The span to record the metrics on
+        """
+        if not self.backend:
+            return
+
+        start = time.perf_counter()
+        self.backend.set(self._key(etag), content)
+        span.set_tag('cache_report', report)
+        span.set_tag('cache_set_ms', round((time.perf_counter() - start) * 1000, 3))
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        The hits and misses of each report since the process started
+        """
+        with self._lock:
+            return {report: dict(stats) for report, stats in self._stats.items()}
+
+
+report_cache = ReportCache()
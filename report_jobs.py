@@ -0,0 +1,423 @@
+"""
+Background jobs for the reports that take too long to be returned within the gateway timeout.
+
+A job is submitted with the name of a report and the parameters its service takes. Report workers, started with the
+`run_report_workers` management command, claim queued jobs with `SELECT ... FOR UPDATE SKIP LOCKED` and run the
+report by passing a request with those parameters through the full middleware stack and view, authenticated with the
+token of the User who submitted the job. The token is only stored encrypted with a key derived from `SECRET_KEY`, and is
+cleared once the job has run. Jobs that are still queued `FINANCIAL_REPORT_JOB_TOKEN_TTL` seconds after they were
+submitted are failed, as the token they would be run with has expired. The response is stored on the job, so the result
+is exactly what the report service would have returned, including any validation or permission errors.
+
+While a job runs, the name of each tracer span its view opens is recorded on the job as its stage. Its progress is the
+number of stages reached out of the number the last completed job of the same report went through.
+
+A job submitted while an identical job is still queued or running is answered with that job instead. Jobs are
+identical when they are for the same report, parameters and Address, and were submitted by Users with the same
+permissions. A job can only be read by the Users of its Address with the same permissions as the User who submitted
+it, see `access_key`. Finished jobs are deleted `FINANCIAL_REPORT_JOB_TTL` seconds after they finish, and jobs that
+have been running for longer than `FINANCIAL_REPORT_JOB_TIMEOUT` seconds are failed, as their worker has stopped.
+"""
+# stdlib
+import base64
+import contextvars
+import hashlib
+import json
+import logging
+import multiprocessing
+import signal
+import time
+from datetime import timedelta
+from typing import Any, Dict, Optional, Tuple
+# libs
+from cryptography.fernet import Fernet, InvalidToken
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.db import connections, IntegrityError, router, transaction
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.request import Request
+# local
+from financial.models import ReportJob
+from financial.sharding import use_shard
+
+
+__all__ = [
+    'access_key',
+    'claim',
+    'REPORTS',
+    'run_job',
+    'run_workers',
+    'submit',
+    'sweep',
+    'work',
+]
+
+logger = logging.getLogger(__name__)
+
+# The reports that can be run as jobs, with the name of their service's URL and its method
+REPORTS = {
+    'balance_sheet': ('balance_sheet_collection', 'get'),
+    'creditor_ledger': ('creditor_ledger_collection', 'get'),
+    'creditor_ledger_aged': ('creditor_ledger_aged_collection', 'get'),
+    'debtor_ledger': ('debtor_ledger_collection', 'get'),
+    'debtor_ledger_aged': ('debtor_ledger_aged_collection', 'get'),
+    'profit_and_loss': ('profit_and_loss_collection', 'get'),
+    'purchases_analysis': ('purchases_analysis_collection', 'get'),
+    'purchases_by_country': ('purchases_by_country_collection', 'get'),
+    'rtd': ('rtd_collection', 'get'),
+    'sales_analysis': ('sales_analysis_collection', 'get'),
+    'sales_by_country': ('sales_by_country_collection', 'get'),
+    'statement': ('statement_collection', 'post'),
+    'trial_balance': ('trial_balance_collection', 'get'),
+    'vat3': ('vat3_collection', 'get'),
+    'vies_purchases': ('vies_purchases_collection', 'get'),
+    'vies_sales': ('vies_sales_collection', 'get'),
+}
+
+# The most often the progress of a running job is written, in seconds
+PROGRESS_INTERVAL = 1.0
+# How often idle workers delete expired jobs and fail stopped ones, in seconds
+SWEEP_INTERVAL = 60.0
+
+
+class _TokenExpired(Exception):
+    """
+    Raised when the token a job would be run with has expired, or can't be decrypted
+    """
+
+
+def _hash(key: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def access_key(request: Request) -> str:
+    """
+    The key of the Address and permissions of the requesting User. The report services return the same result to every
+    User with the same key, so a job can be read by any of them
+    """
+    return _hash({
+        'address_id': request.user.address['id'],
+        'administrator': request.user.administrator,
+        'global_active': request.user.global_active,
+        'member_id': request.user.member['id'],
+    })
+
+
+def _dedup_key(request: Request, report: str, params: Dict[str, Any]) -> str:
+    """
+    The key of a job that is the same for every job that would return the same result
+    """
+    return _hash({'access_key': access_key(request), 'params': params, 'report': report})
+
+
+def _fernet() -> Fernet:
+    """
+    The cipher the tokens of jobs are stored with, keyed from SECRET_KEY
+    """
+    key = hashlib.sha256(f'financial.report_jobs:{settings.SECRET_KEY}'.encode()).digest()
+    return Fernet(base64.urlsafe_b64encode(key))
+
+
+def _encrypt_token(token: Optional[str]) -> Optional[str]:
+    if not token:
+        return None
+    return _fernet().encrypt(token.encode()).decode()
+
+
+def _decrypt_token(job: ReportJob) -> str:
+    """
+    The token of the User who submitted a job
+    :raises _TokenExpired: If the token was stored more than FINANCIAL_REPORT_JOB_TOKEN_TTL seconds ago, or can't be
+                           decrypted
+    """
+    if job.token is None:
+        return ''
+    try:
+        return _fernet().decrypt(job.token.encode(), ttl=settings.FINANCIAL_REPORT_JOB_TOKEN_TTL).decode()
+    except InvalidToken:
+        raise _TokenExpired(
+            'The token of the User who submitted the job expired before the job was run. Submit the report again.',
+        )
+
+
+def submit(request: Request, report: str, params: Dict[str, Any]) -> Tuple[ReportJob, bool]:
+    """
+    Queue a report to be run by a report worker, unless an identical job is already queued or running
+    :param request: The request submitting the job. The report is run as its User
+    :param report: The name of the report, one of REPORTS
+    :param params: The parameters to run the report with, as they would be sent to its service
+    :return: The job, and whether it was created or is an identical job that was already in flight
+    """
+    key = _dedup_key(request, report, params)
+    job = ReportJob.objects.filter(dedup_key=key, status__in=ReportJob.IN_FLIGHT).first()
+    if job is not None:
+        return job, False
+
+    try:
+        with transaction.atomic(using=router.db_for_write(ReportJob)):
+            job = ReportJob.objects.create(
+                access_key=access_key(request),
+                address_id=request.user.address['id'],
+                dedup_key=key,
+                extra={'host': request.get_host(), 'secure': request.is_secure()},
+                params=params,
+                report=report,
+                token=_encrypt_token(request.user.token),
+                user_id=request.user.id,
+            )
+    except IntegrityError:
+        # An identical job was submitted at the same time
+        job = ReportJob.objects.filter(dedup_key=key, status__in=ReportJob.IN_FLIGHT).first()
+        if job is None:
+            raise
+        return job, False
+    return job, True
+
+
+class _Progress:
+    """
+    Records the stages of the job being run by this worker
+    """
+
+    def __init__(self, job: ReportJob, shard: str, expected: Optional[int]):
+        self.job_id = job.pk
+        self.shard = shard
+        self.expected = expected
+        self.count = 0
+        self.written = 0.0
+
+    def reached(self, stage: str):
+        self.count += 1
+        now = time.monotonic()
+        if now - self.written < PROGRESS_INTERVAL:
+            return
+        self.written = now
+        progress = 0
+        if self.expected:
+            progress = min(99, self.count * 100 // self.expected)
+        with use_shard(self.shard):
+            ReportJob.objects.filter(pk=self.job_id).update(stage=stage[:100], progress=progress)
+
+
+_progress: contextvars.ContextVar[Optional[_Progress]] = contextvars.ContextVar('financial_job_progress', default=None)
+
+
+class _ProgressTracer:
+    """
+    Wraps the tracer of a worker so the spans opened by a job's view record its progress. Everything else is passed to
+    the wrapped tracer
+    """
+
+    def __init__(self, tracer):
+        self._tracer = tracer
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._tracer, name)
+
+    def start_span(self, operation_name: str = '', *args: Any, **kwargs: Any):
+        progress = _progress.get()
+        if progress is not None:
+            progress.reached(operation_name)
+        return self._tracer.start_span(operation_name, *args, **kwargs)
+
+
+_handler: Optional[BaseHandler] = None
+
+
+def _get_handler() -> BaseHandler:
+    """
+    The handler jobs are run with, which passes requests through the same middleware as the API
+    """
+    global _handler
+    if _handler is None:
+        handler = BaseHandler()
+        handler.load_middleware()
+        _handler = handler
+    return _handler
+
+
+def _replay(job: ReportJob) -> Tuple[int, Any]:
+    """
+    Run the report of a job through its service
+    :return: The status code and content of the response
+    """
+    url_name, method = REPORTS[job.report]
+    factory = RequestFactory(HTTP_HOST=job.extra.get('host', 'localhost'), HTTP_X_AUTH_TOKEN=_decrypt_token(job))
+    secure = job.extra.get('secure', False)
+    path = reverse(url_name)
+    if method == 'get':
+        request = factory.get(path, job.params, secure=secure)
+    else:
+        request = factory.generic(
+            method.upper(),
+            path,
+            json.dumps(job.params),
+            content_type='application/json',
+            secure=secure,
+        )
+        # The request is made by the worker, not a browser
+        request._dont_enforce_csrf_checks = True
+
+    response = _get_handler().get_response(request)
+    try:
+        if getattr(response, 'streaming', False):
+            raise ValueError(f'The {job.report} service returned a streaming response')
+        content = json.loads(response.content) if len(response.content) > 0 else None
+        return response.status_code, content
+    finally:
+        response.close()
+
+
+def claim() -> Optional[Tuple[ReportJob, str]]:
+    """
+    Claim the oldest queued job in any shard
+    :return: The job and the shard it is in, or None if there are no queued jobs
+    """
+    for shard in settings.FINANCIAL_SHARDS:
+        with use_shard(shard), transaction.atomic(using=router.db_for_write(ReportJob)):
+            job = ReportJob.objects.select_for_update(skip_locked=True).filter(
+                status=ReportJob.STATUS_QUEUED,
+            ).order_by('created').first()
+            if job is None:
+                continue
+            job.status = ReportJob.STATUS_RUNNING
+            job.started = timezone.now()
+            job.save(update_fields=['status', 'started', 'updated'])
+        return job, shard
+    return None
+
+
+def run_job(job: ReportJob, shard: str):
+    """
+    Run a claimed job and store its result
+    :param job: The job, which must have been claimed
+    :param shard: The shard the job is in
+    """
+    with use_shard(shard):
+        expected = ReportJob.objects.filter(
+            report=job.report,
+            stages__isnull=False,
+            status=ReportJob.STATUS_COMPLETED,
+        ).order_by('-finished').values_list('stages', flat=True).first()
+
+    progress = _Progress(job, shard, expected)
+    token = _progress.set(progress)
+    try:
+        status_code, result = _replay(job)
+        status = ReportJob.STATUS_COMPLETED
+        error = None
+    except _TokenExpired as e:
+        status_code = result = None
+        status = ReportJob.STATUS_FAILED
+        error = str(e)
+    except Exception as e:
+        logger.exception('Report Job %s failed', job.pk)
+        status_code = result = None
+        status = ReportJob.STATUS_FAILED
+        error = str(e)
+    finally:
+        _progress.reset(token)
+
+    now = timezone.now()
+    with use_shard(shard):
+        ReportJob.objects.filter(pk=job.pk).update(
+            error=error,
+            expires=now + timedelta(seconds=settings.FINANCIAL_REPORT_JOB_TTL),
+            finished=now,
+            progress=100,
+            result=result,
+            stage='',
+            stages=progress.count if status == ReportJob.STATUS_COMPLETED else None,
+            status=status,
+            status_code=status_code,
+            token=None,
+            updated=now,
+        )
+
+
+def sweep():
+    """
+    Delete expired jobs, and fail the jobs whose worker stopped while running them or whose token has expired
+    """
+    now = timezone.now()
+    for shard in settings.FINANCIAL_SHARDS:
+        with use_shard(shard):
+            ReportJob.objects.filter(expires__lt=now).delete()
+            ReportJob.objects.filter(
+                started__lt=now - timedelta(seconds=settings.FINANCIAL_REPORT_JOB_TIMEOUT),
+                status=ReportJob.STATUS_RUNNING,
+            ).update(
+                error='The report worker running the job stopped before it finished',
+                expires=now + timedelta(seconds=settings.FINANCIAL_REPORT_JOB_TTL),
+                finished=now,
+                status=ReportJob.STATUS_FAILED,
+                token=None,
+                updated=now,
+            )
+            ReportJob.objects.filter(
+                created__lt=now - timedelta(seconds=settings.FINANCIAL_REPORT_JOB_TOKEN_TTL),
+                status=ReportJob.STATUS_QUEUED,
+            ).update(
+                error='The token of the User who submitted the job expired before the job was run. Submit the report '
+                      'again.',
+                expires=now + timedelta(seconds=settings.FINANCIAL_REPORT_JOB_TTL),
+                finished=now,
+                status=ReportJob.STATUS_FAILED,
+                token=None,
+                updated=now,
+            )
+
+
+def work(poll_interval: float, stop: Any):
+    """
+    Run jobs until told to stop. The job being run when `stop` is set is finished first
+    :param poll_interval: The seconds to wait between checks for jobs when there are none
+    :param stop: An Event that is set to stop the worker
+    """
+    # Ctrl-C is handled by the process that started the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if not isinstance(settings.TRACER, _ProgressTracer):
+        settings.TRACER = _ProgressTracer(settings.TRACER)
+
+    swept = 0.0
+    while not stop.is_set():
+        claimed = claim()
+        if claimed is not None:
+            run_job(*claimed)
+            continue
+        if time.monotonic() - swept >= SWEEP_INTERVAL:
+            sweep()
+            swept = time.monotonic()
+        stop.wait(poll_interval)
+    connections.close_all()
+
+
+def run_workers(processes: int, poll_interval: float = 1.0):
+    """
+    Run a pool of worker processes until the process receives SIGINT or SIGTERM
+    :param processes: The number of worker processes, each of which runs one job at a time
+    :param poll_interval: The seconds idle workers wait between checks for jobs
+    """
+    # The workers are forked, and must not share the connections of this process
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    stop = context.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+
+    workers = [
+        context.Process(target=work, args=(poll_interval, stop), name=f'report_worker_{number}')
+        for number in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join()
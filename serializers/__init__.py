@@ -1,5 +1,6 @@
 from .allocation import AllocationSerializer
 from .allocation_detail import AllocationDetailSerializer
+from .auto_allocation import AutoAllocationLineSerializer, AutoAllocationSerializer
 from .contra_nominal_ledger import ContraNominalLedgerSerializer
 from .credit_limit import CreditLimitSerializer
 from .creditor_account import CreditorAccountHistorySerializer, CreditorAccountStatementSerializer
@@ -10,6 +11,7 @@ from .email_log import EmailLogSerializer
 from .statement import StatementSerializer
 from .global_nominal_account import GlobalNominalAccountSerializer
 from .journal_entry import JournalEntrySerializer
+from .journal_import import JournalImportRowSerializer, JournalImportSerializer
 from .nominal_account_history import NominalAccountHistorySerializer
 from .nominal_account_type import NominalAccountTypeSerializer
 from .nominal_contra import NominalContraSerializer
@@ -19,6 +21,7 @@ from .payment_method import PaymentMethodSerializer
 from .period_end import PeriodEndSerializer
 from .purchases_analysis import PurchasesAnalysisSerializer
 from .purchases_by_territory import PurchasesByTerritorySerializer
+from .report_job import ReportJobSerializer
 from .rtd import RTDSerializer
 from .sales_analysis import SalesAnalysisSerializer
 from .sales_by_territory import SalesByTerritorySerializer
@@ -72,6 +75,10 @@ __all__ = [
     # Journal Entry
     'JournalEntrySerializer',
 
+    # Journal Import
+    'JournalImportRowSerializer',
+    'JournalImportSerializer',
+
     # Nominal Account History
     'NominalAccountHistorySerializer',
 
@@ -99,6 +106,9 @@ __all__ = [
     # Purchases By Territory
     'PurchasesByTerritorySerializer',
 
+    # Report Job
+    'ReportJobSerializer',
+
     # RTD (Return of Trading Details)
     'RTDSerializer',
 
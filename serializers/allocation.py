@@ -2,6 +2,7 @@
 import serpy
 # local
 from .allocation_detail import AllocationDetailSerializer
+from .nominal_ledger_line import get_account_names
 
 __all__ = [
     'AllocationSerializer',
@@ -33,12 +34,26 @@ class AllocationSerializer(serpy.Serializer):
     address_id = serpy.Field(required=False)
     allocation_type = serpy.MethodField()
     created = serpy.Field(attr='created.isoformat', call=True)
-    details = AllocationDetailSerializer(many=True, attr='details.iterator', call=True)
+    details = serpy.MethodField()
     id = serpy.Field()
     uri = serpy.Field(attr='get_absolute_url', call=True)
 
     # Backwards Compatibility
     old_address_id = serpy.Field(attr='address_id', label='idAddress')
 
+    def __init__(self, *args, **kwargs):
+        super(AllocationSerializer, self).__init__(*args, **kwargs)
+        self.context = kwargs.get('context', dict())
+
+        if self.instance is not None:
+            # Fetch the account names for the Nominal Ledger entries in every Allocation in one query
+            allocations = self.instance if self.many else [self.instance]
+            entries = [detail.nominal_ledger for allocation in allocations for detail in allocation.details.all()]
+            self.context['account_names'] = get_account_names(entries)
+
     def get_allocation_type(self, obj):
         return 'Customer' if obj.nominal_account_number == 1300 else 'Supplier'
+
+    def get_details(self, obj):
+        # Use the prefetched details, `details.iterator` would query the db again for every Allocation
+        return AllocationDetailSerializer(instance=obj.details.all(), many=True, context=self.context).data
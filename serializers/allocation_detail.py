@@ -27,9 +27,17 @@ class AllocationDetailSerializer(serpy.Serializer):
     credit_amount = serpy.StrField()
     debit_amount = serpy.StrField()
     id = serpy.Field()
-    nominal_ledger = NominalLedgerSerializer()
+    nominal_ledger = serpy.MethodField()
 
     # Backwards Compatibility
     old_credit_amount = serpy.Field(attr='credit_amount', label='totalCredits')
     old_debit_amount = serpy.Field(attr='debit_amount', label='totalDebits')
-    old_nominal_ledger = NominalLedgerSerializer(attr='nominal_ledger', label='journal')
+    old_nominal_ledger = serpy.MethodField('get_nominal_ledger', label='journal')
+
+    def __init__(self, *args, **kwargs):
+        super(AllocationDetailSerializer, self).__init__(*args, **kwargs)
+        self.context = kwargs.get('context', dict())
+
+    def get_nominal_ledger(self, obj):
+        # Pass on the context so the account names fetched by the AllocationSerializer are used
+        return NominalLedgerSerializer(instance=obj.nominal_ledger, context=self.context).data
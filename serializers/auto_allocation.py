@@ -0,0 +1,54 @@
+# libs
+import serpy
+
+
+__all__ = [
+    'AutoAllocationLineSerializer',
+    'AutoAllocationSerializer',
+]
+
+
+class AutoAllocationLineSerializer(serpy.Serializer):
+    """
+    amount:
+        description: |
+            The amount allocated from the Nominal Ledger entry, signed the same way as the lines sent to the
+            Allocation service
+        type: string
+    nominal_ledger_id:
+        description: The id of the Nominal Ledger entry
+        type: integer
+    transaction_type_id:
+        description: The Transaction Type of the Nominal Ledger entry
+        type: integer
+    tsn:
+        description: The Transaction Sequence Number of the Nominal Ledger entry
+        type: integer
+    """
+    amount = serpy.StrField()
+    nominal_ledger_id = serpy.Field(attr='nominal_ledger.pk')
+    transaction_type_id = serpy.Field(attr='nominal_ledger.transaction_type_id')
+    tsn = serpy.Field(attr='nominal_ledger.tsn')
+
+
+class AutoAllocationSerializer(serpy.Serializer):
+    """
+    allocation_id:
+        description: The id of the Allocation created for the match. It is null for a dry run
+        type: integer
+    contra_address_id:
+        description: The contra Address of the matched Nominal Ledger entries
+        type: integer
+    lines:
+        description: The amounts allocated from each matched Nominal Ledger entry
+        type: array
+        items:
+            $ref: '#/components/schemas/AutoAllocationLine'
+    strategy:
+        description: The strategy that made the match, one of `exact`, `reference` or `fifo`
+        type: string
+    """
+    allocation_id = serpy.Field()
+    contra_address_id = serpy.Field()
+    lines = AutoAllocationLineSerializer(many=True)
+    strategy = serpy.Field()
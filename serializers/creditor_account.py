@@ -149,7 +149,7 @@ class CreditorAccountHistorySerializer(NominalLedgerSerializer):
         creditor_adjustment = Q(nominal_ledger__transaction_type_id=10005) & \
             Q(nominal_account_number=reserved.CREDITOR_CONTROL_ACCOUNT)
 
-        debits = Decimal(str(NominalLedgerDebit.objects.filter(
+        debits = Decimal(str(NominalLedgerDebit.objects.lean().filter(
             date_query,
             creditor_adjustment | Q(nominal_ledger__transaction_type_id__in=[10003, 10004]),
             nominal_ledger__address_id=obj.address_id,
@@ -158,7 +158,7 @@ class CreditorAccountHistorySerializer(NominalLedgerSerializer):
             Sum('amount'),
         )['amount__sum'] or 0))
 
-        credits = Decimal(str(NominalLedgerCredit.objects.filter(
+        credits = Decimal(str(NominalLedgerCredit.objects.lean().filter(
             date_query,
             creditor_adjustment | Q(nominal_ledger__transaction_type_id=10002),
             nominal_ledger__address_id=obj.address_id,
@@ -150,7 +150,7 @@ class DebtorAccountHistorySerializer(NominalLedgerSerializer):
             Q(nominal_account_number=reserved.DEBTOR_CONTROL_ACCOUNT)
 
         # Get all the transactions that add to how much this Debtor owes -> sale invoices increase how much they owe
-        debits = Decimal(str(NominalLedgerDebit.objects.filter(
+        debits = Decimal(str(NominalLedgerDebit.objects.lean().filter(
             date_query,
             debtor_adjustment | Q(nominal_ledger__transaction_type_id=11002),
             nominal_ledger__address_id=obj.address_id,
@@ -161,7 +161,7 @@ class DebtorAccountHistorySerializer(NominalLedgerSerializer):
 
         # Get all the transactions that decrease how much this Debtor owes -> Sale Credit Notes and Sale Payments
         # decrease how much they owe
-        credits = Decimal(str(NominalLedgerCredit.objects.filter(
+        credits = Decimal(str(NominalLedgerCredit.objects.lean().filter(
             date_query,
             debtor_adjustment | Q(nominal_ledger__transaction_type_id__in=[11003, 11004]),
             nominal_ledger__address_id=obj.address_id,
@@ -0,0 +1,84 @@
+# stdlib
+from functools import lru_cache
+from typing import FrozenSet, NamedTuple, Optional, Type
+# libs
+import serpy
+from rest_framework.request import Request
+
+
+__all__ = [
+    'Fieldset',
+    'fieldset_from_request',
+    'sparse_serializer',
+]
+
+# The attribute names of the fields kept for backwards compatibility with the old API all start with this prefix
+LEGACY_PREFIX = 'old_'
+
+# Values of the `compact` query parameter that turn compact mode on
+TRUE_VALUES = frozenset(('1', 'true', 'yes', 'on'))
+
+
+class Fieldset(NamedTuple):
+    """
+    The fields of a response requested by the User
+    - `fields`: If set, only these fields are returned
+    - `exclude`: These fields are never returned
+    - `compact`: If True, the backwards compatible aliases for fields (e.g. `idAddress`) are not returned
+    """
+    fields: Optional[FrozenSet[str]] = None
+    exclude: FrozenSet[str] = frozenset()
+    compact: bool = False
+
+
+def _names(value: Optional[str]) -> Optional[FrozenSet[str]]:
+    if value is None:
+        return None
+    return frozenset(name.strip() for name in value.split(',') if name.strip() != '')
+
+
+def fieldset_from_request(request: Request) -> Fieldset:
+    """
+    Read the requested fieldset from the query parameters of a request
+    - `fields`: A comma separated list of the only fields to return
+    - `exclude_fields`: A comma separated list of fields not to return
+    - `compact`: Set to `true` to leave out the backwards compatible aliases of fields
+    :param request: The request being handled
+    :return: The Fieldset to pass to `sparse_serializer`
+    """
+    return Fieldset(
+        fields=_names(request.GET.get('fields')),
+        exclude=_names(request.GET.get('exclude_fields')) or frozenset(),
+        compact=str(request.GET.get('compact', '')).lower() in TRUE_VALUES,
+    )
+
+
+@lru_cache(maxsize=256)
+def sparse_serializer(serializer_class: Type[serpy.Serializer], fieldset: Fieldset) -> Type[serpy.Serializer]:
+    """
+    Generate a subclass of a serializer that only outputs the fields in a fieldset.
+    serpy compiles the getters of a serializer's fields once per class, so the subclass is built by filtering the
+    compiled fields of the given class. The generated classes are cached, so each combination of serializer and
+    fieldset is only compiled once per process.
+    :param serializer_class: The serializer to restrict
+    :param fieldset: The fields requested by the User, from `fieldset_from_request`
+    :return: The serializer itself if every field is requested, otherwise a subclass with only the requested fields
+    """
+    if fieldset == Fieldset():
+        return serializer_class
+
+    kept = set()
+    for name, field in serializer_class._field_map.items():
+        label = field.label or name
+        if fieldset.compact and name.startswith(LEGACY_PREFIX):
+            continue
+        if fieldset.fields is not None and label not in fieldset.fields:
+            continue
+        if label in fieldset.exclude:
+            continue
+        kept.add(label)
+
+    sparse = type(serializer_class)(f'Sparse{serializer_class.__name__}', (serializer_class,), {})
+    sparse._compiled_fields = tuple(field for field in serializer_class._compiled_fields if field[0] in kept)
+    sparse.fieldset = fieldset
+    return sparse
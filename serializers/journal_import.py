@@ -0,0 +1,96 @@
+# libs
+import serpy
+
+
+__all__ = [
+    'JournalImportRowSerializer',
+    'JournalImportSerializer',
+]
+
+
+class JournalImportRowSerializer(serpy.Serializer):
+    """
+    credit:
+        description: The credit amount as it was sent in the file
+        type: string
+    debit:
+        description: The debit amount as it was sent in the file
+        type: string
+    error:
+        description: The reason the row was rejected
+        type: string
+    nominal_account_number:
+        description: The Nominal Account number as it was sent in the file
+        type: string
+    reference:
+        description: The reference of the journal the row belongs to
+        type: string
+    row_number:
+        description: The number of the row in the file, starting from 1 for the first row after any header
+        type: integer
+    transaction_date:
+        description: The transaction date as it was sent in the file
+        type: string
+    """
+    credit = serpy.Field()
+    debit = serpy.Field()
+    error = serpy.Field()
+    nominal_account_number = serpy.Field()
+    reference = serpy.Field()
+    row_number = serpy.Field()
+    transaction_date = serpy.Field()
+
+
+class JournalImportSerializer(serpy.Serializer):
+    """
+    address_id:
+        description: The id of the Address the journals were imported into
+        type: integer
+    created:
+        description: The date the import was made
+        type: string
+    error:
+        description: The reason the file could not be read, if the import failed before any rows were checked
+        type: string
+    file_format:
+        description: The format of the imported file, either `csv` or `ndjson`
+        type: string
+    id:
+        description: The id of the Journal Import
+        type: integer
+    journals_imported:
+        description: The number of Journal Entries created by the import
+        type: integer
+    journals_rejected:
+        description: The number of journals that were not imported because one or more of their rows was invalid
+        type: integer
+    rejected_rows:
+        description: The rows of the file that were rejected, along with the reason for each
+        type: array
+        items:
+            $ref: '#/components/schemas/JournalImportRow'
+    rows_rejected:
+        description: The number of rows of the file that were not imported
+        type: integer
+    rows_total:
+        description: The number of rows in the file
+        type: integer
+    status:
+        description: The status of the import, one of `staged`, `completed` or `failed`
+        type: string
+    uri:
+        description: The absolute URL of the Journal Import that can be used to perform `Read` operations
+        type: string
+    """
+    address_id = serpy.Field()
+    created = serpy.Field(attr='created.isoformat', call=True)
+    error = serpy.Field()
+    file_format = serpy.Field()
+    id = serpy.Field()
+    journals_imported = serpy.Field()
+    journals_rejected = serpy.Field()
+    rejected_rows = JournalImportRowSerializer(many=True, attr='rows.iterator', call=True)
+    rows_rejected = serpy.Field()
+    rows_total = serpy.Field()
+    status = serpy.Field()
+    uri = serpy.Field(attr='get_absolute_url', call=True)
@@ -1,11 +1,9 @@
-# stdlib
-from itertools import chain
 # libs
 import serpy
 # local
-from financial.models.address_nominal_account import AddressNominalAccount
 from financial.serializers.email_log import EmailLogSerializer
-from financial.serializers.nominal_ledger_line import NominalLedgerLineSerializer
+from financial.serializers.fieldsets import Fieldset, sparse_serializer
+from financial.serializers.nominal_ledger_line import get_account_names, NominalLedgerLineSerializer
 
 
 __all__ = [
@@ -190,45 +188,22 @@ class NominalLedgerSerializer(serpy.Serializer):
     old_transaction_date = serpy.Field(attr='transaction_date.isoformat', call=True, label='transactionDate')
     old_unallocated_balance = serpy.StrField(attr='unallocated_balance', label='unallocatedBalance')
 
+    # The fields requested by the User, set on the classes generated by `sparse_serializer`
+    fieldset = Fieldset()
+
     def __init__(self, *args, **kwargs):
         super(NominalLedgerSerializer, self).__init__(*args, **kwargs)
         self.context = kwargs.get('context', dict())
+        self.line_serializer = sparse_serializer(NominalLedgerLineSerializer, Fieldset(compact=self.fieldset.compact))
 
-        if self.instance is not None:
-            self.context['account_names'] = self.get_account_names()
-
-    def get_account_names(self):
-        # Gather the account numbers from all the `debit` and `credit` records to be serialized so we can fetch all
-        # the account names in one query
-        if self.many:
-            # A queryset is being serialized
-            entries = self.instance
-        else:
-            # One object is being serialized
-            entries = [self.instance]
-
-        # Get all the unique Nominal Account Numbers
-        account_numbers = set()
-        for entry in entries:
-            for line in chain(entry.debits.all(), entry.credits.all()):
-                account_numbers.add(line.nominal_account_number)
-
-        account_names = dict()
-        if len(account_numbers) > 0:
-            # Get Address Nominal Account descriptions
-            accounts = AddressNominalAccount.objects.filter(
-                address_id=entries[0].address_id,
-                global_nominal_account__nominal_account_number__in=account_numbers,
-            ).values('global_nominal_account__nominal_account_number', 'description')
-
-            # Iterate through the accounts and make a dict of the values
-            for a in accounts.iterator():
-                account_names[a['global_nominal_account__nominal_account_number']] = a['description']
-
-        return account_names
+        # The account names are only needed if the debits or credits are being serialized, and may already have been
+        # fetched by a serializer this one is nested in
+        lines = any(field[0] in ('credits', 'debits') for field in self._compiled_fields)
+        if self.instance is not None and lines and 'account_names' not in self.context:
+            self.context['account_names'] = get_account_names(self.instance if self.many else [self.instance])
 
     def get_credits(self, obj):
-        return NominalLedgerLineSerializer(instance=obj.credits.all(), many=True, context=self.context).data
+        return self.line_serializer(instance=obj.credits.all(), many=True, context=self.context).data
 
     def get_debits(self, obj):
-        return NominalLedgerLineSerializer(instance=obj.debits.all(), many=True, context=self.context).data
+        return self.line_serializer(instance=obj.debits.all(), many=True, context=self.context).data
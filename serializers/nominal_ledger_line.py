@@ -1,3 +1,7 @@
+# stdlib
+from collections import defaultdict
+from itertools import chain
+from typing import Dict, Iterable
 # libs
 import serpy
 # local
@@ -5,10 +9,43 @@ from financial.models.address_nominal_account import AddressNominalAccount
 
 
 __all__ = [
+    'get_account_names',
     'NominalLedgerLineSerializer',
 ]
 
 
+def get_account_names(entries: Iterable) -> Dict[int, Dict[int, str]]:
+    """
+    Fetch the names of the Nominal Accounts used by the `debit` and `credit` records of the given Nominal Ledger entries
+    in one query, regardless of how many entries or Addresses there are. The debits and credits of the entries should
+    be prefetched.
+    :param entries: The Nominal Ledger entries to be serialized
+    :return: A dict of Address id to a dict of Nominal Account number to name, to be sent to the
+             NominalLedgerLineSerializer as `account_names` in its context
+    """
+    # Get all the unique Addresses and Nominal Account Numbers
+    address_ids = set()
+    account_numbers = set()
+    for entry in entries:
+        address_ids.add(entry.address_id)
+        for line in chain(entry.debits.all(), entry.credits.all()):
+            account_numbers.add(line.nominal_account_number)
+
+    account_names: Dict[int, Dict[int, str]] = defaultdict(dict)
+    if len(account_numbers) > 0:
+        # Get Address Nominal Account descriptions
+        accounts = AddressNominalAccount.objects.filter(
+            address_id__in=address_ids,
+            global_nominal_account__nominal_account_number__in=account_numbers,
+        ).values('address_id', 'global_nominal_account__nominal_account_number', 'description')
+
+        # Iterate through the accounts and make a dict of the values for each Address
+        for a in accounts.iterator():
+            account_names[a['address_id']][a['global_nominal_account__nominal_account_number']] = a['description']
+
+    return dict(account_names)
+
+
 class NominalLedgerLineSerializer(serpy.Serializer):
     """
     account_name:
@@ -87,7 +124,10 @@ class NominalLedgerLineSerializer(serpy.Serializer):
         :return: The name of a Nominal Account
         """
         if 'account_names' in self.context:
-            return self.context['account_names'].get(obj.nominal_account_number, 'Unavailable')
+            # The line's Nominal Ledger entry is cached on it when it is fetched through `entry.debits` or
+            # `entry.credits`, so this does not query the db
+            names = self.context['account_names'].get(obj.nominal_ledger.address_id, {})
+            return names.get(obj.nominal_account_number, 'Unavailable')
 
         # Only try to check the db if no `account_names` were sent. If the account could be found, its data should have
         # been in `account_names`.
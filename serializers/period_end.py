@@ -59,7 +59,7 @@ class PeriodEndSerializer(serpy.Serializer):
     year_end = serpy.MethodField()
 
     def get_year_end(self, obj):
-        return NominalLedger.year_ends.filter(
+        return NominalLedger.year_ends.lean().filter(
             address_id=obj.address_id,
             transaction_date=obj.transaction_date,
         ).exists()
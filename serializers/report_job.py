@@ -0,0 +1,75 @@
+# libs
+import serpy
+
+
+__all__ = [
+    'ReportJobSerializer',
+]
+
+
+class ReportJobSerializer(serpy.Serializer):
+    """
+    created:
+        description: The date the job was submitted
+        type: string
+    expires:
+        description: The date the job and its result will be deleted. Only set once the job has finished
+        type: string
+    finished:
+        description: The date the job finished
+        type: string
+    id:
+        description: The id of the Report Job
+        type: integer
+    params:
+        description: The parameters the report is run with
+        type: object
+    progress:
+        description: |
+            An estimate of how far the report has got, from 0 to 100, based on the stages of the last job for the same
+            report
+        type: integer
+    report:
+        description: The report being run
+        type: string
+    result_uri:
+        description: The URL the result can be fetched from once the job has completed
+        type: string
+    stage:
+        description: The stage of the report that is running
+        type: string
+    started:
+        description: The date a report worker started the job
+        type: string
+    status:
+        description: The status of the job, one of `queued`, `running`, `completed` or `failed`
+        type: string
+    status_code:
+        description: The status code the report's service responded with. Only set once the job has completed
+        type: integer
+    uri:
+        description: The absolute URL of the Report Job that can be used to perform `Read` operations
+        type: string
+    """
+    created = serpy.Field(attr='created.isoformat', call=True)
+    expires = serpy.MethodField()
+    finished = serpy.MethodField()
+    id = serpy.Field()
+    params = serpy.Field()
+    progress = serpy.Field()
+    report = serpy.Field()
+    result_uri = serpy.Field(attr='get_result_url', call=True)
+    stage = serpy.Field()
+    started = serpy.MethodField()
+    status = serpy.Field()
+    status_code = serpy.Field()
+    uri = serpy.Field(attr='get_absolute_url', call=True)
+
+    def get_expires(self, obj):
+        return obj.expires.isoformat() if obj.expires is not None else None
+
+    def get_finished(self, obj):
+        return obj.finished.isoformat() if obj.finished is not None else None
+
+    def get_started(self, obj):
+        return obj.started.isoformat() if obj.started is not None else None
@@ -1,11 +1,8 @@
-# stdlib
-from itertools import chain
 # libs
 import serpy
 # local
-from financial.models.address_nominal_account import AddressNominalAccount
 from financial.serializers.email_log import EmailLogSerializer
-from financial.serializers.nominal_ledger_line import NominalLedgerLineSerializer
+from financial.serializers.nominal_ledger_line import get_account_names, NominalLedgerLineSerializer
 
 
 __all__ = [
@@ -67,37 +64,7 @@ class YearEndSerializer(serpy.Serializer):
         self.context = kwargs.get('context', dict())
 
         if self.instance is not None:
-            self.context['account_names'] = self.get_account_names()
-
-    def get_account_names(self):
-        # Gather the account numbers from all the `debit` and `credit` records to be serialized so we can fetch all the
-        # account names in one query
-        if self.many:
-            # A queryset is being serialized
-            entries = self.instance
-        else:
-            # One object is being serialized
-            entries = [self.instance]
-
-        # Get all the unique Nominal Account Numbers
-        account_numbers = set()
-        for entry in entries:
-            for line in chain(entry.debits.all(), entry.credits.all()):
-                account_numbers.add(line.nominal_account_number)
-
-        account_names = dict()
-        if len(account_numbers) > 0:
-            # Get Address Nominal Account descriptions
-            accounts = AddressNominalAccount.objects.filter(
-                address_id=entries[0].address_id,
-                global_nominal_account__nominal_account_number__in=account_numbers,
-            ).values('global_nominal_account__nominal_account_number', 'description')
-
-            # Iterate through the accounts and make a dict of the values
-            for a in accounts.iterator():
-                account_names[a['global_nominal_account__nominal_account_number']] = a['description']
-
-        return account_names
+            self.context['account_names'] = get_account_names(self.instance if self.many else [self.instance])
 
     def get_credits(self, obj):
         return NominalLedgerLineSerializer(instance=obj.credits.all(), many=True, context=self.context).data
@@ -1,4 +1,5 @@
 # Local settings that change on a per application / per environment basis
+import json
 import os
 from typing import List
 
@@ -48,6 +49,43 @@ DATABASES = {
     },
 }
 
+# Shards for the ledgers of the largest Addresses. FINANCIAL_SHARD_HOSTS is a comma separated list of name=host pairs,
+# and FINANCIAL_SHARD_MAP is a JSON object mapping Address ids to shard names. Other Addresses use the financial
+# database
+FINANCIAL_SHARDS = ['financial']
+for pair in os.getenv('FINANCIAL_SHARD_HOSTS', '').split(','):
+    if pair == '':
+        continue
+    name, host = pair.split('=')
+    DATABASES[f'financial_{name}'] = {
+        **DATABASES['financial'],
+        'NAME': f'financial_{name}',
+        'HOST': host,
+    }
+    FINANCIAL_SHARDS.append(f'financial_{name}')
+FINANCIAL_SHARD_MAP = {
+    int(address_id): f'financial_{name}'
+    for address_id, name in json.loads(os.getenv('FINANCIAL_SHARD_MAP', '{}')).items()
+}
+
+# Read replicas of the financial database, used by the report and list services. A comma separated list of hosts
+FINANCIAL_REPLICA_HOSTS = [host for host in os.getenv('FINANCIAL_REPLICA_HOSTS', '').split(',') if host != '']
+FINANCIAL_REPLICAS = []
+for number, host in enumerate(FINANCIAL_REPLICA_HOSTS):
+    alias = f'financial_replica_{number}'
+    DATABASES[alias] = {
+        **DATABASES['financial'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'financial'},
+    }
+    FINANCIAL_REPLICAS.append(alias)
+# Replicas further behind the primary than this many seconds are not used
+FINANCIAL_REPLICA_MAX_LAG = float(os.getenv('FINANCIAL_REPLICA_MAX_LAG', 5))
+FINANCIAL_REPLICA_LAG_CHECK_INTERVAL = float(os.getenv('FINANCIAL_REPLICA_LAG_CHECK_INTERVAL', 1))
+# The Django cache that records which Addresses have just been written to, so their reads go to the primary. It must be
+# shared by every process
+FINANCIAL_REPLICA_PIN_CACHE_ALIAS = os.getenv('FINANCIAL_REPLICA_PIN_CACHE_ALIAS', 'default')
+
 DATABASE_ROUTERS = [
     'financial.db_router.FinancialRouter',
 ]
@@ -63,3 +101,46 @@ USE_L10N = False
 CLOUDCIX_INFLUX_TAGS = {
     'service_name': APPLICATION_NAME,
 }
+
+# Report result cache. One of 'lru' (in process), 'django' (the Django cache named by REPORT_CACHE_ALIAS) or 'none'
+REPORT_CACHE_BACKEND = os.getenv('REPORT_CACHE_BACKEND', 'lru')
+REPORT_CACHE_MAX_ENTRIES = int(os.getenv('REPORT_CACHE_MAX_ENTRIES', 512))
+REPORT_CACHE_ALIAS = os.getenv('REPORT_CACHE_ALIAS', 'default')
+# Seconds a cached report is kept for, by either backend
+REPORT_CACHE_TIMEOUT = int(os.getenv('REPORT_CACHE_TIMEOUT', 3600))
+
+# Statements slower than this many milliseconds are logged with their plan by financial.instrumentation. 0 disables it
+FINANCIAL_SLOW_QUERY_MS = float(os.getenv('FINANCIAL_SLOW_QUERY_MS', 500))
+
+# N+1 query detection by financial.n_plus_one. The mode is off, log or raise, and the allowlist is the path of a JSON
+# file of the known N+1 queries
+FINANCIAL_N_PLUS_ONE_MODE = os.getenv('FINANCIAL_N_PLUS_ONE_MODE', 'off')
+FINANCIAL_N_PLUS_ONE_SAMPLE_RATE = float(os.getenv('FINANCIAL_N_PLUS_ONE_SAMPLE_RATE', 0.01))
+FINANCIAL_N_PLUS_ONE_THRESHOLD = int(os.getenv('FINANCIAL_N_PLUS_ONE_THRESHOLD', 5))
+FINANCIAL_N_PLUS_ONE_ALLOWLIST = os.getenv('FINANCIAL_N_PLUS_ONE_ALLOWLIST') or None
+
+# Report Jobs are deleted this many seconds after they finish, and are failed if they run for longer than the timeout
+FINANCIAL_REPORT_JOB_TTL = int(os.getenv('FINANCIAL_REPORT_JOB_TTL', 86400))
+FINANCIAL_REPORT_JOB_TIMEOUT = int(os.getenv('FINANCIAL_REPORT_JOB_TIMEOUT', 3600))
+# Queued Report Jobs are failed once the token they were submitted with is this many seconds old, as it has expired. Set
+# it to the lifetime of the tokens issued to Users
+FINANCIAL_REPORT_JOB_TOKEN_TTL = int(os.getenv('FINANCIAL_REPORT_JOB_TOKEN_TTL', 3600))
+
+# Admission control by financial.admission. The limits of each class of request apply to each process, which must be a
+# threaded gunicorn worker with FINANCIAL_ADMISSION_THREADS threads. The slots and queues of the classes together must
+# fit in those threads, with most of them kept for posting, and the slots together are the most database connections
+# a process opens
+FINANCIAL_ADMISSION_THREADS = int(os.getenv('GUNICORN_THREADS', 12))
+FINANCIAL_ADMISSION = {
+    name: {
+        'slots': int(os.getenv(f'FINANCIAL_ADMISSION_{name.upper()}_SLOTS', slots)),
+        'tenant_slots': int(os.getenv(f'FINANCIAL_ADMISSION_{name.upper()}_TENANT_SLOTS', tenant_slots)),
+        'queue': int(os.getenv(f'FINANCIAL_ADMISSION_{name.upper()}_QUEUE', queue)),
+        'timeout': float(os.getenv(f'FINANCIAL_ADMISSION_{name.upper()}_TIMEOUT', timeout)),
+    }
+    for name, slots, tenant_slots, queue, timeout in (
+        ('posting', 4, 2, 2, 10),
+        ('light', 2, 1, 1, 5),
+        ('heavy', 2, 1, 1, 2),
+    )
+}
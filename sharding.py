@@ -0,0 +1,187 @@
+"""
+Address based sharding of the financial database.
+
+The ledgers of the largest Addresses can be kept in their own databases, or shards, for isolation. The shard of each
+Address is looked up in the `FINANCIAL_SHARD_MAP` setting, which maps Address ids to database aliases. Addresses that
+are not in the map use the `financial` database.
+
+`FinancialRouter` routes the queries of a request to the shard of the requesting User's Address. The request is made
+available to the router by `ShardMiddleware`. Code that runs outside of a request, or for another Address, selects a
+shard explicitly with `use_shard`.
+
+A contra transaction links the entries of two Addresses with a foreign key, so the ledgers of Addresses that trade with
+each other are kept together. When Addresses are mapped, `colocate` maps every Address they trade with, directly or
+through other Addresses, to the same shard. The `map_shards` management command works out that map from the ledgers in
+every shard. Transactions can't be made out to a contra Address in another shard, so every contra transaction, and the
+lookups of the pending contras of an Address, stay within one shard. The router refuses relations between objects on
+different shards.
+
+Every shard needs the financial migrations. `migrate` only migrates the database it is given, so use the
+`migrate_shards` management command, which the Docker image runs on start up, to migrate all of `FINANCIAL_SHARDS`, or
+run `migrate --database=<alias> financial` for each of them.
+"""
+# stdlib
+import contextvars
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+# libs
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+
+
+__all__ = [
+    'colocate',
+    'current_address_id',
+    'current_request',
+    'current_shard',
+    'group_by_shard',
+    'in_shard',
+    'PRIMARY',
+    'shard_for',
+    'ShardMiddleware',
+    'use_shard',
+]
+
+PRIMARY = 'financial'
+
+_shard: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('financial_shard', default=None)
+_request: contextvars.ContextVar[Optional[HttpRequest]] = contextvars.ContextVar('financial_request', default=None)
+
+
+def shard_for(address_id: int) -> str:
+    """
+    Look up the shard that holds the ledger of an Address
+    :param address_id: The id of the Address
+    :return: The alias of the shard's database
+    """
+    return settings.FINANCIAL_SHARD_MAP.get(address_id, PRIMARY)
+
+
+def group_by_shard(address_ids: Iterable[int]) -> Dict[str, List[int]]:
+    """
+    Group Addresses by the shard that holds their ledger
+    :param address_ids: The ids of the Addresses to group
+    :return: A dictionary mapping the alias of each shard to the ids of its Addresses
+    """
+    groups: Dict[str, List[int]] = defaultdict(list)
+    for address_id in address_ids:
+        groups[shard_for(address_id)].append(address_id)
+    return dict(groups)
+
+
+def colocate(shard_map: Mapping[int, str], pairs: Iterable[Tuple[int, int]]) -> Dict[int, str]:
+    """
+    Extend a shard map so every Address that trades with a mapped Address, directly or through other Addresses, is
+    mapped to the same shard
+    :param shard_map: The shards the Addresses being moved are mapped to
+    :param pairs: The (address_id, contra_address_id) pairs of every trading relationship
+    :return: The shard map with the trading partners of each mapped Address added
+    :raises ValueError: If Addresses that trade with each other are mapped to different shards
+    """
+    # Union find over the trading relationships
+    parent: Dict[int, int] = {}
+
+    def find(address_id: int) -> int:
+        root = address_id
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while address_id != root:
+            following = parent[address_id]
+            parent[address_id] = root
+            address_id = following
+        return root
+
+    for address_id, contra_address_id in pairs:
+        a, b = find(address_id), find(contra_address_id)
+        if a != b:
+            parent[max(a, b)] = min(a, b)
+
+    group_shards: Dict[int, str] = {}
+    for address_id, shard in shard_map.items():
+        root = find(address_id)
+        other = group_shards.setdefault(root, shard)
+        if other != shard:
+            raise ValueError(
+                f'Address {address_id} is mapped to {shard}, but trades with Addresses mapped to {other}',
+            )
+
+    colocated = dict(shard_map)
+    for address_id in parent:
+        shard = group_shards.get(find(address_id))
+        if shard is not None:
+            colocated[address_id] = shard
+    return colocated
+
+
+def current_request() -> Optional[HttpRequest]:
+    """
+    The request being handled, or None outside of a request
+    """
+    return _request.get()
+
+
+def current_address_id() -> Optional[int]:
+    """
+    The id of the Address of the User making the current request, or None outside of a request
+    """
+    # The authenticated User is only set on the request once the view has started
+    address = getattr(getattr(_request.get(), 'user', None), 'address', None)
+    if isinstance(address, dict) and 'id' in address:
+        return address['id']
+    return None
+
+
+def current_shard() -> str:
+    """
+    The shard that queries are currently routed to. This is the shard selected with `use_shard` if there is one,
+    otherwise the shard of the Address of the User making the current request
+    """
+    shard = _shard.get()
+    if shard is not None:
+        return shard
+
+    address_id = current_address_id()
+    if address_id is not None:
+        return shard_for(address_id)
+    return PRIMARY
+
+
+@contextmanager
+def use_shard(alias: str) -> Iterator[str]:
+    """
+    Route every query on financial models made inside the block to a shard
+    :param alias: The alias of the shard's database
+    """
+    token = _shard.set(alias)
+    try:
+        yield alias
+    finally:
+        _shard.reset(token)
+
+
+def in_shard(alias: str, iterable: Iterable[Any]) -> Iterator[Any]:
+    """
+    Iterate over an iterable with every query routed to a shard. Streamed responses are consumed after the view and
+    the middleware have returned, so their generators have to select the shard themselves.
+    :param alias: The alias of the shard's database
+    :param iterable: The iterable, usually a generator that runs queries
+    """
+    with use_shard(alias):
+        yield from iterable
+
+
+class ShardMiddleware:
+    """
+    Make the request being handled available to `current_shard`
+    """
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        token = _request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _request.reset(token)
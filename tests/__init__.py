@@ -0,0 +1,5 @@
+"""
+Tests for the Financial services, run with `python manage.py test financial.tests` in a project with the Financial
+databases configured. The migrations use Postgres features, so the tests need Postgres. The sharding tests need a
+second shard, e.g. `FINANCIAL_SHARD_HOSTS=a=localhost`, and are skipped without one.
+"""
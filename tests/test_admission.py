@@ -0,0 +1,116 @@
+"""
+Heavy requests beyond the limits of their class must be rejected with a 429 and a Retry-After header while other heavy
+requests hold the slots, without keeping posting requests out. Requests served by a gunicorn worker without threads,
+and limits that don't fit in the threads of a process, must be refused
+"""
+# stdlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest import mock
+# libs
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from rest_framework.response import Response
+from rest_framework.views import APIView
+# local
+from financial import admission
+from financial.admission import AdmissionMiddleware, AdmissionThrottle, check_limits
+
+
+LIMITS = {
+    'posting': {'slots': 4, 'tenant_slots': 4, 'queue': 0, 'timeout': 0},
+    'light': {'slots': 4, 'tenant_slots': 4, 'queue': 0, 'timeout': 0},
+    'heavy': {'slots': 2, 'tenant_slots': 2, 'queue': 0, 'timeout': 0},
+}
+
+
+class HeavyView(APIView):
+    """
+    A heavy report that holds its slot until it is told to finish, or a posting when it is sent a POST
+    """
+    authentication_classes = []
+    permission_classes = []
+    throttle_classes = [AdmissionThrottle]
+    started: threading.Semaphore = None
+    finish: threading.Event = None
+
+    def get(self, request):
+        self.started.release()
+        self.finish.wait(10)
+        return Response({})
+
+    def post(self, request):
+        return Response({}, status=201)
+
+
+@override_settings(FINANCIAL_ADMISSION=LIMITS)
+class AdmissionTest(SimpleTestCase):
+
+    def setUp(self):
+        patcher = mock.patch.dict(admission._gates, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.started = threading.Semaphore(0)
+        self.finish = threading.Event()
+        self.addCleanup(self.finish.set)
+        self.middleware = AdmissionMiddleware(HeavyView.as_view(started=self.started, finish=self.finish))
+
+    def _request(self, **meta):
+        request = RequestFactory().get('/trial_balance/', **meta)
+        request.resolver_match = SimpleNamespace(url_name='trial_balance_collection')
+        return request
+
+    def _fill_heavy(self, executor):
+        """
+        Start enough heavy requests to hold every heavy slot, and wait for them to be running
+        """
+        slots = LIMITS['heavy']['slots']
+        running = [executor.submit(self.middleware, self._request()) for _ in range(slots)]
+        for _ in range(slots):
+            self.assertTrue(self.started.acquire(timeout=10))
+        return running
+
+    def test_concurrent_heavy_requests(self):
+        with ThreadPoolExecutor(max_workers=LIMITS['heavy']['slots']) as executor:
+            running = self._fill_heavy(executor)
+            rejected = [self.middleware(self._request()) for _ in range(3)]
+            self.finish.set()
+            admitted = [future.result() for future in running]
+
+        for response in admitted:
+            self.assertEqual(response.status_code, 200)
+        for response in rejected:
+            self.assertEqual(response.status_code, 429)
+            self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+        # The slots are released once the responses have been sent
+        self.assertEqual(self.middleware(self._request()).status_code, 200)
+
+    def test_posting_while_heavy_is_full(self):
+        with ThreadPoolExecutor(max_workers=LIMITS['heavy']['slots']) as executor:
+            running = self._fill_heavy(executor)
+            request = RequestFactory().post('/account_sale_invoice/')
+            request.resolver_match = SimpleNamespace(url_name='account_sale_invoice_collection')
+            response = self.middleware(request)
+            self.finish.set()
+            for future in running:
+                future.result()
+        self.assertEqual(response.status_code, 201)
+
+    def test_limits_fit_in_threads(self):
+        check_limits(settings.FINANCIAL_ADMISSION, settings.FINANCIAL_ADMISSION_THREADS)
+        with self.assertRaises(ImproperlyConfigured):
+            check_limits(LIMITS, 9)
+
+    def test_sync_gunicorn_worker(self):
+        request = self._request(SERVER_SOFTWARE='gunicorn/22.0.0')
+        request.META['wsgi.multithread'] = False
+        with self.assertRaises(ImproperlyConfigured):
+            self.middleware(request)
+
+        request = self._request(SERVER_SOFTWARE='gunicorn/22.0.0')
+        request.META['wsgi.multithread'] = True
+        self.finish.set()
+        self.assertEqual(self.middleware(request).status_code, 200)
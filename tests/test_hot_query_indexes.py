@@ -0,0 +1,38 @@
+"""
+The hot queries on the ledger tables must be able to use the indexes added for them. Sequential scans are disabled, as
+the planner prefers them for a ledger as small as the test ledger, so the plans show the index the planner would pick
+for a large ledger.
+"""
+# stdlib
+import json
+# libs
+from django.db import connections, router
+# local
+from financial.management.commands.explain_hot_queries import hot_queries, plan_nodes
+from financial.models import NominalLedger
+from financial.tests.utils import LedgerTestCase
+
+
+# The index each hot query is expected to use
+INDEXES = {
+    'resource_read': 'ledger_address_type_tsn',
+    'outstanding_balances': 'ledger_outstanding',
+    'pending_contras': 'ledger_pending_contra',
+    'debit_lines': 'ledger_debit_ledger_account',
+    'credit_lines': 'ledger_credit_ledger_account',
+}
+
+
+class HotQueryIndexTest(LedgerTestCase):
+
+    def test_hot_queries_use_their_indexes(self):
+        with connections[router.db_for_read(NominalLedger)].cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+        queries = dict(hot_queries(self.scale.first_address_id))
+        self.assertEqual(set(queries), set(INDEXES))
+        for name, query in queries.items():
+            with self.subTest(name):
+                plan = json.loads(query.explain(format='json'))[0]['Plan']
+                used = {node['Index Name'] for node in plan_nodes(plan) if 'Index Name' in node}
+                self.assertIn(INDEXES[name], used, plan)
@@ -0,0 +1,81 @@
+"""
+The checks made before a transaction is posted, and the counts made for pagination, must run one query against
+`nominal_ledger` alone, without the joins and prefetches the default managers add for serialization
+"""
+# stdlib
+from types import SimpleNamespace
+# libs
+from django.http import QueryDict
+# local
+from financial.controllers.account_sale_invoice import AccountSaleInvoiceCreateController
+from financial.controllers.period_end import PeriodEndCreateController
+from financial.controllers.transaction_mixin import FinancialException, TransactionMixin
+from financial.models import NominalLedger
+from financial.permissions.period_end import Permissions as PeriodEndPermissions
+from financial.tests.utils import capture_queries, LedgerTestCase
+from financial.views.period_end import PeriodEndCollection
+from financial.views.year_end import YearEndCollection
+
+
+# The tables only the serialization prefetches and joins read
+PREFETCHED_TABLES = ('nominal_ledger_credits', 'nominal_ledger_debits', 'email_log')
+
+
+class LeanQueryTest(LedgerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.address_id = self.scale.first_address_id
+        self.request = SimpleNamespace(user=SimpleNamespace(address={'id': self.address_id}))
+        # Every Period End of the dataset is after its first day
+        self.date = self.scale.start.isoformat()
+
+    def assertLean(self, queries):
+        """
+        Assert that a check ran one query that reads nothing but the Nominal Ledger
+        """
+        self.assertEqual(len(queries), 1, [query['sql'] for query in queries])
+        sql = queries[0]['sql']
+        self.assertNotIn('JOIN', sql.upper())
+        for table in PREFETCHED_TABLES:
+            self.assertNotIn(f'"{table}"', sql)
+
+    def test_validate_transaction_date(self):
+        mixin = SimpleNamespace(request=self.request)
+        with capture_queries() as queries:
+            with self.assertRaises(FinancialException):
+                TransactionMixin._validate_transaction_date(mixin, self.date, 'iso_error', 'period_end_error')
+        self.assertLean(queries)
+
+    def test_controller_period_end_check(self):
+        controller = SimpleNamespace(cleaned_data={'address_id': self.address_id}, request=self.request)
+        with capture_queries() as queries:
+            error = AccountSaleInvoiceCreateController.validate_transaction_date(controller, self.date)
+        self.assertEqual(error, 'financial_account_sale_invoice_create_141')
+        self.assertLean(queries)
+
+    def test_period_end_create_check(self):
+        controller = SimpleNamespace(cleaned_data={}, request=self.request)
+        with capture_queries() as queries:
+            error = PeriodEndCreateController.validate_transaction_date(controller, self.date)
+        self.assertEqual(error, 'financial_period_end_create_104')
+        self.assertLean(queries)
+
+    def test_period_end_delete_permission(self):
+        first = NominalLedger.period_end.lean().filter(address_id=self.address_id).order_by('transaction_date').first()
+        self.assertIsNotNone(first)
+        with capture_queries() as queries:
+            error = PeriodEndPermissions.delete(self.request, first)
+        self.assertIsNotNone(error)
+        self.assertLean(queries)
+
+    def test_pagination_count(self):
+        # The list views count the lean queryset before they fetch the page with the prefetches
+        request = SimpleNamespace(GET=QueryDict(), span=None, user=self.request.user)
+        for view in (PeriodEndCollection(), YearEndCollection()):
+            with capture_queries() as queries:
+                response = view.get(request)
+            self.assertEqual(response.status_code, 200)
+            counts = [query for query in queries if 'COUNT(' in query['sql'].upper()]
+            self.assertLean(counts)
+            self.assertEqual(response.data['_metadata']['total_records'], len(response.data['content']))
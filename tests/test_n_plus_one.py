@@ -0,0 +1,70 @@
+"""
+Statements run in a loop must be reported as N+1 queries unless they are in the allowlist, and in `raise` mode every
+request must be checked, whatever the sample rate
+"""
+# stdlib
+from typing import List
+# libs
+from django.http import HttpResponse
+from django.test import override_settings, RequestFactory
+# local
+from financial.models import NominalLedger
+from financial.n_plus_one import NPlusOneDetector, NPlusOneError, NPlusOneMiddleware
+from financial.tests.utils import LedgerTestCase
+
+
+THRESHOLD = 5
+
+
+class NPlusOneTest(LedgerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ids: List[int] = list(
+            NominalLedger.objects.lean().filter(
+                address_id=self.scale.first_address_id,
+            ).values_list('id', flat=True)[:THRESHOLD],
+        )
+
+    def _in_a_loop(self):
+        for pk in self.ids:
+            NominalLedger.objects.lean().filter(pk=pk).exists()
+
+    def _at_once(self):
+        list(NominalLedger.objects.lean().filter(pk__in=self.ids))
+
+    def test_detector(self):
+        with self.assertRaises(NPlusOneError) as error:
+            with NPlusOneDetector(threshold=THRESHOLD, allowlist=[], view='test'):
+                self._in_a_loop()
+        [repetition] = error.exception.repetitions
+        self.assertEqual(repetition.view, 'test')
+        self.assertEqual(repetition.count, THRESHOLD)
+
+        # Known Repetitions are reported in `found` without failing
+        with NPlusOneDetector(threshold=THRESHOLD, allowlist=[repetition.key], view='test') as detector:
+            self._in_a_loop()
+        self.assertEqual([found.key for found in detector.found], [repetition.key])
+
+        with NPlusOneDetector(threshold=THRESHOLD, allowlist=[], view='test') as detector:
+            self._at_once()
+        self.assertEqual(detector.found, [])
+
+    @override_settings(
+        FINANCIAL_N_PLUS_ONE_ALLOWLIST=None,
+        FINANCIAL_N_PLUS_ONE_SAMPLE_RATE=0,
+        FINANCIAL_N_PLUS_ONE_THRESHOLD=THRESHOLD,
+    )
+    def test_middleware_modes(self):
+        def get_response(request):
+            self._in_a_loop()
+            return HttpResponse()
+
+        middleware = NPlusOneMiddleware(get_response)
+        with override_settings(FINANCIAL_N_PLUS_ONE_MODE='raise'):
+            with self.assertRaises(NPlusOneError):
+                middleware(RequestFactory().get('/'))
+
+        # None of the requests are sampled in `log` mode
+        with override_settings(FINANCIAL_N_PLUS_ONE_MODE='log'):
+            self.assertEqual(middleware(RequestFactory().get('/')).status_code, 200)
@@ -0,0 +1,31 @@
+"""
+Cached reports must be evicted when the in-process cache is full, and expire after REPORT_CACHE_TIMEOUT
+"""
+# stdlib
+from unittest import mock
+# libs
+from django.test import SimpleTestCase
+# local
+from financial.report_cache import LRUBackend
+
+
+class LRUBackendTest(SimpleTestCase):
+
+    def test_least_recently_used_is_evicted(self):
+        backend = LRUBackend(max_entries=2, timeout=60)
+        backend.set('a', 1)
+        backend.set('b', 2)
+        self.assertEqual(backend.get('a'), 1)
+        backend.set('c', 3)
+        self.assertIsNone(backend.get('b'))
+        self.assertEqual(backend.get('a'), 1)
+        self.assertEqual(backend.get('c'), 3)
+
+    def test_results_expire(self):
+        backend = LRUBackend(max_entries=2, timeout=60)
+        with mock.patch('financial.report_cache.time.monotonic', return_value=1000):
+            backend.set('a', 1)
+        with mock.patch('financial.report_cache.time.monotonic', return_value=1059):
+            self.assertEqual(backend.get('a'), 1)
+        with mock.patch('financial.report_cache.time.monotonic', return_value=1060):
+            self.assertIsNone(backend.get('a'))
@@ -0,0 +1,81 @@
+"""
+List serialization must make the same number of queries for a page of one record as for a page of many, however many
+Addresses the page spans
+"""
+# local
+from financial.models import Allocation, NominalLedger
+from financial.serializers import AllocationSerializer, ContraNominalLedgerSerializer, NominalLedgerSerializer
+from financial.serializers.nominal_ledger_line import get_account_names
+from financial.tests.utils import capture_queries, LedgerTestCase
+
+
+PAGE = 50
+
+
+class SerializationQueryTest(LedgerTestCase):
+
+    def _count(self, serializer, objs) -> int:
+        """
+        The number of queries made fetching and serializing a page
+        """
+        with capture_queries() as queries:
+            data = serializer(instance=objs, many=True).data
+        self.assertGreater(len(data), 0)
+        return len(queries)
+
+    def _spanning(self, queryset):
+        """
+        A page of a queryset with records of every Address of the ledger
+        """
+        ids = []
+        for address_id in range(self.scale.first_address_id, self.scale.first_contra_address_id):
+            ids.extend(queryset.filter(address_id=address_id).order_by('id').values_list('id', flat=True)[:PAGE // 2])
+        return queryset.filter(id__in=ids).order_by('id')
+
+    def test_nominal_ledger_list(self):
+        entries = NominalLedger.objects.filter(address_id=self.scale.first_address_id).order_by('id')
+        one = self._count(NominalLedgerSerializer, entries[:1])
+        many = self._count(NominalLedgerSerializer, entries[:PAGE])
+
+        # The entries, their credits, debits and email logs, and the account names of every line
+        self.assertEqual(one, 5)
+        self.assertEqual(many, one)
+
+    def test_nominal_ledger_list_spanning_addresses(self):
+        entries = self._spanning(NominalLedger.objects.all())
+        one = self._count(NominalLedgerSerializer, entries[:1])
+        many = self._count(NominalLedgerSerializer, entries[:PAGE])
+        self.assertEqual(many, one)
+
+    def test_contra_list_spanning_addresses(self):
+        # The sales and purchases made out to a contra Address by every Address that trades with it
+        entries = self._spanning(NominalLedger.objects.filter(contra_address_id=self.scale.first_contra_address_id))
+        one = self._count(ContraNominalLedgerSerializer, entries[:1])
+        many = self._count(ContraNominalLedgerSerializer, entries[:PAGE])
+
+        # The entries and their credits, debits and email logs. The contra lists don't name the accounts
+        self.assertEqual(one, 4)
+        self.assertEqual(many, one)
+
+    def test_account_names_spanning_addresses(self):
+        entries = list(self._spanning(
+            NominalLedger.objects.filter(contra_address_id=self.scale.first_contra_address_id),
+        ))
+        self.assertGreater(len({entry.address_id for entry in entries}), 1)
+
+        with capture_queries() as queries:
+            names = get_account_names(entries)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(set(names), {entry.address_id for entry in entries})
+
+    def test_allocation_list(self):
+        allocations = Allocation.objects.filter(address_id=self.scale.first_address_id).order_by('id')
+        one = self._count(AllocationSerializer, allocations[:1])
+        many = self._count(AllocationSerializer, allocations[:PAGE])
+        self.assertEqual(many, one)
+
+    def test_allocation_list_spanning_addresses(self):
+        allocations = self._spanning(Allocation.objects.all())
+        one = self._count(AllocationSerializer, allocations[:1])
+        many = self._count(AllocationSerializer, allocations[:PAGE])
+        self.assertEqual(many, one)
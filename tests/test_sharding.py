@@ -0,0 +1,149 @@
+"""
+Ledgers must be read from and written to the shard of their Address, with the Addresses they trade with, and Member
+wide queries must gather the results of every shard.
+
+The routing tests need a second shard, e.g. run the tests with `FINANCIAL_SHARD_HOSTS=a=localhost`.
+"""
+# stdlib
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+# libs
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import router
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+# local
+from financial.benchmarks.dataset import build, Scale
+from financial.controllers.account_sale_invoice import AccountSaleInvoiceCreateController
+from financial.db_router import fan_out
+from financial.models import NominalLedger
+from financial.sharding import colocate, group_by_shard, PRIMARY, shard_for, use_shard
+
+
+# The ledger kept in the second shard, whose Address trades with the contra Addresses after it
+SHARDED = Scale(addresses=1, entries=50, contras=2, years=1, bulk_lines=3, first_address_id=910001)
+# A ledger left in the financial database
+UNMAPPED = Scale(addresses=1, entries=50, contras=2, years=1, bulk_lines=3, first_address_id=920001)
+SHARD = settings.FINANCIAL_SHARDS[-1]
+# The sharded Address and every Address it trades with
+SHARD_MAP = {
+    address_id: SHARD
+    for address_id in range(SHARDED.first_address_id, SHARDED.bulk_contra_address_id + 1)
+}
+
+
+class ColocateTest(SimpleTestCase):
+
+    def test_trading_partners_follow_mapped_addresses(self):
+        pairs = [(1, 2), (2, 3), (4, 5), (6, 1)]
+        self.assertEqual(colocate({1: 'financial_a'}, pairs), {
+            1: 'financial_a',
+            2: 'financial_a',
+            3: 'financial_a',
+            6: 'financial_a',
+        })
+
+    def test_separate_groups(self):
+        shard_map = colocate({1: 'financial_a', 4: 'financial_b'}, [(1, 2), (4, 5)])
+        self.assertEqual(shard_map, {1: 'financial_a', 2: 'financial_a', 4: 'financial_b', 5: 'financial_b'})
+
+    def test_partners_mapped_to_different_shards(self):
+        with self.assertRaises(ValueError):
+            colocate({1: 'financial_a', 3: 'financial_b'}, [(1, 2), (2, 3)])
+
+
+@skipUnless(len(settings.FINANCIAL_SHARDS) > 1, 'Set FINANCIAL_SHARD_HOSTS to test more than one shard')
+@override_settings(FINANCIAL_SHARD_MAP=SHARD_MAP)
+class ShardRoutingTest(TestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        with use_shard(SHARD):
+            build(SHARDED)
+        with use_shard(PRIMARY):
+            build(UNMAPPED)
+
+    def test_ledgers_are_in_their_shard(self):
+        for scale, shard, other in ((SHARDED, SHARD, PRIMARY), (UNMAPPED, PRIMARY, SHARD)):
+            address_id = scale.first_address_id
+            self.assertEqual(shard_for(address_id), shard)
+            with use_shard(shard):
+                self.assertTrue(NominalLedger.objects.lean().filter(address_id=address_id).exists())
+            with use_shard(other):
+                self.assertFalse(NominalLedger.objects.lean().filter(address_id=address_id).exists())
+
+    def test_writes_follow_the_address(self):
+        with use_shard(SHARD):
+            entry = NominalLedger.objects.filter(address_id=SHARDED.first_address_id).first()
+        # The write goes to the shard of the entry's Address, whichever shard is selected
+        with use_shard(PRIMARY):
+            self.assertEqual(router.db_for_write(NominalLedger, instance=entry), SHARD)
+        with use_shard(PRIMARY):
+            other = NominalLedger.objects.filter(address_id=UNMAPPED.first_address_id).first()
+        self.assertFalse(router.allow_relation(entry, other))
+
+    def test_contras_are_in_the_shard_of_the_contra_address(self):
+        # The transactions made out to a contra Address are found in the contra Address' own shard
+        contra_address_id = SHARDED.first_contra_address_id
+        with use_shard(shard_for(contra_address_id)):
+            pending = NominalLedger.objects.lean().filter(contra_address_id=contra_address_id)
+            self.assertTrue(pending.filter(address_id=SHARDED.first_address_id).exists())
+
+    def test_contra_address_in_another_shard(self):
+        response = SimpleNamespace(status_code=200, json=lambda: {'content': {'id': UNMAPPED.first_address_id}})
+        controller = SimpleNamespace(
+            cleaned_data={},
+            request=SimpleNamespace(user=SimpleNamespace(address={'id': SHARDED.first_address_id}, token='')),
+            span=None,
+        )
+        with mock.patch('financial.controllers.account_sale_invoice.Membership') as membership:
+            membership.address.read.return_value = response
+            error = AccountSaleInvoiceCreateController.validate_contra_address_id(
+                controller,
+                UNMAPPED.first_address_id,
+            )
+            self.assertEqual(error, 'financial_account_sale_invoice_create_143')
+
+            error = AccountSaleInvoiceCreateController.validate_contra_address_id(
+                controller,
+                SHARDED.first_contra_address_id,
+            )
+            self.assertIsNone(error)
+
+    def test_map_shards(self):
+        call_command('map_shards', check=True)
+
+        # Mapping the Address without the Addresses it trades with would split their contras
+        with override_settings(FINANCIAL_SHARD_MAP={SHARDED.first_address_id: SHARD}):
+            with self.assertRaises(CommandError):
+                call_command('map_shards', check=True)
+
+
+@skipUnless(len(settings.FINANCIAL_SHARDS) > 1, 'Set FINANCIAL_SHARD_HOSTS to test more than one shard')
+@override_settings(FINANCIAL_SHARD_MAP=SHARD_MAP)
+class FanOutTest(TransactionTestCase):
+    """
+    fan_out queries each shard from its own thread and connection, which only see committed data
+    """
+    databases = '__all__'
+
+    def setUp(self):
+        with use_shard(SHARD):
+            build(SHARDED)
+        with use_shard(PRIMARY):
+            build(UNMAPPED)
+
+    def test_fan_out(self):
+        address_ids = [SHARDED.first_address_id, UNMAPPED.first_address_id]
+        self.assertEqual(group_by_shard(address_ids), {
+            SHARD: [SHARDED.first_address_id],
+            PRIMARY: [UNMAPPED.first_address_id],
+        })
+
+        def addresses(ids):
+            objs = NominalLedger.objects.lean().filter(address_id__in=ids)
+            return objs.values_list('address_id', flat=True).distinct()
+
+        self.assertEqual(sorted(fan_out(address_ids, addresses)), sorted(address_ids))
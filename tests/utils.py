@@ -0,0 +1,49 @@
+# stdlib
+from contextlib import contextmanager, ExitStack
+from typing import Dict, Iterator, List
+# libs
+from django.db import connections
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+# local
+from financial.benchmarks.dataset import build, Scale
+from financial.sharding import shard_for, use_shard
+
+
+__all__ = [
+    'capture_queries',
+    'LedgerTestCase',
+]
+
+
+@contextmanager
+def capture_queries() -> Iterator[List[Dict[str, str]]]:
+    """
+    Capture the queries made on every database while the block runs. The list is filled in once the block exits
+    """
+    queries: List[Dict[str, str]] = []
+    with ExitStack() as stack:
+        contexts = [stack.enter_context(CaptureQueriesContext(connection)) for connection in connections.all()]
+        yield queries
+    for context in contexts:
+        queries.extend(context.captured_queries)
+
+
+class LedgerTestCase(TestCase):
+    """
+    A TestCase with a small benchmark ledger: two Addresses trading with the same three contra Addresses, with
+    Allocations between their invoices and payments
+    """
+    databases = '__all__'
+    scale = Scale(addresses=2, entries=300, contras=3, years=1, bulk_lines=5, first_address_id=900001)
+
+    @classmethod
+    def setUpTestData(cls):
+        with use_shard(shard_for(cls.scale.first_address_id)):
+            build(cls.scale)
+
+    def setUp(self):
+        # Route the queries of each test to the shard the ledger was built in
+        stack = ExitStack()
+        stack.enter_context(use_shard(shard_for(self.scale.first_address_id)))
+        self.addCleanup(stack.close)
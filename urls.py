@@ -190,6 +190,20 @@ urlpatterns = [
         name='allocation_resource',
     ),
 
+    # Audit File
+    path(
+        'audit_file/',
+        views.AuditFileCollection.as_view(),
+        name='audit_file_collection',
+    ),
+
+    # Auto Allocation
+    path(
+        'auto_allocation/',
+        views.AutoAllocationCollection.as_view(),
+        name='auto_allocation_collection',
+    ),
+
     # Balance Sheet
     path(
         'balance_sheet/',
@@ -444,6 +458,18 @@ urlpatterns = [
         name='journal_entry_resource',
     ),
 
+    # Journal Import
+    path(
+        'journal_import/',
+        views.JournalImportCollection.as_view(),
+        name='journal_import_collection',
+    ),
+    path(
+        'journal_import/<int:pk>/',
+        views.JournalImportResource.as_view(),
+        name='journal_import_resource',
+    ),
+
     # Nominal Account History
     path(
         'nominal_account/<int:id>/history/',
@@ -470,6 +496,13 @@ urlpatterns = [
         name='nominal_contra_resource',
     ),
 
+    # Nominal Ledger Export
+    path(
+        'nominal_ledger_export/',
+        views.NominalLedgerExportCollection.as_view(),
+        name='nominal_ledger_export_collection',
+    ),
+
     # Payment Method
     path(
         'payment_method/',
@@ -522,6 +555,23 @@ urlpatterns = [
         name='purchases_by_territory_collection',
     ),
 
+    # Report Job
+    path(
+        'report_job/',
+        views.ReportJobCollection.as_view(),
+        name='report_job_collection',
+    ),
+    path(
+        'report_job/<int:pk>/',
+        views.ReportJobResource.as_view(),
+        name='report_job_resource',
+    ),
+    path(
+        'report_job/<int:pk>/result/',
+        views.ReportJobResultResource.as_view(),
+        name='report_job_result',
+    ),
+
     # RTD (Return of Trading Details)
     path(
         'rtd/',
@@ -1,13 +1,16 @@
 # stdlib
 import copy
+from datetime import date
 from decimal import Decimal
-from typing import Dict, List
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 # libs
 from cloudcix.api.membership import Membership
 from django.db.models import Model, Q, Sum
 from django.db.models.functions import Coalesce
 from rest_framework.request import Request
 # local
+from financial.archive import archived_totals
+from financial.db_router import fan_out
 from financial.eu_countries import eu_countries
 from financial.models import NominalLedgerCredit, NominalLedgerDebit
 
@@ -17,11 +20,15 @@ UK_LEFT_EU = '2020-12-31'
 
 __all__ = [
     'AccountContainer',
+    'get_account_totals',
     'get_addresses_in_member',
     'VIESCalculator',
     'VIESContainer',
 ]
 
+# The filters of a report on the lines that also apply to the archived totals of the lines
+ARCHIVED_FILTERS = ('nominal_account_number', 'nominal_ledger__transaction_type_id')
+
 
 class AccountContainer:
     """
@@ -37,6 +44,71 @@ class AccountContainer:
         self.nominal_account = None
 
 
+def get_account_totals(
+        address_ids: List[int],
+        filters: Dict[str, Any],
+        span,
+        archived_on: Optional[date] = None,
+        exclude_transaction_types: Iterable[int] = (),
+) -> Dict[int, AccountContainer]:
+    """
+    Total the debits and credits in each Nominal Account of the ledgers of some Addresses. The ledgers in each shard
+    are totalled concurrently, and the totals of the shards are added together.
+    :param address_ids: The ids of the Addresses in the report
+    :param filters: The filters on the debits and credits. The Addresses are filtered by shard
+    :param span: The span to record the shards queried on
+    :param archived_on: If given, lines archived up to this date are added from their archived totals instead of being
+                        summed again. Only for reports of every line up to this date.
+    :param exclude_transaction_types: Lines of these transaction types are left out
+    :return: A Container with the totals for each Nominal Account, ordered by Account Number
+    """
+    exclude_transaction_types = tuple(exclude_transaction_types)
+
+    def get_totals(ids: List[int]) -> List[Tuple[int, Decimal, Decimal]]:
+        totals = []
+        recent = Q()
+        if archived_on is not None:
+            archived = archived_totals(ids, archived_on)
+            recent = archived.recent
+            balances = archived.balances.filter(
+                **{k.removeprefix('nominal_ledger__'): v for k, v in filters.items() if k.startswith(ARCHIVED_FILTERS)},
+            ).exclude(
+                transaction_type_id__in=exclude_transaction_types,
+            ).values(
+                'nominal_account_number',
+            ).annotate(
+                total_debits=Sum('debits'),
+                total_credits=Sum('credits'),
+            )
+            totals.extend((b['nominal_account_number'], b['total_debits'], b['total_credits']) for b in balances)
+
+        for model in (NominalLedgerDebit, NominalLedgerCredit):
+            lines = model.objects.lean().filter(
+                recent,
+                **{**filters, 'nominal_ledger__address_id__in': ids},
+            ).exclude(
+                nominal_ledger__transaction_type_id__in=exclude_transaction_types,
+            ).values(
+                'nominal_account_number',
+            ).annotate(
+                total=Coalesce(Sum('amount'), Decimal('0')),
+            )
+            zero = Decimal('0')
+            for line in lines:
+                if model is NominalLedgerDebit:
+                    totals.append((line['nominal_account_number'], line['total'], zero))
+                else:
+                    totals.append((line['nominal_account_number'], zero, line['total']))
+        return totals
+
+    objs: Dict[int, AccountContainer] = {}
+    for account_number, debits, credits in fan_out(address_ids, get_totals, span):
+        obj = objs.setdefault(account_number, AccountContainer())
+        obj.total_debits += debits.quantize(Decimal('1.0000'))
+        obj.total_credits += credits.quantize(Decimal('1.0000'))
+    return dict(sorted(objs.items()))
+
+
 def get_addresses_in_member(request, span) -> List[int]:
     """
     Given a token, make requests to Membership to fetch all the Addresses in the Member that the token is from
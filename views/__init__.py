@@ -47,6 +47,8 @@ from .account_sale_payment import (
     AccountSalePaymentResource,
 )
 from .allocation import AllocationCollection, AllocationResource
+from .audit_file import AuditFileCollection
+from .auto_allocation import AutoAllocationCollection
 from .balance_sheet import (
     BalanceSheetCollection,
 )
@@ -109,15 +111,18 @@ from .debtor_ledger import (
 from .financial_setup import financial_setup
 from .global_nominal_account import GlobalNominalAccountCollection, GlobalNominalAccountResource
 from .journal_entry import JournalEntryCollection, JournalEntryResource
+from .journal_import import JournalImportCollection, JournalImportResource
 from .nominal_account_history import NominalAccountHistoryCollection
 from .nominal_account_type import NominalAccountTypeCollection
 from .nominal_contra import NominalContraCollection, NominalContraResource
+from .nominal_ledger_export import NominalLedgerExportCollection
 from .payment_method import PaymentMethodCollection, PaymentMethodResource
 from .period_end import PeriodEndCollection, PeriodEndResource
 from .profit_and_loss import ProfitAndLossCollection
 from .purchases_analysis import PurchasesAnalysisCollection
 from .purchases_by_country import PurchasesByCountryCollection
 from .purchases_by_territory import PurchasesByTerritoryCollection
+from .report_job import ReportJobCollection, ReportJobResource, ReportJobResultResource
 from .rtd import RTDCollection
 from .sales_analysis import SalesAnalysisCollection
 from .sales_by_country import SalesByCountryCollection
@@ -189,6 +194,9 @@ __all__ = [
     'AllocationCollection',
     'AllocationResource',
 
+    # Audit File
+    'AuditFileCollection',
+
     # Balance Sheet
     'BalanceSheetCollection',
 
@@ -270,6 +278,10 @@ __all__ = [
     'JournalEntryCollection',
     'JournalEntryResource',
 
+    # Journal Import
+    'JournalImportCollection',
+    'JournalImportResource',
+
     # Nominal Account History
     'NominalAccountHistoryCollection',
 
@@ -280,6 +292,9 @@ __all__ = [
     'NominalContraCollection',
     'NominalContraResource',
 
+    # Nominal Ledger Export
+    'NominalLedgerExportCollection',
+
     # Payment Method
     'PaymentMethodCollection',
     'PaymentMethodResource',
@@ -300,6 +315,11 @@ __all__ = [
     # Purchases by Territory
     'PurchasesByTerritoryCollection',
 
+    # Report Job
+    'ReportJobCollection',
+    'ReportJobResource',
+    'ReportJobResultResource',
+
     # Return Of Trading Details
     'RTDCollection',
 
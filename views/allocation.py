@@ -6,6 +6,7 @@ from cloudcix_rest.exceptions import Http400, Http404
 from cloudcix_rest.views import APIView
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.db import router, transaction
 from rest_framework import status
 from rest_framework.request import Request
 from rest_framework.response import Response
@@ -133,30 +134,37 @@ class AllocationCollection(APIView):
             if err is not None:
                 return err
 
-        with tracer.start_span('validating_controller', child_of=request.span) as span:
-            controller = AllocationCreateController(data=request.data, request=request, span=span)
-            if not controller.is_valid():
-                return Http400(errors=controller.errors)
-
-        with tracer.start_span('setting_address_id', child_of=request.span):
-            # Remove the details before calling controller.instance
-            details = controller.cleaned_data.pop('details')
-            obj = controller.instance
-            obj.address_id = request.user.address['id']
-
-        with tracer.start_span('saving_objects', child_of=request.span) as span:
-            with tracer.start_span('saving_allocation', child_of=span):
-                obj.save()
-            with tracer.start_span('saving_allocation_details', child_of=span):
-                for line in details:
-                    credit_amount = line['amount'] if line['amount'] < 0 else 0
-                    debit_amount = line['amount'] if line['amount'] > 0 else 0
-                    AllocationDetail.objects.create(
-                        allocation=obj,
-                        credit_amount=credit_amount,
-                        debit_amount=debit_amount,
-                        nominal_ledger=line['nominal_ledger'],
-                    )
+        # The controller locks the Nominal Ledger entries being allocated, so the entries are validated and the
+        # Allocation saved in one transaction
+        with transaction.atomic(using=router.db_for_write(Allocation)):
+            with tracer.start_span('validating_controller', child_of=request.span) as span:
+                controller = AllocationCreateController(data=request.data, request=request, span=span)
+                if not controller.is_valid():
+                    return Http400(errors=controller.errors)
+
+            with tracer.start_span('setting_address_id', child_of=request.span):
+                # Remove the details before calling controller.instance
+                details = controller.cleaned_data.pop('details')
+                obj = controller.instance
+                obj.address_id = request.user.address['id']
+
+            with tracer.start_span('saving_objects', child_of=request.span) as span:
+                # The details are inserted in a single statement, so the balance trigger updates each allocated
+                # Nominal Ledger entry once
+                with tracer.start_span('saving_allocation', child_of=span):
+                    obj.save()
+                with tracer.start_span('saving_allocation_details', child_of=span):
+                    allocation_details = []
+                    for line in details:
+                        credit_amount = line['amount'] if line['amount'] < 0 else 0
+                        debit_amount = line['amount'] if line['amount'] > 0 else 0
+                        allocation_details.append(AllocationDetail(
+                            allocation=obj,
+                            credit_amount=credit_amount,
+                            debit_amount=debit_amount,
+                            nominal_ledger=line['nominal_ledger'],
+                        ))
+                    AllocationDetail.objects.bulk_create(allocation_details)
         with tracer.start_span('serializing_data', child_of=span):
             data = AllocationSerializer(instance=obj).data
 
@@ -189,7 +197,7 @@ class AllocationResource(APIView):
 
         with tracer.start_span('retrieving_requested_object', child_of=request.span):
             try:
-                obj = Allocation.objects.get(id=pk)
+                obj = Allocation.objects.lean().get(id=pk)
             except Allocation.DoesNotExist:
                 return Http404(error_code='financial_allocation_delete_001')
 
@@ -199,6 +207,7 @@ class AllocationResource(APIView):
                 return err
 
         with tracer.start_span('saving_object', child_of=request.span):
-            obj.set_deleted()
+            with transaction.atomic(using=router.db_for_write(Allocation)):
+                obj.set_deleted()
 
         return Response(status=status.HTTP_204_NO_CONTENT)
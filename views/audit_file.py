@@ -0,0 +1,76 @@
+"""
+Management for Audit Files
+This service generates a standard audit file from the Nominal Ledger of an Address. It does not create any records
+"""
+
+# libs
+from cloudcix_rest.exceptions import Http400
+from cloudcix_rest.views import APIView
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.request import Request
+from rest_framework.response import Response
+# local
+from financial import __version__
+from financial.audit_file import generate_audit_file
+from financial.controllers.audit_file import AuditFileListController
+from financial.permissions.audit_file import Permissions
+from financial.sharding import in_shard, shard_for
+
+
+__all__ = [
+    'AuditFileCollection',
+]
+
+
+class AuditFileCollection(APIView):
+    """
+    Handles methods regarding Audit Files that don't require an id to be specified
+    """
+
+    def get(self, request: Request) -> Response:
+        """
+        summary: Stream the standard audit file of an Address for a period
+
+        description: |
+            Generate an XML audit file, modelled on the OECD SAF-T layout, for an Address over a period. The file
+            contains the chart of accounts with opening and closing balances, the customers and suppliers, the tax
+            table and every Nominal Ledger entry with its debit and credit lines. Each section ends with the control
+            totals for that section.
+
+            The file is streamed to the client as it is generated. A global active User can generate the audit file of
+            another Address in their Member by specifying an Address id.
+
+        responses:
+            200:
+                description: The audit file as XML
+            400: {}
+            403: {}
+        """
+        tracer = settings.TRACER
+
+        with tracer.start_span('validating_controller', child_of=request.span) as span:
+            controller = AuditFileListController(data=request.GET, request=request, span=span)
+            if not controller.is_valid():
+                return Http400(errors=controller.errors)
+
+        with tracer.start_span('checking_permissions', child_of=request.span) as span:
+            cd = controller.cleaned_data
+            err = Permissions.list(request, cd['address_id'], span)
+            if err is not None:
+                return err
+
+        with tracer.start_span('streaming_audit_file', child_of=request.span) as span:
+            address_id = cd['address_id'] if cd['address_id'] is not None else request.user.address['id']
+            span.set_tag('address_id', address_id)
+            response = StreamingHttpResponse(
+                in_shard(
+                    shard_for(address_id),
+                    generate_audit_file(address_id, cd['start_date'], cd['end_date'], __version__),
+                ),
+                content_type='application/xml',
+            )
+            filename = f'audit_file_{address_id}_{cd["start_date"]}_{cd["end_date"]}.xml'
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+
+        return response
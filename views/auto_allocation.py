@@ -0,0 +1,77 @@
+"""
+Management for Auto Allocations
+"""
+# libs
+from cloudcix_rest.exceptions import Http400
+from cloudcix_rest.views import APIView
+from django.conf import settings
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+# local
+from financial.allocation_engine import allocate
+from financial.controllers.auto_allocation import AutoAllocationCreateController
+from financial.permissions.auto_allocation import Permissions
+from financial.serializers import AutoAllocationSerializer
+
+
+__all__ = [
+    'AutoAllocationCollection',
+]
+
+
+class AutoAllocationCollection(APIView):
+    """
+    Handles methods regarding Auto Allocations that don't require an id to be specified, i.e. create
+    """
+
+    def post(self, request: Request) -> Response:
+        """
+        summary: Automatically allocate the open items of the Debtor or Creditor ledger
+
+        description: |
+            Match the transactions with an unallocated balance on the Sales or Purchases ledger of the User's Address
+            against each other, and create an Allocation for each match. The transactions of each contra Address are
+            matched separately, using the sent strategies in order:
+            - `exact`: A transaction is matched against the oldest transaction with exactly the opposite balance
+            - `reference`: Transactions with the same `external_reference` are matched against each other, oldest first
+            - `fifo`: The remaining transactions are matched against each other, oldest first
+
+            If `dry_run` is sent as true, the matches are returned without creating any Allocations.
+
+        responses:
+            200:
+                description: The proposed matches of a dry run
+            201:
+                description: The Allocations were created, the content contains the match of each
+            400: {}
+            403: {}
+        """
+        tracer = settings.TRACER
+
+        with tracer.start_span('checking_permissions', child_of=request.span):
+            err = Permissions.create(request)
+            if err is not None:
+                return err
+
+        with tracer.start_span('validating_controller', child_of=request.span) as span:
+            controller = AutoAllocationCreateController(data=request.data, request=request, span=span)
+            if not controller.is_valid():
+                return Http400(errors=controller.errors)
+
+        with tracer.start_span('allocating', child_of=request.span) as span:
+            matches = allocate(
+                address_id=request.user.address['id'],
+                allocation_type=controller.cleaned_data['allocation_type'],
+                contra_address_ids=controller.cleaned_data['contra_address_ids'],
+                strategies=controller.cleaned_data['strategies'],
+                dry_run=controller.cleaned_data['dry_run'],
+            )
+            span.set_tag('num_matches', len(matches))
+
+        with tracer.start_span('serializing_data', child_of=request.span):
+            data = AutoAllocationSerializer(instance=matches, many=True).data
+
+        if controller.cleaned_data['dry_run']:
+            return Response({'content': data})
+        return Response({'content': data}, status=status.HTTP_201_CREATED)
@@ -67,7 +67,7 @@ class CloudbillResource(APIView):
             }
             if request.user.id != 1:
                 kw['nominal_ledger__address_id'] = request.user.address['id']
-            data = NominalLedgerCredit.objects.exclude(
+            data = NominalLedgerCredit.objects.lean().exclude(
                 nominal_account_number=reserved.VAT_CONTROL_ACCOUNT,
             ).filter(**kw).annotate(
                 identifier=StripProductName('description'),
@@ -84,7 +84,7 @@ class CreditLimitCollection(APIView):
                 )
                 address['credit_limit'] = (response.json()['content']['credit_limit'])
                 # Now also calculate the current credit value
-                address['current_credit'] = NominalLedger.objects.filter(
+                address['current_credit'] = NominalLedger.objects.lean().filter(
                     address_id=request.user.address['id'],
                     contra_address_id=address['id'],
                     transaction_type_id__in=TRANSACTION_TYPES,
@@ -129,7 +129,7 @@ class CreditLimitResource(APIView):
 
         with tracer.start_span('get_current_credit', child_of=request.span):
             address['current_credit'] = Decimal(
-                NominalLedger.objects.filter(
+                NominalLedger.objects.lean().filter(
                     address_id=request.user.address['id'],
                     contra_address_id=address['id'],
                     transaction_type_id__in=TRANSACTION_TYPES,
@@ -16,18 +16,22 @@ from rest_framework.request import Request
 from rest_framework.response import Response
 # local
 from financial import reserved_accounts as reserved
+from financial.conditional import etag_headers, etag_matches, get_report_etag, not_modified
 from financial.controllers.creditor_account import (
     CreditorAccountListController,
 )
+from financial.db_router import replica_reads
 from financial.models import (
     NominalLedger,
     NominalLedgerCredit,
     NominalLedgerDebit,
 )
+from financial.report_cache import report_cache
 from financial.serializers import (
     CreditorAccountHistorySerializer,
     CreditorAccountStatementSerializer,
 )
+from financial.serializers.fieldsets import fieldset_from_request, sparse_serializer
 
 __all__ = [
     'CreditorAccountHistoryCollection',
@@ -40,6 +44,7 @@ class CreditorAccountHistoryCollection(APIView):
     Handles methods regarding the Nominal Ledger that don't require an id to be specified i.e. list
     """
 
+    @replica_reads
     def get(self, request: Request, id: int) -> Response:
         """
         summary: List all transactions made with a given Creditor
@@ -65,6 +70,18 @@ class CreditorAccountHistoryCollection(APIView):
             # By validating the controller we generate the filters
             controller.is_valid()
 
+        with tracer.start_span('checking_ledger_version', child_of=request.span):
+            fieldset = fieldset_from_request(request)
+            params = dict(controller.cleaned_data, contra_address_id=id, fieldset=fieldset)
+            etag = get_report_etag(request, 'creditor_account_history', [request.user.address['id']], params)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
+        with tracer.start_span('checking_report_cache', child_of=request.span) as span:
+            content = report_cache.get('creditor_account_history', etag, span)
+            if content is not None:
+                return Response(content, headers=etag_headers(etag))
+
         with tracer.start_span('get_objects', child_of=request.span):
             order = controller.cleaned_data['order']
             order2 = '-id' if order.startswith('-') else 'id'
@@ -84,7 +101,7 @@ class CreditorAccountHistoryCollection(APIView):
                 return Http400(error_code='financial_creditor_account_history_list_001')
 
         with tracer.start_span('gathering_total_debits', child_of=request.span):
-            debits = NominalLedgerDebit.objects.filter(
+            debits = NominalLedgerDebit.objects.lean().filter(
                 nominal_account_number=reserved.CREDITOR_CONTROL_ACCOUNT,
                 nominal_ledger__address_id=request.user.address['id'],
                 nominal_ledger__contra_address_id=id,
@@ -95,7 +112,7 @@ class CreditorAccountHistoryCollection(APIView):
             total_debits = Decimal(str(debits['amount__sum'] or 0)).quantize(Decimal('1.0000'))
 
         with tracer.start_span('gathering_total_credits', child_of=request.span):
-            credits = NominalLedgerCredit.objects.filter(
+            credits = NominalLedgerCredit.objects.lean().filter(
                 nominal_account_number=reserved.CREDITOR_CONTROL_ACCOUNT,
                 nominal_ledger__address_id=request.user.address['id'],
                 nominal_ledger__contra_address_id=id,
@@ -125,9 +142,13 @@ class CreditorAccountHistoryCollection(APIView):
 
         with tracer.start_span('serializing_data', child_of=request.span) as span:
             span.set_tag('num_objects', objs.count())
-            data = CreditorAccountHistorySerializer(instance=objs, many=True).data
+            data = sparse_serializer(CreditorAccountHistorySerializer, fieldset)(instance=objs, many=True).data
 
-        return Response({'content': data, '_metadata': metadata})
+        with tracer.start_span('caching_report', child_of=request.span) as span:
+            content = {'content': data, '_metadata': metadata}
+            report_cache.set('creditor_account_history', etag, content, span)
+
+        return Response(content, headers=etag_headers(etag))
 
 
 class CreditorAccountStatementCollection(APIView):
@@ -136,6 +157,7 @@ class CreditorAccountStatementCollection(APIView):
     i.e. list
     """
 
+    @replica_reads
     def get(self, request: Request, id: int) -> Response:
         """
         summary: List all transactions with a given Creditor that have not been fully allocated
@@ -163,6 +185,24 @@ class CreditorAccountStatementCollection(APIView):
             # By validating the controller we generate the filters
             controller.is_valid()
 
+        with tracer.start_span('checking_ledger_version', child_of=request.span):
+            # The period balances are bucketed relative to today, so the report also changes when the date does
+            fieldset = fieldset_from_request(request)
+            params = dict(
+                controller.cleaned_data,
+                contra_address_id=id,
+                fieldset=fieldset,
+                today=datetime.utcnow().date(),
+            )
+            etag = get_report_etag(request, 'creditor_account_statement', [request.user.address['id']], params)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
+        with tracer.start_span('checking_report_cache', child_of=request.span) as span:
+            content = report_cache.get('creditor_account_statement', etag, span)
+            if content is not None:
+                return Response(content, headers=etag_headers(etag))
+
         with tracer.start_span('get_objects', child_of=request.span):
             order = controller.cleaned_data['order']
             order2 = '-id' if order.startswith('-') else 'id'
@@ -200,7 +240,7 @@ class CreditorAccountStatementCollection(APIView):
                     Q(transaction_date=obj.transaction_date) & \
                     Q(id__lte=obj.id)
 
-                obj.running_balance = NominalLedger.objects.filter(
+                obj.running_balance = NominalLedger.objects.lean().filter(
                     purchase_filter,
                     date_filter,
                 ).aggregate(
@@ -213,7 +253,7 @@ class CreditorAccountStatementCollection(APIView):
             day30 = today - thirty_days
             day60 = day30 - thirty_days
             day90 = day60 - thirty_days
-            balances = NominalLedger.objects.filter(
+            balances = NominalLedger.objects.lean().filter(
                 purchase_filter,
             ).aggregate(
                 day30=Coalesce(Sum(
@@ -258,6 +298,10 @@ class CreditorAccountStatementCollection(APIView):
 
         with tracer.start_span('serializing_data', child_of=request.span) as span:
             span.set_tag('num_objects', objs.count())
-            data = CreditorAccountStatementSerializer(instance=objs, many=True).data
+            data = sparse_serializer(CreditorAccountStatementSerializer, fieldset)(instance=objs, many=True).data
+
+        with tracer.start_span('caching_report', child_of=request.span) as span:
+            content = {'content': data, '_metadata': metadata}
+            report_cache.set('creditor_account_statement', etag, content, span)
 
-        return Response({'content': data, '_metadata': metadata})
+        return Response(content, headers=etag_headers(etag))
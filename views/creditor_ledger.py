@@ -20,15 +20,19 @@ from rest_framework.request import Request
 from rest_framework.response import Response
 # local
 from financial import reserved_accounts as reserved
+from financial.conditional import etag_headers, etag_matches, get_report_etag, not_modified
 from financial.controllers.creditor_ledger import (
     CreditorLedgerAgedListController,
     CreditorLedgerContraTransactionListController,
     CreditorLedgerListController,
     CreditorLedgerTransactionListController,
 )
+from financial.db_router import replica_reads
 from financial.models.nominal_ledger import NominalLedger
+from financial.report_cache import report_cache
 from financial.serializers.nominal_ledger import NominalLedgerSerializer
 from financial.serializers.contra_nominal_ledger import ContraNominalLedgerSerializer
+from financial.serializers.fieldsets import fieldset_from_request, sparse_serializer
 
 ALLOWED_TRANSACTION_TYPES = (10000, 10007)
 
@@ -46,6 +50,7 @@ class CreditorLedgerCollection(APIView):
     Handles methods regarding Creditors on the Nominal Ledger that don't require an id to be specified i.e. list
     """
 
+    @replica_reads
     def get(self, request: Request) -> Response:
         """
         summary: Retrieve a list of outstanding balances between the User and their Creditors
@@ -66,10 +71,21 @@ class CreditorLedgerCollection(APIView):
             # By validating the controller we generate the search filters
             controller.is_valid()
 
+        with tracer.start_span('checking_ledger_version', child_of=request.span):
+            cd = controller.cleaned_data
+            etag = get_report_etag(request, 'creditor_ledger', [request.user.address['id']], cd)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
+        with tracer.start_span('checking_report_cache', child_of=request.span) as span:
+            content = report_cache.get('creditor_ledger', etag, span)
+            if content is not None:
+                return Response(content, headers=etag_headers(etag))
+
         with tracer.start_span('get_objects', child_of=request.span):
             # Get all the Nominal Ledger objects that have a debit or credit referencing the Creditor Control Account
             try:
-                debits = NominalLedger.objects.filter(
+                debits = NominalLedger.objects.lean().filter(
                     address_id=request.user.address['id'],
                     transaction_type_id__range=(10002, 10005),
                     debits__nominal_account_number=reserved.CREDITOR_CONTROL_ACCOUNT,
@@ -84,7 +100,7 @@ class CreditorLedgerCollection(APIView):
                     balance=Decimal('0'),
                 )
 
-                credits = NominalLedger.objects.filter(
+                credits = NominalLedger.objects.lean().filter(
                     address_id=request.user.address['id'],
                     transaction_type_id__range=(10002, 10005),
                     credits__nominal_account_number=reserved.CREDITOR_CONTROL_ACCOUNT,
@@ -147,7 +163,11 @@ class CreditorLedgerCollection(APIView):
                 'total_records': total_records,
             }
 
-        return Response({'content': objs, '_metadata': metadata})
+        with tracer.start_span('caching_report', child_of=request.span) as span:
+            content = {'content': objs, '_metadata': metadata}
+            report_cache.set('creditor_ledger', etag, content, span)
+
+        return Response(content, headers=etag_headers(etag))
 
 
 class CreditorLedgerAgedCollection(APIView):
@@ -167,7 +187,7 @@ class CreditorLedgerAgedCollection(APIView):
             kw['contra_address_id'] = contra_address_id
 
         def func(start_date, end_date):
-            balance = NominalLedger.objects.filter(
+            balance = NominalLedger.objects.lean().filter(
                 transaction_date__range=(start_date, end_date),
                 transaction_type_id__range=(10002, 10005),
                 **kw,
@@ -180,6 +200,7 @@ class CreditorLedgerAgedCollection(APIView):
             return balance.quantize(Decimal('1.0000'))
         return func
 
+    @replica_reads
     def get(self, request: Request) -> Response:
         """
         summary: Retrieve a list of Creditors with a breakdown of the outstanding balance for each one
@@ -200,8 +221,20 @@ class CreditorLedgerAgedCollection(APIView):
             # By validating the controller we generate the filters
             controller.is_valid()
 
+        with tracer.start_span('checking_ledger_version', child_of=request.span):
+            # The aged balances are bucketed relative to today, so the report also changes when the date does
+            params = dict(controller.cleaned_data, today=date.today(), default_order='order' not in request.GET)
+            etag = get_report_etag(request, 'creditor_ledger_aged', [request.user.address['id']], params)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
+        with tracer.start_span('checking_report_cache', child_of=request.span) as span:
+            content = report_cache.get('creditor_ledger_aged', etag, span)
+            if content is not None:
+                return Response(content, headers=etag_headers(etag))
+
         with tracer.start_span('get_objects', child_of=request.span):
-            contra_address_ids = NominalLedger.objects.filter(
+            contra_address_ids = NominalLedger.objects.lean().filter(
                 address_id=request.user.address['id'],
                 transaction_type_id__range=(10002, 10005),
             ).exclude(
@@ -314,7 +347,11 @@ class CreditorLedgerAgedCollection(APIView):
                 'current_balance': str(current_balance),
             }
 
-        return Response({'content': objs, '_metadata': metadata})
+        with tracer.start_span('caching_report', child_of=request.span) as span:
+            content = {'content': objs, '_metadata': metadata}
+            report_cache.set('creditor_ledger_aged', etag, content, span)
+
+        return Response(content, headers=etag_headers(etag))
 
 
 class CreditorLedgerTransactionCollection(APIView):
@@ -325,6 +362,7 @@ class CreditorLedgerTransactionCollection(APIView):
 
     serializer_class = NominalLedgerSerializer
 
+    @replica_reads
     def get(self, request: Request) -> Response:
         """
         summary: Retrieve a list of Purchase Transactions
@@ -343,6 +381,18 @@ class CreditorLedgerTransactionCollection(APIView):
             # By validating the controller we generate the filters
             controller.is_valid()
 
+        with tracer.start_span('checking_ledger_version', child_of=request.span):
+            fieldset = fieldset_from_request(request)
+            params = dict(controller.cleaned_data, fieldset=fieldset)
+            etag = get_report_etag(request, 'creditor_ledger_transaction', [request.user.address['id']], params)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
+        with tracer.start_span('checking_report_cache', child_of=request.span) as span:
+            content = report_cache.get('creditor_ledger_transaction', etag, span)
+            if content is not None:
+                return Response(content, headers=etag_headers(etag))
+
         with tracer.start_span('get_objects', child_of=request.span):
             order = controller.cleaned_data['order']
             order2 = '-id' if order.startswith('-') else 'id'
@@ -364,7 +414,7 @@ class CreditorLedgerTransactionCollection(APIView):
             credit_adjustment = Q(transaction_type_id=10005) & \
                 Q(credits__nominal_account_number=reserved.CREDITOR_CONTROL_ACCOUNT)
 
-            total_credits = NominalLedger.objects.filter(
+            total_credits = NominalLedger.objects.lean().filter(
                 Q(transaction_type_id__in=(10000, 10002, 10006)) | credit_adjustment,
                 address_id=request.user.address['id'],
             ).aggregate(
@@ -373,7 +423,7 @@ class CreditorLedgerTransactionCollection(APIView):
 
             debit_adjustment = Q(transaction_type_id=10005) & \
                 Q(debits__nominal_account_number=reserved.CREDITOR_CONTROL_ACCOUNT)
-            total_debits = NominalLedger.objects.filter(
+            total_debits = NominalLedger.objects.lean().filter(
                 Q(transaction_type_id__in=(10001, 10003, 10004, 10007)) | debit_adjustment,
                 address_id=request.user.address['id'],
             ).aggregate(
@@ -396,9 +446,13 @@ class CreditorLedgerTransactionCollection(APIView):
             }
 
         with tracer.start_span('serializing_data', child_of=request.span):
-            data = NominalLedgerSerializer(instance=objs, many=True).data
+            data = sparse_serializer(NominalLedgerSerializer, fieldset)(instance=objs, many=True).data
 
-        return Response({'content': data, '_metadata': metadata})
+        with tracer.start_span('caching_report', child_of=request.span) as span:
+            content = {'content': data, '_metadata': metadata}
+            report_cache.set('creditor_ledger_transaction', etag, content, span)
+
+        return Response(content, headers=etag_headers(etag))
 
 
 class CreditorLedgerContraTransactionCollection(APIView):
@@ -408,6 +462,7 @@ class CreditorLedgerContraTransactionCollection(APIView):
 
     serializer_class = ContraNominalLedgerSerializer
 
+    @replica_reads
     def get(self, request: Request) -> Response:
         """
         summary: Retrieve a list of Purchase Transactions made out to the requesting User's Address
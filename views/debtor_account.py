@@ -16,18 +16,22 @@ from rest_framework.request import Request
 from rest_framework.response import Response
 # local
 from financial import reserved_accounts as reserved
+from financial.conditional import etag_headers, etag_matches, get_report_etag, not_modified
 from financial.controllers.debtor_account import (
     DebtorAccountListController,
 )
+from financial.db_router import replica_reads
 from financial.models import (
     NominalLedger,
     NominalLedgerCredit,
     NominalLedgerDebit,
 )
+from financial.report_cache import report_cache
 from financial.serializers import (
     DebtorAccountHistorySerializer,
     DebtorAccountStatementSerializer,
 )
+from financial.serializers.fieldsets import fieldset_from_request, sparse_serializer
 
 
 __all__ = [
@@ -41,6 +45,7 @@ class DebtorAccountHistoryCollection(APIView):
     Handles methods regarding the Nominal Ledger that don't require an id to be specified i.e. list
     """
 
+    @replica_reads
     def get(self, request: Request, id: int) -> Response:
         """
         summary: List all transactions made with a given Debtor
@@ -64,6 +69,18 @@ class DebtorAccountHistoryCollection(APIView):
             # By validating the controller we generate the filters
             controller.is_valid()
 
+        with tracer.start_span('checking_ledger_version', child_of=request.span):
+            fieldset = fieldset_from_request(request)
+            params = dict(controller.cleaned_data, contra_address_id=id, fieldset=fieldset)
+            etag = get_report_etag(request, 'debtor_account_history', [request.user.address['id']], params)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
+        with tracer.start_span('checking_report_cache', child_of=request.span) as span:
+            content = report_cache.get('debtor_account_history', etag, span)
+            if content is not None:
+                return Response(content, headers=etag_headers(etag))
+
         with tracer.start_span('retrieve_requested_objects', child_of=request.span):
             order = controller.cleaned_data['order']
             order2 = '-id' if order.startswith('-') else 'id'
@@ -83,7 +100,7 @@ class DebtorAccountHistoryCollection(APIView):
                 return Http400(error_code='financial_debtor_account_history_list_001')
 
         with tracer.start_span('gathering_total_debits', child_of=request.span):
-            debits = NominalLedgerDebit.objects.filter(
+            debits = NominalLedgerDebit.objects.lean().filter(
                 nominal_account_number=reserved.DEBTOR_CONTROL_ACCOUNT,
                 nominal_ledger__address_id=request.user.address['id'],
                 nominal_ledger__contra_address_id=id,
@@ -94,7 +111,7 @@ class DebtorAccountHistoryCollection(APIView):
             total_debits = Decimal(str(debits['amount__sum'] or 0)).quantize(Decimal('1.0000'))
 
         with tracer.start_span('gathering_total_credits', child_of=request.span):
-            credits = NominalLedgerCredit.objects.filter(
+            credits = NominalLedgerCredit.objects.lean().filter(
                 nominal_account_number=reserved.DEBTOR_CONTROL_ACCOUNT,
                 nominal_ledger__address_id=request.user.address['id'],
                 nominal_ledger__contra_address_id=id,
@@ -124,9 +141,13 @@ class DebtorAccountHistoryCollection(APIView):
 
         with tracer.start_span('serializing_data', child_of=request.span) as span:
             span.set_tag('num_objects', objs.count())
-            data = DebtorAccountHistorySerializer(instance=objs, many=True).data
+            data = sparse_serializer(DebtorAccountHistorySerializer, fieldset)(instance=objs, many=True).data
 
-        return Response({'content': data, '_metadata': metadata})
+        with tracer.start_span('caching_report', child_of=request.span) as span:
+            content = {'content': data, '_metadata': metadata}
+            report_cache.set('debtor_account_history', etag, content, span)
+
+        return Response(content, headers=etag_headers(etag))
 
 
 class DebtorAccountStatementCollection(APIView):
@@ -135,6 +156,7 @@ class DebtorAccountStatementCollection(APIView):
     i.e. list
     """
 
+    @replica_reads
     def get(self, request: Request, id: int) -> Response:
         """
         summary: List all transactions with a given Debtor that have not been fully allocated
@@ -160,6 +182,24 @@ class DebtorAccountStatementCollection(APIView):
             # By validating the controller we generate the filters
             controller.is_valid()
 
+        with tracer.start_span('checking_ledger_version', child_of=request.span):
+            # The period balances are bucketed relative to today, so the report also changes when the date does
+            fieldset = fieldset_from_request(request)
+            params = dict(
+                controller.cleaned_data,
+                contra_address_id=id,
+                fieldset=fieldset,
+                today=datetime.utcnow().date(),
+            )
+            etag = get_report_etag(request, 'debtor_account_statement', [request.user.address['id']], params)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
+        with tracer.start_span('checking_report_cache', child_of=request.span) as span:
+            content = report_cache.get('debtor_account_statement', etag, span)
+            if content is not None:
+                return Response(content, headers=etag_headers(etag))
+
         with tracer.start_span('retrieve_requested_object', child_of=request.span):
             order = controller.cleaned_data['order']
             order2 = '-id' if order.startswith('-') else 'id'
@@ -197,7 +237,7 @@ class DebtorAccountStatementCollection(APIView):
                     Q(transaction_date=obj.transaction_date) & \
                     Q(id__lte=obj.id)
 
-                obj.running_balance = NominalLedger.objects.filter(
+                obj.running_balance = NominalLedger.objects.lean().filter(
                     sale_filter,
                     date_filter,
                 ).aggregate(
@@ -210,7 +250,7 @@ class DebtorAccountStatementCollection(APIView):
             day30 = today - thirty_days
             day60 = day30 - thirty_days
             day90 = day60 - thirty_days
-            balances = NominalLedger.objects.filter(
+            balances = NominalLedger.objects.lean().filter(
                 sale_filter,
             ).aggregate(
                 day30=Coalesce(Sum(
@@ -255,6 +295,10 @@ class DebtorAccountStatementCollection(APIView):
 
         with tracer.start_span('serializing_data', child_of=request.span) as span:
             span.set_tag('num_objects', objs.count())
-            data = DebtorAccountStatementSerializer(instance=objs, many=True).data
+            data = sparse_serializer(DebtorAccountStatementSerializer, fieldset)(instance=objs, many=True).data
+
+        with tracer.start_span('caching_report', child_of=request.span) as span:
+            content = {'content': data, '_metadata': metadata}
+            report_cache.set('debtor_account_statement', etag, content, span)
 
-        return Response({'content': data, '_metadata': metadata})
+        return Response(content, headers=etag_headers(etag))
@@ -20,15 +20,19 @@ from rest_framework.request import Request
 from rest_framework.response import Response
 # local
 from financial import reserved_accounts as reserved
+from financial.conditional import etag_headers, etag_matches, get_report_etag, not_modified
 from financial.controllers.debtor_ledger import (
     DebtorLedgerAgedListController,
     DebtorLedgerContraTransactionListController,
     DebtorLedgerListController,
     DebtorLedgerTransactionListController,
 )
+from financial.db_router import replica_reads
 from financial.models.nominal_ledger import NominalLedger
+from financial.report_cache import report_cache
 from financial.serializers.nominal_ledger import NominalLedgerSerializer
 from financial.serializers.contra_nominal_ledger import ContraNominalLedgerSerializer
+from financial.serializers.fieldsets import fieldset_from_request, sparse_serializer
 
 ALLOWED_TRANSACTION_TYPES = (11000, 11007)
 
@@ -46,6 +50,7 @@ class DebtorLedgerCollection(APIView):
     Handles methods regarding Debtors on the Nominal Ledger that don't require an id to be specified i.e. list
     """
 
+    @replica_reads
     def get(self, request: Request) -> Response:
         """
         summary: Retrieve a list of the outstanding balances between the User and their Debtors
@@ -65,10 +70,21 @@ class DebtorLedgerCollection(APIView):
             # By validating the controller we generate the filters
             controller.is_valid()
 
+        with tracer.start_span('checking_ledger_version', child_of=request.span):
+            cd = controller.cleaned_data
+            etag = get_report_etag(request, 'debtor_ledger', [request.user.address['id']], cd)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
+        with tracer.start_span('checking_report_cache', child_of=request.span) as span:
+            content = report_cache.get('debtor_ledger', etag, span)
+            if content is not None:
+                return Response(content, headers=etag_headers(etag))
+
         with tracer.start_span('get_objects', child_of=request.span):
             # Get all the Nominal Ledger objects that have a debit or credit referencing the Debtor Control Account
             try:
-                debits = NominalLedger.objects.filter(
+                debits = NominalLedger.objects.lean().filter(
                     address_id=request.user.address['id'],
                     transaction_type_id__range=(11002, 11005),
                     debits__nominal_account_number=reserved.DEBTOR_CONTROL_ACCOUNT,
@@ -83,7 +99,7 @@ class DebtorLedgerCollection(APIView):
                     balance=Decimal('0'),
                 )
 
-                credits = NominalLedger.objects.filter(
+                credits = NominalLedger.objects.lean().filter(
                     address_id=request.user.address['id'],
                     transaction_type_id__range=(11002, 11005),
                     credits__nominal_account_number=reserved.DEBTOR_CONTROL_ACCOUNT,
@@ -147,7 +163,11 @@ class DebtorLedgerCollection(APIView):
                 'balance': str(total_balance),
             }
 
-        return Response({'content': objs, '_metadata': metadata})
+        with tracer.start_span('caching_report', child_of=request.span) as span:
+            content = {'content': objs, '_metadata': metadata}
+            report_cache.set('debtor_ledger', etag, content, span)
+
+        return Response(content, headers=etag_headers(etag))
 
 
 class DebtorLedgerAgedCollection(APIView):
@@ -167,7 +187,7 @@ class DebtorLedgerAgedCollection(APIView):
             kw['contra_address_id'] = contra_address_id
 
         def func(start_date, end_date):
-            balance = NominalLedger.objects.filter(
+            balance = NominalLedger.objects.lean().filter(
                 transaction_date__range=(start_date, end_date),
                 transaction_type_id__range=(11002, 11005),
                 **kw,
@@ -180,6 +200,7 @@ class DebtorLedgerAgedCollection(APIView):
             return balance.quantize(Decimal('1.0000'))
         return func
 
+    @replica_reads
     def get(self, request: Request) -> Response:
         """
         summary: Retrieve a list of Debtors with a breakdown of the outstanding balance for each one
@@ -200,8 +221,20 @@ class DebtorLedgerAgedCollection(APIView):
             # By validating the controller we generate the filters
             controller.is_valid()
 
+        with tracer.start_span('checking_ledger_version', child_of=request.span):
+            # The aged balances are bucketed relative to today, so the report also changes when the date does
+            params = dict(controller.cleaned_data, today=date.today(), default_order='order' not in request.GET)
+            etag = get_report_etag(request, 'debtor_ledger_aged', [request.user.address['id']], params)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
+        with tracer.start_span('checking_report_cache', child_of=request.span) as span:
+            content = report_cache.get('debtor_ledger_aged', etag, span)
+            if content is not None:
+                return Response(content, headers=etag_headers(etag))
+
         with tracer.start_span('get_objects', child_of=request.span):
-            contra_address_ids = NominalLedger.objects.filter(
+            contra_address_ids = NominalLedger.objects.lean().filter(
                 address_id=request.user.address['id'],
                 transaction_type_id__range=(11002, 11005),
             ).exclude(
@@ -318,7 +351,11 @@ class DebtorLedgerAgedCollection(APIView):
                 'current_balance': str(current_balance),
             }
 
-        return Response({'content': objs, '_metadata': metadata})
+        with tracer.start_span('caching_report', child_of=request.span) as span:
+            content = {'content': objs, '_metadata': metadata}
+            report_cache.set('debtor_ledger_aged', etag, content, span)
+
+        return Response(content, headers=etag_headers(etag))
 
 
 class DebtorLedgerTransactionCollection(APIView):
@@ -328,6 +365,7 @@ class DebtorLedgerTransactionCollection(APIView):
 
     serializer_class = NominalLedgerSerializer
 
+    @replica_reads
     def get(self, request: Request) -> Response:
         """
         summary: Retrieve a list of Sale Transactions
@@ -346,6 +384,18 @@ class DebtorLedgerTransactionCollection(APIView):
             # By validating the controller we generate the filters
             controller.is_valid()
 
+        with tracer.start_span('checking_ledger_version', child_of=request.span):
+            fieldset = fieldset_from_request(request)
+            params = dict(controller.cleaned_data, fieldset=fieldset)
+            etag = get_report_etag(request, 'debtor_ledger_transaction', [request.user.address['id']], params)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
+        with tracer.start_span('checking_report_cache', child_of=request.span) as span:
+            content = report_cache.get('debtor_ledger_transaction', etag, span)
+            if content is not None:
+                return Response(content, headers=etag_headers(etag))
+
         with tracer.start_span('get_objects', child_of=request.span):
             order = controller.cleaned_data['order']
             order2 = '-id' if order.startswith('-') else 'id'
@@ -367,7 +417,7 @@ class DebtorLedgerTransactionCollection(APIView):
             credit_adjustment = Q(transaction_type_id=11005) & \
                 Q(credits__nominal_account_number=reserved.DEBTOR_CONTROL_ACCOUNT)
 
-            total_credits = NominalLedger.objects.filter(
+            total_credits = NominalLedger.objects.lean().filter(
                 Q(transaction_type_id__in=(11001, 11003, 11004, 11007)) | credit_adjustment,
                 address_id=request.user.address['id'],
             ).aggregate(
@@ -376,7 +426,7 @@ class DebtorLedgerTransactionCollection(APIView):
 
             debit_adjustment = Q(transaction_type_id=11005) & \
                 Q(debits__nominal_account_number=reserved.DEBTOR_CONTROL_ACCOUNT)
-            total_debits = NominalLedger.objects.filter(
+            total_debits = NominalLedger.objects.lean().filter(
                 Q(transaction_type_id__in=(11000, 11002, 11006)) | debit_adjustment,
                 address_id=request.user.address['id'],
             ).aggregate(
@@ -401,9 +451,13 @@ class DebtorLedgerTransactionCollection(APIView):
 
         with tracer.start_span('serializing_data', child_of=request.span) as span:
             span.set_tag('num_objects', len(objs))
-            data = NominalLedgerSerializer(instance=objs, many=True).data
+            data = sparse_serializer(NominalLedgerSerializer, fieldset)(instance=objs, many=True).data
 
-        return Response({'content': data, '_metadata': metadata})
+        with tracer.start_span('caching_report', child_of=request.span) as span:
+            content = {'content': data, '_metadata': metadata}
+            report_cache.set('debtor_ledger_transaction', etag, content, span)
+
+        return Response(content, headers=etag_headers(etag))
 
 
 class DebtorLedgerContraTransactionCollection(APIView):
@@ -413,6 +467,7 @@ class DebtorLedgerContraTransactionCollection(APIView):
 
     serializer_class = ContraNominalLedgerSerializer
 
+    @replica_reads
     def get(self, request: Request):
         """
         summary: Retrieve a list of Sale Transactions made out to the requesting User's Address
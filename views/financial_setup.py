@@ -1,16 +1,12 @@
-from ..models import (
-    GlobalNominalAccount,
-    NominalContra,
-    PaymentMethod,
-    StatementSettings,
-    TaxRate,
-)
+from ..provisioning import provision, Target
 
 
 def financial_setup(request):
     """
     summary:  |
-        This function checks and creates the default Financial records required for a Member to start using Financials
+        This function checks and creates the default Financial records required for a Member to start using Financials.
+        The records are copied from those of Member 0 and Address 0 with a few set based statements, see
+        `financial.provisioning`, which can also provision many Addresses at once
 
     description: |
         1. Create default Global Nominal Accounts
@@ -61,78 +57,8 @@ def financial_setup(request):
         - description: Reduced Rate; percent:13.5
         - description: Standard Rate; percent:23
     """
-    statement = StatementSettings.objects.filter(address_id=request.user.address['id'])
-    global_nominal_accounts = GlobalNominalAccount.objects.filter(member_id=request.user.member['id'])
-    payment_methods = PaymentMethod.objects.filter(member_id=request.user.member['id'])
-    tax_rates = TaxRate.objects.filter(address_id=request.user.address['id'])
-
-    # If a statement record for the requesting users address does not exist, one must be created
-    if statement.count() == 0:
-        StatementSettings.objects.create(address_id=request.user.address['id'])
-
-    # If no records exist for the global nominal accounts, payment records and tax_rate for requesting user's
-    # Member or Address, default records must be created
-    if global_nominal_accounts.count() == 0 and payment_methods.count() == 0 and tax_rates.count() == 0:
-        # Global Nominal Accounts
-        default_accounts = GlobalNominalAccount.objects.filter(member_id=0)
-
-        for account in default_accounts:
-            GlobalNominalAccount.objects.create(
-                currency_id=request.user.member['currency_id'],
-                description=account.description,
-                external_reference=account.external_reference,
-                member_id=request.user.member['id'],
-                nominal_account_number=account.nominal_account_number,
-                nominal_account_type=account.nominal_account_type,
-                valid_purchases_account=account.valid_purchases_account,
-                valid_sales_account=account.valid_sales_account,
-            )
-        # If no records exist for the payments method for requesting user's Member, default records must be created
-        # Payment Methods
-        default_payment_methods = PaymentMethod.objects.filter(member_id=0)
-        for payment_method in default_payment_methods:
-            PaymentMethod.objects.create(
-                description=payment_method.description,
-                member_id=request.user.member['id'],
-            )
-        # Nominal Contras
-        default_contras = NominalContra.objects.filter(
-            global_nominal_account__member_id=0,
-            payment_method__member_id=0,
-        )
-        # if no records exist for either global nominal account or payment methods for the requesting user's member then
-        # the default nominal contra records need to be created
-        for contra in default_contras:
-            try:
-                account = GlobalNominalAccount.objects.get(
-                    member_id=request.user.member['id'],
-                    nominal_account_number=contra.global_nominal_account.nominal_account_number,
-                )
-                payment_method = PaymentMethod.objects.get(
-                    deleted__isnull=True,
-                    member_id=request.user.member['id'],
-                    description=contra.payment_method.description,
-                )
-            except (GlobalNominalAccount.DoesNotExist, PaymentMethod.DoesNotExist):  # pragma: no cover
-                pass
-            try:
-                NominalContra.objects.get(
-                    global_nominal_account=account,
-                    payment_method=payment_method,
-                    transaction_type_id=contra.transaction_type_id,
-                )
-            except NominalContra.DoesNotExist:
-                NominalContra.objects.create(
-                    global_nominal_account=account,
-                    payment_method=payment_method,
-                    transaction_type_id=contra.transaction_type_id,
-                )
-
-        # Tax Rates
-        default_tax_rates = TaxRate.objects.filter(address_id=0)
-        for tax_rate in default_tax_rates:
-            TaxRate.objects.create(
-                address_id=request.user.address['id'],
-                percent=tax_rate.percent,
-                description=tax_rate.description,
-            )
+    provision([Target(
+        address_id=request.user.address['id'],
+        member_id=request.user.member['id'],
+        currency_id=request.user.member['currency_id'],
+    )])
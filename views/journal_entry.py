@@ -79,14 +79,14 @@ class JournalEntryCollection(APIView):
             # Get the total debits and credits. For some reason the models need to be switched for the metadata... This
             # is how it was done in the PY2 version. It shouldn't make a difference anyway since if everything is
             # working as intended then the total credits should equal the total debits
-            total_credits = NominalLedgerDebit.objects.filter(
+            total_credits = NominalLedgerDebit.objects.lean().filter(
                 nominal_ledger__address_id=request.user.address['id'],
                 nominal_ledger__transaction_type_id=12000,
             ).aggregate(
                 balance=Sum('amount'),
             )['balance']
 
-            total_debits = NominalLedgerCredit.objects.filter(
+            total_debits = NominalLedgerCredit.objects.lean().filter(
                 nominal_ledger__address_id=request.user.address['id'],
                 nominal_ledger__transaction_type_id=12000,
             ).aggregate(
@@ -0,0 +1,115 @@
+"""
+Management for Journal Imports
+"""
+# libs
+from cloudcix_rest.exceptions import Http400, Http404
+from django.conf import settings
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+# local
+from financial.api_view import FinancialAPIView as APIView
+from financial.controllers.journal_import import JournalImportCreateController
+from financial.journal_import import ImportFileError, run_import
+from financial.models import JournalImport
+from financial.permissions.journal_import import Permissions
+from financial.serializers.journal_import import JournalImportSerializer
+
+
+__all__ = [
+    'JournalImportCollection',
+    'JournalImportResource',
+]
+
+
+class JournalImportCollection(APIView):
+    """
+    Handles methods regarding Journal Imports that don't require an id to be specified
+    """
+
+    def post(self, request: Request) -> Response:
+        """
+        summary: Import a file of Journal Entries
+
+        description: |
+            Import a CSV or NDJSON file of Journal Entries onto the Nominal Ledger. The file is copied into a staging
+            table and checked as a whole, and every journal whose rows are all valid is created in a single pass.
+            Journals with any invalid row are rejected, and the rejected rows are returned along with the reason.
+            Files that cannot be decoded or parsed, and CSV files whose header is missing a required column, are
+            rejected as a whole with a 400, and their Journal Import is failed with the reason as its `error`.
+
+        responses:
+            201:
+                description: The file was imported, the content contains the counts and any rejected rows
+            400: {}
+            403: {}
+        """
+        tracer = settings.TRACER
+
+        with tracer.start_span('checking_permissions', child_of=request.span):
+            err = Permissions.create(request)
+            if err is not None:
+                return err
+
+        with tracer.start_span('validating_controller', child_of=request.span) as span:
+            controller = JournalImportCreateController(data=request.data, request=request, span=span)
+            if not controller.is_valid():
+                return Http400(errors=controller.errors)
+
+        with tracer.start_span('importing_journals', child_of=request.span):
+            obj = JournalImport.objects.create(
+                address_id=request.user.address['id'],
+                file_format=controller.cleaned_data['file_format'],
+                user_id=request.user.id,
+            )
+            try:
+                run_import(
+                    obj,
+                    controller.cleaned_data['file'],
+                    request.user.address,
+                    f'{request.user.first_name} {request.user.surname}',
+                )
+            except ImportFileError as e:
+                return Http400(error_code=e.error_code)
+
+        with tracer.start_span('serializing_data', child_of=request.span):
+            data = JournalImportSerializer(instance=obj).data
+
+        return Response({'content': data}, status=status.HTTP_201_CREATED)
+
+
+class JournalImportResource(APIView):
+    """
+    Handles methods regarding Journal Imports that require an id to be specified
+    """
+
+    def get(self, request: Request, pk: int) -> Response:
+        """
+        summary: Read the details of a specified Journal Import
+
+        description: |
+            Attempt to read a Journal Import by the given `pk`, returning a 404 if it does not exist. The rejected rows
+            of the import are kept so they can be corrected and imported again.
+
+        path_params:
+            pk:
+                description: The id of the Journal Import to be read
+                type: integer
+
+        responses:
+            200:
+                description: Journal Import was read successfully
+            404: {}
+        """
+        tracer = settings.TRACER
+
+        with tracer.start_span('retrieve_requested_object', child_of=request.span):
+            try:
+                obj = JournalImport.objects.get(address_id=request.user.address['id'], pk=pk)
+            except JournalImport.DoesNotExist:
+                return Http404(error_code='financial_journal_import_read_001')
+
+        with tracer.start_span('serializing_data', child_of=request.span):
+            data = JournalImportSerializer(instance=obj).data
+
+        return Response({'content': data})
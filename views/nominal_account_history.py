@@ -15,8 +15,11 @@ from django.db.models import Q, Sum
 from rest_framework.request import Request
 from rest_framework.response import Response
 # local
+from financial.conditional import etag_headers, etag_matches, get_report_etag, not_modified
 from financial.controllers.nominal_account_history import NominalAccountHistoryListController
+from financial.db_router import replica_reads
 from financial.models import AddressNominalAccount, NominalAccountHistory, NominalLedgerDebit, NominalLedgerCredit
+from financial.report_cache import report_cache
 from financial.serializers.nominal_account_history import NominalAccountHistorySerializer
 
 
@@ -30,6 +33,7 @@ class NominalAccountHistoryCollection(APIView):
     Handle methods regarding transactions on the Nominal Ledger that use specific Nominal Account Numbers
     """
 
+    @replica_reads
     def get(self, request: Request, id: int) -> Response:
         """
         summary: Retrieve all amounts debited or credited to a specific Nominal Account
@@ -67,6 +71,17 @@ class NominalAccountHistoryCollection(APIView):
             # By validating the controller we generate the search filters
             controller.is_valid()
 
+        with tracer.start_span('checking_ledger_version', child_of=request.span):
+            params = dict(controller.cleaned_data, nominal_account_number=account_number)
+            etag = get_report_etag(request, 'nominal_account_history', [request.user.address['id']], params)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
+        with tracer.start_span('checking_report_cache', child_of=request.span) as span:
+            content = report_cache.get('nominal_account_history', etag, span)
+            if content is not None:
+                return Response(content, headers=etag_headers(etag))
+
         with tracer.start_span('get_objects', child_of=request.span):
             kw = controller.cleaned_data['search']
             order = controller.cleaned_data['order']
@@ -199,4 +214,8 @@ class NominalAccountHistoryCollection(APIView):
                 many=True,
             ).data
 
-        return Response({'content': data, '_metadata': metadata})
+        with tracer.start_span('caching_report', child_of=request.span) as span:
+            content = {'content': data, '_metadata': metadata}
+            report_cache.set('nominal_account_history', etag, content, span)
+
+        return Response(content, headers=etag_headers(etag))
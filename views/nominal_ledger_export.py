@@ -0,0 +1,84 @@
+"""
+Management for Nominal Ledger Exports
+This service streams the Nominal Ledger of an Address to the client. It does not create any records
+"""
+
+# libs
+from cloudcix_rest.exceptions import Http400
+from cloudcix_rest.views import APIView
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.request import Request
+from rest_framework.response import Response
+# local
+from financial.controllers.nominal_ledger_export import NominalLedgerExportListController
+from financial.exports import EXPORT_FORMATS, export_filters, iter_transactions, stream_csv, stream_ndjson
+from financial.permissions.nominal_ledger_export import Permissions
+from financial.sharding import in_shard, shard_for
+
+
+__all__ = [
+    'NominalLedgerExportCollection',
+]
+
+
+class NominalLedgerExportCollection(APIView):
+    """
+    Handles methods regarding Nominal Ledger Exports that don't require an id to be specified
+    """
+
+    def get(self, request: Request) -> Response:
+        """
+        summary: Stream every Nominal Ledger entry of an Address in a date range, along with its debits and credits
+
+        description: |
+            Export the Nominal Ledger of an Address for auditing. Entries are read from the database in chunks and
+            streamed to the client as they are read, so there is no pagination and no limit on the size of the export.
+
+            With `format=ndjson` each line of the response is a JSON document for one Nominal Ledger entry, with its
+            debits and credits in `lines`. With `format=csv` there is one row per debit or credit, with the fields of
+            the entry repeated on each row.
+
+            A global active User can export the Nominal Ledger of another Address in their Member by specifying an
+            Address id.
+
+        responses:
+            200:
+                description: The Nominal Ledger entries, streamed in the requested format
+            400: {}
+            403: {}
+        """
+        tracer = settings.TRACER
+
+        with tracer.start_span('validating_controller', child_of=request.span) as span:
+            controller = NominalLedgerExportListController(data=request.GET, request=request, span=span)
+            if not controller.is_valid():
+                return Http400(errors=controller.errors)
+
+        with tracer.start_span('checking_permissions', child_of=request.span) as span:
+            cd = controller.cleaned_data
+            err = Permissions.list(request, cd['address_id'], span)
+            if err is not None:
+                return err
+
+        with tracer.start_span('streaming_objects', child_of=request.span) as span:
+            address_id = cd['address_id'] if cd['address_id'] is not None else request.user.address['id']
+            filters = export_filters(
+                address_id,
+                cd['start_date'],
+                cd['end_date'],
+                cd['transaction_type_ids'],
+                cd['nominal_account_numbers'],
+            )
+            span.set_tag('format', cd['format'])
+            span.set_tag('address_id', address_id)
+
+            render = stream_csv if cd['format'] == 'csv' else stream_ndjson
+            response = StreamingHttpResponse(
+                in_shard(shard_for(address_id), render(iter_transactions(filters))),
+                content_type=EXPORT_FORMATS[cd['format']],
+            )
+            filename = f'nominal_ledger_{address_id}_{cd["start_date"]}_{cd["end_date"]}.{cd["format"]}'
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+
+        return response
@@ -52,7 +52,7 @@ class PeriodEndCollection(APIView):
         with tracer.start_span('get_objects', child_of=request.span):
             order = controller.cleaned_data['order']
             try:
-                objs = NominalLedger.period_end.filter(
+                objs = NominalLedger.period_end.lean().filter(
                     address_id=request.user.address['id'],
                     **controller.cleaned_data['search'],
                 ).exclude(
@@ -67,8 +67,8 @@ class PeriodEndCollection(APIView):
             total_records = objs.count()
             page = controller.cleaned_data['page']
             limit = controller.cleaned_data['limit']
-            # Handle pagination
-            objs = objs[page * limit: (page + 1) * limit]
+            # Handle pagination. Only the page is fetched with the related rows its serialization needs
+            objs = NominalLedger.period_end.related(objs)[page * limit: (page + 1) * limit]
             metadata = {
                 'page': page,
                 'limit': limit,
@@ -78,7 +78,7 @@ class PeriodEndCollection(APIView):
             }
 
         with tracer.start_span('serializing_data', child_of=request.span) as span:
-            span.set_tag('num_objects', objs.count())
+            span.set_tag('num_objects', len(objs))
             data = PeriodEndSerializer(instance=objs, many=True).data
 
         return Response({'content': data, '_metadata': metadata})
@@ -10,17 +10,18 @@ from decimal import Decimal
 from cloudcix_rest.exceptions import Http400
 from cloudcix_rest.views import APIView
 from django.conf import settings
-from django.db.models import Sum
-from django.db.models.functions import Coalesce
 from rest_framework.request import Request
 from rest_framework.response import Response
 # local
 from financial import reserved_accounts as reserved
+from financial.conditional import etag_headers, etag_matches, get_report_etag, not_modified
 from financial.controllers.profit_and_loss import ProfitAndLossListController
-from financial.models import GlobalNominalAccount, NominalLedgerCredit, NominalLedgerDebit
+from financial.db_router import replica_reads
+from financial.models import GlobalNominalAccount
 from financial.permissions.profit_and_loss import Permissions
+from financial.report_cache import report_cache
 from financial.serializers.statement import StatementSerializer
-from financial.utils import AccountContainer, get_addresses_in_member
+from financial.utils import get_account_totals, get_addresses_in_member
 
 
 __all__ = [
@@ -35,6 +36,7 @@ class ProfitAndLossCollection(APIView):
 
     serializer_class = StatementSerializer
 
+    @replica_reads
     def get(self, request: Request) -> Response:
         """
         summary: Calculate the balance in each of an Address' Trading Accounts during a date range
@@ -73,52 +75,30 @@ class ProfitAndLossCollection(APIView):
 
             if not request.user.global_active:
                 filters['nominal_ledger__address_id'] = request.user.address['id']
+                address_ids = [request.user.address['id']]
 
             else:
                 if cd['address_id'] is not None:
                     filters['nominal_ledger__address_id'] = cd['address_id']
+                    address_ids = [cd['address_id']]
                 else:
                     # A global-active user has not specified an Address id. They should see a Profit and Loss statement
                     # for their entire Member
-                    filters['nominal_ledger__address_id__in'] = get_addresses_in_member(request, span)
+                    address_ids = get_addresses_in_member(request, span)
+                    filters['nominal_ledger__address_id__in'] = address_ids
 
-        with tracer.start_span('get_objects', child_of=request.span) as span:
-            with tracer.start_span('get_debits', child_of=span):
-                debits = NominalLedgerDebit.objects.filter(
-                    **filters,
-                ).values(
-                    'nominal_account_number',
-                ).annotate(
-                    total=Coalesce(Sum('amount'), Decimal('0')),
-                ).order_by(
-                    'nominal_account_number',
-                )
-
-                # Store the Nominal Account data in Containers. Keep these in a dictionary for easy access
-                objs = {
-                    d['nominal_account_number']: AccountContainer(total_debits=d['total'].quantize(Decimal('1.0000')))
-                    for d in debits
-                }
-
-            with tracer.start_span('get_credits', child_of=span):
-                credits = NominalLedgerCredit.objects.filter(
-                    **filters,
-                ).values(
-                    'nominal_account_number',
-                ).annotate(
-                    total=Coalesce(Sum('amount'), Decimal('0')),
-                ).order_by(
-                    'nominal_account_number',
-                )
+        with tracer.start_span('checking_ledger_version', child_of=request.span):
+            etag = get_report_etag(request, 'profit_and_loss', address_ids, cd)
+            if etag_matches(request, etag):
+                return not_modified(etag)
 
-                # Aggregate the credit and debit data
-                for c in credits:
-                    total = c['total'].quantize(Decimal('1.0000'))
+        with tracer.start_span('checking_report_cache', child_of=request.span) as span:
+            content = report_cache.get('profit_and_loss', etag, span)
+            if content is not None:
+                return Response(content, headers=etag_headers(etag))
 
-                    if c['nominal_account_number'] in objs:
-                        objs[c['nominal_account_number']].total_credits = total
-                    else:
-                        objs[c['nominal_account_number']] = AccountContainer(total_credits=total)
+        with tracer.start_span('get_objects', child_of=request.span) as span:
+            objs = get_account_totals(address_ids, filters, span)
 
         with tracer.start_span('get_accounts', child_of=request.span):
             accounts = GlobalNominalAccount.objects.filter(
@@ -177,4 +157,8 @@ class ProfitAndLossCollection(APIView):
             # objs is a dictionary of Account Number - Container key-value pairs. Just serialize the Containers
             data = StatementSerializer(instance=objs.values(), many=True).data
 
-        return Response({'content': data, '_metadata': metadata})
+        with tracer.start_span('caching_report', child_of=request.span) as span:
+            content = {'content': data, '_metadata': metadata}
+            report_cache.set('profit_and_loss', etag, content, span)
+
+        return Response(content, headers=etag_headers(etag))
@@ -17,8 +17,11 @@ from rest_framework.response import Response
 # local
 from financial import reserved_accounts as reserved
 from financial.api_view import FinancialAPIView as APIView
+from financial.conditional import etag_headers, etag_matches, get_report_etag, not_modified
 from financial.controllers.purchases_analysis import PurchasesAnalysisListController
+from financial.db_router import replica_reads
 from financial.models import NominalLedger
+from financial.report_cache import report_cache
 from financial.serializers.purchases_analysis import PurchasesAnalysisSerializer
 
 
@@ -32,6 +35,7 @@ class PurchasesAnalysisCollection(APIView):
     Handles methods regarding the Nominal Ledger that don't require an id to be specified i.e. list
     """
 
+    @replica_reads
     def get(self, request: Request) -> Response:
         """
         summary: Get the total amounts purchased from each supplier Address, optionally filtering by Territory
@@ -52,13 +56,23 @@ class PurchasesAnalysisCollection(APIView):
             # By validating the controller we generate the filters
             controller.is_valid()
 
+        with tracer.start_span('checking_ledger_version', child_of=request.span):
+            cd = controller.cleaned_data
+            etag = get_report_etag(request, 'purchases_analysis', [request.user.address['id']], cd)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
+        with tracer.start_span('checking_report_cache', child_of=request.span) as span:
+            content = report_cache.get('purchases_analysis', etag, span)
+            if content is not None:
+                return Response(content, headers=etag_headers(etag))
+
         with tracer.start_span('get_objects', child_of=request.span) as span:
             with tracer.start_span('get_debits', child_of=span):
-                cd = controller.cleaned_data
                 try:
                     # Calculate all purchases from invoices. Search through the debit lines on the invoices as they
                     # will show how much of the invoice was VAT
-                    purchases = NominalLedger.objects.filter(
+                    purchases = NominalLedger.objects.lean().filter(
                         address_id=request.user.address['id'],
                         transaction_type_id__in=(10000, 10002),
                         **cd['search'],
@@ -81,7 +95,7 @@ class PurchasesAnalysisCollection(APIView):
             with tracer.start_span('get_credits', child_of=span):
                 # Calculate the amounts lost from debit notes. Search through the credit lines on the debit notes as
                 # they will show how much of the transaction was vat
-                debit_notes = NominalLedger.objects.filter(
+                debit_notes = NominalLedger.objects.lean().filter(
                     address_id=request.user.address['id'],
                     transaction_type_id__in=(10001, 10003),
                     **cd['search'],
@@ -138,4 +152,8 @@ class PurchasesAnalysisCollection(APIView):
             span.set_tag('num_objects', len(objs))
             data = PurchasesAnalysisSerializer(instance=objs, many=True).data
 
-        return Response({'content': data, '_metadata': meta})
+        with tracer.start_span('caching_report', child_of=request.span) as span:
+            content = {'content': data, '_metadata': meta}
+            report_cache.set('purchases_analysis', etag, content, span)
+
+        return Response(content, headers=etag_headers(etag))
@@ -17,8 +17,11 @@ from rest_framework.response import Response
 # local
 from financial import reserved_accounts as reserved
 from financial.api_view import FinancialAPIView as APIView
+from financial.conditional import etag_headers, etag_matches, get_report_etag, not_modified
 from financial.controllers.purchases_by_territory import PurchasesByTerritoryListController
+from financial.db_router import replica_reads
 from financial.models import NominalLedger
+from financial.report_cache import report_cache
 from financial.serializers import PurchasesByTerritorySerializer
 
 
@@ -32,6 +35,7 @@ class PurchasesByTerritoryCollection(APIView):
     Handles methods regarding the Nominal Ledger that don't require an id to be specified i.e. list
     """
 
+    @replica_reads
     def get(self, request: Request, territory_id: int) -> Response:
         """
         summary: Get the total amounts purchased from each Address in a Territory
@@ -74,13 +78,25 @@ class PurchasesByTerritoryCollection(APIView):
             addresses = membership_response.json()['content']
             address_ids = [a['id'] for a in addresses]
 
+        with tracer.start_span('checking_ledger_version', child_of=request.span):
+            # The Addresses in the Territory are part of the report, so changes to them must also change the ETag
+            params = dict(cd, territory_id=territory_id, membership=membership_response.json())
+            etag = get_report_etag(request, 'purchases_by_territory', [request.user.address['id']], params)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
+        with tracer.start_span('checking_report_cache', child_of=request.span) as span:
+            content = report_cache.get('purchases_by_territory', etag, span)
+            if content is not None:
+                return Response(content, headers=etag_headers(etag))
+
         with tracer.start_span('get_objects', child_of=request.span) as span:
             if len(address_ids) != 0:
                 with tracer.start_span('get_debits', child_of=span):
                     try:
                         # Calculate all purchases from invoices. Search for the credit lines on the invoices as they
                         # will show how much of the invoice was VAT
-                        invoices = NominalLedger.objects.filter(
+                        invoices = NominalLedger.objects.lean().filter(
                             address_id=request.user.address['id'],
                             contra_address_id__in=address_ids,
                             transaction_type_id__in=(10000, 10002),
@@ -107,7 +123,7 @@ class PurchasesByTerritoryCollection(APIView):
                 with tracer.start_span('get_credits', child_of=span):
                     # Calculate the amounts lost from debit notes. Search for the credit lines on the debit notes as
                     # they will show how much of the transaction was vat
-                    notes = NominalLedger.objects.filter(
+                    notes = NominalLedger.objects.lean().filter(
                         address_id=request.user.address['id'],
                         contra_address_id__in=address_ids,
                         transaction_type_id__in=(10001, 10003),
@@ -163,4 +179,8 @@ class PurchasesByTerritoryCollection(APIView):
             span.set_tag('num_objects', len(addresses))
             data = PurchasesByTerritorySerializer(instance=addresses, many=True).data
 
-        return Response({'content': data, '_metadata': meta})
+        with tracer.start_span('caching_report', child_of=request.span) as span:
+            content = {'content': data, '_metadata': meta}
+            report_cache.set('purchases_by_territory', etag, content, span)
+
+        return Response(content, headers=etag_headers(etag))
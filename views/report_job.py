@@ -0,0 +1,149 @@
+"""
+Management for Report Jobs
+"""
+# libs
+from cloudcix_rest.exceptions import Http400, Http404
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+# local
+from financial.api_view import FinancialAPIView as APIView
+from financial.controllers.report_job import ReportJobCreateController
+from financial.models import ReportJob
+from financial.report_jobs import access_key, submit
+from financial.serializers.report_job import ReportJobSerializer
+
+
+__all__ = [
+    'ReportJobCollection',
+    'ReportJobResource',
+    'ReportJobResultResource',
+]
+
+
+class ReportJobCollection(APIView):
+    """
+    Handles methods regarding Report Jobs that don't require an id to be specified
+    """
+
+    def post(self, request: Request) -> Response:
+        """
+        summary: Submit a report to be run in the background
+
+        description: |
+            Queue a report to be run by a report worker, for reports that take too long to wait for, e.g. a Trial
+            Balance for a whole Member. The report is run as the requesting User with the `params` sent, exactly as if
+            they had been sent to the report's service. Poll the returned Report Job until its status is `completed`
+            and fetch the result from its `result_uri`.
+            If an identical report is already queued or running for the requesting User's Address, that Report Job is
+            returned instead of a new one.
+            A Report Job can only be read by the Users of its Address with the same permissions as the User who
+            submitted it.
+
+        responses:
+            202:
+                description: The report was queued, or an identical report is already queued or running
+            400: {}
+        """
+        tracer = settings.TRACER
+
+        with tracer.start_span('validating_controller', child_of=request.span) as span:
+            controller = ReportJobCreateController(data=request.data, request=request, span=span)
+            if not controller.is_valid():
+                return Http400(errors=controller.errors)
+
+        with tracer.start_span('submitting_job', child_of=request.span) as span:
+            obj, created = submit(request, controller.cleaned_data['report'], controller.cleaned_data['params'])
+            span.set_tag('created', created)
+
+        with tracer.start_span('serializing_data', child_of=request.span):
+            data = ReportJobSerializer(instance=obj).data
+
+        return Response({'content': data}, status=status.HTTP_202_ACCEPTED)
+
+
+class ReportJobResource(APIView):
+    """
+    Handles methods regarding Report Jobs that require an id to be specified
+    """
+
+    def get(self, request: Request, pk: int) -> Response:
+        """
+        summary: Read the status of a specified Report Job
+
+        description: |
+            Attempt to read a Report Job by the given `pk`, returning a 404 if it does not exist or has expired. The
+            Report Job includes its status and progress, but not its result.
+
+        path_params:
+            pk:
+                description: The id of the Report Job to be read
+                type: integer
+
+        responses:
+            200:
+                description: Report Job was read successfully
+            404: {}
+        """
+        tracer = settings.TRACER
+
+        with tracer.start_span('retrieve_requested_object', child_of=request.span):
+            try:
+                obj = ReportJob.objects.defer('result').get(
+                    access_key=access_key(request),
+                    address_id=request.user.address['id'],
+                    pk=pk,
+                )
+            except ReportJob.DoesNotExist:
+                return Http404(error_code='financial_report_job_read_001')
+
+        with tracer.start_span('serializing_data', child_of=request.span):
+            data = ReportJobSerializer(instance=obj).data
+
+        return Response({'content': data})
+
+
+class ReportJobResultResource(APIView):
+    """
+    Handles fetching the result of a Report Job
+    """
+
+    def get(self, request: Request, pk: int) -> Response:
+        """
+        summary: Fetch the result of a completed Report Job
+
+        description: |
+            Return the response of the report's service that was stored when the Report Job completed, with the same
+            status code. Results are deleted when their Report Job expires.
+
+        path_params:
+            pk:
+                description: The id of the Report Job whose result is to be fetched
+                type: integer
+
+        responses:
+            200:
+                description: The result of the report, as returned by the report's service
+            400: {}
+            404: {}
+        """
+        tracer = settings.TRACER
+
+        with tracer.start_span('retrieve_requested_object', child_of=request.span):
+            try:
+                obj = ReportJob.objects.filter(
+                    Q(expires__isnull=True) | Q(expires__gt=timezone.now()),
+                ).get(access_key=access_key(request), address_id=request.user.address['id'], pk=pk)
+            except ReportJob.DoesNotExist:
+                return Http404(error_code='financial_report_job_result_001')
+
+        with tracer.start_span('checking_status', child_of=request.span):
+            if obj.status in ReportJob.IN_FLIGHT:
+                return Http400(error_code='financial_report_job_result_002')
+            if obj.status == ReportJob.STATUS_FAILED:
+                return Http400(error_code='financial_report_job_result_003')
+
+        return Response(obj.result, status=obj.status_code)
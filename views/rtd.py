@@ -15,11 +15,14 @@ from django.db.models.functions import Coalesce
 from rest_framework.request import Request
 from rest_framework.response import Response
 # local
+from financial.conditional import etag_headers, etag_matches, get_report_etag, not_modified
+from financial.db_router import replica_reads
 from financial.eu_countries import eu_countries
 from financial.api_view import FinancialAPIView as APIView
 from financial.controllers.rtd import RTDListController
 from financial.models import NominalAccountType, NominalLedgerCredit, NominalLedgerDebit, TaxRate
 from financial.permissions.rtd import Permissions
+from financial.report_cache import report_cache
 from financial.serializers import RTDSerializer
 from financial.utils import UK_LEFT_EU
 
@@ -36,6 +39,7 @@ class RTDCollection(APIView):
     Handles methods regarding records on the Nominal Ledger that don't require an id to be specified, i.e. list
     """
 
+    @replica_reads
     def get(self, request: Request) -> Response:
         """
         summary: Calculate all values for a Return of Trading Details (RTD) report
@@ -64,8 +68,18 @@ class RTDCollection(APIView):
             if not controller.is_valid():
                 return Http400(errors=controller.errors)
 
-        with tracer.start_span('calculating_all_sales', child_of=request.span) as span:
+        with tracer.start_span('checking_ledger_version', child_of=request.span):
             cd = controller.cleaned_data
+            etag = get_report_etag(request, 'rtd', [request.user.address['id']], cd)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
+        with tracer.start_span('checking_report_cache', child_of=request.span) as span:
+            content = report_cache.get('rtd', etag, span)
+            if content is not None:
+                return Response(content, headers=etag_headers(etag))
+
+        with tracer.start_span('calculating_all_sales', child_of=request.span) as span:
             filters = {
                 'tax_rate_id__isnull': False,
                 'nominal_ledger__address_id': request.user.address['id'],
@@ -75,7 +89,7 @@ class RTDCollection(APIView):
 
             # Calculate all sales. Figures should exclude VAT
             with tracer.start_span('calculating_sale_invoices', child_of=span):
-                sales = NominalLedgerCredit.objects.filter(
+                sales = NominalLedgerCredit.objects.lean().filter(
                     nominal_account_number__range=(sale_accounts.min_account_number, sale_accounts.max_account_number),
                     nominal_ledger__transaction_type_id__in=(11000, 11002, 11006),
                     **filters,
@@ -86,7 +100,7 @@ class RTDCollection(APIView):
                 )
 
             with tracer.start_span('calculating_credit_notes', child_of=span):
-                sale_refunds = NominalLedgerDebit.objects.filter(
+                sale_refunds = NominalLedgerDebit.objects.lean().filter(
                     nominal_account_number__range=(sale_accounts.min_account_number, sale_accounts.max_account_number),
                     nominal_ledger__transaction_type_id__in=(11001, 11003, 11007),
                     **filters,
@@ -115,7 +129,7 @@ class RTDCollection(APIView):
 
             with tracer.start_span('calculating_purchase_invoices', child_of=span):
                 # Get all purchase invoices from EU countries excluding Ireland
-                purchases = NominalLedgerDebit.objects.filter(
+                purchases = NominalLedgerDebit.objects.lean().filter(
                     Q(nominal_account_number__range=(1, 999)) | Q(nominal_account_number__range=(5000, 7999)),
                     nominal_ledger__transaction_type_id__in=(10000, 10002, 10006),
                     nominal_ledger__country_id_bill_to__in=eu_country_ids,
@@ -130,7 +144,7 @@ class RTDCollection(APIView):
 
             with tracer.start_span('calculating_debit_notes', child_of=span):
                 # Get all debit notes to EU countries excluding Ireland
-                purchase_refunds = NominalLedgerCredit.objects.filter(
+                purchase_refunds = NominalLedgerCredit.objects.lean().filter(
                     Q(nominal_account_number__range=(1, 999)) | Q(nominal_account_number__range=(5000, 7999)),
                     nominal_ledger__transaction_type_id__in=(10001, 10003, 10007),
                     nominal_ledger__country_id_bill_to__in=eu_country_ids,
@@ -158,7 +172,7 @@ class RTDCollection(APIView):
         with tracer.start_span('calculating_resale_purchases', child_of=request.span) as span:
             purchase_account = NominalAccountType.objects.get(description__iexact='purchases')
             with tracer.start_span('calculating_resale_invoices', child_of=span):
-                resale = NominalLedgerDebit.objects.filter(
+                resale = NominalLedgerDebit.objects.lean().filter(
                     nominal_account_number__range=(
                         purchase_account.min_account_number,
                         purchase_account.max_account_number,
@@ -172,7 +186,7 @@ class RTDCollection(APIView):
                 )
 
             with tracer.start_span('calculating_resale_debit_notes', child_of=span):
-                resale_refunds = NominalLedgerCredit.objects.filter(
+                resale_refunds = NominalLedgerCredit.objects.lean().filter(
                     nominal_account_number__range=(
                         purchase_account.min_account_number,
                         purchase_account.max_account_number,
@@ -199,7 +213,7 @@ class RTDCollection(APIView):
 
         with tracer.start_span('calculating_non_resale_purchases', child_of=request.span) as span:
             with tracer.start_span('calculating_non_resale_invoices', child_of=span):
-                non_resale = NominalLedgerDebit.objects.filter(
+                non_resale = NominalLedgerDebit.objects.lean().filter(
                     Q(nominal_account_number__range=(1, 999)) | Q(nominal_account_number__range=(6000, 7999)),
                     nominal_ledger__transaction_type_id__in=(10000, 10002, 10006),
                     **filters,
@@ -210,7 +224,7 @@ class RTDCollection(APIView):
                 )
 
             with tracer.start_span('calculating_non_resale_debit_notes', child_of=span):
-                non_resale_refunds = NominalLedgerCredit.objects.filter(
+                non_resale_refunds = NominalLedgerCredit.objects.lean().filter(
                     Q(nominal_account_number__range=(1, 999)) | Q(nominal_account_number__range=(6000, 7999)),
                     nominal_ledger__transaction_type_id__in=(10001, 10003, 10007),
                     **filters,
@@ -234,8 +248,12 @@ class RTDCollection(APIView):
 
         with tracer.start_span('gathering_tax_rates', child_of=request.span):
             # The percentage on a Tax Rate could change from year to year so get Tax Percentages from debit/credit lines
-            tax_percents = list(NominalLedgerCredit.objects.filter(**filters).values('tax_rate_id', 'tax_percent'))
-            tax_percents.extend(list(NominalLedgerDebit.objects.filter(**filters).values('tax_rate_id', 'tax_percent')))
+            tax_percents = list(
+                NominalLedgerCredit.objects.lean().filter(**filters).values('tax_rate_id', 'tax_percent'),
+            )
+            tax_percents.extend(list(
+                NominalLedgerDebit.objects.lean().filter(**filters).values('tax_rate_id', 'tax_percent'),
+            ))
 
             # Get all the Tax Rates in the User's Address
             rates = TaxRate.objects.filter(address_id=request.user.address['id']).values('id', 'description')
@@ -307,4 +325,8 @@ class RTDCollection(APIView):
             }
             data = RTDSerializer(instance=data).data
 
-        return Response({'content': data, '_metadata': meta})
+        with tracer.start_span('caching_report', child_of=request.span) as span:
+            content = {'content': data, '_metadata': meta}
+            report_cache.set('rtd', etag, content, span)
+
+        return Response(content, headers=etag_headers(etag))
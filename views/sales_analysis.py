@@ -17,8 +17,11 @@ from rest_framework.response import Response
 # local
 from financial import reserved_accounts as reserved
 from financial.api_view import FinancialAPIView as APIView
+from financial.conditional import etag_headers, etag_matches, get_report_etag, not_modified
 from financial.controllers.sales_analysis import SalesAnalysisListController
+from financial.db_router import replica_reads
 from financial.models import NominalLedger
+from financial.report_cache import report_cache
 from financial.serializers.sales_analysis import SalesAnalysisSerializer
 
 
@@ -32,6 +35,7 @@ class SalesAnalysisCollection(APIView):
     Handles methods regarding the Nominal Ledger that don't require an id to be specified i.e. list
     """
 
+    @replica_reads
     def get(self, request: Request) -> Response:
         """
         summary: Get the total amounts sold to each Customer Address, optionally filtering by Territory
@@ -52,13 +56,23 @@ class SalesAnalysisCollection(APIView):
             # By validating the controller we generate the filters
             controller.is_valid()
 
-        with tracer.start_span('get_objects', child_of=request.span) as span:
+        with tracer.start_span('checking_ledger_version', child_of=request.span):
             cd = controller.cleaned_data
+            etag = get_report_etag(request, 'sales_analysis', [request.user.address['id']], cd)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
+        with tracer.start_span('checking_report_cache', child_of=request.span) as span:
+            content = report_cache.get('sales_analysis', etag, span)
+            if content is not None:
+                return Response(content, headers=etag_headers(etag))
+
+        with tracer.start_span('get_objects', child_of=request.span) as span:
             with tracer.start_span('get_debits', child_of=span):
                 try:
                     # Calculate all sales from invoices. Search for the credit lines on the invoices as they will
                     # show how much of the invoice was VAT
-                    sales = NominalLedger.objects.filter(
+                    sales = NominalLedger.objects.lean().filter(
                         address_id=request.user.address['id'],
                         transaction_type_id__in=(11000, 11002),
                         **cd['search'],
@@ -83,7 +97,7 @@ class SalesAnalysisCollection(APIView):
             with tracer.start_span('get_credits', child_of=span):
                 # Calculate the amounts lost from credit notes. Search for the debit lines on the credit notes as
                 # they will show how much of the transaction was vat
-                credit_notes = NominalLedger.objects.filter(
+                credit_notes = NominalLedger.objects.lean().filter(
                     address_id=request.user.address['id'],
                     transaction_type_id__in=(11001, 11003),
                     **cd['search'],
@@ -143,4 +157,8 @@ class SalesAnalysisCollection(APIView):
             span.set_tag('num_objects', len(objs))
             data = SalesAnalysisSerializer(instance=objs, many=True).data
 
-        return Response({'content': data, '_metadata': meta})
+        with tracer.start_span('caching_report', child_of=request.span) as span:
+            content = {'content': data, '_metadata': meta}
+            report_cache.set('sales_analysis', etag, content, span)
+
+        return Response(content, headers=etag_headers(etag))
@@ -14,9 +14,12 @@ from rest_framework.request import Request
 from rest_framework.response import Response
 # local
 from financial import reserved_accounts as reserved
+from financial.conditional import etag_headers, etag_matches, get_report_etag, not_modified
 from financial.controllers.sales_by_country import SalesByCountryListController
+from financial.db_router import fan_out, replica_reads
 from financial.models import NominalLedgerCredit, NominalLedgerDebit
 from financial.permissions.sales_by_country import Permissions
+from financial.report_cache import report_cache
 from financial.serializers import TransactionsByCountrySerializer
 from financial.utils import get_addresses_in_member
 
@@ -37,6 +40,7 @@ class SalesByCountryCollection(APIView):
 
     serializer_class = TransactionsByCountrySerializer
 
+    @replica_reads
     def get(self, request: Request) -> Response:
         """
         summary: Returns a list of Countries with total amounts per Country earned in Sales in a period of time.
@@ -73,14 +77,27 @@ class SalesByCountryCollection(APIView):
 
             if not request.user.global_active:
                 filters['nominal_ledger__address_id'] = request.user.address['id']
+                address_ids = [request.user.address['id']]
 
             else:
                 if cd['address_id'] is not None:
                     filters['nominal_ledger__address_id'] = cd['address_id']
+                    address_ids = [cd['address_id']]
                 else:
                     # A global-active user has not specified an Address id. They should be able to list Sales by Country
                     # for their entire Member
-                    filters['nominal_ledger__address_id__in'] = get_addresses_in_member(request, span)
+                    address_ids = get_addresses_in_member(request, span)
+                    filters['nominal_ledger__address_id__in'] = address_ids
+
+        with tracer.start_span('checking_ledger_version', child_of=request.span):
+            etag = get_report_etag(request, 'sales_by_country', address_ids, cd)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
+        with tracer.start_span('checking_report_cache', child_of=request.span) as span:
+            content = report_cache.get('sales_by_country', etag, span)
+            if content is not None:
+                return Response(content, headers=etag_headers(etag))
 
         with tracer.start_span('get_objects', child_of=request.span) as span:
             # When gathering for the Debits/Credits, first apply the search filters.
@@ -88,11 +105,13 @@ class SalesByCountryCollection(APIView):
             objs: Dict = dict()
 
             with tracer.start_span('get_credits', child_of=span):
-                credits = NominalLedgerCredit.objects.filter(
-                    **filters,
-                    nominal_ledger__transaction_type_id__in=CREDIT_TRANSACTIONS,
-                ).order_by(
-                    'nominal_ledger__country_id_bill_to',
+                credits = fan_out(
+                    address_ids,
+                    lambda ids: NominalLedgerCredit.objects.filter(
+                        **{**filters, 'nominal_ledger__address_id__in': ids},
+                        nominal_ledger__transaction_type_id__in=CREDIT_TRANSACTIONS,
+                    ),
+                    span,
                 )
                 # Store the data in Containers.
                 # Keep these in a dictionary for easy access grouped by country_id_bill_to.
@@ -115,11 +134,13 @@ class SalesByCountryCollection(APIView):
                     objs[country_id][key] += base_currency_total
 
             with tracer.start_span('get_debits', child_of=span):
-                debits = NominalLedgerDebit.objects.filter(
-                    **filters,
-                    nominal_ledger__transaction_type_id__in=DEBIT_TRANSACTIONS,
-                ).order_by(
-                    'nominal_ledger__country_id_bill_to',
+                debits = fan_out(
+                    address_ids,
+                    lambda ids: NominalLedgerDebit.objects.filter(
+                        **{**filters, 'nominal_ledger__address_id__in': ids},
+                        nominal_ledger__transaction_type_id__in=DEBIT_TRANSACTIONS,
+                    ),
+                    span,
                 )
                 for d in debits:
                     base_currency_total = d.amount * d.exchange_rate * -1
@@ -160,4 +181,8 @@ class SalesByCountryCollection(APIView):
             # objs is a dictionary of Country_ids and Containers. Pass the Containers to be serialized
             span.set_tag('num_objects', len(objs))
             data = TransactionsByCountrySerializer(instance=objs.values(), many=True).data
-        return Response({'content': data, '_metadata': metadata})
+        with tracer.start_span('caching_report', child_of=request.span) as span:
+            content = {'content': data, '_metadata': metadata}
+            report_cache.set('sales_by_country', etag, content, span)
+
+        return Response(content, headers=etag_headers(etag))
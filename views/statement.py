@@ -64,7 +64,7 @@ class StatementCollection(APIView):
 
         with tracer.start_span('existing_sale_trading_partner', child_of=request.span):
             # There are no account sales invoices issued by the address_id to the contra_address_id for a Statement
-            ledger_objs = NominalLedger.account_sale_invoices.filter(
+            ledger_objs = NominalLedger.account_sale_invoices.lean().filter(
                 address_id=address_id,
                 contra_address_id=contra_address_id,
             )
@@ -218,8 +218,9 @@ class StatementCollection(APIView):
             'transaction_date',
             'id',
         )
-        total_records = objs.count()
         data = NominalLedgerSerializer(instance=objs, many=True).data
+        # Every entry is serialized, so they are counted without another query
+        total_records = len(data)
         running_balance = Decimal('0')
         # For each individual Ledger entry, we want to sum up the unallocated balances of the Ledger entries before it
         for ledger in data:
@@ -268,7 +269,7 @@ class StatementCollection(APIView):
         day60 = day30 - timedelta(days=30)
         day90 = day60 - timedelta(days=30)
 
-        objs = NominalLedger.objects.exclude(
+        objs = NominalLedger.objects.lean().exclude(
             unallocated_balance=Decimal('0'),
         ).filter(
             **search_parameters,
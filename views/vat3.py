@@ -15,8 +15,11 @@ from rest_framework.response import Response
 # local
 from financial import reserved_accounts as reserved
 from financial.api_view import FinancialAPIView as APIView
+from financial.conditional import etag_headers, etag_matches, get_report_etag, not_modified
 from financial.controllers.vat3 import VAT3ListController
+from financial.db_router import replica_reads
 from financial.models import NominalLedgerCredit, NominalLedgerDebit, TaxRate
+from financial.report_cache import report_cache
 from financial.utils import VIESCalculator
 
 
@@ -30,6 +33,7 @@ class VAT3Collection(APIView):
     Handles methods regarding records on the Nominal Ledger that don't require an id to be specified, i.e. list
     """
 
+    @replica_reads
     def get(self, request: Request) -> Response:
         """
         summary: Calculate all values required in a Revenue VAT3 form
@@ -61,10 +65,21 @@ class VAT3Collection(APIView):
             if not controller.is_valid():
                 return Http400(errors=controller.errors)
 
-        with tracer.start_span('calculating_vat', child_of=request.span):
+        with tracer.start_span('checking_ledger_version', child_of=request.span):
             cd = controller.cleaned_data
+            params = dict(cd, tax_rate_id=tax_rate.pk)
+            etag = get_report_etag(request, 'vat3', [request.user.address['id']], params)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
+        with tracer.start_span('checking_report_cache', child_of=request.span) as span:
+            content = report_cache.get('vat3', etag, span)
+            if content is not None:
+                return Response(content, headers=etag_headers(etag))
+
+        with tracer.start_span('calculating_vat', child_of=request.span):
             # Get every ledger line that credits the VAT control account
-            credits = NominalLedgerCredit.objects.filter(
+            credits = NominalLedgerCredit.objects.lean().filter(
                 nominal_account_number=reserved.VAT_CONTROL_ACCOUNT,
                 nominal_ledger__address_id=request.user.address['id'],
                 nominal_ledger__transaction_date__range=(cd['start_date'], cd['end_date']),
@@ -80,7 +95,7 @@ class VAT3Collection(APIView):
             )
 
             # Get every ledger line that debits the VAT control account
-            debits = NominalLedgerDebit.objects.filter(
+            debits = NominalLedgerDebit.objects.lean().filter(
                 nominal_account_number=reserved.VAT_CONTROL_ACCOUNT,
                 nominal_ledger__address_id=request.user.address['id'],
                 nominal_ledger__transaction_date__range=(cd['start_date'], cd['end_date']),
@@ -152,4 +167,8 @@ class VAT3Collection(APIView):
                 'vat_on_sales': str(vat['sales']),
             }
 
-        return Response({'content': data})
+        with tracer.start_span('caching_report', child_of=request.span) as span:
+            content = {'content': data}
+            report_cache.set('vat3', etag, content, span)
+
+        return Response(content, headers=etag_headers(etag))
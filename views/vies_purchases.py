@@ -14,9 +14,12 @@ from rest_framework.request import Request
 from rest_framework.response import Response
 # local
 from financial.api_view import FinancialAPIView as APIView
+from financial.conditional import etag_headers, etag_matches, get_report_etag, not_modified
 from financial.controllers.vies import VIESListController
+from financial.db_router import replica_reads
 from financial.eu_countries import eu_countries
 from financial.models import NominalLedgerCredit, NominalLedgerDebit, TaxRate
+from financial.report_cache import report_cache
 from financial.serializers.vies import VIESSerializer
 from financial.utils import VIESCalculator
 
@@ -33,6 +36,7 @@ class VIESPurchasesCollection(APIView):
 
     serializer_class = VIESSerializer
 
+    @replica_reads
     def get(self, request: Request) -> Response:
         """
         summary: Calculate the value of goods purchased from other EU Countries at 0% VAT
@@ -67,6 +71,17 @@ class VIESPurchasesCollection(APIView):
             # By validating the controller we generate the search filters
             controller.is_valid()
 
+        with tracer.start_span('checking_ledger_version', child_of=request.span):
+            params = dict(controller.cleaned_data, tax_rate_id=tax_rate.pk)
+            etag = get_report_etag(request, 'vies_purchases', [request.user.address['id']], params)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
+        with tracer.start_span('checking_report_cache', child_of=request.span) as span:
+            content = report_cache.get('vies_purchases', etag, span)
+            if content is not None:
+                return Response(content, headers=etag_headers(etag))
+
         with tracer.start_span('get_objects', child_of=request.span) as span:
 
             with tracer.start_span('get_credits', child_of=span):
@@ -108,4 +123,8 @@ class VIESPurchasesCollection(APIView):
             span.set_tag('num_objects', len(objs))
             data = VIESSerializer(instance=objs, many=True).data
 
-        return Response({'content': data})
+        with tracer.start_span('caching_report', child_of=request.span) as span:
+            content = {'content': data}
+            report_cache.set('vies_purchases', etag, content, span)
+
+        return Response(content, headers=etag_headers(etag))
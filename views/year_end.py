@@ -63,7 +63,7 @@ class YearEndCollection(APIView):
         with tracer.start_span('get_objects', child_of=request.span):
             order = controller.cleaned_data['order']
             try:
-                objs = NominalLedger.year_ends.filter(
+                objs = NominalLedger.year_ends.lean().filter(
                     address_id=request.user.address['id'],
                     **controller.cleaned_data['search'],
                 ).exclude(
@@ -78,8 +78,8 @@ class YearEndCollection(APIView):
             total_records = objs.count()
             page = controller.cleaned_data['page']
             limit = controller.cleaned_data['limit']
-            # Handle pagination
-            objs = objs[page * limit: (page + 1) * limit]
+            # Handle pagination. Only the page is fetched with the related rows its serialization needs
+            objs = NominalLedger.year_ends.related(objs)[page * limit: (page + 1) * limit]
             metadata = {
                 'page': page,
                 'limit': limit,
@@ -89,7 +89,7 @@ class YearEndCollection(APIView):
             }
 
         with tracer.start_span('serializing_data', child_of=request.span):
-            span.set_tag('num_objects', objs.count())
+            span.set_tag('num_objects', len(objs))
             data = YearEndSerializer(instance=objs, many=True).data
 
         return Response({'content': data, '_metadata': metadata})
@@ -129,7 +129,7 @@ class YearEndCollection(APIView):
             })
 
             # Check for a period end associated with this Year End
-            period_end = NominalLedger.period_end.filter(
+            period_end = NominalLedger.period_end.lean().filter(
                 address_id=cd['address_id'],
                 transaction_date=cd['transaction_date'],
             )